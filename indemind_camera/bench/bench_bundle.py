@@ -0,0 +1,87 @@
+"""
+每 tick 取数开销基准 — 旧调用方式 (get_frame + get_depth + get_imu，
+每路先查尺寸再取数) vs get_bundle() 一次调用。
+报告每 tick 耗时和 ctypes 调用次数。通过 FakeImseeLib 运行，无需相机；
+假库的每次调用都比真实 C 函数慢，因此调用次数的差距就是主要收益。
+用法: python bench/bench_bundle.py [tick 数]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from fake_sdk import FakeImseeLib
+from imsee_sdk import ImseeSdk
+
+RESOLUTIONS = ((640, 400), (1280, 800))
+IMU_PER_TICK = 40   # 1 kHz IMU / 25 fps
+
+
+def _count_calls(lib):
+    """把 lib 的 imsee_* 函数包一层计数，返回计数字典。"""
+    counter = {"n": 0}
+    for name in dir(lib):
+        if name.startswith("imsee_"):
+            fn = getattr(lib, name)
+
+            def counted(*args, _fn=fn):
+                counter["n"] += 1
+                return _fn(*args)
+
+            counted.argtypes = counted.restype = None
+            setattr(lib, name, counted)
+    return counter
+
+
+def _old_tick(sdk):
+    return sdk.get_frame(), sdk.get_depth(), sdk.get_imu()
+
+
+def _bundle_tick(sdk):
+    return sdk.get_bundle()
+
+
+def _run(width, height, ticks, fetch):
+    lib = FakeImseeLib()
+    counter = _count_calls(lib)
+    sdk = ImseeSdk(lib=lib)
+    sdk.init()
+    frame = np.zeros((height, width * 2), np.uint8)
+    depth = np.zeros((height, width), np.uint16)
+    elapsed = 0.0
+    for i in range(ticks + 1):
+        t0 = i / 25
+        imu = np.zeros((IMU_PER_TICK, 7))
+        imu[:, 0] = t0 + np.arange(1, IMU_PER_TICK + 1) / 1000 - 0.04
+        lib.push("imu", imu)
+        lib.push("frame", frame, timestamp=t0)
+        lib.push("depth", depth, timestamp=t0)
+        if i == 0:   # 预热 (首次分配缓冲)
+            fetch(sdk)
+            counter["n"] = 0
+            continue
+        start = time.perf_counter()
+        fetch(sdk)
+        elapsed += time.perf_counter() - start
+    return elapsed / ticks * 1e6, counter["n"] / ticks
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print(f"{'resolution':>10s} {'path':>7s} {'us/tick':>9s} {'calls/tick':>11s}")
+    for width, height in RESOLUTIONS:
+        for name, fetch in (("old", _old_tick), ("bundle", _bundle_tick)):
+            us, calls = _run(width, height, ticks, fetch)
+            print(f"{f'{width}x{height}':>10s} {name:>7s} {us:9.1f} {calls:11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+深度叠加合成基准 — OverlayCompositor (预分配缓冲) vs 旧实现 (逐帧分配 + 花式索引)。
+报告每帧耗时，以及 tracemalloc 统计的单帧临时内存峰值。
+用法: python bench/bench_compositor.py [迭代次数]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_DIR not in sys.path:
+    sys.path.insert(0, _PROJECT_DIR)
+
+from webapp.compositor import OverlayCompositor, _compose_reference
+
+CASES = (((400, 640), (400, 640)), ((800, 1280), (800, 1280)), ((800, 1280), (400, 640)))
+
+
+def _measure(fn, iters):
+    fn()  # 预热
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        fn()
+    ms = (time.perf_counter() - t0) / iters * 1000
+
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return ms, peak
+
+
+def main():
+    iters = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = np.random.default_rng(0)
+    print(f"{'camera':>10s} {'depth':>10s} {'path':>10s} {'ms/frame':>9s} "
+          f"{'peak KB':>9s}")
+    for cam_shape, depth_shape in CASES:
+        frame = rng.integers(0, 256, cam_shape, dtype=np.uint8)
+        depth = rng.integers(0, 6000, depth_shape, dtype=np.uint16)
+        depth[rng.random(depth_shape) < 0.15] = 0
+        comp = OverlayCompositor()
+        paths = (("old", lambda: _compose_reference(frame, depth, 0.5)),
+                 ("new", lambda: comp.compose(frame, depth, 0.5)))
+        for name, fn in paths:
+            ms, peak = _measure(fn, iters)
+            print(f"{f'{cam_shape[1]}x{cam_shape[0]}':>10s} "
+                  f"{f'{depth_shape[1]}x{depth_shape[0]}':>10s} {name:>10s} "
+                  f"{ms:9.2f} {peak / 1024:9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+数据集导出基准 — 在合成会话 (SyntheticScene 纹理双目 + 深度 + 1 kHz IMU) 上测 EuRoC / TUM 导出吞吐:
+主进程内逐张 cv2.imwrite 的串行导出 vs dataset_export 的 PNG 进程池 (1 / 2 / 4 / CPU 核数个进程)，
+报告帧/s、输入 MB/s 和相对采集帧率的余量；最后用合成 SDK 实时导出，报告丢帧。无需相机。
+用法: python bench/bench_dataset_export.py [秒数] [resolution 1|2] [PNG 压缩级别]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from dataset_export import export_live, export_session, to_ns
+from imu_stream import IMU_DTYPE
+from session import Session, SessionWriter
+from synthetic_sdk import SyntheticScene, SyntheticSdk
+
+SIZES = {1: (640, 400), 2: (1280, 800)}
+FPS = 25
+
+
+def generate(path, seconds, w, h):
+    scene = SyntheticScene(w, h, FPS)
+    with SessionWriter(path, 1 if w == 640 else 2, FPS, codecs={"depth": "zlib"},
+                       calibration=scene.calibration(), synthetic=True) as writer:
+        for i in range(int(seconds * FPS)):
+            out = scene.render(i, {"frame", "depth"})
+            writer.write("frame", out["frame"], i / FPS)
+            writer.write("depth", out["depth"], i / FPS)
+        imu = np.zeros(int(seconds * 1000), IMU_DTYPE)
+        imu["timestamp"] = np.arange(len(imu)) / 1000
+        imu["accel"][:, 2] = 9.81
+        imu["gyro"][:, 1] = np.sin(imu["timestamp"])
+        writer.write_imu(imu)
+
+
+def serial_euroc(session_path, out, compression):
+    """对照: 主进程内逐张编码写盘 (np.savetxt 写 IMU)。"""
+    params = [cv2.IMWRITE_PNG_COMPRESSION, compression]
+    s = Session(session_path)
+    for cam in ("cam0", "cam1"):
+        os.makedirs(os.path.join(out, "mav0", cam, "data"))
+    os.makedirs(os.path.join(out, "mav0", "imu0"))
+    for t, frame in s.iter_stream("frame"):
+        w = frame.shape[1] // 2
+        name = f"{int(to_ns(t))}.png"
+        cv2.imwrite(os.path.join(out, "mav0", "cam0", "data", name), frame[:, :w], params)
+        cv2.imwrite(os.path.join(out, "mav0", "cam1", "data", name), frame[:, w:], params)
+    imu = s.imu
+    cols = np.column_stack([to_ns(imu["timestamp"]), imu["gyro"], imu["accel"]])
+    np.savetxt(os.path.join(out, "mav0", "imu0", "data.csv"), cols,
+               fmt=["%d"] + ["%.6f"] * 6, delimiter=",")
+
+
+def run(label, fn, n_frames, frame_bytes, out):
+    shutil.rmtree(out, ignore_errors=True)
+    start = time.perf_counter()
+    fn(out)
+    elapsed = time.perf_counter() - start
+    png = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(out) for f in files
+              if f.endswith(".png"))
+    fps = n_frames / elapsed
+    print(f"{label:22s} {elapsed:7.2f}s {fps:8.1f} {n_frames * frame_bytes / elapsed / 1e6:9.1f} "
+          f"{png / 1e6:8.1f} {fps / FPS:7.2f}x")
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    resolution = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    compression = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    w, h = SIZES[resolution]
+    tmp = tempfile.mkdtemp(prefix="bench_export_")
+    try:
+        session_path = os.path.join(tmp, "session")
+        generate(session_path, seconds, w, h)
+        n = Session(session_path).count("frame")
+        cpus = os.cpu_count() or 1
+        print(f"CPU 核数 {cpus}，合成会话 {seconds:g}s: {n} 帧 {w}x{h} 双目 + 深度 + IMU，"
+              f"PNG 压缩级别 {compression}，采集 {FPS} fps")
+        print(f"\n{'导出方式':22s} {'耗时':>8s} {'帧/s':>8s} {'输入 MB/s':>9s} {'PNG MB':>8s} "
+              f"{'÷采集':>8s}")
+        out = os.path.join(tmp, "out")
+        run("EuRoC 串行", lambda o: serial_euroc(session_path, o, compression), n, h * w * 2, out)
+        for workers in sorted({1, 2, 4, cpus}):
+            run(f"EuRoC 进程池 x{workers}",
+                lambda o: export_session(session_path, o, workers=workers,
+                                         compression=compression), n, h * w * 2, out)
+        run(f"TUM 进程池 x{cpus}",
+            lambda o: export_session(session_path, o, "tum", workers=cpus,
+                                     compression=compression), n, h * w * 3, out)
+
+        sdk = SyntheticSdk(fps=FPS, size=(w, h))
+        sdk.init()
+        sdk.enable_depth()
+        sdk.enable_imu()
+        shutil.rmtree(out, ignore_errors=True)
+        live = min(seconds, 5.0)
+        stats = export_live(sdk, out, live, "tum", fps=FPS, compression=compression)
+        sdk.release()
+        counts = "  ".join(f"{k} {v} 帧 (丢 {stats['dropped'].get(k, 0)})"
+                           for k, v in stats["frames"].items())
+        print(f"\n实时导出 TUM {live:g}s (合成 SDK，进程池 x{cpus}): {counts}，"
+              f"IMU {stats['imu_samples']} 样本")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
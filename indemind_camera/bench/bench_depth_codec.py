@@ -0,0 +1,115 @@
+"""
+深度编码基准 — raw / zlib / PNG16 / depth_codec (RVL，独立帧与时间差分) 的压缩率和编解码吞吐。
+数据: 合成场景的真值深度；合成双目图经 StereoSGBM 算出的深度 (接近相机输出: 空洞、
+视差量化的台阶和边缘噪声)；给出会话目录时再加上录制的 depth 流。每种编码都校验无损。无需相机。
+用法: python bench/bench_depth_codec.py [帧数] [resolution 1|2] [会话目录]
+"""
+import os
+import sys
+import time
+import zlib
+
+import cv2
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+import depth_codec
+from session import Session
+from synthetic_sdk import SyntheticScene
+
+SIZES = {1: (640, 400), 2: (1280, 800)}
+
+
+def synthetic_depths(w, h, n):
+    scene = SyntheticScene(w, h, 25)
+    return [scene.render(i, {"depth"})["depth"].copy() for i in range(n)]
+
+
+def sgbm_depths(w, h, n):
+    scene = SyntheticScene(w, h, 25)
+    sgbm = cv2.StereoSGBM_create(0, 64, 5, P1=8 * 25, P2=32 * 25, uniquenessRatio=10,
+                                 speckleWindowSize=50, speckleRange=2)
+    out = []
+    for i in range(n):
+        frame = scene.render(i, set())["frame"]
+        disp = sgbm.compute(frame[:, :w], frame[:, w:]).astype(np.float32) / 16
+        depth = np.zeros((h, w), np.float32)
+        np.divide(scene.fxb, disp, out=depth, where=disp > 0)
+        out.append(np.clip(depth, 0, 65535).astype(np.uint16))
+    return out
+
+
+def session_depths(path, n):
+    s = Session(path)
+    return [np.array(s.read("depth", i)) for i in range(min(n, s.count("depth")))]
+
+
+def _stream(factory):
+    """有状态编码 (时间差分): 每轮用新的编码器 / 解码器。"""
+    def encode_all(depths):
+        enc = factory[0]()
+        return [enc.encode(d) for d in depths]
+
+    def decode_all(blobs):
+        dec = factory[1]()
+        return [dec.decode(b) for b in blobs]
+    return encode_all, decode_all
+
+
+def _each(encode, decode):
+    return (lambda depths: [encode(d) for d in depths],
+            lambda blobs: [decode(b) for b in blobs])
+
+
+def codecs(shape):
+    return [
+        ("raw", *_each(lambda d: d.tobytes(),
+                       lambda b: np.frombuffer(b, np.uint16).reshape(shape))),
+        ("zlib-1", *_each(lambda d: zlib.compress(d, 1),
+                          lambda b: np.frombuffer(zlib.decompress(b), np.uint16).reshape(shape))),
+        ("zlib-6", *_each(lambda d: zlib.compress(d, 6),
+                          lambda b: np.frombuffer(zlib.decompress(b), np.uint16).reshape(shape))),
+        ("PNG16", *_each(lambda d: cv2.imencode(".png", d)[1],
+                         lambda b: cv2.imdecode(b, cv2.IMREAD_UNCHANGED))),
+        ("rvl", *_each(depth_codec.encode, depth_codec.decode)),
+        ("rvl 时间差分", *_stream((depth_codec.DepthEncoder, depth_codec.DepthDecoder))),
+    ]
+
+
+def run(name, depths):
+    h, w = depths[0].shape
+    raw = sum(d.nbytes for d in depths)
+    print(f"\n{name}: {len(depths)} 帧 {w}x{h}，空洞 {np.mean([(d == 0).mean() for d in depths]):.1%}")
+    print(f"{'编码':14s} {'压缩率':>8s} {'编码 MB/s':>10s} {'ms/帧':>7s} {'解码 MB/s':>10s} {'ms/帧':>7s}")
+    for codec, encode_all, decode_all in codecs((h, w)):
+        start = time.perf_counter()
+        blobs = encode_all(depths)
+        enc = time.perf_counter() - start
+        start = time.perf_counter()
+        back = decode_all(blobs)
+        dec = time.perf_counter() - start
+        assert all(np.array_equal(a, b) for a, b in zip(depths, back)), codec
+        size = sum(len(b) for b in blobs)
+        print(f"{codec:14s} {size / raw:8.2%} {raw / enc / 1e6:10.0f} {enc / len(depths) * 1e3:7.2f} "
+              f"{raw / dec / 1e6:10.0f} {dec / len(depths) * 1e3:7.2f}")
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    resolution = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    w, h = SIZES[resolution]
+    print(f"CPU 核数 {os.cpu_count()}，压缩率 = 编码后 / 原始字节")
+    run("合成场景真值深度", synthetic_depths(w, h, frames))
+    run("合成双目 + StereoSGBM 深度", sgbm_depths(w, h, frames))
+    if len(sys.argv) > 3:
+        run(f"录制会话 {sys.argv[3]}", session_depths(sys.argv[3], frames))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
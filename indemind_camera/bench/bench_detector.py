@@ -0,0 +1,106 @@
+"""
+检测结果解析基准 — 旧实现 (int[6] 缓冲 + 逐框 Python 循环拼 dict，再用列表推导
+过滤类别 / 分数) vs 结构化数组 (get_detector_boxes() + detector_utils 向量化过滤 /
+去重)。默认 256 个框。通过 FakeImseeLib 运行，无需相机。
+用法: python bench/bench_detector.py [框数] [次数]
+"""
+import ctypes
+import os
+import sys
+import time
+
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from config import CLASS_NAMES
+from detector_utils import dedup, filter_classes, filter_score, make_boxes
+from fake_sdk import FakeImseeLib
+from imsee_sdk import ImseeSdk
+
+KEEP_CLASSES = {1, 2, 3}
+MIN_SCORE = 0.3
+
+
+def _random_boxes(n, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.integers(0, 600, (n, 2))
+    wh = rng.integers(10, 80, (n, 2))
+    cls = rng.integers(0, 10, n)
+    score = rng.random(n)
+    return make_boxes(np.column_stack([xy, wh, cls, score]).tolist())
+
+
+def _old_parse(lib, buf, max_boxes):
+    """旧的 get_detector_boxes(): 逐元素索引 ctypes 数组拼 dict。"""
+    seq, ts = ctypes.c_uint64(0), ctypes.c_double(0)
+    got = lib.imsee_get_detector_boxes_ex(buf, max_boxes, ctypes.byref(seq), ctypes.byref(ts))
+    result = []
+    for i in range(max(got, 0)):
+        off = i * 6
+        result.append({
+            "x": buf[off], "y": buf[off + 1], "w": buf[off + 2], "h": buf[off + 3],
+            "class_id": buf[off + 4],
+            "class_name": CLASS_NAMES.get(buf[off + 4], "UNKNOWN"),
+            "score": buf[off + 5] / 1000.0,
+        })
+    return result
+
+
+def _old_filter(boxes):
+    return [b for b in boxes if b["class_id"] in KEEP_CLASSES and b["score"] >= MIN_SCORE]
+
+
+def _run(boxes, iters, fetch, post):
+    lib = FakeImseeLib()
+    sdk = ImseeSdk(lib=lib)
+    sdk.init()
+    buf = (ctypes.c_int * (len(boxes) * 6))()
+    times = np.zeros(3)
+    for _ in range(iters):
+        lib.push("detector", boxes)
+        t0 = time.perf_counter()
+        got = fetch(sdk, lib, buf, len(boxes))
+        t1 = time.perf_counter()
+        kept = post(got)
+        t2 = time.perf_counter()
+        if post is _new_filter:
+            dedup(kept)
+        t3 = time.perf_counter()
+        times += (t1 - t0, t2 - t1, t3 - t2)
+    return times / iters * 1e6, len(got), len(kept)
+
+
+def _old(sdk, lib, buf, n):
+    return _old_parse(lib, buf, n)
+
+
+def _new(sdk, lib, buf, n):
+    return sdk.get_detector_boxes(max_boxes=n)
+
+
+def _new_filter(boxes):
+    return filter_score(filter_classes(boxes, KEEP_CLASSES), MIN_SCORE)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    iters = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    boxes = _random_boxes(n)
+    print(f"{n} 个框, {iters} 次")
+    print(f"{'path':>11s} {'取数 us':>9s} {'过滤 us':>9s} {'去重 us':>9s} {'框数':>5s} {'保留':>5s}")
+    for name, fetch, post in (("dict loop", _old, _old_filter),
+                              ("structured", _new, _new_filter)):
+        (fetch_us, post_us, dedup_us), got, kept = _run(boxes, iters, fetch, post)
+        dedup_col = f"{dedup_us:9.1f}" if post is _new_filter else f"{'-':>9s}"
+        print(f"{name:>11s} {fetch_us:9.1f} {post_us:9.1f} {dedup_col} {got:5d} {kept:5d}")
+    print("(去重: 过滤后的框做 Fast NMS，旧实现没有对应功能)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
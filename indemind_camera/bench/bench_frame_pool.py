@@ -0,0 +1,72 @@
+"""
+ImseeSdk 取帧分配基准 — get_*() (每次 .copy()) vs lease() (池缓冲, C 侧直接写入)。
+报告每次取帧耗时，以及 tracemalloc 统计的单次取帧新分配内存。
+通过 FakeImseeLib 运行，无需相机。
+用法: python bench/bench_frame_pool.py [迭代次数]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from fake_sdk import FakeImseeLib
+from imsee_sdk import ImseeSdk
+
+# (kind, 数据形状, dtype, 旧接口)
+CASES = (
+    ("depth", (400, 640), np.uint16, "get_depth"),
+    ("depth", (800, 1280), np.uint16, "get_depth"),
+    ("disparity", (400, 640), np.float32, "get_disparity"),
+    ("rectified", (800, 2560), np.uint8, "get_rectified"),
+)
+
+
+def _measure(lib, kind, data, fetch, iters):
+    def once():
+        lib.push(kind, data)
+        t0 = time.perf_counter()
+        fetch()
+        return time.perf_counter() - t0
+
+    once()  # 预热 (首次分配池 / 内部缓冲)
+    us = sum(once() for _ in range(iters)) / iters * 1e6
+
+    lib.push(kind, data)
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        fetch()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return us, peak
+
+
+def main():
+    iters = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'kind':>10s} {'shape':>10s} {'path':>8s} {'us/fetch':>9s} {'alloc KB':>9s}")
+    for kind, shape, dtype, getter in CASES:
+        lib = FakeImseeLib()
+        sdk = ImseeSdk(lib=lib)
+        data = np.random.default_rng(0).integers(0, 200, shape).astype(dtype)
+
+        def leased():
+            sdk.lease(kind).release()
+
+        for name, fetch in (("copy", getattr(sdk, getter)), ("lease", leased)):
+            us, peak = _measure(lib, kind, data, fetch, iters)
+            print(f"{kind:>10s} {f'{shape[1]}x{shape[0]}':>10s} {name:>8s} "
+                  f"{us:9.1f} {peak / 1024:9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+IMU 录制基准 — 1 kHz 合成 IMU 流 (默认 1 小时，每批 20 个样本，即 50 Hz 送达)。
+对比: 旧 record_imu.py (Python 列表累积 + 逐行 f-string 写 CSV) vs ImuRecorder 流式写 .npy
++ 向量化转 CSV。每个阶段在独立进程中运行，报告峰值 RSS (相对进程起点的增量) 和吞吐。
+旧路径内存随时长线性增长，默认只跑 10 分钟。
+用法: python bench/bench_imu_recorder.py [分钟数] [旧路径分钟数]
+"""
+import concurrent.futures
+import csv
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from imu_recorder import ImuRecorder, to_csv
+from imu_stream import as_columns
+from synthetic_sdk import SyntheticScene
+
+RATE = 1000
+BATCH = 20
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def _peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def _batches(minutes):
+    """按分钟复用一块合成数据，只平移时间戳 (生成开销不计入写入)。"""
+    block = SyntheticScene.imu(0, 60 * RATE, RATE)
+    for m in range(int(minutes)):
+        chunk = block.copy()
+        chunk["timestamp"] += 60 * m
+        for i in range(0, len(chunk), BATCH):
+            yield chunk[i:i + BATCH]
+
+
+def _phase_stream(path, minutes):
+    base = _rss_mb()
+    spent = 0.0
+    with ImuRecorder(path) as rec:
+        for batch in _batches(minutes):
+            t0 = time.perf_counter()
+            rec.write(batch)
+            spent += time.perf_counter() - t0
+        t0 = time.perf_counter()
+    spent += time.perf_counter() - t0
+    return {"samples": rec.count, "bytes": os.path.getsize(path), "seconds": spent,
+            "peak": _peak_mb(), "delta": _peak_mb() - base, "syncs": rec.syncs}
+
+
+def _phase_to_csv(path, csv_path):
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    n = to_csv(path, csv_path)
+    return {"samples": n, "bytes": os.path.getsize(csv_path),
+            "seconds": time.perf_counter() - t0, "peak": _peak_mb(), "delta": _peak_mb() - base}
+
+
+def _phase_legacy(csv_path, minutes):
+    """旧 record_imu.py 的做法。"""
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    all_samples = []
+    for batch in _batches(minutes):
+        all_samples.extend(as_columns(batch).tolist())
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "accel_x", "accel_y", "accel_z",
+                         "gyro_x", "gyro_y", "gyro_z"])
+        for row in all_samples:
+            writer.writerow([f"{row[0]:.6f}",
+                             f"{row[1]:.6f}", f"{row[2]:.6f}", f"{row[3]:.6f}",
+                             f"{row[4]:.6f}", f"{row[5]:.6f}", f"{row[6]:.6f}"])
+    return {"samples": len(all_samples), "bytes": os.path.getsize(csv_path),
+            "seconds": time.perf_counter() - t0, "peak": _peak_mb(), "delta": _peak_mb() - base}
+
+
+def _isolated(fn, *args):
+    """在新进程里跑一个阶段，峰值 RSS 互不影响。"""
+    ctx = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=ctx) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _report(name, r):
+    mb = r["bytes"] / 1e6
+    print(f"{name:22s} {r['samples']:9d} {mb:8.1f} {r['seconds']:8.2f} "
+          f"{r['samples'] / r['seconds'] / 1e6:9.2f} {mb / r['seconds']:8.1f} "
+          f"{r['peak']:8.0f} {r['delta']:8.1f}")
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+    legacy_minutes = float(sys.argv[2]) if len(sys.argv) > 2 else min(minutes, 10)
+    with tempfile.TemporaryDirectory() as tmp:
+        npy, csv_path = os.path.join(tmp, "imu.npy"), os.path.join(tmp, "imu.csv")
+        print(f"1 kHz IMU, 每批 {BATCH} 个样本; 流式 {minutes:g} 分钟, 旧路径 {legacy_minutes:g} 分钟")
+        print(f"{'':22s} {'样本数':>9s} {'MB':>8s} {'秒':>8s} {'M 样本/s':>9s} {'MB/s':>8s} "
+              f"{'峰值RSS':>8s} {'增量MB':>8s}")
+        _report("ImuRecorder (.npy)", _isolated(_phase_stream, npy, minutes))
+        _report("  -> to_csv", _isolated(_phase_to_csv, npy, csv_path))
+        if legacy_minutes > 0:
+            _report("旧: 列表 + 逐行 CSV",
+                    _isolated(_phase_legacy, os.path.join(tmp, "legacy.csv"), legacy_minutes))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
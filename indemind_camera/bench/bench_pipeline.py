@@ -0,0 +1,157 @@
+"""
+端到端管线压测 — SyntheticSdk 现场生成数据 (默认 1280x800 @ 50 fps + 检测框 + 1 kHz IMU)，
+IndemindHandler 采集，StreamHub 向 1 / 4 / 16 个模拟流客户端 (frame / overlay 交替) 推 JPEG，
+同时一个旁路线程读 IMU 和检测框。无需相机。每轮报告:
+    源 / 采集 / 客户端平均帧率，源帧产生到客户端拿到 JPEG 的延迟 p50 / p99，
+    进程 CPU (单核 %) 和 RSS，旁路读到的 IMU / 检测框速率。
+用法: python bench/bench_pipeline.py [秒数] [resolution 1|2] [fps] [imu_rate]
+"""
+import asyncio
+import os
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from synthetic_sdk import SyntheticSdk
+from webapp.indemind_handler import IndemindHandler
+from webapp.stream_hub import StreamHub
+
+CLIENT_COUNTS = (1, 4, 16)
+WARMUP = 0.5
+
+
+class _TimedSdk(SyntheticSdk):
+    """记下 handler 最近取到的帧的传感器时间戳 (monotonic)，新帧回调据此算延迟。"""
+
+    frame_time = 0.0
+
+    def get_frame(self):
+        frame = super().get_frame()
+        if frame is not None:
+            self.frame_time = frame.timestamp
+        return frame
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:   # 非 Linux: 退回峰值 RSS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def _side_reader(sdk, stop, counts):
+    """旁路消费者: 和 webapp 的采集线程并发读 IMU 与检测框。"""
+    reader = sdk.imu_reader()
+    while not stop.is_set():
+        counts["imu"] += len(reader.read())
+        if sdk.get_detector_boxes().seq:
+            counts["detector"] += 1
+        stop.wait(0.005)
+
+
+async def _client(hub, kind, published, latencies, deadline):
+    sub = hub.subscribe(kind, 80)
+    try:
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                data = await asyncio.wait_for(hub.next_jpeg(sub), left)
+            except asyncio.TimeoutError:
+                break
+            if data is None:
+                break
+            source = published.get(sub.last_seq)
+            if source:
+                latencies.append(time.monotonic() - source)
+    finally:
+        hub.unsubscribe(sub)
+    return sub.frames_sent
+
+
+async def _clients(hub, n, published, latencies, duration):
+    deadline = time.monotonic() + duration
+    kinds = ("frame", "overlay")
+    return await asyncio.gather(*(_client(hub, kinds[i % 2], published, latencies, deadline)
+                                  for i in range(n)))
+
+
+def run(n_clients, duration, resolution, fps, imu_rate):
+    sdk = _TimedSdk(resolution, fps, imu_rate)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    if not h.start()["success"]:
+        raise RuntimeError("handler start failed")
+    sdk.enable_detector()
+    sdk.enable_imu()
+    hub = StreamHub(h)
+    published = {}   # 快照 seq -> 源帧时间戳
+    h.add_frame_listener(lambda snap: published.__setitem__(snap.seq, sdk.frame_time))
+    stop, counts = threading.Event(), {"imu": 0, "detector": 0}
+    side = threading.Thread(target=_side_reader, args=(sdk, stop, counts), daemon=True)
+    side.start()
+    time.sleep(WARMUP)
+
+    latencies = []
+    gen0 = sdk.generator_stats()
+    snap0 = h.get_snapshot()
+    cap0 = snap0.seq if snap0 is not None else 0
+    counts.update(imu=0, detector=0)
+    cpu0, t0 = time.process_time(), time.monotonic()
+    sent = asyncio.run(_clients(hub, n_clients, published, latencies, duration))
+    wall = time.monotonic() - t0
+    cpu = time.process_time() - cpu0
+    gen1 = sdk.generator_stats()
+    cap1 = h.get_snapshot().seq
+    side_counts = dict(counts)
+    rss = _rss_mb()
+    stop.set()
+    side.join()
+    h.stop()
+
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "source_fps": (gen1["frames"] - gen0["frames"]) / wall,
+        "skipped": gen1["skipped"] - gen0["skipped"],
+        "render_ms": gen1["render_ms"],
+        "capture_fps": (cap1 - cap0) / wall,
+        "client_fps": sum(sent) / n_clients / wall,
+        "p50": float(np.percentile(lat, 50)),
+        "p99": float(np.percentile(lat, 99)),
+        "cpu": cpu / wall * 100,
+        "rss": rss,
+        "imu_hz": side_counts["imu"] / wall,
+        "det_hz": side_counts["detector"] / wall,
+    }
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    resolution = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    fps = float(sys.argv[3]) if len(sys.argv) > 3 else 50
+    imu_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 1000
+    print(f"合成数据 resolution={resolution} @ {fps:g} fps + 检测框 + IMU {imu_rate:g} Hz，"
+          f"每轮 {duration:g}s")
+    print(f"{'clients':>7s} {'源 fps':>7s} {'丢节拍':>6s} {'采集 fps':>8s} {'客户端 fps':>10s} "
+          f"{'p50 ms':>7s} {'p99 ms':>7s} {'CPU %':>6s} {'RSS MB':>7s} {'IMU Hz':>7s} "
+          f"{'检测 Hz':>7s}")
+    for n in CLIENT_COUNTS:
+        r = run(n, duration, resolution, fps, imu_rate)
+        print(f"{n:7d} {r['source_fps']:7.1f} {r['skipped']:6d} {r['capture_fps']:8.1f} "
+              f"{r['client_fps']:10.1f} {r['p50']:7.1f} {r['p99']:7.1f} {r['cpu']:6.0f} "
+              f"{r['rss']:7.0f} {r['imu_hz']:7.0f} {r['det_hz']:7.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+会话读取基准 — 生成一段约 N GB 的合成会话 (1280x800 双目 raw + 深度 zlib + 1 kHz IMU)，
+对比内存映射的 Session 与旧读法 (np.load 整个索引 / IMU，每帧 seek + read 拷贝):
+打开耗时与内存、按时间戳定位、随机读帧 (零拷贝视图 / 读入内容)、深度解码、对齐遍历。无需相机。
+用法: python bench/bench_session_reader.py [GB] [会话目录]
+会话目录缺省为临时目录 (跑完删除)；指定目录时保留，下次直接复用。
+"""
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from imu_stream import IMU_DTYPE
+from session import IMU_FILE, META_FILE, STREAM_DTYPES, Session, SessionWriter
+from synthetic_sdk import SyntheticScene
+
+W, H, FPS, IMU_RATE = 1280, 800, 25, 1000
+VARIANTS = 16   # 预先渲染的不同画面数，循环写入 (帧首 4 字节写帧号，读回时校验)
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def generate(path, gigabytes):
+    scene = SyntheticScene(W, H, FPS)
+    frames, depths = [], []
+    for i in range(VARIANTS):
+        out = scene.render(i, {"frame", "depth"})
+        frames.append(np.ascontiguousarray(out["frame"]))
+        depths.append(zlib.compress(np.ascontiguousarray(out["depth"]), 1))
+    count = int(gigabytes * 1e9 // (frames[0].nbytes + len(depths[0])))
+    start = time.perf_counter()
+    with SessionWriter(path, 2, FPS, codecs={"depth": "zlib"}, synthetic=True) as w:
+        for i in range(count):
+            t = i / FPS
+            frame = frames[i % VARIANTS]
+            frame.reshape(-1)[:4] = np.frombuffer(np.uint32(i).tobytes(), np.uint8)
+            w.write("frame", frame, t, seq=i + 1)
+            w.write_encoded("depth", depths[i % VARIANTS], (H, W), t + 0.005, i + 1)
+            if i % FPS == FPS - 1:
+                imu = np.zeros(IMU_RATE, IMU_DTYPE)
+                imu["timestamp"] = (i + 1 - FPS) / FPS + np.arange(IMU_RATE) / IMU_RATE
+                imu["accel"][:, 2] = 9.81
+                w.write_imu(imu)
+            if i % 500 == 0:
+                sys.stdout.write(f"\r  生成 {i}/{count} 帧")
+                sys.stdout.flush()
+    print(f"\r  生成 {count} 帧，{time.perf_counter() - start:.1f}s")
+
+
+class LegacySession:
+    """内存映射之前的读法: 打开时 np.load 索引和整个 imu.npy，读帧用 seek + read。"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            self.streams = json.load(f)["streams"]
+        self.path = path
+        self.index = {k: np.load(os.path.join(path, f"{k}.idx.npy"))
+                      for k in self.streams if k != "imu"}
+        self.imu = np.load(os.path.join(path, IMU_FILE))
+        self._files = {}
+
+    def read(self, kind, i):
+        entry = self.index[kind][i]
+        f = self._files.get(kind)
+        if f is None:
+            f = self._files[kind] = open(os.path.join(self.path, f"{kind}.bin"), "rb")
+        f.seek(int(entry["offset"]))
+        raw = f.read(int(entry["nbytes"]))
+        if self.streams[kind].get("codec", "raw") == "zlib":
+            raw = zlib.decompress(raw)
+        shape = tuple(entry["shape"][:int(entry["ndim"])].tolist())
+        return np.frombuffer(raw, STREAM_DTYPES[kind]).reshape(shape)
+
+
+def read_frames(reader, picks):
+    """随机读帧并读完内容 (校验帧号)，返回每帧毫秒数。"""
+    start = time.perf_counter()
+    for i in picks:
+        frame = reader.read("frame", int(i))
+        assert int(np.frombuffer(frame.reshape(-1)[:4].tobytes(), np.uint32)[0]) == i
+        frame.sum(dtype=np.uint64)
+    return (time.perf_counter() - start) / len(picks) * 1e3
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    gigabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    keep = len(sys.argv) > 2
+    path = sys.argv[2] if keep else tempfile.mkdtemp(prefix="bench_session_")
+    try:
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            print(f"生成约 {gigabytes:g} GB 合成会话: {path}")
+            generate(path, gigabytes)
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        rng = np.random.default_rng(0)
+
+        open_s = timed(lambda: Session(path), 20)
+        legacy_open = timed(lambda: LegacySession(path), 3)
+        rss0 = rss_mb()
+        s = Session(path)
+        rss_session = rss_mb() - rss0
+        legacy = LegacySession(path)
+        rss_legacy = rss_mb() - rss0 - rss_session
+        n = s.count("frame")
+        print(f"\n会话 {size / 1e9:.2f} GB: {n} 帧 ({n / FPS:.0f}s)，IMU {s.count('imu')} 样本，"
+              f"内存 {os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1e9:.1f} GB")
+        print(f"\n{'':20s} {'Session (mmap)':>16s} {'旧读法':>16s}")
+        print(f"{'打开':20s} {open_s * 1e3:13.2f} ms {legacy_open * 1e3:13.2f} ms")
+        print(f"{'打开后 RSS 增量':20s} {rss_session:13.1f} MB {rss_legacy:13.1f} MB")
+
+        targets = rng.uniform(0, n / FPS, 100_000)
+        start = time.perf_counter()
+        for t in targets:
+            s.nearest("frame", t)
+        seek_us = (time.perf_counter() - start) / len(targets) * 1e6
+        first_imu = time.perf_counter()
+        s.imu_between(0.0, 0.0)
+        first_imu = time.perf_counter() - first_imu
+        start = time.perf_counter()
+        for t in targets[:20_000]:
+            s.imu_between(t, t + 0.04)
+        imu_us = (time.perf_counter() - start) / 20_000 * 1e6
+        start = time.perf_counter()
+        for q in rng.integers(1, n + 1, 20_000):
+            s.find_seq("frame", q)
+        seq_us = (time.perf_counter() - start) / 20_000 * 1e6
+        print(f"{'按时间戳定位 frame':20s} {seek_us:13.2f} us")
+        print(f"{'按 SDK 序号定位':20s} {seq_us:13.2f} us")
+        print(f"{'IMU 区间':20s} {imu_us:13.2f} us   (首次取时间列 {first_imu * 1e3:.0f} ms)")
+
+        picks = rng.integers(0, n, 200)
+        view_us = timed(lambda: [s.read("frame", int(i)) for i in picks], 5) / len(picks) * 1e6
+        print(f"{'随机取帧 (只建视图)':20s} {view_us:13.2f} us")
+        # 两种读法各用一组不同的随机帧，避免后一种吃到前一种读进页缓存的数据
+        touch_ms = [read_frames(r, rng.integers(0, n, 200)) for r in (s, legacy)]
+        print(f"{'随机取帧 + 读完内容':20s} {touch_ms[0]:13.2f} ms {touch_ms[1]:13.2f} ms")
+        depth_ms = [timed(lambda: r.read("depth", int(picks[0])), 20) * 1e3 for r in (s, legacy)]
+        print(f"{'随机取深度 (zlib 解码)':20s} {depth_ms[0]:13.2f} ms {depth_ms[1]:13.2f} ms")
+
+        t0 = float(rng.uniform(0, max(n / FPS - 10, 0)))
+        start = time.perf_counter()
+        count = 0
+        for sample in s.aligned(("frame", "depth"), start=t0, end=t0 + 10):
+            sample["frame"].sum(dtype=np.uint64)
+            count += 1
+        elapsed = time.perf_counter() - start
+        print(f"{'对齐遍历 10s 片段':20s} {count / elapsed:10.1f} 组/s  "
+              f"({count} 组, {elapsed:.2f}s, 含深度解码)")
+        print(f"\n进程 RSS {rss_mb():.0f} MB，峰值 "
+              f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3:.0f} MB")
+    finally:
+        if not keep:
+            shutil.rmtree(path, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+会话录制基准 — SyntheticSdk 现场生成 1280x800 @ 25 fps 双目 + 深度 + 1 kHz IMU，
+SessionRecorder 录到临时目录。对比编码方式和编码线程数，报告各路实际录下的帧率、
+积压丢弃 / SDK 侧漏取帧数、写盘带宽、进程 CPU 和最大积压。无需相机。
+用法: python bench/bench_session_recorder.py [秒数] [resolution 1|2] [fps]
+"""
+import os
+import sys
+import tempfile
+import time
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from session_recorder import SessionRecorder
+from synthetic_sdk import SyntheticSdk
+
+KINDS = ("frame", "depth", "imu")
+# (名称, codecs, 编码线程数)；codecs=None 即 DEFAULT_CODECS
+CONFIGS = (
+    ("raw", {}, 1),
+    ("默认 (深度 zlib)", None, 1),
+    ("默认 (深度 zlib)", None, 4),
+    ("全部 zlib", {"frame": "zlib", "depth": "zlib"}, 4),
+)
+
+
+def run(codecs, workers, duration, resolution, fps):
+    sdk = SyntheticSdk(resolution, fps)
+    sdk.init()
+    sdk.enable_depth()
+    sdk.enable_imu()
+    time.sleep(0.3)
+    with tempfile.TemporaryDirectory() as tmp:
+        rec = SessionRecorder(sdk, tmp, KINDS, codecs=codecs, workers=workers,
+                              resolution=resolution, fps=fps)
+        cpu0 = time.process_time()
+        rec.start()
+        time.sleep(duration)
+        stats = rec.stop()
+        cpu = time.process_time() - cpu0
+    sdk.release()
+    stats["cpu"] = cpu / stats["seconds"] * 100
+    return stats
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    resolution = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    fps = float(sys.argv[3]) if len(sys.argv) > 3 else 25
+    print(f"合成数据 resolution={resolution} @ {fps:g} fps, frame + depth + IMU, "
+          f"每轮 {duration:g}s, CPU 核数 {os.cpu_count()}")
+    print(f"{'编码':16s} {'线程':>4s} {'frame fps':>9s} {'depth fps':>9s} {'丢弃':>5s} "
+          f"{'漏取':>5s} {'IMU 丢失':>8s} {'MB/s':>7s} {'CPU %':>6s} {'最大积压':>8s}")
+    for name, codecs, workers in CONFIGS:
+        st = run(codecs, workers, duration, resolution, fps)
+        streams = st["streams"]
+        dropped = sum(s["dropped"] for s in streams.values())
+        missed = sum(s["missed"] for s in streams.values())
+        print(f"{name:16s} {workers:4d} {streams['frame']['fps']:9.1f} "
+              f"{streams['depth']['fps']:9.1f} {dropped:5d} {missed:5d} "
+              f"{st['imu_dropped']:8d} {st['bytes'] / st['seconds'] / 1e6:7.1f} "
+              f"{st['cpu']:6.0f} {st['max_backlog']:8d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+共享内存采集 worker 吞吐基准 — 一个合成数据源 worker 进程按 fps 发布 frame + depth，
+1 / 2 / 4 / 8 个读者进程各自用 ShmSdk 读取。报告每个读者实际取到的帧率、拷贝带宽、
+漏帧 (读者慢于 worker 而被跳过的帧) 和半帧 (像素不一致) 数。无需相机。
+用法: python bench/bench_shm_worker.py [fps] [秒数] [resolution 1|2]
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from capture_worker import CaptureWorker
+from shm_ring import ShmSdk
+
+READER_COUNTS = (1, 2, 4, 8)
+
+
+def _reader(name, duration, start, out):
+    sdk = ShmSdk(name)
+    sdk.init()
+    start.wait()
+    frames = nbytes = missed = torn = 0
+    last = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        got = sdk.wait_any(("frame", "depth"), timeout=0.1)
+        depth = got.get("depth")
+        for arr in got.values():
+            nbytes += arr.nbytes
+            if not (arr.reshape(-1)[::997] == arr.flat[0]).all():
+                torn += 1
+        if depth is not None:
+            if last:
+                missed += depth.seq - last - 1
+            last = depth.seq
+            frames += 1
+    sdk.release()
+    out.put((frames, nbytes, missed, torn))
+
+
+def _run(readers, fps, duration, resolution):
+    name = f"imsee_bench_{os.getpid()}"
+    ctx = multiprocessing.get_context("spawn")
+    with CaptureWorker(name, "synthetic", kinds=("frame", "depth"), fps=fps,
+                       resolution=resolution, slots=4) as worker:
+        worker.wait_running()
+        start, out = ctx.Event(), ctx.Queue()
+        procs = [ctx.Process(target=_reader, args=(name, duration, start, out))
+                 for _ in range(readers)]
+        for p in procs:
+            p.start()
+        time.sleep(0.5)   # 等读者进程启动并挂上共享内存
+        head0 = worker.stats()["heads"]["depth"]
+        t0 = time.monotonic()
+        start.set()
+        results = [out.get() for _ in procs]
+        publish_fps = (worker.stats()["heads"]["depth"] - head0) / (time.monotonic() - t0)
+        for p in procs:
+            p.join()
+    return publish_fps, results
+
+
+def main():
+    fps = float(sys.argv[1]) if len(sys.argv) > 1 else 100
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    resolution = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    print(f"合成数据 {fps:g} fps, resolution={resolution}, 每轮 {duration:g}s")
+    print(f"{'readers':>7s} {'发布 fps':>9s} {'读者 fps':>9s} {'MB/s/读者':>10s} "
+          f"{'总 MB/s':>8s} {'漏帧':>6s} {'半帧':>5s}")
+    for readers in READER_COUNTS:
+        publish_fps, results = _run(readers, fps, duration, resolution)
+        frames = [r[0] for r in results]
+        mb = [r[1] / duration / 1e6 for r in results]
+        missed = sum(r[2] for r in results)
+        torn = sum(r[3] for r in results)
+        print(f"{readers:7d} {publish_fps:9.1f} {sum(frames) / readers / duration:9.1f} "
+              f"{sum(mb) / readers:10.1f} {sum(mb):8.1f} {missed:6d} {torn:5d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
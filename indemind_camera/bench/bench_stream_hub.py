@@ -0,0 +1,72 @@
+"""
+StreamHub 编码扇出基准 — 1 / 10 / 50 个模拟订阅者。
+对比: 每个订阅者各自调用 handler.get_*_jpeg (旧路径) vs StreamHub 共享编码。
+用法: python bench/bench_stream_hub.py [帧数]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from fake_sdk import FakeImseeSdk
+from webapp.indemind_handler import IndemindHandler
+from webapp.stream_hub import StreamHub
+
+SUBSCRIBERS = (1, 10, 50)
+
+
+def _push_and_wait(sdk, h, rng):
+    frame = rng.integers(0, 256, (sdk.height, sdk.width * 2), dtype=np.uint8)
+    depth = rng.integers(300, 4500, (sdk.height, sdk.width), dtype=np.uint16)
+    seq = h.get_snapshot().seq if h.get_snapshot() is not None else 0
+    sdk.push(frame, depth)
+    while h.get_snapshot() is None or h.get_snapshot().seq <= seq:
+        time.sleep(0.0005)
+
+
+def run(kind, n_subs, frames, use_hub):
+    rng = np.random.default_rng(0)
+    sdk = FakeImseeSdk(width=640, height=400)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    h.start()
+    hub = StreamHub(h)
+    subs = [hub.subscribe(kind, 80) for _ in range(n_subs)]
+    naive = h.get_frame_jpeg if kind == "frame" else h.get_overlay_jpeg
+
+    cpu = 0.0
+    for _ in range(frames):
+        _push_and_wait(sdk, h, rng)
+        t0 = time.process_time()
+        for s in subs:
+            if use_hub:
+                hub.get_jpeg(s)
+            else:
+                naive(quality=80)
+        cpu += time.process_time() - t0
+    h.stop()
+    encodes = hub.encode_count if use_hub else n_subs * frames
+    return cpu / frames * 1000, encodes
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"{'kind':8s} {'subs':>5s} {'per-client ms/frame':>20s} {'hub ms/frame':>14s} "
+          f"{'encodes (old/hub)':>18s}")
+    for kind in ("frame", "overlay"):
+        for n in SUBSCRIBERS:
+            old_ms, old_enc = run(kind, n, frames, use_hub=False)
+            hub_ms, hub_enc = run(kind, n, frames, use_hub=True)
+            print(f"{kind:8s} {n:5d} {old_ms:20.2f} {hub_ms:14.2f} "
+                  f"{f'{old_enc}/{hub_enc}':>18s}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
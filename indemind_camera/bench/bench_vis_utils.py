@@ -0,0 +1,56 @@
+"""
+vis_utils 彩色化微基准 — LUT 快速路径 vs 旧的逐像素实现。
+分辨率: 640x400, 1280x800。
+用法: python bench/bench_vis_utils.py [迭代次数]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from vis_utils import (depth_to_color, disparity_to_color,
+                       _depth_to_color_reference, _disparity_to_color_reference)
+
+RESOLUTIONS = ((640, 400), (1280, 800))
+
+
+def _time_ms(fn, arg, iters):
+    fn(arg)  # 预热 (含 LUT 构建)
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        fn(arg)
+    return (time.perf_counter() - t0) / iters * 1000
+
+
+def main():
+    iters = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = np.random.default_rng(0)
+    cases = (
+        ("depth", lambda d: _depth_to_color_reference(d), lambda d: depth_to_color(d)),
+        ("depth (no denoise)", lambda d: _depth_to_color_reference(d, denoise=False),
+         lambda d: depth_to_color(d, denoise=False)),
+        ("disparity", _disparity_to_color_reference, disparity_to_color),
+    )
+
+    print(f"{'case':20s} {'res':>10s} {'old ms':>9s} {'lut ms':>9s} {'speedup':>8s}")
+    for w, h in RESOLUTIONS:
+        depth = rng.integers(0, 6000, (h, w), dtype=np.uint16)
+        depth[rng.random((h, w)) < 0.15] = 0
+        disp = rng.random((h, w), dtype=np.float32) * 64 - 4
+        for name, old, new in cases:
+            arg = disp if name == "disparity" else depth
+            old_ms = _time_ms(old, arg, iters)
+            new_ms = _time_ms(new, arg, iters)
+            print(f"{name:20s} {f'{w}x{h}':>10s} {old_ms:9.2f} {new_ms:9.2f} "
+                  f"{old_ms / new_ms:7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
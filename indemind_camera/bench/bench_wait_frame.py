@@ -0,0 +1,69 @@
+"""
+取帧延迟基准 — 轮询 (get_depth() + sleep 30ms，相当于旧脚本的 cv2.waitKey(30))
+vs 阻塞等待 (wait_frame())。FakeImseeLib 按固定帧率推帧，
+测量 push -> 调用方拿到该帧 的端到端延迟，以及重复 / 空轮询次数。
+通过 FakeImseeLib 运行，无需相机。
+用法: python bench/bench_wait_frame.py [帧率] [帧数]
+"""
+import os
+import statistics
+import sys
+import time
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+for p in (_PROJECT_DIR, _TEST_DIR):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+from fake_sdk import FakeImseeLib
+from imsee_sdk import ImseeSdk
+
+POLL_INTERVAL = 0.03
+
+
+def _run(fps, frames, fetch):
+    lib = FakeImseeLib()
+    sdk = ImseeSdk(lib=lib)
+    sdk.init()
+    stop = lib.start_stream(fps, kinds=("depth",), shape=(400, 640))
+    latencies, empty, last = [], 0, 0
+    try:
+        while len(latencies) < frames:
+            depth = fetch(sdk)
+            if depth is None:
+                empty += 1
+                continue
+            latencies.append(time.perf_counter() - lib.push_times[("depth", depth.seq)])
+            last = depth.seq
+    finally:
+        stop()
+    skipped = last - len(latencies)   # 被后一帧覆盖、调用方没看到的帧
+    return latencies, empty, skipped
+
+
+def _poll(sdk):
+    time.sleep(POLL_INTERVAL)
+    return sdk.get_depth()
+
+
+def _wait(sdk):
+    return sdk.wait_frame("depth", timeout=1.0)
+
+
+def main():
+    fps = float(sys.argv[1]) if len(sys.argv) > 1 else 25
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f"{fps:g} fps, {frames} 帧")
+    print(f"{'path':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'max ms':>8s} {'空轮询':>6s} {'漏帧':>6s}")
+    for name, fetch in (("poll", _poll), ("wait", _wait)):
+        lat, empty, skipped = _run(fps, frames, fetch)
+        lat_ms = sorted(x * 1000 for x in lat)
+        p95 = lat_ms[int(len(lat_ms) * 0.95) - 1]
+        print(f"{name:>6s} {statistics.median(lat_ms):8.2f} {p95:8.2f} {lat_ms[-1]:8.2f} "
+              f"{empty:6d} {skipped:6d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,8 @@
 #include <cstring>
 #include <mutex>
 #include <atomic>
+#include <chrono>
+#include <condition_variable>
 #include <vector>
 
 #ifdef _WIN32
@@ -31,6 +33,7 @@ static int g_frame_height = 0;
 static int g_frame_channels = 0;
 static std::atomic<bool> g_frame_ready{false};
 static std::atomic<int> g_callback_count{0};
+static double g_frame_prev_time = 0;   // 上一帧的传感器时间 (由 g_mutex 保护)
 
 // --- Depth ---
 static std::mutex g_depth_mutex;
@@ -67,26 +70,30 @@ static std::atomic<bool> g_pts_ready{false};
 static bool g_has_pts = false;
 
 // --- IMU ring buffer ---
-struct ImuSample {
+// 样本按序号存放: 序号为 s 的样本 (s 从 1 开始，即 g_seq[P_IMU]) 在 g_imu_ring[(s - 1) % size]。
+// 读取不清空环: 每个读者自带游标 (已读到的序号)，多个读者互不影响。
+struct ImuSample {        // 32 字节，与 Python 侧 IMU_DTYPE 的内存布局一致
     double timestamp;
     float accel[3];
     float gyro[3];
 };
 static std::mutex g_imu_mutex;
-static const int IMU_RING_SIZE = 2000;
-static ImuSample g_imu_ring[IMU_RING_SIZE];
-static int g_imu_head = 0;
-static int g_imu_count = 0;
+static const int IMU_RING_DEFAULT = 2000;
+static ImuSample* g_imu_ring = nullptr;
+static int g_imu_ring_size = IMU_RING_DEFAULT;
+static unsigned long long g_imu_first = 0;    // 本次 init (或改环大小) 后的第一个样本序号
+static unsigned long long g_imu_cursor = 0;   // 旧接口 imsee_get_imu 自己的游标
 static bool g_has_imu = false;
 
 // --- Detector ---
-struct DetBox {
+struct DetBox {           // 24 字节，与 Python 侧 detector_utils.DET_DTYPE 的内存布局一致
     int x, y, w, h;
     float score;
     int class_id;
 };
 static std::mutex g_det_mutex;
-static DetBox g_det_boxes[256];
+static const int DET_MAX_BOXES = 256;
+static DetBox g_det_boxes[DET_MAX_BOXES];
 static int g_det_box_count = 0;
 static unsigned char* g_det_img_buf = nullptr;
 static int g_det_img_width = 0;
@@ -95,6 +102,82 @@ static int g_det_img_channels = 0;
 static std::atomic<bool> g_det_ready{false};
 static bool g_has_det = false;
 
+// --- Per-product sequence number + sensor timestamp ---
+// seq 每个新数据 +1，进程内单调递增 (release 不清零)；time 为 SDK 回调给出的传感器时间，
+// 由各自产品的 mutex 保护
+enum Product { P_FRAME = 0, P_DEPTH, P_DISP, P_RECT, P_POINTS, P_DETECTOR, P_IMU, P_COUNT };
+static std::atomic<unsigned long long> g_seq[P_COUNT];
+static double g_time[P_COUNT] = {0};
+
+// imsee_wait_* 的等待者: 任一产品 seq 变化或 release 时唤醒
+static std::mutex g_wait_mutex;
+static std::condition_variable g_wait_cv;
+static unsigned long long g_wait_epoch = 0;   // release 时 +1，让等待者立即返回
+
+// 必须在数据写完、ready 标志置位之后调用: 被唤醒的等待者马上就能取到这份数据
+static inline void publish(int product, double time) {
+    g_time[product] = time;
+    {
+        std::lock_guard<std::mutex> lock(g_wait_mutex);
+        g_seq[product].fetch_add(1);
+    }
+    g_wait_cv.notify_all();
+}
+
+static inline void report(int product, unsigned long long* seq, double* timestamp) {
+    if (seq) *seq = g_seq[product].load();
+    if (timestamp) *timestamp = g_time[product];
+}
+
+// --- Per-product history ring (imsee_init_ex 设置深度，0 = 只保留最新一帧) ---
+// 每个槽保存一份数据副本及其 seq / time；seq 为 s 的数据在 slots[s % depth]。
+// 由各自产品的 mutex 保护 (见 product_mutex)。IMU 有自己的环，不在此列。
+struct HistSlot {
+    std::vector<unsigned char> data;
+    int bytes = 0;
+    int rows = 0, cols = 0, channels = 0;   // numpy 形状: (rows, cols[, channels])
+    unsigned long long seq = 0;
+    double time = 0;
+};
+struct History {
+    std::vector<HistSlot> slots;
+    unsigned long long first = 0;    // 本次 init 后存入的第一个 seq
+    unsigned long long newest = 0;
+};
+static int g_history_depth = 0;
+static History g_history[P_COUNT];
+
+static std::mutex& product_mutex(int product) {
+    switch (product) {
+        case P_DEPTH: return g_depth_mutex;
+        case P_DISP: return g_disp_mutex;
+        case P_RECT: return g_rect_mutex;
+        case P_POINTS: return g_pts_mutex;
+        case P_DETECTOR: return g_det_mutex;
+        default: return g_mutex;
+    }
+}
+
+// 在回调中、publish() 之前调用 (需持有该产品的 mutex)，存入的即是下一个 seq 的数据
+static void history_push(int product, double time, const void* data, int bytes,
+                         int rows, int cols, int channels) {
+    if (g_history_depth <= 0) return;
+    History& h = g_history[product];
+    if ((int)h.slots.size() != g_history_depth) h.slots.resize(g_history_depth);
+    unsigned long long seq = g_seq[product].load() + 1;
+    HistSlot& slot = h.slots[seq % g_history_depth];
+    if ((int)slot.data.size() < bytes) slot.data.resize(bytes);
+    memcpy(slot.data.data(), data, bytes);
+    slot.bytes = bytes;
+    slot.rows = rows;
+    slot.cols = cols;
+    slot.channels = channels;
+    slot.seq = seq;
+    slot.time = time;
+    if (h.first == 0) h.first = seq;
+    h.newest = seq;
+}
+
 // --- Calibration cache (use pointer to avoid static std::map construction ABI issues) ---
 static bool g_calib_cached = false;
 static indem::MoudleAllParam* g_calib = nullptr;
@@ -105,8 +188,11 @@ extern "C" {
 // Init / Release
 // ============================================================
 
-EXPORT int imsee_init(int resolution, int fps) {
+// history_depth: 每种数据保留的历史帧数 (imsee_history_read)，0 = 不保留
+EXPORT int imsee_init_ex(int resolution, int fps, int history_depth) {
     if (g_sdk != nullptr) return -1;
+    if (history_depth < 0) return -3;
+    g_history_depth = history_depth;
 
     g_sdk = new indem::CIMRSDK();
     indem::MRCONFIG config = {0};
@@ -168,6 +254,9 @@ EXPORT int imsee_init(int resolution, int fps) {
 
             g_frame_ready.store(true);
             g_callback_count.fetch_add(1);
+            g_frame_prev_time = g_time[P_FRAME];
+            history_push(P_FRAME, time, g_frame_buf, out_size, height, out_width, 1);
+            publish(P_FRAME, time);
         },
         nullptr
     );
@@ -175,6 +264,10 @@ EXPORT int imsee_init(int resolution, int fps) {
     return 0;
 }
 
+EXPORT int imsee_init(int resolution, int fps) {
+    return imsee_init_ex(resolution, fps, 0);
+}
+
 EXPORT void imsee_release() {
     if (g_sdk != nullptr) {
         g_sdk->Release();
@@ -182,10 +275,17 @@ EXPORT void imsee_release() {
         g_sdk = nullptr;
     }
 
+    {
+        std::lock_guard<std::mutex> lock(g_wait_mutex);
+        g_wait_epoch++;
+    }
+    g_wait_cv.notify_all();
+
     {
         std::lock_guard<std::mutex> lock(g_mutex);
         delete[] g_frame_buf; g_frame_buf = nullptr;
         g_frame_width = g_frame_height = g_frame_channels = 0;
+        g_frame_prev_time = 0;
         g_frame_ready.store(false);
     }
     {
@@ -214,7 +314,7 @@ EXPORT void imsee_release() {
     }
     {
         std::lock_guard<std::mutex> lock(g_imu_mutex);
-        g_imu_head = g_imu_count = 0;
+        g_imu_first = 0;
     }
     {
         std::lock_guard<std::mutex> lock(g_det_mutex);
@@ -224,6 +324,12 @@ EXPORT void imsee_release() {
         g_det_ready.store(false);
     }
 
+    for (int p = 0; p < P_COUNT; p++) {
+        std::lock_guard<std::mutex> lock(product_mutex(p));
+        g_history[p] = History();
+    }
+    g_history_depth = 0;
+
     g_has_depth = g_has_disp = g_has_rect = g_has_pts = g_has_imu = g_has_det = false;
     g_calib_cached = false;
     delete g_calib; g_calib = nullptr;
@@ -238,6 +344,107 @@ EXPORT int imsee_get_callback_count() {
     return g_callback_count.load();
 }
 
+// 只读序号，不拷贝数据: 调用方可先比较 seq，没有新数据时跳过取帧
+EXPORT unsigned long long imsee_get_seq(int product) {
+    if (product < 0 || product >= P_COUNT) return 0;
+    return g_seq[product].load();
+}
+
+// 阻塞等待: mask 的第 i 位表示等待产品 i，after_seqs[i] 为调用方已见过的序号。
+// 任一被等待产品的 seq > after_seqs[i] 时返回这些产品的位掩码；
+// 超时或 release() 时返回 0。timeout_ms < 0 表示无限等待。
+// 从 Python (ctypes.CDLL) 调用时 GIL 已释放，不阻塞其他线程。
+EXPORT unsigned int imsee_wait_any(unsigned int mask, const unsigned long long* after_seqs,
+                                   int timeout_ms) {
+    auto ready_mask = [&]() {
+        unsigned int ready = 0;
+        for (int i = 0; i < P_COUNT; i++)
+            if ((mask & (1u << i)) && g_seq[i].load() > after_seqs[i]) ready |= 1u << i;
+        return ready;
+    };
+
+    std::unique_lock<std::mutex> lock(g_wait_mutex);
+    unsigned long long epoch = g_wait_epoch;
+    unsigned int ready = 0;
+    auto pred = [&]() { return (ready = ready_mask()) != 0 || g_wait_epoch != epoch; };
+    if (timeout_ms < 0) {
+        g_wait_cv.wait(lock, pred);
+    } else {
+        g_wait_cv.wait_for(lock, std::chrono::milliseconds(timeout_ms), pred);
+    }
+    return ready;
+}
+
+// 单产品版本: 返回新的 seq，超时返回 0
+EXPORT unsigned long long imsee_wait_seq(int product, unsigned long long after_seq,
+                                         int timeout_ms) {
+    if (product < 0 || product >= P_COUNT) return 0;
+    unsigned long long after[P_COUNT] = {0};
+    after[product] = after_seq;
+    if (imsee_wait_any(1u << product, after, timeout_ms) == 0) return 0;
+    return g_seq[product].load();
+}
+
+// ============================================================
+// History ring (按序号游标读取)
+// ============================================================
+
+// 取 seq > after_seq 的最早一帧 (历史环中仍保留的)。
+// dims[3] 输出 numpy 形状 rows, cols, channels；seq / timestamp 输出该帧的元数据；
+// skipped 输出因读者落后超过环深度而被覆盖、再也取不到的帧数 (0 表示没有丢帧)。
+// 返回拷贝的字节数；没有更新的帧返回 0；buffer 不够返回 -1 (dims 已填好)。
+EXPORT int imsee_history_read(int product, unsigned long long after_seq,
+                              unsigned char* buffer, int buffer_size,
+                              int* dims, unsigned long long* seq, double* timestamp,
+                              unsigned long long* skipped) {
+    *skipped = 0;
+    if (product < 0 || product >= P_COUNT || product == P_IMU) return 0;
+    std::lock_guard<std::mutex> lock(product_mutex(product));
+    const History& h = g_history[product];
+    if (h.slots.empty() || h.newest == 0 || after_seq >= h.newest) return 0;
+
+    unsigned long long depth = h.slots.size();
+    unsigned long long oldest = (h.newest >= h.first + depth) ? h.newest - depth + 1 : h.first;
+    unsigned long long want = after_seq + 1;
+    if (want < oldest) {
+        // 本次 init 之前的帧不计为丢帧 (它们从未进入历史环)
+        if (want < h.first) want = h.first;
+        *skipped = oldest - want;
+        want = oldest;
+    }
+    // 没有存数据的序号 (如不带图像的检测结果) 直接跳过
+    while (want <= h.newest && h.slots[want % depth].seq != want) want++;
+    if (want > h.newest) return 0;
+
+    const HistSlot& slot = h.slots[want % depth];
+    dims[0] = slot.rows;
+    dims[1] = slot.cols;
+    dims[2] = slot.channels;
+    if (buffer_size < slot.bytes) return -1;
+    memcpy(buffer, slot.data.data(), slot.bytes);
+    *seq = slot.seq;
+    *timestamp = slot.time;
+    return slot.bytes;
+}
+
+// 历史环的状态: depth 环深度, oldest / newest 当前可读的 seq 范围 (空时为 0)，返回占用字节数
+EXPORT long long imsee_history_info(int product, int* depth, unsigned long long* oldest,
+                                    unsigned long long* newest) {
+    *depth = g_history_depth;
+    *oldest = *newest = 0;
+    if (product < 0 || product >= P_COUNT || product == P_IMU) return 0;
+    std::lock_guard<std::mutex> lock(product_mutex(product));
+    const History& h = g_history[product];
+    long long bytes = 0;
+    for (const HistSlot& slot : h.slots) bytes += (long long)slot.data.capacity();
+    if (h.newest != 0) {
+        unsigned long long n = h.slots.size();
+        *oldest = (h.newest >= h.first + n) ? h.newest - n + 1 : h.first;
+        *newest = h.newest;
+    }
+    return bytes;
+}
+
 // ============================================================
 // Raw camera frame
 // ============================================================
@@ -248,17 +455,23 @@ EXPORT void imsee_get_image_info(int* width, int* height, int* channels) {
     *channels = g_frame_channels;
 }
 
-EXPORT int imsee_get_frame(unsigned char* buffer, int buffer_size) {
+EXPORT int imsee_get_frame_ex(unsigned char* buffer, int buffer_size,
+                              unsigned long long* seq, double* timestamp) {
     if (!g_frame_ready.load()) return 0;
     std::lock_guard<std::mutex> lock(g_mutex);
     if (g_frame_buf == nullptr) return 0;
     int required = g_frame_width * g_frame_height * g_frame_channels;
     if (buffer_size < required) return -1;
     memcpy(buffer, g_frame_buf, required);
+    report(P_FRAME, seq, timestamp);
     g_frame_ready.store(false);
     return required;
 }
 
+EXPORT int imsee_get_frame(unsigned char* buffer, int buffer_size) {
+    return imsee_get_frame_ex(buffer, buffer_size, nullptr, nullptr);
+}
+
 // ============================================================
 // Depth
 // ============================================================
@@ -287,23 +500,31 @@ EXPORT int imsee_enable_depth(int mode) {
             depth.convertTo(depth_mm, CV_16U, 1000.0);
             memcpy(g_depth_buf, depth_mm.data, w * h * 2);
             g_depth_ready.store(true);
+            history_push(P_DEPTH, time, g_depth_buf, w * h * 2, h, w, 1);
+            publish(P_DEPTH, time);
         });
         return 0;
     }
     return -2;
 }
 
-EXPORT int imsee_get_depth(unsigned short* buffer, int buffer_size) {
+EXPORT int imsee_get_depth_ex(unsigned short* buffer, int buffer_size,
+                              unsigned long long* seq, double* timestamp) {
     if (!g_has_depth || !g_depth_ready.load()) return 0;
     std::lock_guard<std::mutex> lock(g_depth_mutex);
     if (g_depth_buf == nullptr) return 0;
     int required = g_depth_width * g_depth_height;
     if (buffer_size < required) return -1;
     memcpy(buffer, g_depth_buf, required * 2);
+    report(P_DEPTH, seq, timestamp);
     g_depth_ready.store(false);
     return required;
 }
 
+EXPORT int imsee_get_depth(unsigned short* buffer, int buffer_size) {
+    return imsee_get_depth_ex(buffer, buffer_size, nullptr, nullptr);
+}
+
 EXPORT void imsee_get_depth_size(int* width, int* height) {
     *width = g_depth_width;
     *height = g_depth_height;
@@ -344,23 +565,31 @@ EXPORT int imsee_enable_disparity(int mode) {
                 memcpy(g_disp_buf, tmp.data, w * h * sizeof(float));
             }
             g_disp_ready.store(true);
+            history_push(P_DISP, time, g_disp_buf, w * h * (int)sizeof(float), h, w, 1);
+            publish(P_DISP, time);
         });
         return 0;
     }
     return -2;
 }
 
-EXPORT int imsee_get_disparity(float* buffer, int buffer_size) {
+EXPORT int imsee_get_disparity_ex(float* buffer, int buffer_size,
+                                  unsigned long long* seq, double* timestamp) {
     if (!g_has_disp || !g_disp_ready.load()) return 0;
     std::lock_guard<std::mutex> lock(g_disp_mutex);
     if (g_disp_buf == nullptr) return 0;
     int required = g_disp_width * g_disp_height;
     if (buffer_size < required) return -1;
     memcpy(buffer, g_disp_buf, required * sizeof(float));
+    report(P_DISP, seq, timestamp);
     g_disp_ready.store(false);
     return required;
 }
 
+EXPORT int imsee_get_disparity(float* buffer, int buffer_size) {
+    return imsee_get_disparity_ex(buffer, buffer_size, nullptr, nullptr);
+}
+
 EXPORT void imsee_get_disparity_size(int* width, int* height) {
     *width = g_disp_width;
     *height = g_disp_height;
@@ -420,23 +649,32 @@ EXPORT int imsee_enable_rectify() {
                     memcpy(g_rect_buf + y * out_width + lw, right_gray.ptr(y), lw);
 
             g_rect_ready.store(true);
+            history_push(P_RECT, time, g_rect_buf, out_width * lh * g_rect_channels,
+                         lh, out_width, g_rect_channels);
+            publish(P_RECT, time);
         });
         return 0;
     }
     return -2;
 }
 
-EXPORT int imsee_get_rectified(unsigned char* buffer, int buffer_size) {
+EXPORT int imsee_get_rectified_ex(unsigned char* buffer, int buffer_size,
+                                  unsigned long long* seq, double* timestamp) {
     if (!g_has_rect || !g_rect_ready.load()) return 0;
     std::lock_guard<std::mutex> lock(g_rect_mutex);
     if (g_rect_buf == nullptr) return 0;
     int required = g_rect_width * g_rect_height * g_rect_channels;
     if (buffer_size < required) return -1;
     memcpy(buffer, g_rect_buf, required);
+    report(P_RECT, seq, timestamp);
     g_rect_ready.store(false);
     return required;
 }
 
+EXPORT int imsee_get_rectified(unsigned char* buffer, int buffer_size) {
+    return imsee_get_rectified_ex(buffer, buffer_size, nullptr, nullptr);
+}
+
 EXPORT void imsee_get_rectified_info(int* width, int* height, int* channels) {
     *width = g_rect_width;
     *height = g_rect_height;
@@ -477,23 +715,31 @@ EXPORT int imsee_enable_points() {
                 memcpy(g_pts_buf, tmp.data, total * 3 * sizeof(float));
             }
             g_pts_ready.store(true);
+            history_push(P_POINTS, time, g_pts_buf, total * 3 * (int)sizeof(float), total, 3, 1);
+            publish(P_POINTS, time);
         });
         return 0;
     }
     return -2;
 }
 
-EXPORT int imsee_get_points(float* buffer, int buffer_size) {
+EXPORT int imsee_get_points_ex(float* buffer, int buffer_size,
+                               unsigned long long* seq, double* timestamp) {
     if (!g_has_pts || !g_pts_ready.load()) return 0;
     std::lock_guard<std::mutex> lock(g_pts_mutex);
     if (g_pts_buf == nullptr) return 0;
     int required = g_pts_count * 3;
     if (buffer_size < required) return -1;
     memcpy(buffer, g_pts_buf, required * sizeof(float));
+    report(P_POINTS, seq, timestamp);
     g_pts_ready.store(false);
     return g_pts_count;
 }
 
+EXPORT int imsee_get_points(float* buffer, int buffer_size) {
+    return imsee_get_points_ex(buffer, buffer_size, nullptr, nullptr);
+}
+
 EXPORT void imsee_get_points_size(int* width, int* height, int* count) {
     *width = g_pts_width;
     *height = g_pts_height;
@@ -507,67 +753,186 @@ EXPORT void imsee_get_points_size(int* width, int* height, int* count) {
 EXPORT int imsee_enable_imu() {
     if (g_sdk == nullptr) return -1;
 
+    {
+        std::lock_guard<std::mutex> lock(g_imu_mutex);
+        if (g_imu_ring == nullptr) g_imu_ring = new ImuSample[g_imu_ring_size];
+    }
     g_has_imu = true;
     g_sdk->RegistModuleIMUCallback([](indem::ImuData imu) {
         std::lock_guard<std::mutex> lock(g_imu_mutex);
-        ImuSample& s = g_imu_ring[g_imu_head];
+        unsigned long long seq = g_seq[P_IMU].load() + 1;
+        ImuSample& s = g_imu_ring[(seq - 1) % g_imu_ring_size];
         s.timestamp = imu.timestamp;
         memcpy(s.accel, imu.accel, sizeof(float) * 3);
         memcpy(s.gyro, imu.gyro, sizeof(float) * 3);
-        g_imu_head = (g_imu_head + 1) % IMU_RING_SIZE;
-        if (g_imu_count < IMU_RING_SIZE) g_imu_count++;
+        if (g_imu_first == 0) g_imu_first = seq;
+        publish(P_IMU, imu.timestamp);
     });
     return 0;
 }
 
-// Returns number of samples copied. Each sample is 7 floats: [timestamp(as float), ax, ay, az, gx, gy, gz]
-// Actually uses doubles for timestamp, so we pack as: [ts_high, ts_low, ax, ay, az, gx, gy, gz] -- too complex.
-// Simpler: output buffer is double[n*7] = [timestamp, ax, ay, az, gx, gy, gz] per sample
-EXPORT int imsee_get_imu(double* buffer, int max_samples) {
-    if (!g_has_imu) return 0;
+// 环的大小 (样本数)。改变大小会丢弃环中已有的样本，读者游标不受影响 (下次读取从新样本开始)。
+EXPORT int imsee_set_imu_ring_size(int samples) {
+    if (samples <= 0) return -1;
     std::lock_guard<std::mutex> lock(g_imu_mutex);
-    if (g_imu_count == 0) return 0;
-
-    int n = (max_samples < g_imu_count) ? max_samples : g_imu_count;
-    // Read from oldest to newest
-    int start;
-    if (g_imu_count >= IMU_RING_SIZE) {
-        start = g_imu_head;  // ring is full, head points to oldest
-    } else {
-        start = 0;
+    if (samples != g_imu_ring_size || g_imu_ring == nullptr) {
+        delete[] g_imu_ring;
+        g_imu_ring = new ImuSample[samples];
+        g_imu_ring_size = samples;
     }
+    g_imu_first = 0;
+    return 0;
+}
 
-    // Copy the most recent n samples
-    int copy_start;
-    if (g_imu_count >= IMU_RING_SIZE) {
-        copy_start = (g_imu_head - n + IMU_RING_SIZE) % IMU_RING_SIZE;
-    } else {
-        copy_start = (g_imu_count >= n) ? (g_imu_count - n) : 0;
-        if (g_imu_count < n) n = g_imu_count;
-    }
+EXPORT int imsee_get_imu_ring_size() {
+    return g_imu_ring_size;
+}
 
-    for (int i = 0; i < n; i++) {
-        int idx = (copy_start + i) % IMU_RING_SIZE;
-        double* out = buffer + i * 7;
-        out[0] = g_imu_ring[idx].timestamp;
-        out[1] = g_imu_ring[idx].accel[0];
-        out[2] = g_imu_ring[idx].accel[1];
-        out[3] = g_imu_ring[idx].accel[2];
-        out[4] = g_imu_ring[idx].gyro[0];
-        out[5] = g_imu_ring[idx].gyro[1];
-        out[6] = g_imu_ring[idx].gyro[2];
-    }
+// 当前可读的最早样本序号 (需持有 g_imu_mutex)；环为空时返回 newest + 1
+static unsigned long long imu_oldest(unsigned long long newest) {
+    if (g_imu_first == 0 || g_imu_ring == nullptr) return newest + 1;
+    unsigned long long size = g_imu_ring_size;
+    return (newest >= g_imu_first + size) ? newest - size + 1 : g_imu_first;
+}
 
-    // Reset count after reading
-    g_imu_count = 0;
-    g_imu_head = 0;
+// 游标读取: 拷贝序号 > *cursor 的样本 (最多 max_samples 个，从旧到新) 到 buffer
+// (ImuSample 数组)，并把 *cursor 推进到最后一个拷贝的样本。
+// dropped 输出读者落后超过环大小、已被覆盖的样本数。返回拷贝的样本数。
+EXPORT int imsee_read_imu(unsigned long long* cursor, ImuSample* buffer, int max_samples,
+                          unsigned long long* dropped) {
+    *dropped = 0;
+    if (!g_has_imu) return 0;
+    std::lock_guard<std::mutex> lock(g_imu_mutex);
+    unsigned long long newest = g_seq[P_IMU].load();
+    unsigned long long oldest = imu_oldest(newest);
+    unsigned long long next = *cursor + 1;
+    if (next < oldest) {
+        // 本次 init 之前的样本不计为丢失 (它们从未进入环)
+        if (next >= g_imu_first && g_imu_first != 0) *dropped = oldest - next;
+        next = oldest;
+    }
+    int n = 0;
+    for (; next <= newest && n < max_samples; next++, n++)
+        buffer[n] = g_imu_ring[(next - 1) % g_imu_ring_size];
+    *cursor = next - 1;
+    return n;
+}
 
+// 旧接口: 返回上次调用以来的最新 max_samples 个样本，
+// buffer 为 double[n*7] = [timestamp, ax, ay, az, gx, gy, gz]。
+// 使用自己的游标，不影响 imsee_read_imu 的其他读者。
+EXPORT int imsee_get_imu(double* buffer, int max_samples) {
+    if (!g_has_imu || max_samples <= 0) return 0;
+    std::lock_guard<std::mutex> lock(g_imu_mutex);
+    unsigned long long newest = g_seq[P_IMU].load();
+    unsigned long long next = g_imu_cursor + 1;
+    unsigned long long oldest = imu_oldest(newest);
+    if (next < oldest) next = oldest;
+    if (newest >= next + max_samples) next = newest - max_samples + 1;   // 只要最新的
+
+    int n = 0;
+    for (; next <= newest; next++, n++) {
+        const ImuSample& s = g_imu_ring[(next - 1) % g_imu_ring_size];
+        double* out = buffer + n * 7;
+        out[0] = s.timestamp;
+        for (int k = 0; k < 3; k++) {
+            out[1 + k] = s.accel[k];
+            out[4 + k] = s.gyro[k];
+        }
+    }
+    g_imu_cursor = newest;
     return n;
 }
 
 EXPORT int imsee_get_imu_count() {
     std::lock_guard<std::mutex> lock(g_imu_mutex);
-    return g_imu_count;
+    unsigned long long newest = g_seq[P_IMU].load();
+    unsigned long long next = g_imu_cursor + 1;
+    unsigned long long oldest = imu_oldest(newest);
+    if (next < oldest) next = oldest;
+    return newest >= next ? (int)(newest - next + 1) : 0;
+}
+
+// ============================================================
+// Bundle: 一次调用取 frame + depth + IMU
+// ============================================================
+
+// 在同时持有 frame / depth 锁的情况下拷贝两路数据 (两者不会在拷贝中途被回调改写)，
+// 并附带 (imu_after, 当前帧时间] 之间的 IMU 样本 (ImuSample 数组；不移动任何 IMU 读者的游标)。
+// imu_after < 0 时取上一帧时间，即相邻两帧之间的 IMU。
+//
+// mask: (1 << P_FRAME) | (1 << P_DEPTH) | (1 << P_IMU) 的任意组合
+// seqs / timestamps / counts: [P_COUNT] 输出；counts 为拷贝的元素数 (IMU 为样本数)，
+//   缓冲不够 (分辨率变了) 时为 -1；timestamps[P_IMU] 为本次 IMU 窗口的上界 (当前帧时间)，
+//   调用方下一次把它作为 imu_after 传回，即可无缝衔接。
+// dims: [4] 输出 frame_w, frame_h, depth_w, depth_h —— 调用方据此缓存缓冲尺寸，
+//   不必每次调用 imsee_get_image_info / imsee_get_depth_size。
+// 返回本次拷贝了新数据的产品位掩码 (frame / depth 只在有新帧时拷贝)。
+EXPORT unsigned int imsee_get_bundle(unsigned int mask,
+                                     unsigned char* frame_buf, int frame_size,
+                                     unsigned short* depth_buf, int depth_size,
+                                     ImuSample* imu_buf, int imu_max, double imu_after,
+                                     unsigned long long* seqs, double* timestamps,
+                                     int* counts, int* dims) {
+    for (int i = 0; i < P_COUNT; i++) counts[i] = 0;
+    unsigned int got = 0;
+    double frame_time;
+
+    {
+        std::unique_lock<std::mutex> frame_lock(g_mutex, std::defer_lock);
+        std::unique_lock<std::mutex> depth_lock(g_depth_mutex, std::defer_lock);
+        std::lock(frame_lock, depth_lock);
+
+        dims[0] = g_frame_width;
+        dims[1] = g_frame_height;
+        dims[2] = g_depth_width;
+        dims[3] = g_depth_height;
+        frame_time = g_time[P_FRAME];
+        if (imu_after < 0) imu_after = g_frame_prev_time;
+
+        if ((mask & (1u << P_FRAME)) && g_frame_ready.load() && g_frame_buf != nullptr) {
+            int required = g_frame_width * g_frame_height * g_frame_channels;
+            if (frame_size < required) {
+                counts[P_FRAME] = -1;
+            } else {
+                memcpy(frame_buf, g_frame_buf, required);
+                report(P_FRAME, &seqs[P_FRAME], &timestamps[P_FRAME]);
+                counts[P_FRAME] = required;
+                g_frame_ready.store(false);
+                got |= 1u << P_FRAME;
+            }
+        }
+        if ((mask & (1u << P_DEPTH)) && g_has_depth && g_depth_ready.load() &&
+            g_depth_buf != nullptr) {
+            int required = g_depth_width * g_depth_height;
+            if (depth_size < required) {
+                counts[P_DEPTH] = -1;
+            } else {
+                memcpy(depth_buf, g_depth_buf, required * 2);
+                report(P_DEPTH, &seqs[P_DEPTH], &timestamps[P_DEPTH]);
+                counts[P_DEPTH] = required;
+                g_depth_ready.store(false);
+                got |= 1u << P_DEPTH;
+            }
+        }
+    }
+
+    if ((mask & (1u << P_IMU)) && g_has_imu) {
+        std::lock_guard<std::mutex> lock(g_imu_mutex);
+        unsigned long long newest = g_seq[P_IMU].load();
+        int n = 0;
+        for (unsigned long long i = imu_oldest(newest); i <= newest && n < imu_max; i++) {
+            const ImuSample& s = g_imu_ring[(i - 1) % g_imu_ring_size];
+            if (s.timestamp <= imu_after) continue;
+            if (s.timestamp > frame_time) break;
+            imu_buf[n++] = s;
+        }
+        seqs[P_IMU] = g_seq[P_IMU].load();
+        timestamps[P_IMU] = frame_time;
+        counts[P_IMU] = n;
+        if (n > 0) got |= 1u << P_IMU;
+    }
+    return got;
 }
 
 // ============================================================
@@ -585,7 +950,7 @@ EXPORT int imsee_enable_detector() {
             // Copy boxes
             g_det_box_count = 0;
             for (const auto& bi : info.finalBoxInfo) {
-                if (g_det_box_count >= 256) break;
+                if (g_det_box_count >= DET_MAX_BOXES) break;
                 DetBox& db = g_det_boxes[g_det_box_count];
                 db.x = bi.box.x;
                 db.y = bi.box.y;
@@ -614,6 +979,11 @@ EXPORT int imsee_enable_detector() {
             }
 
             g_det_ready.store(true);
+            if (g_det_img_buf != nullptr)
+                history_push(P_DETECTOR, info.timestamp, g_det_img_buf,
+                             g_det_img_width * g_det_img_height * g_det_img_channels,
+                             g_det_img_height, g_det_img_width, g_det_img_channels);
+            publish(P_DETECTOR, info.timestamp);
         });
         return 0;
     }
@@ -621,9 +991,11 @@ EXPORT int imsee_enable_detector() {
 }
 
 // Output: buffer is int[n*6] = [x, y, w, h, class_id, score_x1000] per box
-EXPORT int imsee_get_detector_boxes(int* buffer, int max_boxes) {
+EXPORT int imsee_get_detector_boxes_ex(int* buffer, int max_boxes,
+                                      unsigned long long* seq, double* timestamp) {
     if (!g_has_det || !g_det_ready.load()) return 0;
     std::lock_guard<std::mutex> lock(g_det_mutex);
+    report(P_DETECTOR, seq, timestamp);
 
     int n = g_det_box_count;
     if (n > max_boxes) n = max_boxes;
@@ -641,16 +1013,42 @@ EXPORT int imsee_get_detector_boxes(int* buffer, int max_boxes) {
     return n;
 }
 
-EXPORT int imsee_get_detector_image(unsigned char* buffer, int buffer_size) {
+EXPORT int imsee_get_detector_boxes(int* buffer, int max_boxes) {
+    return imsee_get_detector_boxes_ex(buffer, max_boxes, nullptr, nullptr);
+}
+
+// 检测框原样拷出 (DetBox 数组，分数保持 float)，Python 侧直接作为结构化数组使用
+EXPORT int imsee_get_detector_results_ex(DetBox* buffer, int max_boxes,
+                                        unsigned long long* seq, double* timestamp) {
+    if (!g_has_det || !g_det_ready.load()) return 0;
+    std::lock_guard<std::mutex> lock(g_det_mutex);
+    report(P_DETECTOR, seq, timestamp);
+    int n = g_det_box_count < max_boxes ? g_det_box_count : max_boxes;
+    if (n > 0) memcpy(buffer, g_det_boxes, n * sizeof(DetBox));
+    g_det_ready.store(false);
+    return n;
+}
+
+EXPORT int imsee_get_detector_max_boxes() {
+    return DET_MAX_BOXES;
+}
+
+EXPORT int imsee_get_detector_image_ex(unsigned char* buffer, int buffer_size,
+                                      unsigned long long* seq, double* timestamp) {
     if (!g_has_det) return 0;
     std::lock_guard<std::mutex> lock(g_det_mutex);
     if (g_det_img_buf == nullptr) return 0;
     int required = g_det_img_width * g_det_img_height * g_det_img_channels;
     if (buffer_size < required) return -1;
     memcpy(buffer, g_det_img_buf, required);
+    report(P_DETECTOR, seq, timestamp);
     return required;
 }
 
+EXPORT int imsee_get_detector_image(unsigned char* buffer, int buffer_size) {
+    return imsee_get_detector_image_ex(buffer, buffer_size, nullptr, nullptr);
+}
+
 EXPORT void imsee_get_detector_image_info(int* width, int* height, int* channels) {
     *width = g_det_img_width;
     *height = g_det_img_height;
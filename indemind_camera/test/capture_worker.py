@@ -0,0 +1,371 @@
+"""
+独立采集进程 — 唯一持有相机 (ImseeSdk) 的 worker 进程，把每种数据发布到共享内存环
+(shm_ring)，任意多个进程 (多 worker 的 uvicorn、记录器、分析脚本) 用 ShmSdk 挂上去读。
+
+C wrapper 用进程级全局变量 (g_sdk)，同一时刻只能有一个进程打开相机；
+CaptureWorker 是管理者: 创建共享内存段，启动 worker 子进程，子进程崩溃 / 卡死
+(心跳超时) 时按退避间隔重启它。共享内存段归管理者所有，worker 重启期间读者不用重新挂载，
+环内序号继续递增。
+
+用法: python capture_worker.py [--synthetic] [--name imsee] [--kinds frame,depth,imu]
+      IMSEE_SHM=imsee uvicorn webapp.server:app --workers 4   # webapp 从共享内存取帧
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+import numpy as np
+
+from config import FPS, RESOLUTION
+from detector_utils import DET_DTYPE
+from imsee_sdk import SdkArray
+from imu_stream import IMU_DTYPE, IMU_PERIOD
+from shm_ring import STATE_RUNNING, STATE_STARTING, STATE_STOPPED, Control, ShmRing, ring_name
+
+# resolution 参数 -> 单目 (宽, 高)
+RESOLUTION_SIZES = {1: (640, 400), 2: (1280, 800)}
+
+# 每种数据在环中的 dtype 与单个数据的最大字节数 (按单目宽高计算)
+RING_SPECS = {
+    "frame": (np.uint8, lambda w, h: w * 2 * h),         # 左右目并排灰度
+    "depth": (np.uint16, lambda w, h: w * h * 2),
+    "disparity": (np.float32, lambda w, h: w * h * 4),
+    "rectified": (np.uint8, lambda w, h: w * 2 * h),
+    "points": (np.float32, lambda w, h: w * h * 12),
+    "detector": (DET_DTYPE, lambda w, h: 256 * DET_DTYPE.itemsize),
+    "detector_image": (np.uint8, lambda w, h: w * h * 3),   # 检测框更新时取 (BGR)
+    "imu": (IMU_DTYPE, lambda w, h: 2000 * IMU_DTYPE.itemsize),
+}
+
+WORKER_KINDS = tuple(RING_SPECS)
+
+# 各数据需要先打开的 SDK 处理器
+_ENABLE = {
+    "depth": ("enable_depth", 0),
+    "disparity": ("enable_disparity", 0),
+    "rectified": ("enable_rectify",),
+    "points": ("enable_points",),
+    "detector": ("enable_detector",),
+    "detector_image": ("enable_detector",),
+    "imu": ("enable_imu",),
+}
+
+
+class SyntheticSource:
+    """合成数据源 (无需相机)，提供 worker 用到的 ImseeSdk 子集 (init / enable_* /
+    wait_any / get_detector_image / get_calibration / get_device_info_detailed /
+    release)。按 fps 节拍产生数据，每个数组的全部元素都等于序号
+    (按 dtype 取模)，读者据此可以检查是否读到了半帧。
+
+    crash_after: 产生这么多帧后进程直接退出 (模拟 SDK 段错误，测试 worker 重启用)。
+    """
+
+    def __init__(self, crash_after=0):
+        self.crash_after = crash_after
+        self.size = RESOLUTION_SIZES[1]
+        self.fps = FPS
+        self.seq = 0
+        self._next = 0.0   # 下一帧的时刻 (monotonic)
+        self._last = 0.0   # 最近一帧的时刻
+
+    def init(self, resolution=1, fps=25, history=0):
+        self.size = RESOLUTION_SIZES[resolution]
+        self.fps = fps
+        self._next = time.monotonic() + 1.0 / fps
+        return 0
+
+    def release(self):
+        pass
+
+    def enable_depth(self, mode=0):
+        return 0
+
+    enable_disparity = enable_depth
+
+    def enable_rectify(self):
+        return 0
+
+    enable_points = enable_detector = enable_imu = enable_rectify
+
+    def get_calibration(self):
+        w, h = self.size
+        return {"width": w, "height": h, "fx": float(w), "fy": float(w), "cx": w / 2,
+                "cy": h / 2, "baseline": 0.12}
+
+    def get_device_info_detailed(self):
+        return {"name": "synthetic", "fps": self.fps}
+
+    def get_detector_image(self):
+        if self.seq == 0:
+            return None
+        return self._make("detector_image", self.seq, self._last)
+
+    def _make(self, kind, seq, timestamp):
+        w, h = self.size
+        if kind in ("frame", "rectified"):
+            arr = np.full((h, w * 2), seq & 0xFF, np.uint8)
+        elif kind == "depth":
+            arr = np.full((h, w), seq & 0xFFFF, np.uint16)
+        elif kind == "disparity":
+            arr = np.full((h, w), seq, np.float32)
+        elif kind == "points":
+            arr = np.full((h * w, 3), seq, np.float32)
+        elif kind == "detector_image":
+            arr = np.full((h, w, 3), seq & 0xFF, np.uint8)
+        elif kind == "detector":
+            arr = np.zeros(1, DET_DTYPE)
+            arr["x"] = arr["class_id"] = seq
+            arr["score"] = 1.0
+        else:
+            n = max(1, round(1.0 / (self.fps * IMU_PERIOD)))
+            arr = np.zeros(n, IMU_DTYPE)
+            arr["timestamp"] = timestamp - IMU_PERIOD * np.arange(n - 1, -1, -1)
+            arr["accel"] = seq
+        arr = arr.view(SdkArray)
+        arr.seq, arr.timestamp = seq, timestamp
+        return arr
+
+    def wait_any(self, kinds, timeout=1.0):
+        period = 1.0 / self.fps
+        now = time.monotonic()
+        due = self._next
+        if due - now > timeout:
+            time.sleep(max(timeout, 0))
+            return {}
+        if due > now:
+            time.sleep(due - now)
+        elif now - due > period:
+            due = now   # 落后超过一帧 (进程被抢占): 和相机一样直接丢帧，不补发
+        self._next = due + period
+        self._last = due
+        self.seq += 1
+        if self.crash_after and self.seq > self.crash_after:
+            os._exit(3)
+        return {kind: self._make(kind, self.seq, due) for kind in kinds}
+
+
+def _open_source(source, options):
+    if source == "synthetic":
+        return SyntheticSource(**options)
+    from imsee_sdk import ImseeSdk
+    return ImseeSdk(**options)
+
+
+def _worker_main(name, source, options, resolution, fps, stop):
+    """worker 子进程: 打开数据源，把数据写进共享内存环，直到 stop 被置位。
+
+    检测器图像不是独立的等待产品: 订阅了 detector_image 时等 detector，检测框更新后再取图像。
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl-C 由管理者处理
+    control = Control.attach(name)
+    kinds = control.kinds
+    rings = {kind: ShmRing.attach(ring_name(name, kind)) for kind in kinds}
+    sdk = _open_source(source, options)
+    ret = sdk.init(resolution, fps)
+    if ret != 0:
+        print(f"[capture_worker] 初始化失败: {ret}", file=sys.stderr)
+        sys.exit(2)
+    try:
+        for method, *args in dict.fromkeys(_ENABLE[k] for k in kinds if k in _ENABLE):
+            getattr(sdk, method)(*args)
+        for field, getter in (("calibration", sdk.get_calibration),
+                              ("device_info", sdk.get_device_info_detailed)):
+            try:
+                control.publish_json(field, getter())
+            except ValueError as e:   # 超过控制段字段长度: 读者拿到 {}
+                print(f"[capture_worker] {e}", file=sys.stderr)
+        wait_kinds = tuple(k for k in kinds if k != "detector_image")
+        image_ring = rings.get("detector_image")
+        if image_ring is not None and "detector" not in wait_kinds:
+            wait_kinds += ("detector",)
+        control["state"] = STATE_RUNNING
+        while not stop.is_set():
+            control["heartbeat"] = time.time()
+            got = sdk.wait_any(wait_kinds, timeout=0.2)
+            if image_ring is not None and "detector" in got:
+                image = sdk.get_detector_image()
+                if image is not None:
+                    image_ring.write(image, getattr(image, "timestamp", 0.0))
+            for kind, data in got.items():
+                if kind in rings:
+                    rings[kind].write(data, getattr(data, "timestamp", 0.0))
+    finally:
+        sdk.release()
+
+
+class CaptureWorker:
+    """管理采集 worker 子进程与共享内存段。
+
+    name: 共享内存名前缀 (控制段 "<name>"，数据环 "<name>_<kind>")
+    source: "sdk" (真实相机) 或 "synthetic" (SyntheticSource)；source_options 传给它的构造函数
+    slots: 每种数据的环槽位数
+    hang_timeout: worker 心跳超过这么多秒没有更新视为卡死，强制重启
+    """
+
+    def __init__(self, name="imsee", source="sdk", kinds=WORKER_KINDS, resolution=RESOLUTION,
+                 fps=FPS, slots=4, source_options=None, hang_timeout=5.0, max_backoff=2.0):
+        unknown = set(kinds) - set(RING_SPECS)
+        if unknown:
+            raise ValueError(f"unknown worker kinds: {sorted(unknown)}")
+        self.name = name
+        self.source = source
+        self.kinds = tuple(kinds)
+        self.resolution = resolution
+        self.fps = fps
+        self.slots = slots
+        self.source_options = dict(source_options or {})
+        self.hang_timeout = hang_timeout
+        self.max_backoff = max_backoff
+        self.restarts = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop = self._ctx.Event()
+        self._control = None
+        self._rings = {}
+        self._proc = None
+        self._started = 0.0   # 当前 worker 的启动时刻 (monotonic)
+        self._monitor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+    @property
+    def pid(self):
+        return self._proc.pid if self._proc is not None else None
+
+    def is_alive(self):
+        return self._proc is not None and self._proc.is_alive()
+
+    def start(self):
+        """创建共享内存段并启动 worker (不等待相机初始化完成)。"""
+        if self._monitor is not None:
+            return
+        w, h = RESOLUTION_SIZES[self.resolution]
+        self._control = Control.create(self.name, self.kinds, self.slots)
+        for kind in self.kinds:
+            dtype, capacity = RING_SPECS[kind]
+            self._rings[kind] = ShmRing.create(ring_name(self.name, kind), dtype,
+                                               capacity(w, h), self.slots)
+        if self.source == "sdk":
+            # 子进程启动时就要带上正确的 LD_LIBRARY_PATH (worker 里不能再 execv 重启)
+            from imsee_sdk import _set_lib_env
+            _set_lib_env()
+        self._stop.clear()
+        self._spawn()
+        self._monitor = threading.Thread(target=self._monitor_loop,
+                                         name="capture-worker-monitor", daemon=True)
+        self._monitor.start()
+
+    def stop(self, timeout=3.0):
+        """停止 worker 并删除共享内存段。"""
+        if self._monitor is None:
+            return
+        self._stop.set()
+        self._monitor.join()
+        self._monitor = None
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+        self._control["state"] = STATE_STOPPED
+        for ring in self._rings.values():
+            ring.close()
+        self._rings = {}
+        self._control.close()
+        self._control = None
+
+    def wait_running(self, timeout=10.0):
+        """等到 worker 完成数据源初始化，返回是否成功。"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._control["state"] == STATE_RUNNING:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stats(self):
+        return {
+            "pid": self.pid,
+            "generation": int(self._control["generation"]),
+            "restarts": self.restarts,
+            "heads": {kind: ring.head for kind, ring in self._rings.items()},
+            "oversize": {kind: ring.oversize for kind, ring in self._rings.items()},
+        }
+
+    def _spawn(self):
+        self._control["state"] = STATE_STARTING
+        self._control["generation"] += 1
+        self._control["heartbeat"] = time.time()
+        self._proc = self._ctx.Process(
+            target=_worker_main, name=f"capture-worker-{self.name}", daemon=True,
+            args=(self.name, self.source, self.source_options, self.resolution, self.fps,
+                  self._stop))
+        self._proc.start()
+        self._control["pid"] = self._proc.pid
+        self._started = time.monotonic()
+
+    def _monitor_loop(self):
+        backoff = 0.1
+        while not self._stop.is_set():
+            proc = self._proc
+            proc.join(0.1)
+            if self._stop.is_set():
+                break
+            if proc.is_alive():
+                stale = time.time() - self._control["heartbeat"]
+                if self._control["state"] != STATE_RUNNING or stale < self.hang_timeout:
+                    continue
+                print(f"[capture_worker] worker {proc.pid} 心跳停止 {stale:.1f}s，强制重启",
+                      file=sys.stderr)
+                proc.kill()
+                proc.join()
+            else:
+                print(f"[capture_worker] worker {proc.pid} 退出 (code {proc.exitcode})，重启",
+                      file=sys.stderr)
+            # 运行了一段时间才退出的重置退避；刚启动就退出 (如相机未插) 的逐次加倍
+            if time.monotonic() - self._started > 5.0:
+                backoff = 0.1
+            if self._stop.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.max_backoff)
+            self.restarts += 1
+            self._spawn()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indemind 采集 worker (共享内存发布)")
+    parser.add_argument("--name", default="imsee", help="共享内存名前缀")
+    parser.add_argument("--synthetic", action="store_true", help="用合成数据代替相机")
+    parser.add_argument("--kinds", default=",".join(WORKER_KINDS),
+                        help="发布的数据，逗号分隔")
+    parser.add_argument("--slots", type=int, default=4, help="每种数据的环槽位数")
+    args = parser.parse_args()
+
+    worker = CaptureWorker(args.name, "synthetic" if args.synthetic else "sdk",
+                           kinds=args.kinds.split(","), slots=args.slots)
+    worker.start()
+    print(f"采集 worker 已启动: pid {worker.pid}, 共享内存 {args.name}, Ctrl-C 退出")
+    try:
+        while True:
+            time.sleep(5)
+            stats = worker.stats()
+            print(f"  generation {stats['generation']}  heads {stats['heads']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
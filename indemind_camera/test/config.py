@@ -1,11 +1,24 @@
 """
-共用配置常量 — SDK 初始化参数和可视化默认值。
+共用配置常量 — SDK 初始化参数、数据来源和可视化默认值。
 """
+import os
 
 # SDK 初始化
 RESOLUTION = 1        # 1=640x400, 2=1280x800
 FPS = 25
 
+# 数据来源 (sdk_backend.open_sdk): "sdk" = 相机, "replay" = 回放录制的会话,
+# "shm" = 独立采集进程 (capture_worker.py) 的共享内存, "synthetic" = 实时合成数据。
+# 环境变量可覆盖。
+BACKEND = os.environ.get("IMSEE_BACKEND") or ("shm" if os.environ.get("IMSEE_SHM") else "sdk")
+REPLAY_SESSION = os.environ.get("IMSEE_REPLAY", "")   # 空 = 自动生成的合成会话
+REPLAY_SPEED = float(os.environ.get("IMSEE_REPLAY_SPEED", "1.0"))   # 0 = 尽快
+SHM_NAME = os.environ.get("IMSEE_SHM") or "imsee"
+# 合成数据源: 覆盖 init() 的分辨率 / 帧率 (0 = 沿用 RESOLUTION / FPS)，IMU 采样率 (Hz)
+SYNTH_RESOLUTION = int(os.environ.get("IMSEE_SYNTH_RESOLUTION", "0"))
+SYNTH_FPS = float(os.environ.get("IMSEE_SYNTH_FPS", "0"))
+SYNTH_IMU_RATE = float(os.environ.get("IMSEE_SYNTH_IMU_RATE", "1000"))
+
 # 深度可视化
 DEPTH_MAX_RANGE = 4000  # mm
 
@@ -0,0 +1,369 @@
+"""
+数据集导出 — 把录制的会话或实时采集的数据写成 SLAM / VIO 工具常用的目录格式 (命令行见 export_dataset.py):
+    euroc   EuRoC MAV: mav0/cam0、cam1 (双目拼接帧拆成左右两张 PNG)、imu0/data.csv，各自带 sensor.yaml
+    tum     TUM RGB-D: rgb/ (左图)、depth/ (16 位 PNG，5000 = 1 m)、rgb.txt / depth.txt /
+            accelerometer.txt，另有 calibration.txt
+PNG 编码和写文件在进程池里 (spawn)，主进程只拆图、记索引；积压超过 max_pending 时，
+block=True (导出会话) 等最早的任务完成，block=False (实时采集) 丢掉这一帧并计数，不拖慢采集。
+sensor.yaml 的内参 / 畸变 / 基线来自 get_calibration()；SDK 不提供相机到 IMU 的外参，
+imu0 的 T_BS 写单位阵 (机体系 = cam0)，IMU 噪声参数也需要另行标定后补上。
+"""
+import abc
+import collections
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from imu_recorder import format_csv
+from imu_stream import IMU_PERIOD
+from session import Session
+
+PNG_COMPRESSION = 1            # cv2 IMWRITE_PNG_COMPRESSION: 1 比默认的 3 快约一倍，只大几个百分点
+TUM_DEPTH_FACTOR = 5           # TUM 深度 PNG: 5000 = 1 m，即毫米 x 5
+IMU_DECIMALS = 6
+IMU_CHUNK = 1 << 16
+
+
+def to_ns(timestamp):
+    """秒 (标量或数组) -> 整数纳秒；文件名和 data.csv 用同一个换算，保证一致。"""
+    return np.rint(np.asarray(timestamp, np.float64) * 1e9).astype(np.int64)
+
+
+def _write_pngs(jobs, compression):
+    """进程池任务: 把 [(路径, 图像)] 逐个编码成 PNG 写盘，返回写出的字节数。"""
+    params = [cv2.IMWRITE_PNG_COMPRESSION, compression]
+    total = 0
+    for path, image in jobs:
+        ok, buf = cv2.imencode(".png", image, params)
+        if not ok:
+            raise IOError(f"PNG encode failed: {path}")
+        with open(path, "wb") as f:
+            f.write(buf)
+        total += len(buf)
+    return total
+
+
+def camera_models(calibration, width, height, rectified=False):
+    """get_calibration() 的结果 -> ([左, 右] 相机参数, 基线 m)；无标定参数时相机参数为 None。
+
+    相机参数是 {"intrinsics": [fu, fv, cu, cv], "distortion": [k1, k2, t1, t2]}，按图像宽度缩放
+    到 width x height (SDK 标定优先给 640x400 的参数)。兼容 SDK 的 {"left": {...}, "right": {...}}
+    和合成 / 旧会话的扁平格式 {"width", "fx", "fy", "cx", "cy"} (无畸变，左右相同)。
+    rectified=True 时取投影矩阵 P 的内参、畸变为 0 (对应 rectified 流)。
+    """
+    calibration = calibration or {}
+    baseline = float(calibration.get("baseline", 0.0))
+    if "left" in calibration:
+        cams = [calibration["left"], calibration.get("right", calibration["left"])]
+    elif "fx" in calibration:
+        cam = {"w": calibration.get("width", width), "h": calibration.get("height", height)}
+        cam.update({k: calibration[k] for k in ("fx", "fy", "cx", "cy")})
+        cams = [cam, cam]
+    else:
+        return [None, None], baseline
+    models = []
+    for cam in cams:
+        scale = width / cam.get("w", width)
+        P = cam.get("P")
+        if rectified and P:
+            fu, fv, cu, cv = P[0], P[5], P[2], P[6]
+            distortion = [0.0] * 4
+        else:
+            fu, fv, cu, cv = cam["fx"], cam["fy"], cam["cx"], cam["cy"]
+            distortion = [float(cam.get(k, 0.0)) for k in ("k1", "k2", "t1", "t2")]
+        models.append({"intrinsics": [float(v) * scale for v in (fu, fv, cu, cv)],
+                       "distortion": distortion})
+    return models, baseline
+
+
+class DatasetWriter(abc.ABC):
+    """导出器的公共部分: PNG 进程池、积压控制和统计。子类实现各格式的目录和索引文件。
+
+    calibration: get_calibration() 的结果；fps: 相机帧率 (写进 sensor.yaml)；
+    workers: 编码进程数 (缺省 CPU 核数)；max_pending: 允许同时在途的 PNG 任务数 (缺省 4 x workers)；
+    block: 积压满时等待 (True) 还是丢帧 (False)；compression: PNG 压缩级别 0-9。
+    """
+
+    KINDS = ("frame",)            # 该格式用到的图像类数据
+
+    def __init__(self, path, calibration=None, fps=25, rectified=False, workers=None,
+                 max_pending=None, block=True, compression=PNG_COMPRESSION):
+        self.path = path
+        self.calibration = calibration or {}
+        self.fps = fps
+        self.rectified = rectified
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = 4 * self.workers if max_pending is None else max_pending
+        self.block = block
+        self.compression = compression
+        self.frames = collections.Counter()      # kind -> 已提交的帧数
+        self.dropped = collections.Counter()
+        self.imu_samples = 0
+        self.png_bytes = 0
+        self.size = None                         # 单目图像 (宽, 高)，第一帧时确定
+        self._pending = collections.deque()
+        self._pool = ProcessPoolExecutor(self.workers,
+                                         mp_context=multiprocessing.get_context("spawn"))
+        # 先把工作进程拉起来 (spawn + import cv2 约需半秒)，免得实时导出的头几帧因积压被丢
+        for future in [self._pool.submit(_write_pngs, [], 0) for _ in range(self.workers)]:
+            future.result()
+        self._files = []
+        self._start = time.monotonic()
+        self._end = 0.0
+        os.makedirs(path, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def _open(self, *parts, header=""):
+        f = open(os.path.join(self.path, *parts), "w")
+        f.write(header)
+        self._files.append(f)
+        return f
+
+    def _collect(self, future):
+        self.png_bytes += future.result()
+
+    def _submit(self, kind, jobs):
+        """提交一组 PNG；丢帧时返回 False，调用方不记索引。"""
+        while self._pending and self._pending[0].done():
+            self._collect(self._pending.popleft())
+        if len(self._pending) >= self.max_pending:
+            if not self.block:
+                self.dropped[kind] += 1
+                return False
+            if self._pending:
+                self._collect(self._pending.popleft())
+        # jobs 里的图像都是拷贝: 参数在进程池的后台线程里才序列化，期间调用方的缓冲可能被覆盖
+        self._pending.append(self._pool.submit(_write_pngs, jobs, self.compression))
+        self.frames[kind] += 1
+        return True
+
+    @abc.abstractmethod
+    def write_frame(self, timestamp, frame):
+        """写一帧双目拼接图 (timestamp 为秒)；丢帧时返回 False。"""
+
+    def write_depth(self, timestamp, depth):
+        """不含深度的格式忽略深度。"""
+        return False
+
+    @abc.abstractmethod
+    def write_imu(self, samples):
+        """追加一批 IMU_DTYPE 样本到 IMU 索引。"""
+
+    def _finish(self):
+        """close() 时写出标定等文件 (此时已知图像尺寸)。"""
+
+    def close(self):
+        """等全部 PNG 写完，写出标定文件并关闭索引，返回 stats()。"""
+        if self._pool is None:
+            return self.stats()
+        try:
+            while self._pending:
+                self._collect(self._pending.popleft())
+        finally:
+            self._pool.shutdown()
+            self._pool = None
+            self._end = time.monotonic()
+            for f in self._files:
+                f.close()
+        self._finish()
+        return self.stats()
+
+    def stats(self):
+        """{"seconds", "frames": {kind: 数}, "dropped": {kind: 数}, "imu_samples", "png_bytes", "backlog"}"""
+        seconds = (self._end or time.monotonic()) - self._start
+        return {"seconds": seconds, "frames": dict(self.frames), "dropped": dict(self.dropped),
+                "imu_samples": self.imu_samples, "png_bytes": self.png_bytes,
+                "backlog": len(self._pending)}
+
+
+def _yaml_list(values):
+    return "[" + ", ".join(repr(float(v)) for v in values) + "]"
+
+
+def _yaml_matrix(T):
+    rows = ",\n         ".join(", ".join(repr(float(v)) for v in row) for row in T)
+    return f"T_BS:\n  cols: 4\n  rows: 4\n  data: [{rows}]\n"
+
+
+class EurocWriter(DatasetWriter):
+    """EuRoC MAV 格式 (<path>/mav0/...)，时间戳为纳秒。机体系取 cam0: cam1 的 T_BS 是沿 x 平移基线。"""
+
+    def __init__(self, path, calibration=None, fps=25, **kwargs):
+        super().__init__(path, calibration, fps, **kwargs)
+        self.root = os.path.join(path, "mav0")
+        for cam in ("cam0", "cam1"):
+            os.makedirs(os.path.join(self.root, cam, "data"), exist_ok=True)
+        os.makedirs(os.path.join(self.root, "imu0"), exist_ok=True)
+        self._cam_csv = [self._open("mav0", cam, "data.csv", header="#timestamp [ns],filename\n")
+                         for cam in ("cam0", "cam1")]
+        self._imu_csv = self._open(
+            "mav0", "imu0", "data.csv",
+            header="#timestamp [ns],w_RS_S_x [rad s^-1],w_RS_S_y [rad s^-1],w_RS_S_z [rad s^-1],"
+                   "a_RS_S_x [m s^-2],a_RS_S_y [m s^-2],a_RS_S_z [m s^-2]\n")
+
+    def write_frame(self, timestamp, frame):
+        """双目拼接帧 (H, 2W) -> cam0/cam1 各一张 PNG；丢帧时返回 False。"""
+        h, w = frame.shape[0], frame.shape[1] // 2
+        self.size = (w, h)
+        name = f"{int(to_ns(timestamp))}.png"
+        jobs = [(os.path.join(self.root, cam, "data", name), np.array(half))
+                for cam, half in (("cam0", frame[:, :w]), ("cam1", frame[:, w:]))]
+        if not self._submit("frame", jobs):
+            return False
+        for f in self._cam_csv:
+            f.write(f"{name[:-4]},{name}\n")
+        return True
+
+    def write_imu(self, samples):
+        if not len(samples):
+            return
+        self._imu_csv.write(format_csv(
+            [to_ns(samples["timestamp"]), *samples["gyro"].T, *samples["accel"].T],
+            IMU_DECIMALS).decode("ascii"))
+        self.imu_samples += len(samples)
+
+    def _finish(self):
+        w, h = self.size or (0, 0)
+        models, baseline = camera_models(self.calibration, w, h, self.rectified)
+        for i, model in enumerate(models):
+            T = np.eye(4)
+            T[0, 3] = baseline * i
+            text = (f"# General sensor definitions.\nsensor_type: camera\n"
+                    f"comment: Indemind {'left' if i == 0 else 'right'} camera "
+                    f"({'rectified' if self.rectified else 'raw'})\n\n"
+                    f"# Sensor extrinsics wrt. the body-frame.\n{_yaml_matrix(T)}\n"
+                    f"# Camera specific definitions.\nrate_hz: {self.fps:g}\n"
+                    f"resolution: [{w}, {h}]\ncamera_model: pinhole\n")
+            if model is None:
+                text += "# get_calibration() returned no intrinsics\n"
+            else:
+                text += (f"intrinsics: {_yaml_list(model['intrinsics'])} #fu, fv, cu, cv\n"
+                         f"distortion_model: radial-tangential\n"
+                         f"distortion_coefficients: {_yaml_list(model['distortion'])}\n")
+            with open(os.path.join(self.root, f"cam{i}", "sensor.yaml"), "w") as f:
+                f.write(text)
+        with open(os.path.join(self.root, "imu0", "sensor.yaml"), "w") as f:
+            f.write(f"# General sensor definitions.\nsensor_type: imu\ncomment: Indemind IMU\n\n"
+                    f"# Sensor extrinsics wrt. the body-frame.\n"
+                    f"# The SDK does not expose camera-IMU extrinsics: identity until calibrated.\n"
+                    f"{_yaml_matrix(np.eye(4))}rate_hz: {1 / IMU_PERIOD:g}\n\n"
+                    f"# Noise parameters (gyroscope_noise_density, gyroscope_random_walk,\n"
+                    f"# accelerometer_noise_density, accelerometer_random_walk) need an\n"
+                    f"# IMU calibration (e.g. Allan variance) and are not written here.\n")
+
+
+class TumWriter(DatasetWriter):
+    """TUM RGB-D 格式，时间戳为秒 (6 位小数)。rgb 取双目帧的左图；depth 与 rgb 各自按原时间戳
+    命名，配对由使用方 (如 TUM 的 associate.py) 按时间戳完成。超出 16 位 PNG 范围 (约 13.1 m)
+    的深度写 0 (无效)。"""
+
+    KINDS = ("frame", "depth")
+
+    def __init__(self, path, calibration=None, fps=25, **kwargs):
+        super().__init__(path, calibration, fps, **kwargs)
+        for sub in ("rgb", "depth"):
+            os.makedirs(os.path.join(path, sub), exist_ok=True)
+        self._index = {
+            "frame": self._open("rgb.txt", header="# color images\n# timestamp filename\n"),
+            "depth": self._open("depth.txt", header="# depth maps\n# timestamp filename\n"),
+        }
+        self._accel = self._open("accelerometer.txt",
+                                 header="# accelerometer data\n# timestamp ax ay az\n")
+
+    def _write(self, kind, sub, timestamp, image):
+        name = f"{sub}/{timestamp:.6f}.png"
+        if not self._submit(kind, [(os.path.join(self.path, name), image)]):
+            return False
+        self._index[kind].write(f"{timestamp:.6f} {name}\n")
+        return True
+
+    def write_frame(self, timestamp, frame):
+        h, w = frame.shape[0], frame.shape[1] // 2
+        self.size = (w, h)
+        return self._write("frame", "rgb", timestamp, np.array(frame[:, :w]))
+
+    def write_depth(self, timestamp, depth):
+        self.size = self.size or (depth.shape[1], depth.shape[0])
+        depth = depth.astype(np.uint32) * TUM_DEPTH_FACTOR
+        depth[depth > 0xFFFF] = 0
+        return self._write("depth", "depth", timestamp, depth.astype(np.uint16))
+
+    def write_imu(self, samples):
+        if not len(samples):
+            return
+        self._accel.write(format_csv([samples["timestamp"], *samples["accel"].T],
+                                     IMU_DECIMALS, sep=" ").decode("ascii"))
+        self.imu_samples += len(samples)
+
+    def _finish(self):
+        w, h = self.size or (0, 0)
+        (left, _), baseline = camera_models(self.calibration, w, h, self.rectified)
+        with open(os.path.join(self.path, "calibration.txt"), "w") as f:
+            f.write(f"# {w}x{h} left camera, depth factor {TUM_DEPTH_FACTOR * 1000}\n"
+                    f"# fx fy cx cy k1 k2 t1 t2 baseline[m]\n")
+            if left is not None:
+                f.write(" ".join(repr(v) for v in left["intrinsics"] + left["distortion"]
+                                 + [baseline]) + "\n")
+
+
+FORMATS = {"euroc": EurocWriter, "tum": TumWriter}
+
+
+def export_session(session_path, path, fmt="euroc", kind="frame", start=None, end=None,
+                   **kwargs):
+    """把会话目录导出为 fmt 格式，返回 stats()。kind 为 "frame" 或 "rectified"；
+    start / end (秒) 限定时间范围；其余参数传给 DatasetWriter。"""
+    with Session(session_path) as s:
+        writer = FORMATS[fmt](path, s.meta.get("calibration"), s.fps,
+                              rectified=kind == "rectified", **kwargs)
+        try:
+            if kind in s.streams:
+                for t, frame in s.iter_stream(kind, start, end):
+                    writer.write_frame(t, frame)
+            if "depth" in writer.KINDS and "depth" in s.streams:
+                for t, depth in s.iter_stream("depth", start, end):
+                    writer.write_depth(t, depth)
+            ts = s.timestamps("imu")
+            lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+            hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="right"))
+            for i in range(lo, hi, IMU_CHUNK):
+                writer.write_imu(s.imu[i:min(i + IMU_CHUNK, hi)])
+        finally:
+            stats = writer.close()
+    return stats
+
+
+def export_live(sdk, path, seconds, fmt="euroc", kind="frame", fps=25, stop=None, **kwargs):
+    """从已 init (并已 enable 所需数据) 的 sdk 实时导出 seconds 秒，返回 stats()。
+
+    编码跟不上时丢帧 (stats()["dropped"])，不阻塞采集；stop 为 threading.Event 时可提前结束。
+    """
+    kwargs.setdefault("block", False)
+    writer = FORMATS[fmt](path, sdk.get_calibration(), fps, rectified=kind == "rectified",
+                          **kwargs)
+    kinds = (kind,) + (("depth",) if "depth" in writer.KINDS else ())
+    reader = sdk.imu_reader()
+    deadline = time.monotonic() + seconds
+    try:
+        while time.monotonic() < deadline and not (stop is not None and stop.is_set()):
+            for k, arr in sdk.wait_any(kinds, timeout=0.05).items():
+                if k == "depth":
+                    writer.write_depth(arr.timestamp, arr)
+                else:
+                    writer.write_frame(arr.timestamp, arr)
+            samples = reader.read()
+            if len(samples):
+                writer.write_imu(samples)
+    finally:
+        stats = writer.close()
+    return stats
@@ -0,0 +1,261 @@
+"""
+uint16 深度图无损编码 (RVL 思路，numpy 向量化) — 会话录制 (session.CODECS["rvl"]) 和
+WebSocket 深度流 (/ws/depth?codec=rvl) 共用。
+
+一帧深度按行优先展开后拆成三串非负整数:
+    空洞游程    交替的 (连续 0 的个数, 连续非 0 的个数)，从 0 的游程开始；空洞整片压成两个数
+    差值游程    非 0 像素与前一个非 0 像素之差，交替的 (连续差为 0 的个数, 差不为 0 的个数)；
+                立体匹配的深度在平面上多是整片同值，大部分差为 0
+    差值        不为 0 的差 zigzag 后减 1 (差值按 uint16 取模、当作 int16，最多 16 bit)
+差值游程不划算时 (噪声大、很少有相同的相邻值) 不用它，直接存全部差值的 zigzag，由编码端按
+实际字节数选择 (flags 的 DELTA_RUNS 位)。
+三串数都用 4 bit 变长码: 每个 nibble 低 3 位存数据，最高位表示后面还有 nibble。
+时间差分 (encode(depth, prev)) 先求与上一帧的差 (不变的像素为 0，归入“空洞”游程)，再按上面的方式编码。
+
+数据布局 (小端): 30 字节头 (HEADER) + 空洞游程码 + 差值游程码 + 差值码。
+用法: python depth_codec.py <会话目录>      # 对会话的 depth 流报告压缩率
+"""
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"RVL1"
+# magic, flags, width, height, 三串数的个数, 前两串的字节数
+HEADER = struct.Struct("<4sBxHHIIIII")
+TEMPORAL = 0x01
+DELTA_RUNS = 0x02
+
+
+def _nibble_counts(values):
+    counts = np.ones(len(values), np.int32)
+    limit, vmax = 8, int(values.max()) if len(values) else 0
+    while limit <= vmax:
+        counts += values >= limit
+        limit <<= 3
+    return counts
+
+
+def _vle_encode(values, nibbles=None):
+    """非负整数数组 → 4 bit 变长码 (两个 nibble 一字节，低位在前)。
+
+    nibbles: 已算好的 _nibble_counts(values)。先一次写全部数的第一个 nibble，
+    之后只对还有高位的数 (通常很少) 逐层填写，不为每个 nibble 建下标数组。
+    """
+    if not len(values):
+        return b""
+    if values.dtype.kind != "u":
+        values = values.astype(np.uint32)
+    if nibbles is None:
+        nibbles = _nibble_counts(values)
+    first = np.cumsum(nibbles) - nibbles           # 每个数第一个 nibble 的位置
+    total = int(first[-1] + nibbles[-1])
+    out = np.zeros(total + total % 2, np.uint8)
+    out[first] = values & 7
+    sel = np.flatnonzero(nibbles > 1)
+    pos, rest = first[sel], values[sel] >> 3
+    out[pos] |= 8
+    while len(pos):
+        more = rest >= 8
+        pos += 1
+        out[pos] = (rest & 7) | (more.view(np.uint8) << 3)
+        keep = np.flatnonzero(more)
+        pos, rest = pos[keep], rest[keep] >> 3
+    return (out[0::2] | (out[1::2] << 4)).tobytes()
+
+
+def _vle_decode(buf, count):
+    """_vle_encode 的逆操作，取前 count 个数 (int64)。"""
+    if not count:
+        return np.zeros(0, np.int64)
+    b = np.frombuffer(buf, np.uint8)
+    nib = np.empty(len(b) * 2, np.uint8)
+    nib[0::2] = b & 15
+    nib[1::2] = b >> 4
+    last = np.flatnonzero(nib < 8)[:count]
+    if len(last) < count:
+        raise ValueError("depth codec: truncated data")
+    first = np.empty_like(last)
+    first[0] = 0
+    first[1:] = last[:-1] + 1
+    values = (nib[first] & 7).astype(np.int64)
+    sel = np.flatnonzero(last > first)
+    pos, shift = first[sel], 3
+    while len(sel):
+        pos = pos + 1
+        values[sel] |= (nib[pos] & 7).astype(np.int64) << shift
+        keep = last[sel] > pos
+        sel, pos, shift = sel[keep], pos[keep], shift + 3
+    return values
+
+
+def _runs(mask):
+    """bool 数组 → 交替的 (False 游程, True 游程) 长度，偶数个。"""
+    edges = np.flatnonzero(mask[1:] != mask[:-1]) + 1
+    runs = np.diff(np.concatenate(([0], edges, [len(mask)])))
+    if len(mask) and mask[0]:
+        runs = np.concatenate(([0], runs))
+    if len(runs) % 2:
+        runs = np.append(runs, 0)
+    return runs
+
+
+def _unruns(runs, total):
+    """_runs 的逆操作；游程总长必须是 total。"""
+    if int(runs.sum()) != total:
+        raise ValueError("depth codec: corrupt run lengths")
+    return np.repeat(np.tile(np.array([False, True]), len(runs) // 2), runs)
+
+
+def encode(depth, prev=None):
+    """(H, W) uint16 深度 → bytes。给出 prev (上一帧) 时编码与它的差，解码时要同一个 prev。"""
+    depth = np.ascontiguousarray(depth)
+    if depth.dtype != np.uint16 or depth.ndim != 2:
+        raise ValueError(f"expected 2-D uint16 depth, got {depth.dtype} {depth.shape}")
+    h, w = depth.shape
+    x = depth.ravel()
+    flags = 0
+    if prev is not None:
+        if prev.shape != depth.shape:
+            raise ValueError(f"prev shape {prev.shape} != {depth.shape}")
+        x = x - np.asarray(prev, np.uint16).ravel()
+        flags |= TEMPORAL
+    # 全程 uint16 取模运算 (差值按 int16 解读再 zigzag)，比先转 int32 少一半内存读写；
+    # 解码端 int32 累加后截断为 uint16，结果相同
+    mask = x != 0
+    holes = _runs(mask)
+    values = x[mask]
+    deltas = np.empty_like(values)
+    deltas[:1] = values[:1]
+    np.subtract(values[1:], values[:-1], out=deltas[1:])
+    d = deltas.view(np.int16)
+    zigzag = ((d << 1) ^ (d >> 15)).view(np.uint16)
+    changed = zigzag != 0
+    same = _runs(changed)
+    nonzero = zigzag[changed] - 1
+    # 两种方式的 nibble 数 (差为 0 的都只占一个 nibble，只需要看不为 0 的那些)。
+    # 不用游程时存的是 nonzero + 1，nibble 数不少于 nonzero 的；用游程已经比这个下限
+    # 还少时 (立体深度的常见情况) 不必再数一遍
+    same_nibbles, nonzero_nibbles = _nibble_counts(same), _nibble_counts(nonzero)
+    with_runs = int(same_nibbles.sum()) + int(nonzero_nibbles.sum())
+    without = len(zigzag) - len(nonzero) + int(nonzero_nibbles.sum())
+    if with_runs >= without:
+        without = len(zigzag) - len(nonzero) + int(_nibble_counts(nonzero + 1).sum())
+    if with_runs < without:
+        flags |= DELTA_RUNS
+        streams = [_vle_encode(same, same_nibbles), _vle_encode(nonzero, nonzero_nibbles)]
+    else:
+        same = same[:0]
+        streams = [b"", _vle_encode(zigzag)]
+    streams.insert(0, _vle_encode(holes))
+    header = HEADER.pack(MAGIC, flags, w, h, len(holes), len(same),
+                         len(nonzero) if flags & DELTA_RUNS else len(zigzag),
+                         len(streams[0]), len(streams[1]))
+    return b"".join([header] + streams)
+
+
+def is_temporal(data):
+    return bool(HEADER.unpack_from(data)[1] & TEMPORAL)
+
+
+def decode(data, prev=None):
+    """encode 的逆操作，返回 (H, W) uint16。时间差分的数据必须给出编码时的 prev。"""
+    magic, flags, w, h, n_holes, n_same, n_zigzag, holes_bytes, same_bytes = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"bad magic: {magic!r}")
+    view = memoryview(data).cast("B")
+    a = HEADER.size + holes_bytes
+    b = a + same_bytes
+    mask = _unruns(_vle_decode(view[HEADER.size:a], n_holes), w * h)
+    zigzag = _vle_decode(view[b:], n_zigzag).astype(np.int32)
+    if flags & DELTA_RUNS:
+        changed = _unruns(_vle_decode(view[a:b], n_same), int(np.count_nonzero(mask)))
+        if np.count_nonzero(changed) != n_zigzag:
+            raise ValueError("depth codec: corrupt delta runs")
+        zigzag += 1
+        deltas = np.zeros(len(changed), np.int32)
+        deltas[changed] = (zigzag >> 1) ^ -(zigzag & 1)
+    elif n_zigzag != np.count_nonzero(mask):
+        raise ValueError("depth codec: corrupt run lengths")
+    else:
+        deltas = (zigzag >> 1) ^ -(zigzag & 1)
+    values = np.cumsum(deltas, dtype=np.int32)
+    if flags & TEMPORAL:
+        if prev is None or prev.shape != (h, w):
+            raise ValueError("temporal depth frame needs the previous frame")
+        out = prev.astype(np.int32).ravel()
+        out[mask] += values
+        return out.astype(np.uint16).reshape(h, w)
+    out = np.zeros(w * h, np.uint16)
+    out[mask] = values
+    return out.reshape(h, w)
+
+
+class DepthEncoder:
+    """编码一路深度流，能省字节时对上一帧做时间差分。
+
+    每 keyframe_interval 帧 (及尺寸变化时) 一个独立帧。时间差分的结果不比最近的独立帧小
+    (画面在动、深度有闪烁) 时改发独立帧，并且直到下一个关键帧周期都不再尝试差分，
+    所以通常每帧只编码一次。keyframe_interval=1 即全部独立编码。
+    解码端用 DepthDecoder，按顺序喂入全部数据。
+    """
+
+    def __init__(self, keyframe_interval=30):
+        self.keyframe_interval = keyframe_interval
+        self._prev = None
+        self._count = 0
+        self._intra_bytes = 0
+        self._temporal = True
+
+    def encode(self, depth):
+        key = (self._prev is None or self._prev.shape != depth.shape
+               or self._count % self.keyframe_interval == 0)
+        if key:
+            self._temporal = True
+        data = None if key or not self._temporal else encode(depth, self._prev)
+        if data is not None and len(data) >= self._intra_bytes:
+            data = None
+            self._temporal = False
+        if data is None:
+            data = encode(depth)
+            self._intra_bytes = len(data)
+        self._prev = np.array(depth, np.uint16)
+        self._count += 1
+        return data
+
+    def reset(self):
+        """下一帧强制为独立帧 (比如解码端重连)。"""
+        self._prev = None
+        self._count = 0
+
+
+class DepthDecoder:
+    """DepthEncoder 的解码端。"""
+
+    def __init__(self):
+        self._prev = None
+
+    def decode(self, data):
+        self._prev = decode(data, self._prev if is_temporal(data) else None)
+        return self._prev
+
+
+def main():
+    from session import Session
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 1
+    s = Session(sys.argv[1])
+    n = s.count("depth")
+    raw = packed = 0
+    for i in range(n):
+        depth = s.read("depth", i)
+        raw += depth.nbytes
+        packed += len(encode(depth))
+    print(f"{n} 帧深度: {raw / 1e6:.1f} MB → {packed / 1e6:.1f} MB ({packed / max(raw, 1):.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+检测结果工具 — 结构化数组类型与向量化的类别过滤 / 分数阈值 / 去重 (NMS)。
+
+ImseeSdk.get_detector_boxes() 返回 DET_DTYPE 结构化数组 (C 侧直接写入，没有逐框的
+Python 循环)；下面的函数都对整批框做 numpy 运算，结果仍是 DET_DTYPE 数组。
+需要旧的 dict 列表时用 to_dicts()。
+"""
+import numpy as np
+
+from config import CLASS_NAMES
+
+# 与 imsee_wrapper.cpp 的 struct DetBox 内存布局一致 (24 字节)
+DET_DTYPE = np.dtype([
+    ("x", "<i4"),
+    ("y", "<i4"),
+    ("w", "<i4"),
+    ("h", "<i4"),
+    ("score", "<f4"),
+    ("class_id", "<i4"),
+])
+
+
+def make_boxes(rows):
+    """[(x, y, w, h, class_id, score), ...] -> DET_DTYPE 数组 (测试 / 合成数据用)。"""
+    rows = list(rows)
+    out = np.zeros(len(rows), DET_DTYPE)
+    if rows:
+        cols = np.asarray(rows, np.float64).reshape(-1, 6)
+        for i, name in enumerate(("x", "y", "w", "h", "class_id")):
+            out[name] = cols[:, i]
+        out["score"] = cols[:, 5]
+    return out
+
+
+def filter_classes(boxes, class_ids):
+    """只保留 class_id 属于 class_ids 的框。"""
+    wanted = np.fromiter(class_ids, np.int32)
+    # 类别集合很小: 广播比较比 np.isin 的排序 / 查表快
+    return boxes[(boxes["class_id"][:, None] == wanted).any(axis=1)]
+
+
+def filter_score(boxes, min_score):
+    """只保留 score >= min_score 的框。"""
+    return boxes[boxes["score"] >= min_score]
+
+
+def _corners(boxes):
+    """-> (x1, y1, x2, y2, area) 各为 float32 列。"""
+    x1 = boxes["x"].astype(np.float32)
+    y1 = boxes["y"].astype(np.float32)
+    w = boxes["w"].astype(np.float32)
+    h = boxes["h"].astype(np.float32)
+    return x1, y1, x1 + w, y1 + h, w * h
+
+
+def iou_matrix(a, b):
+    """a (N 个框) 与 b (M 个框) 两两之间的 IoU，返回 (N, M) float32。"""
+    ax1, ay1, ax2, ay2, area_a = _corners(a)
+    bx1, by1, bx2, by2, area_b = _corners(b)
+    iw = np.minimum.outer(ax2, bx2) - np.maximum.outer(ax1, bx1)
+    ih = np.minimum.outer(ay2, by2) - np.maximum.outer(ay1, by1)
+    np.maximum(iw, 0, out=iw)
+    np.maximum(ih, 0, out=ih)
+    inter = iw * ih
+    union = np.add.outer(area_a, area_b) - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def dedup(boxes, iou_threshold=0.5, per_class=True):
+    """NMS 式去重: 与更高分的框 IoU 超过阈值的框被去掉。结果按分数降序。
+
+    用一次 (N, N) IoU 矩阵完成，没有逐框循环 (Fast NMS: 被去掉的框仍参与
+    抑制更低分的框，因此比逐个贪心的 NMS 略激进；N <= 256 时矩阵只有 256 KB)。
+    per_class=True 时只在同类别之间去重。
+    """
+    if len(boxes) < 2:
+        return boxes.copy()
+    order = np.argsort(-boxes["score"], kind="stable")
+    ranked = boxes[order]
+    iou = iou_matrix(ranked, ranked)
+    if per_class:
+        iou[ranked["class_id"][:, None] != ranked["class_id"][None, :]] = 0
+    # 只看排在前面 (分数更高) 的框: 上三角 (不含对角线)
+    suppressed = np.triu(iou > iou_threshold, k=1).any(axis=0)
+    return ranked[~suppressed]
+
+
+def class_names(boxes, names=None):
+    """每个框的类别名 (未知类别为 "UNKNOWN")。"""
+    names = CLASS_NAMES if names is None else names
+    return [names.get(int(c), "UNKNOWN") for c in boxes["class_id"]]
+
+
+def to_dicts(boxes, names=None):
+    """DET_DTYPE 数组 -> [{x, y, w, h, class_id, class_name, score}, ...] (旧格式，按需使用)。"""
+    cols = {k: boxes[k].tolist() for k in ("x", "y", "w", "h", "class_id", "score")}
+    return [
+        {"x": x, "y": y, "w": w, "h": h, "class_id": c, "class_name": n, "score": s}
+        for x, y, w, h, c, s, n in zip(cols["x"], cols["y"], cols["w"], cols["h"],
+                                       cols["class_id"], cols["score"],
+                                       class_names(boxes, names))
+    ]
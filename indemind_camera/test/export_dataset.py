@@ -0,0 +1,81 @@
+"""
+导出数据集 — 把录制的会话 (或相机实时采集) 转成 EuRoC MAV / TUM RGB-D 目录 (dataset_export)。
+用法: python export_dataset.py <会话目录|live> [输出目录] [--format euroc|tum] [--kind frame|rectified]
+                              [--seconds 10] [--start 秒 --end 秒] [--workers N] [--compression 0-9]
+默认: euroc, frame, 输出 <会话目录>_euroc/ (live 为 dataset_<时间>/)；live 时录 --seconds 秒，
+编码跟不上时丢帧并在结束时报告。
+"""
+import argparse
+import os
+import sys
+import time
+
+from config import FPS, RESOLUTION
+from dataset_export import FORMATS, PNG_COMPRESSION, export_live, export_session
+from sdk_backend import open_sdk
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _live(args):
+    sdk = open_sdk()
+    ret = sdk.init(RESOLUTION, FPS)
+    if ret != 0:
+        print(f"初始化失败: {ret}")
+        return None
+    print(f"相机: {sdk.get_module_info()}")
+    if args.kind == "rectified":
+        sdk.enable_rectify()
+    if "depth" in FORMATS[args.format].KINDS:
+        sdk.enable_depth()
+    sdk.enable_imu()
+    print(f"\n开始采集 {args.seconds} 秒...")
+    try:
+        return export_live(sdk, args.output, args.seconds, args.format, args.kind, fps=FPS,
+                           workers=args.workers, compression=args.compression)
+    finally:
+        sdk.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indemind 数据集导出 (EuRoC / TUM)")
+    parser.add_argument("source", help="会话目录，或 live 表示从相机实时采集")
+    parser.add_argument("output", nargs="?", help="输出目录")
+    parser.add_argument("--format", default="euroc", choices=sorted(FORMATS))
+    parser.add_argument("--kind", default="frame", choices=["frame", "rectified"],
+                        help="导出的双目图 (rectified 用投影矩阵的内参、无畸变)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="live: 采集秒数")
+    parser.add_argument("--start", type=float, help="会话: 起始时间戳 (秒)")
+    parser.add_argument("--end", type=float, help="会话: 结束时间戳 (秒)")
+    parser.add_argument("--workers", type=int, default=None, help="PNG 编码进程数 (缺省 CPU 核数)")
+    parser.add_argument("--compression", type=int, default=PNG_COMPRESSION,
+                        help="PNG 压缩级别 0-9")
+    args = parser.parse_args()
+    live = args.source == "live"
+    if args.output is None:
+        args.output = (os.path.join(_SCRIPT_DIR, time.strftime("dataset_%Y%m%d_%H%M%S")) if live
+                       else f"{args.source.rstrip(os.sep)}_{args.format}")
+
+    print("=" * 50)
+    print(f"Indemind 数据集导出 ({args.format}): {args.source} -> {args.output}")
+    print("=" * 50)
+
+    if live:
+        stats = _live(args)
+        if stats is None:
+            return 1
+    else:
+        stats = export_session(args.source, args.output, args.format, args.kind,
+                               start=args.start, end=args.end, workers=args.workers,
+                               compression=args.compression)
+
+    seconds = max(stats["seconds"], 1e-9)
+    print(f"\n导出完成: {seconds:.1f}s, PNG {stats['png_bytes'] / 1e6:.1f} MB, "
+          f"IMU {stats['imu_samples']} 样本")
+    for kind, n in stats["frames"].items():
+        print(f"  {kind:10s} {n:6d} 帧 ({n / seconds:.1f} 帧/s)  丢帧 {stats['dropped'].get(kind, 0)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
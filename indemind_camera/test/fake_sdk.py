@@ -0,0 +1,608 @@
+"""
+脚本化的 ImseeSdk 替身 — 不需要相机和 libimsee_wrapper.so。
+按调用方 push() 的顺序吐帧，并记录每个 SDK 方法的调用次数，
+用于 webapp / 工具脚本的单元测试和基准测试。
+
+FakeImseeSdk 替换整个 ImseeSdk；FakeImseeLib 只替换 ctypes 层的 .so，
+用于测试 ImseeSdk 自身 (ImseeSdk(lib=FakeImseeLib()))。
+"""
+import collections
+import ctypes
+import threading
+import time
+
+import numpy as np
+
+from detector_utils import DET_DTYPE
+from imu_stream import IMU_DTYPE, as_columns, from_columns
+
+
+class FakeImseeSdk:
+    """与 ImseeSdk 接口兼容的假 SDK。
+
+    每次 push() 产生一个"新帧"；与 C wrapper 的 ready 标志语义一致，
+    get_frame()/get_depth() 对同一帧只返回一次，之后返回 None。
+    """
+
+    def __init__(self, width=640, height=400, stereo=True):
+        self.width = width
+        self.height = height
+        self.stereo = stereo
+        self.calls = collections.Counter()
+        self.frames_served = 0
+        self.depths_served = 0
+        self._lock = threading.Lock()
+        self._frame = None
+        self._depth = None
+        self._initialized = False
+
+    # ----- 测试脚本控制 -----
+
+    def push(self, frame=None, depth=None):
+        """发布一帧新数据。frame/depth 为 None 时生成默认图案。"""
+        fw = self.width * 2 if self.stereo else self.width
+        if frame is None:
+            frame = np.full((self.height, fw), 128, dtype=np.uint8)
+        if depth is None:
+            depth = np.full((self.height, self.width), 1500, dtype=np.uint16)
+        with self._lock:
+            self._frame = frame
+            self._depth = depth
+
+    # ----- ImseeSdk 接口 -----
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+        return False
+
+    def init(self, resolution=1, fps=25):
+        self.calls["init"] += 1
+        self._initialized = True
+        return 0
+
+    def release(self):
+        self.calls["release"] += 1
+        self._initialized = False
+
+    def is_initialized(self):
+        return self._initialized
+
+    def get_module_info(self):
+        return "ID: FAKE, FW: 0.0"
+
+    def enable_depth(self, mode=0):
+        self.calls["enable_depth"] += 1
+        return 0
+
+    def get_frame(self):
+        self.calls["get_frame"] += 1
+        with self._lock:
+            frame, self._frame = self._frame, None
+        if frame is None:
+            return None
+        self.frames_served += 1
+        return frame
+
+    def get_depth(self):
+        self.calls["get_depth"] += 1
+        with self._lock:
+            depth, self._depth = self._depth, None
+        if depth is None:
+            return None
+        self.depths_served += 1
+        return depth
+
+
+class _CFunc:
+    """可设置 argtypes/restype 的函数包装，模拟 ctypes 导出函数。"""
+
+    def __init__(self, fn):
+        self._fn = fn
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        return self._fn(*args)
+
+
+def _out(ref, value):
+    """写 ctypes.byref(c_int) 形式的输出参数。"""
+    ref._obj.value = value
+
+
+class FakeImseeLib:
+    """libimsee_wrapper.so 的纯 Python 实现，语义与 src/imsee_wrapper.cpp 一致:
+    get_* 把最新数据 memcpy 到调用方缓冲，并清除 ready 标志 (同一帧只返回一次)。
+
+    push(kind, array, timestamp=None) 模拟 SDK 回调写入新数据；kind 取
+    frame / depth / disparity / rectified / points / detector_image / detector / imu
+    (detector 为 DET_DTYPE 检测框数组；imu 为 IMU_DTYPE 结构化数组或 (N, 7) 样本，
+    逐个追加到环形缓冲)。
+    每次 push 该产品的 seq +1 (imu 每个样本 +1) 并唤醒 imsee_wait_*；
+    timestamp 缺省为 time.monotonic() (imu 为最后一个样本的时间戳)。
+    start_stream() 在后台线程按固定帧率 push，用于延迟测试。
+    """
+
+    _DTYPES = {"frame": np.uint8, "depth": np.uint16, "disparity": np.float32,
+               "rectified": np.uint8, "points": np.float32, "detector_image": np.uint8}
+    # kind -> imsee_get_seq() 的产品编号 (同 imsee_sdk.PRODUCTS，检测框与检测图共用)
+    _PRODUCT = {"frame": 0, "depth": 1, "disparity": 2, "rectified": 3,
+                "points": 4, "detector_image": 5, "imu": 6}
+    IMU_RING_SIZE = 2000
+    DET_MAX_BOXES = 256
+    track_push_times = True   # 记录 push_times (延迟基准用；长时间推流时关掉)
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._data = {}          # kind -> ndarray (C 侧的内部缓冲)
+        self._ready = set()
+        self._imu_ring = np.zeros(self.IMU_RING_SIZE, IMU_DTYPE)   # 同 C 侧 g_imu_ring
+        self._boxes = np.zeros(0, DET_DTYPE)
+        self._imu_first = 0          # 本次 init 后的第一个样本序号
+        self._imu_cursor = 0         # 旧接口 imsee_get_imu 的游标
+        self._seq = [0] * 7          # 产品编号 -> 序号
+        self._time = [0.0] * 7       # 产品编号 -> 传感器时间戳
+        self._wait_epoch = 0
+        self._frame_prev_time = 0.0
+        self._history_depth = 0
+        self._history = {}           # 产品编号 -> {seq: (ndarray, timestamp)}
+        self._history_first = {}     # 产品编号 -> 本次 init 后的第一个 seq
+        self.push_times = {}         # (kind, seq) -> push 时的 time.perf_counter()
+        self._initialized = False
+        self.callback_count = 0
+        self.calls = collections.Counter()
+        self.taken = collections.Counter()   # kind -> 被取走 (清 ready) 的次数
+        for name in dir(self):
+            if name.startswith("imsee_"):
+                setattr(self, name, _CFunc(getattr(self, name)))
+
+    # ----- 测试脚本控制 -----
+
+    def push(self, kind, array, timestamp=None):
+        if kind == "imu":
+            self._push_imu(array)
+            return
+        if kind == "detector":
+            with self._lock:
+                self._boxes = np.array(array, DET_DTYPE)[:self.DET_MAX_BOXES]
+                self._ready.add("detector")
+                self._seq[5] += 1
+                self._time[5] = time.monotonic() if timestamp is None else timestamp
+                self._lock.notify_all()
+            return
+        array = np.ascontiguousarray(array, dtype=self._DTYPES[kind])
+        product = self._PRODUCT[kind]
+        with self._lock:
+            self._data[kind] = array.copy()
+            self._ready.add(kind)
+            if kind == "frame":
+                self._frame_prev_time = self._time[product]
+            self._seq[product] += 1
+            self._time[product] = time.monotonic() if timestamp is None else timestamp
+            if self._history_depth > 0:
+                ring = self._history.setdefault(product, {})
+                seq = self._seq[product]
+                ring[seq] = (self._data[kind], self._time[product])
+                ring.pop(seq - self._history_depth, None)
+                self._history_first.setdefault(product, seq)
+            if self.track_push_times:
+                self.push_times[(kind, self._seq[product])] = time.perf_counter()
+            if kind == "frame":
+                self.callback_count += 1
+            self._lock.notify_all()
+
+    def _push_imu(self, samples):
+        samples = np.asarray(samples)
+        if samples.dtype != IMU_DTYPE:
+            samples = from_columns(samples)
+        if len(samples) == 0:
+            return
+        size = len(self._imu_ring)
+        with self._lock:
+            first = self._seq[6] + 1
+            seqs = np.arange(first, first + len(samples))
+            self._imu_ring[(seqs[-size:] - 1) % size] = samples[-size:]
+            if self._imu_first == 0:
+                self._imu_first = first
+            self._seq[6] = int(seqs[-1])
+            self._time[6] = float(samples["timestamp"][-1])
+            if self.track_push_times:
+                self.push_times[("imu", self._seq[6])] = time.perf_counter()
+            self._lock.notify_all()
+
+    def start_stream(self, fps, kinds=("frame", "depth"), shape=(40, 64)):
+        """后台线程按 fps 固定节拍 push kinds (合成数据)。返回 stop() 函数。"""
+        stop = threading.Event()
+        h, w = shape
+        samples = {"frame": np.zeros((h, w * 2), np.uint8),
+                   "depth": np.full((h, w), 1500, np.uint16),
+                   "disparity": np.ones((h, w), np.float32),
+                   "rectified": np.zeros((h, w * 2), np.uint8),
+                   "points": np.zeros((h * w, 3), np.float32),
+                   "detector_image": np.zeros((h, w, 3), np.uint8),
+                   "imu": np.zeros(1, IMU_DTYPE)}
+
+        def run():
+            period = 1.0 / fps
+            t0 = time.perf_counter()
+            i = 0
+            while not stop.is_set():
+                i += 1
+                delay = t0 + i * period - time.perf_counter()
+                if delay > 0 and stop.wait(delay):
+                    break
+                for kind in kinds:
+                    self.push(kind, samples[kind])
+
+        t = threading.Thread(target=run, name="fake-imsee-stream", daemon=True)
+        t.start()
+
+        def stop_stream():
+            stop.set()
+            t.join()
+
+        return stop_stream
+    # ----- 内部 -----
+
+    def _shape(self, kind):
+        arr = self._data.get(kind)
+        return arr.shape if arr is not None else None
+
+    def _copy_out(self, kind, buffer, buffer_size, seq=None, timestamp=None, consume=True):
+        self.calls[kind] += 1
+        with self._lock:
+            if kind not in self._ready:
+                return 0
+            arr = self._data[kind]
+            if buffer_size < arr.size:
+                return -1
+            ctypes.memmove(buffer, arr.ctypes.data, arr.nbytes)
+            self._report(kind, seq, timestamp)
+            if consume:
+                self._take(kind)
+            return arr.size
+
+    def _take(self, kind):
+        """调用方取走 kind 的最新数据 (持有 _lock 时调用): 清 ready 标志并唤醒等待者。"""
+        self._ready.discard(kind)
+        self.taken[kind] += 1
+        self._lock.notify_all()
+
+    def _report(self, kind, seq, timestamp):
+        product = self._PRODUCT[kind]
+        if seq is not None:
+            _out(seq, self._seq[product])
+        if timestamp is not None:
+            _out(timestamp, self._time[product])
+
+    def _info3(self, kind, w, h, ch):
+        shape = self._shape(kind)
+        if shape is None:
+            _out(w, 0), _out(h, 0), _out(ch, 0)
+            return
+        _out(w, shape[1])
+        _out(h, shape[0])
+        _out(ch, shape[2] if len(shape) == 3 else 1)
+
+    def _info2(self, kind, w, h):
+        shape = self._shape(kind) or (0, 0)
+        _out(w, shape[1])
+        _out(h, shape[0])
+
+    # ----- Init / Release -----
+
+    def imsee_init(self, resolution, fps):
+        return self.imsee_init_ex(resolution, fps, 0)
+
+    def imsee_init_ex(self, resolution, fps, history_depth):
+        if history_depth < 0:
+            return -3
+        self._initialized = True
+        self._history_depth = history_depth
+        return 0
+
+    def imsee_release(self):
+        self._initialized = False
+        with self._lock:
+            self._data.clear()
+            self._ready.clear()
+            self._imu_first = 0
+            self._frame_prev_time = 0.0
+            self._history.clear()
+            self._history_first.clear()
+            self._history_depth = 0
+            self._wait_epoch += 1
+            self._lock.notify_all()
+
+    def imsee_is_initialized(self):
+        return 1 if self._initialized else 0
+
+    def imsee_get_callback_count(self):
+        return self.callback_count
+
+    def imsee_get_seq(self, product):
+        return self._seq[product] if 0 <= product < len(self._seq) else 0
+
+    def imsee_wait_any(self, mask, after_seqs, timeout_ms):
+        def ready_mask():
+            return sum(1 << i for i in range(len(self._seq))
+                       if mask & (1 << i) and self._seq[i] > after_seqs[i])
+
+        with self._lock:
+            epoch = self._wait_epoch
+            self._lock.wait_for(lambda: ready_mask() or self._wait_epoch != epoch,
+                                None if timeout_ms < 0 else timeout_ms / 1000)
+            return ready_mask()
+
+    def imsee_wait_seq(self, product, after_seq, timeout_ms):
+        after = [0] * len(self._seq)
+        after[product] = after_seq
+        if self.imsee_wait_any(1 << product, after, timeout_ms) == 0:
+            return 0
+        return self._seq[product]
+
+    # ----- History ring -----
+
+    def _history_range(self, product):
+        ring = self._history.get(product)
+        if not ring:
+            return 0, 0
+        return min(ring), max(ring)
+
+    def imsee_history_read(self, product, after_seq, buffer, buffer_size,
+                           dims, seq, timestamp, skipped):
+        _out(skipped, 0)
+        with self._lock:
+            oldest, newest = self._history_range(product)
+            if newest == 0 or after_seq >= newest:
+                return 0
+            want = after_seq + 1
+            if want < oldest:
+                want = max(want, self._history_first[product])
+                _out(skipped, oldest - want)
+                want = oldest
+            # 没有存数据的序号 (如不带图像的检测结果) 直接跳过，与 C 侧一致
+            ring = self._history[product]
+            while want <= newest and want not in ring:
+                want += 1
+            if want > newest:
+                return 0
+            arr, ts = ring[want]
+            shape = arr.shape + (1,) * (3 - arr.ndim)
+            dims[0], dims[1], dims[2] = shape
+            if buffer_size < arr.nbytes:
+                return -1
+            ctypes.memmove(buffer, arr.ctypes.data, arr.nbytes)
+            _out(seq, want)
+            _out(timestamp, ts)
+            return arr.nbytes
+
+    def imsee_history_info(self, product, depth, oldest, newest):
+        with self._lock:
+            _out(depth, self._history_depth)
+            lo, hi = self._history_range(product)
+            _out(oldest, lo)
+            _out(newest, hi)
+            return sum(a.nbytes for a, _ in self._history.get(product, {}).values())
+
+    # ----- Products -----
+
+    def imsee_get_image_info(self, w, h, ch):
+        self._info3("frame", w, h, ch)
+
+    def imsee_get_frame(self, buffer, buffer_size):
+        return self._copy_out("frame", buffer, buffer_size)
+
+    def imsee_get_frame_ex(self, buffer, buffer_size, seq, timestamp):
+        return self._copy_out("frame", buffer, buffer_size, seq, timestamp)
+
+    def imsee_enable_depth(self, mode):
+        return 0
+
+    def imsee_get_depth(self, buffer, buffer_size):
+        return self._copy_out("depth", buffer, buffer_size)
+
+    def imsee_get_depth_ex(self, buffer, buffer_size, seq, timestamp):
+        return self._copy_out("depth", buffer, buffer_size, seq, timestamp)
+
+    def imsee_get_depth_size(self, w, h):
+        self._info2("depth", w, h)
+
+    def imsee_enable_disparity(self, mode):
+        return 0
+
+    def imsee_get_disparity(self, buffer, buffer_size):
+        return self._copy_out("disparity", buffer, buffer_size)
+
+    def imsee_get_disparity_ex(self, buffer, buffer_size, seq, timestamp):
+        return self._copy_out("disparity", buffer, buffer_size, seq, timestamp)
+
+    def imsee_get_disparity_size(self, w, h):
+        self._info2("disparity", w, h)
+
+    def imsee_enable_rectify(self):
+        return 0
+
+    def imsee_get_rectified(self, buffer, buffer_size):
+        return self._copy_out("rectified", buffer, buffer_size)
+
+    def imsee_get_rectified_ex(self, buffer, buffer_size, seq, timestamp):
+        return self._copy_out("rectified", buffer, buffer_size, seq, timestamp)
+
+    def imsee_get_rectified_info(self, w, h, ch):
+        self._info3("rectified", w, h, ch)
+
+    def imsee_enable_points(self):
+        return 0
+
+    def imsee_get_points(self, buffer, buffer_size):
+        return self.imsee_get_points_ex(buffer, buffer_size, None, None)
+
+    def imsee_get_points_ex(self, buffer, buffer_size, seq, timestamp):
+        got = self._copy_out("points", buffer, buffer_size, seq, timestamp)
+        return got // 3 if got > 0 else got   # C 侧返回点数
+
+    def imsee_get_points_size(self, w, h, count):
+        shape = self._shape("points")
+        n = shape[0] if shape is not None else 0
+        _out(w, n), _out(h, 1 if n else 0), _out(count, n)
+
+    def imsee_enable_imu(self):
+        return 0
+
+    def _imu_oldest(self):
+        newest, size = self._seq[6], len(self._imu_ring)
+        if self._imu_first == 0:
+            return newest + 1
+        return newest - size + 1 if newest >= self._imu_first + size else self._imu_first
+
+    def _imu_range(self, start, stop):
+        """序号 [start, stop] 的样本 (需持锁)。"""
+        return self._imu_ring[(np.arange(start, stop + 1) - 1) % len(self._imu_ring)]
+
+    def imsee_set_imu_ring_size(self, samples):
+        if samples <= 0:
+            return -1
+        with self._lock:
+            self._imu_ring = np.zeros(samples, IMU_DTYPE)
+            self._imu_first = 0
+        return 0
+
+    def imsee_get_imu_ring_size(self):
+        return len(self._imu_ring)
+
+    def imsee_read_imu(self, cursor, buffer, max_samples, dropped):
+        _out(dropped, 0)
+        with self._lock:
+            newest, oldest = self._seq[6], self._imu_oldest()
+            nxt = cursor._obj.value + 1
+            if nxt < oldest:
+                if self._imu_first and nxt >= self._imu_first:
+                    _out(dropped, oldest - nxt)
+                nxt = oldest
+            stop = min(newest, nxt + max_samples - 1)
+            out = self._imu_range(nxt, stop)
+            if len(out):
+                ctypes.memmove(buffer, out.ctypes.data, out.nbytes)
+            _out(cursor, max(nxt - 1, stop))
+            return len(out)
+
+    def imsee_get_imu(self, buffer, max_samples):
+        with self._lock:
+            newest = self._seq[6]
+            nxt = max(self._imu_cursor + 1, self._imu_oldest(), newest - max_samples + 1)
+            rows = as_columns(self._imu_range(nxt, newest))
+            self._imu_cursor = newest
+        if len(rows):
+            ctypes.memmove(buffer, rows.ctypes.data, rows.nbytes)
+        return len(rows)
+
+    def imsee_get_imu_count(self):
+        with self._lock:
+            nxt = max(self._imu_cursor + 1, self._imu_oldest())
+            return max(0, self._seq[6] - nxt + 1)
+
+    # ----- Bundle -----
+
+    def imsee_get_bundle(self, mask, frame_buf, frame_size, depth_buf, depth_size,
+                         imu_buf, imu_max, imu_after, seqs, timestamps, counts, dims):
+        self.calls["bundle"] += 1
+        for i in range(len(self._seq)):
+            counts[i] = 0
+        got = 0
+        with self._lock:
+            frame_shape = self._shape("frame") or (0, 0)
+            depth_shape = self._shape("depth") or (0, 0)
+            dims[0], dims[1] = frame_shape[1], frame_shape[0]
+            dims[2], dims[3] = depth_shape[1], depth_shape[0]
+            frame_time = self._time[0]
+            if imu_after < 0:
+                imu_after = self._frame_prev_time
+
+            for kind, buf, size in (("frame", frame_buf, frame_size),
+                                    ("depth", depth_buf, depth_size)):
+                product = self._PRODUCT[kind]
+                if not mask & (1 << product) or kind not in self._ready:
+                    continue
+                arr = self._data[kind]
+                if size < arr.size:
+                    counts[product] = -1
+                    continue
+                ctypes.memmove(buf, arr.ctypes.data, arr.nbytes)
+                seqs[product], timestamps[product] = self._seq[product], self._time[product]
+                counts[product] = arr.size
+                self._take(kind)
+                got |= 1 << product
+
+            if mask & (1 << 6):
+                samples = self._imu_range(self._imu_oldest(), self._seq[6])
+                ts = samples["timestamp"]
+                window = samples[(ts > imu_after) & (ts <= frame_time)][:imu_max]
+                if len(window):
+                    window = np.ascontiguousarray(window)
+                    ctypes.memmove(imu_buf, window.ctypes.data, window.nbytes)
+                    got |= 1 << 6
+                seqs[6], timestamps[6], counts[6] = self._seq[6], frame_time, len(window)
+        return got
+
+    def imsee_enable_detector(self):
+        return 0
+
+    def _take_boxes(self, max_boxes, seq, timestamp):
+        with self._lock:
+            if "detector" not in self._ready:
+                return None
+            self._report("detector_image", seq, timestamp)
+            self._take("detector")
+            return self._boxes[:max_boxes]
+
+    def imsee_get_detector_boxes(self, buffer, max_boxes):
+        return self.imsee_get_detector_boxes_ex(buffer, max_boxes, None, None)
+
+    def imsee_get_detector_boxes_ex(self, buffer, max_boxes, seq, timestamp):
+        boxes = self._take_boxes(max_boxes, seq, timestamp)
+        if boxes is None:
+            return 0
+        # 旧布局: 每框 int[6] = x, y, w, h, class_id, score*1000
+        legacy = np.empty((len(boxes), 6), np.int32)
+        for i, name in enumerate(("x", "y", "w", "h", "class_id")):
+            legacy[:, i] = boxes[name]
+        legacy[:, 5] = boxes["score"] * 1000
+        ctypes.memmove(buffer, legacy.ctypes.data, legacy.nbytes)
+        return len(boxes)
+
+    def imsee_get_detector_results_ex(self, buffer, max_boxes, seq, timestamp):
+        boxes = self._take_boxes(max_boxes, seq, timestamp)
+        if boxes is None:
+            return 0
+        if len(boxes):
+            ctypes.memmove(buffer, boxes.ctypes.data, boxes.nbytes)
+        return len(boxes)
+
+    def imsee_get_detector_max_boxes(self):
+        return self.DET_MAX_BOXES
+
+    def imsee_get_detector_image(self, buffer, buffer_size):
+        return self.imsee_get_detector_image_ex(buffer, buffer_size, None, None)
+
+    def imsee_get_detector_image_ex(self, buffer, buffer_size, seq, timestamp):
+        # C 侧检测图不清 ready 标志: 每次都返回最新一张
+        return self._copy_out("detector_image", buffer, buffer_size, seq, timestamp,
+                              consume=False)
+
+    def imsee_get_detector_image_info(self, w, h, ch):
+        self._info3("detector_image", w, h, ch)
+
+    # ----- Calibration / device info -----
+
+    def imsee_get_calibration(self):
+        return b"{}"
+
+    def imsee_get_device_info_detailed(self):
+        return b"{}"
+
+    def imsee_get_module_info(self):
+        return b"ID: FAKE, FW: 0.0"
@@ -0,0 +1,88 @@
+"""
+帧缓冲池 — 预分配一圈同形状的 numpy 缓冲，以"租约"形式借出。
+租约释放前，对应缓冲绝不会被再次借出 (不会被下一帧覆盖)。
+"""
+import collections
+import threading
+
+import numpy as np
+
+
+class FrameLease:
+    """一块池缓冲的租约。
+
+    array 在 release() 之前归持有者独占；release() 后不得再访问
+    (包括由 array 切出来的视图)。支持 with 语句:
+
+        lease = sdk.lease("depth")
+        if lease is not None:
+            with lease as depth:
+                ...
+    """
+
+    __slots__ = ("array", "buffer", "seq", "timestamp", "_pool")
+
+    def __init__(self, pool, buffer):
+        self._pool = pool
+        self.buffer = buffer    # 完整的池缓冲 (C 侧写入目标)
+        self.array = buffer     # 有效数据视图 (可能只是 buffer 的前一部分)
+        self.seq = 0            # 数据的 SDK 序号 / 传感器时间戳 (由 ImseeSdk.lease 填写)
+        self.timestamp = 0.0
+
+    @property
+    def released(self) -> bool:
+        return self._pool is None
+
+    def release(self):
+        """归还缓冲。重复调用无副作用。"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            self.array = None
+            pool._put(self.buffer)
+
+    def __enter__(self):
+        return self.array
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+        return False
+
+
+class FramePool:
+    """固定形状 / 类型的缓冲环。
+
+    acquire() 总是返回当前未被持有的缓冲 (最早归还的优先)；
+    全部被持有时新分配一块加入池中，而不是覆盖别人手里的帧。
+    """
+
+    def __init__(self, shape, dtype, size: int = 4):
+        if size < 1:
+            raise ValueError(f"pool size must be >= 1: {size}")
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._free = collections.deque(np.empty(self.shape, self.dtype) for _ in range(size))
+        self._lock = threading.Lock()
+        self.allocations = size   # 累计分配的缓冲数 (稳态下不再增长)
+        self.outstanding = 0      # 当前借出的租约数
+
+    def matches(self, shape, dtype) -> bool:
+        return self.shape == tuple(shape) and self.dtype == np.dtype(dtype)
+
+    def acquire(self) -> FrameLease:
+        with self._lock:
+            if self._free:
+                buf = self._free.popleft()
+            else:
+                buf = np.empty(self.shape, self.dtype)
+                self.allocations += 1
+            self.outstanding += 1
+        return FrameLease(self, buf)
+
+    def _put(self, buf):
+        with self._lock:
+            self.outstanding -= 1
+            self._free.append(buf)
+
+    def __len__(self):
+        """池中缓冲总数 (空闲 + 借出)。"""
+        return len(self._free) + self.outstanding
@@ -6,7 +6,7 @@ import cv2
 import sys
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 from vis_utils import depth_to_color
 
 
@@ -16,7 +16,7 @@ def main():
     print("按 Q 或 ESC 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -30,11 +30,11 @@ def main():
     cv2.namedWindow(win, cv2.WINDOW_NORMAL)
 
     while True:
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
         if key in (ord("q"), 27):
             break
 
-        depth = sdk.get_depth()
+        depth = sdk.wait_frame("depth", timeout=0.1)
         if depth is None:
             continue
 
@@ -7,7 +7,7 @@ import numpy as np
 import sys
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 from vis_utils import depth_to_color
 
 
@@ -17,7 +17,7 @@ def main():
     print("A/D: 调整深度透明度  Q/ESC: 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -38,7 +38,7 @@ def main():
     last_valid = None
 
     while True:
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
         if key in (ord("q"), 27):
             break
         elif key == ord("a"):
@@ -48,8 +48,12 @@ def main():
             alpha = min(1.0, alpha + 0.1)
             print(f"深度透明度: {alpha:.1f}")
 
+        # 阻塞到任一路有新数据 (不再按固定间隔轮询)
+        kinds = ("frame", "depth") if depth_ret == 0 else ("frame",)
+        got = sdk.wait_any(kinds, timeout=0.1)
+
         # --- 左摄像头 ---
-        frame = sdk.get_frame()
+        frame = got.get("frame")
         if frame is not None:
             h, w = frame.shape[:2]
             if w > h * 1.5:
@@ -60,7 +64,7 @@ def main():
 
         # --- 深度图 ---
         if depth_ret == 0:
-            depth = sdk.get_depth()
+            depth = got.get("depth")
             if depth is not None:
                 last_depth_color, last_depth_raw, last_valid = depth_to_color(depth)
 
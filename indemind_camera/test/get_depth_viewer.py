@@ -9,7 +9,7 @@ import numpy as np
 import sys
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 from vis_utils import depth_to_color
 
 
@@ -20,7 +20,7 @@ def main():
     print("按 Q 或 ESC 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -39,12 +39,16 @@ def main():
     display_w = 640
 
     while True:
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
         if key in (ord("q"), 27):
             break
 
+        # 阻塞到任一路有新数据 (不再按固定间隔轮询)
+        kinds = ("frame", "depth") if depth_ret == 0 else ("frame",)
+        got = sdk.wait_any(kinds, timeout=0.1)
+
         # --- 摄像头帧 ---
-        frame = sdk.get_frame()
+        frame = got.get("frame")
         if frame is not None:
             h, w = frame.shape[:2]
             if w > h * 1.5:
@@ -62,7 +66,7 @@ def main():
 
         # --- 深度图 ---
         if depth_ret == 0:
-            depth = sdk.get_depth()
+            depth = got.get("depth")
             if depth is not None:
                 colored, clamped, _valid = depth_to_color(depth)
                 dh, dw = depth.shape
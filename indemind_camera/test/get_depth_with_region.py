@@ -8,7 +8,7 @@ import numpy as np
 import sys
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 from vis_utils import depth_to_color
 
 
@@ -19,7 +19,7 @@ def main():
     print("按 Q 或 ESC 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -45,11 +45,11 @@ def main():
     ROWS, COLS = 3, 3
 
     while True:
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
         if key in (ord("q"), 27):
             break
 
-        depth = sdk.get_depth()
+        depth = sdk.wait_frame("depth", timeout=0.1)
         if depth is None:
             continue
 
@@ -6,8 +6,9 @@ import cv2
 import numpy as np
 import sys
 
-from imsee_sdk import ImseeSdk
-from config import CLASS_NAMES, RESOLUTION, FPS
+from sdk_backend import open_sdk
+from config import RESOLUTION, FPS
+from detector_utils import DET_DTYPE, class_names, dedup
 
 # 每个类别的颜色 (BGR)
 CLASS_COLORS = {
@@ -23,6 +24,8 @@ CLASS_COLORS = {
     9: (0, 128, 255),    # KEY
 }
 
+NO_BOXES = np.zeros(0, DET_DTYPE)
+
 
 def main():
     print("=" * 50)
@@ -30,7 +33,7 @@ def main():
     print("按 Q 或 ESC 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -47,12 +50,13 @@ def main():
     last_frame = None
 
     while True:
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
         if key in (ord("q"), 27):
             break
 
-        # 获取检测结果
-        boxes = sdk.get_detector_boxes()
+        # 阻塞到检测结果或原始帧更新
+        got = sdk.wait_any(("detector", "frame"), timeout=0.1)
+        boxes = got.get("detector", NO_BOXES)
 
         # 尝试获取检测器图像
         det_img = sdk.get_detector_image()
@@ -63,7 +67,7 @@ def main():
                 display = det_img.copy()
         else:
             # 回退到原始帧
-            frame = sdk.get_frame()
+            frame = got.get("frame")
             if frame is not None:
                 last_frame = frame
             if last_frame is None:
@@ -76,11 +80,9 @@ def main():
                 display = cv2.cvtColor(last_frame, cv2.COLOR_GRAY2BGR)
 
         # 绘制检测框
-        for box in boxes:
-            x, y, bw, bh = box["x"], box["y"], box["w"], box["h"]
-            cls_id = box["class_id"]
-            name = box["class_name"]
-            score = box["score"]
+        boxes = dedup(boxes)
+        for box, name in zip(boxes.tolist(), class_names(boxes)):
+            x, y, bw, bh, score, cls_id = box
             color = CLASS_COLORS.get(cls_id, (255, 255, 255))
 
             cv2.rectangle(display, (x, y), (x + bw, y + bh), color, 2)
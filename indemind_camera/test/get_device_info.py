@@ -6,7 +6,7 @@ import sys
 import time
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 
 
 def main():
@@ -14,7 +14,7 @@ def main():
     print("Indemind 设备信息查看器")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
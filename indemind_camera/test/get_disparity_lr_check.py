@@ -6,7 +6,7 @@ import cv2
 import sys
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 from vis_utils import disparity_to_color
 
 
@@ -16,7 +16,7 @@ def main():
     print("按 Q 或 ESC 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -31,11 +31,11 @@ def main():
     cv2.namedWindow(win, cv2.WINDOW_NORMAL)
 
     while True:
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
         if key in (ord("q"), 27):
             break
 
-        disp = sdk.get_disparity()
+        disp = sdk.wait_frame("disparity", timeout=0.1)
         if disp is None:
             continue
 
@@ -7,7 +7,7 @@ import numpy as np
 import sys
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 
 
 def main():
@@ -16,7 +16,7 @@ def main():
     print("按 Q 或 ESC 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -30,11 +30,11 @@ def main():
 
     print("等待帧数据...")
     while True:
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
         if key in (ord("q"), 27):
             break
 
-        frame = sdk.get_frame()
+        frame = sdk.wait_frame("frame", timeout=0.1)
         if frame is None:
             continue
 
@@ -6,7 +6,7 @@ import sys
 import time
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 
 
 def main():
@@ -15,7 +15,7 @@ def main():
     print("按 Ctrl+C 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -43,16 +43,18 @@ def main():
             # 只打印最后几条 (避免刷屏)
             show = imu[-5:] if len(imu) > 5 else imu
             for sample in show:
-                ts = sample[0]
-                ax, ay, az = sample[1], sample[2], sample[3]
-                gx, gy, gz = sample[4], sample[5], sample[6]
+                ts = sample["timestamp"]
+                ax, ay, az = sample["accel"]
+                gx, gy, gz = sample["gyro"]
                 print(f"{ts:14.4f}  {ax:8.3f}  {ay:8.3f}  {az:8.3f}  "
                       f"{gx:8.4f}  {gy:8.4f}  {gz:8.4f}")
 
             total_samples += len(imu)
 
     except KeyboardInterrupt:
-        print(f"\n\n总采样数: {total_samples}")
+        stats = sdk.imu_stats()
+        print(f"\n\n总采样数: {total_samples}, 环溢出丢失: {stats['dropped']}, "
+              f"时间戳断档: {stats['gaps']} 次 (约 {stats['missing']} 个样本)")
 
     sdk.release()
     print("完成。")
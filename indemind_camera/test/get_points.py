@@ -7,7 +7,7 @@ import numpy as np
 import sys
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 
 
 def points_to_topview(pts, img_size=400, range_m=5.0):
@@ -44,7 +44,7 @@ def main():
     print("按 Q 或 ESC 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -59,11 +59,11 @@ def main():
     count = 0
 
     while True:
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
         if key in (ord("q"), 27):
             break
 
-        pts = sdk.get_points()
+        pts = sdk.wait_frame("points", timeout=0.1)
         if pts is None:
             continue
 
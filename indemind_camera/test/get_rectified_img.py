@@ -7,7 +7,7 @@ import numpy as np
 import sys
 
 from config import RESOLUTION, FPS
-from imsee_sdk import ImseeSdk
+from sdk_backend import open_sdk
 
 
 def main():
@@ -17,7 +17,7 @@ def main():
     print("按 Q 或 ESC 退出")
     print("=" * 50)
 
-    sdk = ImseeSdk()
+    sdk = open_sdk()
     ret = sdk.init(RESOLUTION, FPS)
     if ret != 0:
         print(f"初始化失败: {ret}")
@@ -31,11 +31,11 @@ def main():
     cv2.namedWindow(win, cv2.WINDOW_NORMAL)
 
     while True:
-        key = cv2.waitKey(30) & 0xFF
+        key = cv2.waitKey(1) & 0xFF
         if key in (ord("q"), 27):
             break
 
-        frame = sdk.get_rectified()
+        frame = sdk.wait_frame("rectified", timeout=0.1)
         if frame is None:
             continue
 
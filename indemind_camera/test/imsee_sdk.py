@@ -7,10 +7,13 @@ import ctypes
 import json
 import os
 import sys
+import time
 
 import numpy as np
 
-from config import CLASS_NAMES
+from detector_utils import DET_DTYPE, to_dicts
+from frame_pool import FramePool
+from imu_stream import IMU_DTYPE, ImuReader
 
 # 库路径: test/ 的上一级目录下的 lib/
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -18,15 +21,17 @@ _PROJECT_DIR = os.path.dirname(_SCRIPT_DIR)
 _LIB_DIR = os.path.join(_PROJECT_DIR, "lib")
 
 
-def _ensure_lib_env():
-    """确保 LD_LIBRARY_PATH 正确设置，必要时重启进程。
-    解决: 1) conda libgcc_s ABI 冲突  2) SDK 运行时 dlopen 依赖"""
+def _set_lib_env():
+    """把 LD_LIBRARY_PATH 设为 系统库优先 + 项目库 (只改 os.environ，不重启进程)。
+
+    返回 True 表示有改动 (本进程需要重启才生效；之后启动的子进程直接继承)。
+    """
     abs_lib = os.path.abspath(_LIB_DIR)
     sys_lib = "/lib/x86_64-linux-gnu"
 
     # 检查是否已经设置好
     if os.environ.get("_IMSEE_LIB_OK") == "1":
-        return
+        return False
 
     # 构建正确的 LD_LIBRARY_PATH: 系统库优先(覆盖 conda), 然后项目库
     current = os.environ.get("LD_LIBRARY_PATH", "")
@@ -43,13 +48,21 @@ def _ensure_lib_env():
         new_parts = [sys_lib, abs_lib] + [p for p in parts if p not in (sys_lib, abs_lib)]
         os.environ["LD_LIBRARY_PATH"] = ":".join(new_parts)
         os.environ["_IMSEE_LIB_OK"] = "1"
+    return need_reexec
+
+
+def _ensure_lib_env():
+    """确保 LD_LIBRARY_PATH 正确设置，必要时重启进程。
+    解决: 1) conda libgcc_s ABI 冲突  2) SDK 运行时 dlopen 依赖"""
+    if _set_lib_env():
         # 重启进程使 LD_LIBRARY_PATH 生效 (dlopen 需要在进程启动时设置)
         try:
             os.execv(sys.executable, [sys.executable] + sys.argv)
         except OSError:
             # execv 在某些环境下可能失败 (非 TTY 等)
             print("[警告] 无法自动设置库路径，请使用:")
-            print(f"  LD_LIBRARY_PATH={':'.join(new_parts)} python3 {' '.join(sys.argv)}")
+            print(f"  LD_LIBRARY_PATH={os.environ['LD_LIBRARY_PATH']} "
+                  f"python3 {' '.join(sys.argv)}")
             sys.exit(1)
 
 
@@ -76,20 +89,136 @@ def _preload_deps():
                 pass
 
 
-class ImseeSdk:
-    """Indemind SDK ctypes wrapper。"""
+# imsee_get_seq() 的产品编号 (与 imsee_wrapper.cpp 的 enum Product 一致)
+PRODUCTS = {"frame": 0, "depth": 1, "disparity": 2, "rectified": 3,
+            "points": 4, "detector": 5, "imu": 6}
 
-    def __init__(self):
-        so_path = os.path.join(_LIB_DIR, "libimsee_wrapper.so")
-        if not os.path.exists(so_path):
-            print(f"[错误] 找不到 {so_path}")
-            print("请先运行 ./build.sh 编译 wrapper")
-            sys.exit(1)
 
-        _ensure_lib_env()
-        _preload_deps()
-        self._lib = ctypes.CDLL(so_path)
+class SdkArray(np.ndarray):
+    """带 SDK 元数据的 ndarray。
+
+    seq: 该产品的序号 (每个新数据 +1，进程内单调递增)
+    timestamp: SDK 回调给出的传感器时间戳 (秒)
+    切片 / 视图保留元数据；cv2 等函数的输出是普通 ndarray。
+    """
+
+    def __array_finalize__(self, obj):
+        self.seq = getattr(obj, "seq", 0)
+        self.timestamp = getattr(obj, "timestamp", 0.0)
+
+
+class BoxList(list):
+    """get_detector_boxes(as_dicts=True) 的结果列表，附带 seq / timestamp。"""
+
+    seq = 0
+    timestamp = 0.0
+
+
+class Bundle:
+    """get_bundle() 的结果: 同一快照下取到的 frame / depth / IMU。
+
+    frame / depth: SdkArray 或 None (该路没有新数据)；是 ImseeSdk 内部缓冲的视图
+    imu: IMU_DTYPE 结构化数组 (timestamp, accel[3], gyro[3])，为上一次取到的帧与
+         当前帧之间的样本；没有样本时为 None
+    """
+
+    __slots__ = ("frame", "depth", "imu")
+
+    def __init__(self, frame=None, depth=None, imu=None):
+        self.frame = frame
+        self.depth = depth
+        self.imu = imu
+
+
+class HistoryCursor:
+    """按序号遍历某一产品历史环的游标 (见 ImseeSdk.cursor)。
+
+    每次 read() 返回上次读到的 seq 之后的全部数据 (从旧到新)；
+    读者落后超过环深度时，被覆盖的帧数累计在 overruns 中。
+    """
+
+    def __init__(self, sdk, kind, seq=0):
+        self._sdk = sdk
+        self.kind = kind
+        self.seq = seq          # 已读到的最后一个序号
+        self.overruns = 0       # 累计丢失的帧数
+
+    def read(self, max_items=None):
+        items, skipped = self._sdk.read_after(self.kind, self.seq, max_items)
+        self.overruns += skipped
+        if items:
+            self.seq = items[-1].seq
+        return items
+
+
+def _tag(arr, seq, timestamp):
+    arr = arr.view(SdkArray)
+    arr.seq = seq
+    arr.timestamp = timestamp
+    return arr
+
+
+class ImseeSdk:
+    """Indemind SDK ctypes wrapper。
+
+    lib: 已加载的 wrapper 库 (测试时可传入 fake_sdk.FakeImseeLib)，默认加载 lib/ 下的 .so。
+    pool_size: lease() 每种数据预分配的缓冲数。
+    """
+
+    # lease() 支持的数据: kind -> (C 取数函数, numpy dtype, ctypes 元素类型)
+    LEASE_KINDS = {
+        "frame": ("imsee_get_frame_ex", np.uint8, ctypes.c_ubyte),
+        "depth": ("imsee_get_depth_ex", np.uint16, ctypes.c_ushort),
+        "disparity": ("imsee_get_disparity_ex", np.float32, ctypes.c_float),
+        "rectified": ("imsee_get_rectified_ex", np.uint8, ctypes.c_ubyte),
+        "points": ("imsee_get_points_ex", np.float32, ctypes.c_float),
+        "detector_image": ("imsee_get_detector_image_ex", np.uint8, ctypes.c_ubyte),
+    }
+
+    # 历史环 (init(history=N)) 中各产品的数据类型；检测产品保存的是检测器图像
+    HISTORY_DTYPES = {
+        "frame": np.uint8,
+        "depth": np.uint16,
+        "disparity": np.float32,
+        "rectified": np.uint8,
+        "points": np.float32,
+        "detector": np.uint8,
+    }
+
+    # wait_frame() / wait_any() 唤醒后用来取数的方法 (检测产品返回检测框)
+    WAIT_GETTERS = {
+        "frame": "get_frame",
+        "depth": "get_depth",
+        "disparity": "get_disparity",
+        "rectified": "get_rectified",
+        "points": "get_points",
+        "detector": "get_detector_boxes",
+        "imu": "get_imu",
+    }
+
+    def __init__(self, lib=None, pool_size=4):
+        if lib is None:
+            so_path = os.path.join(_LIB_DIR, "libimsee_wrapper.so")
+            if not os.path.exists(so_path):
+                print(f"[错误] 找不到 {so_path}")
+                print("请先运行 ./build.sh 编译 wrapper")
+                sys.exit(1)
+
+            _ensure_lib_env()
+            _preload_deps()
+            lib = ctypes.CDLL(so_path)
+        self._lib = lib
         self._declare_functions()
+        self._pool_size = pool_size
+        self._pools = {}   # kind -> FramePool
+        self._seq_out = ctypes.c_ulonglong()   # *_ex() 的输出参数 (复用)
+        self._ts_out = ctypes.c_double()
+        self._seen = dict.fromkeys(PRODUCTS, 0)   # 产品 -> 本实例最后取到的序号
+        self._wait_after = (ctypes.c_ulonglong * len(PRODUCTS))()
+        self._bundle = None   # get_bundle() 的缓冲 / 输出参数 (首次调用时创建)
+        self._hist_shapes = {}   # kind -> 上次历史读取的形状 (预分配下一帧的输出数组)
+        self._hist_dims = (ctypes.c_int * 3)()
+        self._hist_skipped = ctypes.c_ulonglong()
 
         # 预分配缓冲区
         self._cam_buf = None
@@ -102,7 +231,7 @@ class ImseeSdk:
         self._rect_buf_size = 0
         self._pts_buf = None
         self._pts_buf_size = 0
-        self._imu_buf = None
+        self._imu_reader = ImuReader(self)   # get_imu() 的游标
         self._det_box_buf = None
         self._det_img_buf = None
         self._det_img_size = 0
@@ -115,28 +244,48 @@ class ImseeSdk:
         USHORT_P = ctypes.POINTER(ctypes.c_ushort)
         FLOAT_P = ctypes.POINTER(ctypes.c_float)
         DOUBLE_P = ctypes.POINTER(ctypes.c_double)
+        U64_P = ctypes.POINTER(ctypes.c_ulonglong)
 
         # --- Init / Release ---
         lib.imsee_init.argtypes = [INT, INT]
         lib.imsee_init.restype = INT
+        lib.imsee_init_ex.argtypes = [INT, INT, INT]
+        lib.imsee_init_ex.restype = INT
         lib.imsee_release.argtypes = []
         lib.imsee_release.restype = None
         lib.imsee_is_initialized.argtypes = []
         lib.imsee_is_initialized.restype = INT
         lib.imsee_get_callback_count.argtypes = []
         lib.imsee_get_callback_count.restype = INT
+        lib.imsee_get_seq.argtypes = [INT]
+        lib.imsee_get_seq.restype = ctypes.c_ulonglong
+        lib.imsee_wait_any.argtypes = [ctypes.c_uint, U64_P, INT]
+        lib.imsee_wait_any.restype = ctypes.c_uint
+        lib.imsee_wait_seq.argtypes = [INT, ctypes.c_ulonglong, INT]
+        lib.imsee_wait_seq.restype = ctypes.c_ulonglong
+
+        # --- History ring ---
+        lib.imsee_history_read.argtypes = [INT, ctypes.c_ulonglong, UBYTE_P, INT,
+                                           PINT, U64_P, DOUBLE_P, U64_P]
+        lib.imsee_history_read.restype = INT
+        lib.imsee_history_info.argtypes = [INT, PINT, U64_P, U64_P]
+        lib.imsee_history_info.restype = ctypes.c_longlong
 
         # --- Raw image ---
         lib.imsee_get_image_info.argtypes = [PINT, PINT, PINT]
         lib.imsee_get_image_info.restype = None
         lib.imsee_get_frame.argtypes = [UBYTE_P, INT]
         lib.imsee_get_frame.restype = INT
+        lib.imsee_get_frame_ex.argtypes = [UBYTE_P, INT, U64_P, DOUBLE_P]
+        lib.imsee_get_frame_ex.restype = INT
 
         # --- Depth ---
         lib.imsee_enable_depth.argtypes = [INT]
         lib.imsee_enable_depth.restype = INT
         lib.imsee_get_depth.argtypes = [USHORT_P, INT]
         lib.imsee_get_depth.restype = INT
+        lib.imsee_get_depth_ex.argtypes = [USHORT_P, INT, U64_P, DOUBLE_P]
+        lib.imsee_get_depth_ex.restype = INT
         lib.imsee_get_depth_size.argtypes = [PINT, PINT]
         lib.imsee_get_depth_size.restype = None
 
@@ -145,6 +294,8 @@ class ImseeSdk:
         lib.imsee_enable_disparity.restype = INT
         lib.imsee_get_disparity.argtypes = [FLOAT_P, INT]
         lib.imsee_get_disparity.restype = INT
+        lib.imsee_get_disparity_ex.argtypes = [FLOAT_P, INT, U64_P, DOUBLE_P]
+        lib.imsee_get_disparity_ex.restype = INT
         lib.imsee_get_disparity_size.argtypes = [PINT, PINT]
         lib.imsee_get_disparity_size.restype = None
 
@@ -153,6 +304,8 @@ class ImseeSdk:
         lib.imsee_enable_rectify.restype = INT
         lib.imsee_get_rectified.argtypes = [UBYTE_P, INT]
         lib.imsee_get_rectified.restype = INT
+        lib.imsee_get_rectified_ex.argtypes = [UBYTE_P, INT, U64_P, DOUBLE_P]
+        lib.imsee_get_rectified_ex.restype = INT
         lib.imsee_get_rectified_info.argtypes = [PINT, PINT, PINT]
         lib.imsee_get_rectified_info.restype = None
 
@@ -161,6 +314,8 @@ class ImseeSdk:
         lib.imsee_enable_points.restype = INT
         lib.imsee_get_points.argtypes = [FLOAT_P, INT]
         lib.imsee_get_points.restype = INT
+        lib.imsee_get_points_ex.argtypes = [FLOAT_P, INT, U64_P, DOUBLE_P]
+        lib.imsee_get_points_ex.restype = INT
         lib.imsee_get_points_size.argtypes = [PINT, PINT, PINT]
         lib.imsee_get_points_size.restype = None
 
@@ -171,14 +326,32 @@ class ImseeSdk:
         lib.imsee_get_imu.restype = INT
         lib.imsee_get_imu_count.argtypes = []
         lib.imsee_get_imu_count.restype = INT
+        lib.imsee_read_imu.argtypes = [U64_P, ctypes.c_void_p, INT, U64_P]
+        lib.imsee_read_imu.restype = INT
+        lib.imsee_set_imu_ring_size.argtypes = [INT]
+        lib.imsee_set_imu_ring_size.restype = INT
+        lib.imsee_get_imu_ring_size.argtypes = []
+        lib.imsee_get_imu_ring_size.restype = INT
+
+        # --- Bundle ---
+        lib.imsee_get_bundle.argtypes = [ctypes.c_uint, UBYTE_P, INT, USHORT_P, INT,
+                                         ctypes.c_void_p, INT, ctypes.c_double,
+                                         U64_P, DOUBLE_P, PINT, PINT]
+        lib.imsee_get_bundle.restype = ctypes.c_uint
 
         # --- Detector ---
         lib.imsee_enable_detector.argtypes = []
         lib.imsee_enable_detector.restype = INT
         lib.imsee_get_detector_boxes.argtypes = [PINT, INT]
         lib.imsee_get_detector_boxes.restype = INT
+        lib.imsee_get_detector_boxes_ex.argtypes = [PINT, INT, U64_P, DOUBLE_P]
+        lib.imsee_get_detector_boxes_ex.restype = INT
+        lib.imsee_get_detector_results_ex.argtypes = [ctypes.c_void_p, INT, U64_P, DOUBLE_P]
+        lib.imsee_get_detector_results_ex.restype = INT
         lib.imsee_get_detector_image.argtypes = [UBYTE_P, INT]
         lib.imsee_get_detector_image.restype = INT
+        lib.imsee_get_detector_image_ex.argtypes = [UBYTE_P, INT, U64_P, DOUBLE_P]
+        lib.imsee_get_detector_image_ex.restype = INT
         lib.imsee_get_detector_image_info.argtypes = [PINT, PINT, PINT]
         lib.imsee_get_detector_image_info.restype = None
 
@@ -205,9 +378,12 @@ class ImseeSdk:
     # Init / Release
     # ==========================================================
 
-    def init(self, resolution=1, fps=25):
-        """初始化相机。resolution: 1=640x400, 2=1280x800"""
-        return self._lib.imsee_init(resolution, fps)
+    def init(self, resolution=1, fps=25, history=0):
+        """初始化相机。resolution: 1=640x400, 2=1280x800
+
+        history: 每种数据在 C 侧保留的历史帧数 (供 read_after / cursor 使用)，0 = 不保留。
+        """
+        return self._lib.imsee_init_ex(resolution, fps, history)
 
     def release(self):
         self._lib.imsee_release()
@@ -221,6 +397,135 @@ class ImseeSdk:
     def get_module_info(self):
         return self._lib.imsee_get_module_info().decode("utf-8", errors="replace")
 
+    def get_seq(self, kind):
+        """kind 当前的最新序号 (不拷贝数据)。与上次拿到的 .seq 相同说明没有新数据。"""
+        return self._lib.imsee_get_seq(PRODUCTS[kind])
+
+    def _fetch(self, product, fn, buf, size):
+        """调用 *_ex 取数函数，返回 (got, seq, timestamp)，并记下 product 已看到的序号。"""
+        self._seq_out.value = 0
+        got = fn(buf, size, ctypes.byref(self._seq_out), ctypes.byref(self._ts_out))
+        seq = self._seq_out.value
+        if seq > self._seen[product]:
+            self._seen[product] = seq
+        return got, seq, self._ts_out.value
+
+    # ==========================================================
+    # Blocking wait (C 侧条件变量; ctypes 调用期间释放 GIL)
+    # ==========================================================
+
+    def wait_any(self, kinds, timeout=1.0):
+        """阻塞到 kinds 中任一产品出现比本实例上次取到的更新的数据，取回并返回
+        {kind: 数据}；超时 (秒) 或 release() 时返回 {}。timeout=None 表示一直等。
+
+        只包含确实取到数据的 kind；同时就绪的多个 kind 一次全部返回。
+        """
+        mask = 0
+        for kind in kinds:
+            if kind not in self.WAIT_GETTERS:
+                raise ValueError(f"unknown wait kind: {kind}")
+            mask |= 1 << PRODUCTS[kind]
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            if deadline is None:
+                timeout_ms = -1
+            else:
+                timeout_ms = max(0, int((deadline - time.monotonic()) * 1000 + 0.5))
+            for kind, product in PRODUCTS.items():
+                self._wait_after[product] = self._seen[kind]
+            ready = self._lib.imsee_wait_any(mask, self._wait_after, timeout_ms)
+            if ready == 0:
+                return {}
+
+            result = {}
+            for kind in kinds:
+                product = PRODUCTS[kind]
+                if not ready & (1 << product):
+                    continue
+                data = getattr(self, self.WAIT_GETTERS[kind])()
+                # 以实际取到的数据的 seq 记为已看到 (取数据与读 seq 之间可能又来新数据，
+                # 读当前 seq 会把没拿到的那份也标成已看到)；get_imu() 自己维护游标。
+                # 数据已被别的调用方取走时同样视为已看到，避免反复立即唤醒
+                if kind != "imu":
+                    seq = getattr(data, "seq", 0) if data is not None else 0
+                    self._seen[kind] = max(self._seen[kind], seq or self.get_seq(kind))
+                if data is not None and (kind != "detector" or data.seq):
+                    result[kind] = data
+            if result or (deadline is not None and time.monotonic() >= deadline):
+                return result
+
+    def wait_frame(self, kind, timeout=1.0):
+        """阻塞到 kind 出现新数据并返回它 (同 get_*() 的返回值)；超时返回 None。
+
+        替代 "get_*() + cv2.waitKey(30) / time.sleep()" 轮询: 新帧到达即返回，
+        不会拿到重复帧，也不额外引入轮询间隔的延迟。
+        """
+        return self.wait_any((kind,), timeout).get(kind)
+
+    # ==========================================================
+    # History ring (按序号游标读取，需 init(history=N))
+    # ==========================================================
+
+    def _history_read_one(self, kind, after_seq):
+        """读取 seq > after_seq 的最早一帧，返回 (SdkArray 或 None, 丢帧数)。"""
+        dtype = self.HISTORY_DTYPES[kind]
+        product = PRODUCTS[kind]
+        dims, skipped = self._hist_dims, self._hist_skipped
+        shape = self._hist_shapes.get(kind, (0,))
+        for _ in range(2):   # 输出数组不够大 (首次 / 分辨率变了) 时按 C 侧给出的形状重试一次
+            arr = np.empty(shape, dtype)
+            got = self._lib.imsee_history_read(
+                product, after_seq, arr.ctypes.data_as(ctypes.POINTER(ctypes.c_ubyte)),
+                arr.nbytes, dims, ctypes.byref(self._seq_out), ctypes.byref(self._ts_out),
+                ctypes.byref(skipped))
+            rows, cols, ch = dims
+            shape = (rows, cols) if ch <= 1 else (rows, cols, ch)
+            if got != -1:
+                break
+        if got <= 0:
+            return None, skipped.value
+        self._hist_shapes[kind] = shape
+        if arr.shape != shape:
+            arr = arr.reshape(-1)[:got // arr.itemsize].reshape(shape)
+        return _tag(arr, self._seq_out.value, self._ts_out.value), skipped.value
+
+    def read_after(self, kind, seq, max_items=None):
+        """历史环中 seq 之后的全部数据 (从旧到新)，返回 (列表, 丢帧数)。
+
+        丢帧数为读者落后超过环深度、已被覆盖而取不到的帧数。
+        返回的数组各自独立，可以长期持有。
+        """
+        if kind not in self.HISTORY_DTYPES:
+            raise ValueError(f"unknown history kind: {kind}")
+        items, overruns = [], 0
+        while max_items is None or len(items) < max_items:
+            arr, skipped = self._history_read_one(kind, seq)
+            overruns += skipped
+            if arr is None:
+                break
+            items.append(arr)
+            seq = arr.seq
+        return items, overruns
+
+    def cursor(self, kind, seq=0):
+        """从 seq 之后开始读取 kind 历史的游标 (HistoryCursor)。"""
+        if kind not in self.HISTORY_DTYPES:
+            raise ValueError(f"unknown history kind: {kind}")
+        return HistoryCursor(self, kind, seq)
+
+    def history_stats(self):
+        """{kind: {"depth", "oldest", "newest", "bytes"}} — 各产品历史环的状态与内存占用。"""
+        depth = ctypes.c_int()
+        oldest, newest = ctypes.c_ulonglong(), ctypes.c_ulonglong()
+        stats = {}
+        for kind in self.HISTORY_DTYPES:
+            nbytes = self._lib.imsee_history_info(PRODUCTS[kind], ctypes.byref(depth),
+                                                  ctypes.byref(oldest), ctypes.byref(newest))
+            stats[kind] = {"depth": depth.value, "oldest": oldest.value,
+                           "newest": newest.value, "bytes": nbytes}
+        return stats
+
     # ==========================================================
     # Raw camera frame
     # ==========================================================
@@ -232,7 +537,11 @@ class ImseeSdk:
         return w.value, h.value, ch.value
 
     def get_frame(self):
-        """返回 numpy 图像或 None (无新帧)"""
+        """返回 numpy 图像或 None (无新帧)。
+
+        注意: 返回的是内部缓冲的视图，下一次 get_frame() 会覆盖它；
+        需要长期持有时请 copy() 或改用 lease("frame")。
+        """
         w, h, ch = self.get_image_info()
         if w <= 0 or h <= 0:
             return None
@@ -240,10 +549,66 @@ class ImseeSdk:
         if self._cam_buf is None or self._cam_buf_size != needed:
             self._cam_buf = (ctypes.c_ubyte * needed)()
             self._cam_buf_size = needed
-        got = self._lib.imsee_get_frame(self._cam_buf, needed)
+        got, seq, ts = self._fetch("frame", self._lib.imsee_get_frame_ex,
+                                   self._cam_buf, needed)
+        if got <= 0:
+            return None
+        arr = np.frombuffer(self._cam_buf, dtype=np.uint8, count=got).reshape((h, w))
+        return _tag(arr, seq, ts)
+
+    # ==========================================================
+    # Pooled leases (零拷贝: C 侧直接写入池缓冲)
+    # ==========================================================
+
+    def _lease_shape(self, kind):
+        """当前分辨率下 kind 的数组形状；尚无数据时返回 None。"""
+        if kind in ("frame", "rectified", "detector_image"):
+            info = {"frame": self.get_image_info,
+                    "rectified": self.get_rectified_info,
+                    "detector_image": self.get_detector_image_info}[kind]
+            w, h, ch = info()
+            if w <= 0 or h <= 0:
+                return None
+            return (h, w) if ch <= 1 else (h, w, ch)
+        if kind == "points":
+            _, _, count = self.get_points_size()
+            return (count, 3) if count > 0 else None
+        w, h = self.get_depth_size() if kind == "depth" else self.get_disparity_size()
+        return (h, w) if w > 0 and h > 0 else None
+
+    def lease(self, kind):
+        """取一帧新数据到池缓冲中，返回 FrameLease 或 None (无新数据)。
+
+        与 get_*() 不同: 不做额外复制，且租约释放前缓冲不会被下一帧覆盖。
+        用完必须 release() (或用 with 语句)，否则池会不断新分配缓冲。
+        """
+        try:
+            fn_name, dtype, ctype = self.LEASE_KINDS[kind]
+        except KeyError:
+            raise ValueError(f"unknown lease kind: {kind}") from None
+        shape = self._lease_shape(kind)
+        if shape is None:
+            return None
+        pool = self._pools.get(kind)
+        if pool is None or not pool.matches(shape, dtype):
+            pool = self._pools[kind] = FramePool(shape, dtype, self._pool_size)
+
+        lease = pool.acquire()
+        buf = lease.buffer
+        product = "detector" if kind == "detector_image" else kind
+        got, lease.seq, lease.timestamp = self._fetch(
+            product, getattr(self._lib, fn_name),
+            buf.ctypes.data_as(ctypes.POINTER(ctype)), buf.size)
         if got <= 0:
+            lease.release()
             return None
-        return np.frombuffer(self._cam_buf, dtype=np.uint8, count=got).reshape((h, w))
+        if kind == "points" and got < shape[0]:
+            lease.array = buf[:got]   # points 返回的是点数
+        return lease
+
+    def pool_stats(self):
+        """{kind: (缓冲总数, 借出数)}"""
+        return {k: (len(p), p.outstanding) for k, p in self._pools.items()}
 
     # ==========================================================
     # Depth
@@ -267,10 +632,12 @@ class ImseeSdk:
         if self._depth_buf is None or self._depth_buf_size != needed:
             self._depth_buf = (ctypes.c_ushort * needed)()
             self._depth_buf_size = needed
-        got = self._lib.imsee_get_depth(self._depth_buf, needed)
+        got, seq, ts = self._fetch("depth", self._lib.imsee_get_depth_ex,
+                                   self._depth_buf, needed)
         if got <= 0:
             return None
-        return np.frombuffer(self._depth_buf, dtype=np.uint16, count=got).reshape((h, w)).copy()
+        arr = np.frombuffer(self._depth_buf, dtype=np.uint16, count=got).reshape((h, w)).copy()
+        return _tag(arr, seq, ts)
 
     # ==========================================================
     # Disparity
@@ -294,10 +661,12 @@ class ImseeSdk:
         if self._disp_buf is None or self._disp_buf_size != needed:
             self._disp_buf = (ctypes.c_float * needed)()
             self._disp_buf_size = needed
-        got = self._lib.imsee_get_disparity(self._disp_buf, needed)
+        got, seq, ts = self._fetch("disparity", self._lib.imsee_get_disparity_ex,
+                                   self._disp_buf, needed)
         if got <= 0:
             return None
-        return np.frombuffer(self._disp_buf, dtype=np.float32, count=got).reshape((h, w)).copy()
+        arr = np.frombuffer(self._disp_buf, dtype=np.float32, count=got).reshape((h, w)).copy()
+        return _tag(arr, seq, ts)
 
     # ==========================================================
     # Rectified images
@@ -320,10 +689,12 @@ class ImseeSdk:
         if self._rect_buf is None or self._rect_buf_size != needed:
             self._rect_buf = (ctypes.c_ubyte * needed)()
             self._rect_buf_size = needed
-        got = self._lib.imsee_get_rectified(self._rect_buf, needed)
+        got, seq, ts = self._fetch("rectified", self._lib.imsee_get_rectified_ex,
+                                   self._rect_buf, needed)
         if got <= 0:
             return None
-        return np.frombuffer(self._rect_buf, dtype=np.uint8, count=got).reshape((h, w)).copy()
+        arr = np.frombuffer(self._rect_buf, dtype=np.uint8, count=got).reshape((h, w)).copy()
+        return _tag(arr, seq, ts)
 
     # ==========================================================
     # Point cloud
@@ -346,10 +717,12 @@ class ImseeSdk:
         if self._pts_buf is None or self._pts_buf_size != needed:
             self._pts_buf = (ctypes.c_float * needed)()
             self._pts_buf_size = needed
-        got = self._lib.imsee_get_points(self._pts_buf, needed)
+        got, seq, ts = self._fetch("points", self._lib.imsee_get_points_ex,
+                                   self._pts_buf, needed)
         if got <= 0:
             return None
-        return np.frombuffer(self._pts_buf, dtype=np.float32, count=got * 3).reshape((got, 3)).copy()
+        arr = np.frombuffer(self._pts_buf, dtype=np.float32, count=got * 3).reshape((got, 3)).copy()
+        return _tag(arr, seq, ts)
 
     # ==========================================================
     # IMU
@@ -358,17 +731,128 @@ class ImseeSdk:
     def enable_imu(self):
         return self._lib.imsee_enable_imu()
 
+    def set_imu_ring_size(self, samples):
+        """C 侧 IMU 环的大小 (样本数，默认 2000 = 1 kHz 下 2 秒)。会丢弃环中已有样本。"""
+        return self._lib.imsee_set_imu_ring_size(samples)
+
+    def get_imu_ring_size(self):
+        return self._lib.imsee_get_imu_ring_size()
+
+    def read_imu(self, seq, max_samples=2000):
+        """读取序号 > seq 的 IMU 样本 (从旧到新，最多 max_samples 个)，不影响其他读者。
+
+        返回 (IMU_DTYPE 结构化数组, 新游标, 被覆盖而丢失的样本数)。
+        """
+        out = np.empty(max_samples, IMU_DTYPE)
+        cursor = ctypes.c_ulonglong(seq)
+        dropped = ctypes.c_ulonglong()
+        got = self._lib.imsee_read_imu(ctypes.byref(cursor), out.ctypes.data, max_samples,
+                                       ctypes.byref(dropped))
+        return out[:got], cursor.value, dropped.value
+
+    def imu_reader(self, from_oldest=False, max_samples=2000):
+        """新建一个 IMU 游标读者 (ImuReader)。
+
+        from_oldest: True 时从环中最早的样本开始读，否则只读之后到达的样本。
+        """
+        seq = 0 if from_oldest else self.get_seq("imu")
+        return ImuReader(self, seq, max_samples)
+
     def get_imu_count(self):
-        return self._lib.imsee_get_imu_count()
+        """get_imu() 尚未读取的样本数 (不超过环大小)。"""
+        pending = self.get_seq("imu") - self._imu_reader.seq
+        return min(pending, self.get_imu_ring_size())
 
     def get_imu(self, max_samples=2000):
-        """返回 (N, 7) float64 数组: [timestamp, ax, ay, az, gx, gy, gz] 或 None"""
-        if self._imu_buf is None or len(self._imu_buf) < max_samples * 7:
-            self._imu_buf = (ctypes.c_double * (max_samples * 7))()
-        got = self._lib.imsee_get_imu(self._imu_buf, max_samples)
-        if got <= 0:
-            return None
-        return np.frombuffer(self._imu_buf, dtype=np.float64, count=got * 7).reshape((got, 7)).copy()
+        """返回上次调用以来的 IMU 样本 (IMU_DTYPE 结构化数组: timestamp, accel[3], gyro[3])
+        或 None。本实例自带一个游标读者，与其他读者互不影响；累计丢失数见
+        self.imu_stats()。需要 (N, 7) 旧格式时用 imu_stream.as_columns()。
+        """
+        reader = self._imu_reader
+        reader.max_samples = max_samples
+        samples = reader.read()
+        self._seen["imu"] = reader.seq
+        return samples if len(samples) else None
+
+    def imu_stats(self):
+        """get_imu() 读者的统计: seq / dropped / gaps / missing / max_gap。"""
+        return self._imu_reader.stats()
+
+    # ==========================================================
+    # Bundle (一次 ctypes 调用取 frame + depth + IMU)
+    # ==========================================================
+
+    def _bundle_state(self, max_imu):
+        b = self._bundle
+        if b is None:
+            n = len(PRODUCTS)
+            b = self._bundle = {
+                "frame": np.empty((0, 0), np.uint8), "depth": np.empty((0, 0), np.uint16),
+                "imu": np.empty(0, IMU_DTYPE), "dims": (ctypes.c_int * 4)(),
+                "seqs": (ctypes.c_ulonglong * n)(), "timestamps": (ctypes.c_double * n)(),
+                "counts": (ctypes.c_int * n)(), "imu_after": -1.0,
+            }
+        if len(b["imu"]) < max_imu:
+            b["imu"] = np.empty(max_imu, IMU_DTYPE)
+        return b
+
+    def get_bundle(self, kinds=("frame", "depth", "imu"), max_imu=2000):
+        """一次调用取回 kinds (frame / depth / imu 的子集)，返回 Bundle。
+
+        frame 与 depth 在 C 侧同时持锁拷贝，不会夹在某个回调的中途；IMU 为
+        上一次 get_bundle() 取到的帧之后、当前帧之前 (含) 的样本，首次调用时
+        为相邻两帧之间的样本。缓冲尺寸由 C 侧随结果一并返回并缓存在本实例中，
+        只在分辨率变化时重新分配，省去每帧的 get_image_info / get_depth_size 查询。
+
+        注意: 与 get_frame() 相同，frame / depth 是本实例缓冲的视图 (C 侧直接写入，
+        不再额外复制)，下一次 get_bundle() 会覆盖它们；需要长期持有时请 copy()。
+        """
+        pending = 0
+        for kind in kinds:
+            if kind not in ("frame", "depth", "imu"):
+                raise ValueError(f"unknown bundle kind: {kind}")
+            pending |= 1 << PRODUCTS[kind]
+        if "imu" in kinds and max_imu < 1:
+            raise ValueError(f"max_imu must be >= 1, got {max_imu}")
+        b = self._bundle_state(max_imu)
+        seqs, timestamps, counts, dims = b["seqs"], b["timestamps"], b["counts"], b["dims"]
+        result = Bundle()
+
+        for _ in range(2):   # 缓冲不够 (首次 / 分辨率变了) 时按新尺寸重试一次
+            frame, depth, imu = b["frame"], b["depth"], b["imu"]
+            got = self._lib.imsee_get_bundle(
+                pending,
+                frame.ctypes.data_as(ctypes.POINTER(ctypes.c_ubyte)), frame.size,
+                depth.ctypes.data_as(ctypes.POINTER(ctypes.c_ushort)), depth.size,
+                imu.ctypes.data, max_imu,
+                b["imu_after"], seqs, timestamps, counts, dims)
+
+            shapes = {"frame": (dims[1], dims[0]), "depth": (dims[3], dims[2])}
+            retry = 0
+            for kind in ("frame", "depth"):
+                product = PRODUCTS[kind]
+                buf = b[kind]
+                if got & (1 << product):
+                    arr = buf.reshape(-1)[:counts[product]].reshape(shapes[kind])
+                    setattr(result, kind, _tag(arr, seqs[product], timestamps[product]))
+                    self._seen[kind] = max(self._seen[kind], seqs[product])
+                elif counts[product] == -1:
+                    retry |= 1 << product
+                if buf.shape != shapes[kind]:
+                    b[kind] = np.empty(shapes[kind], buf.dtype)
+
+            imu_product = PRODUCTS["imu"]
+            if pending & (1 << imu_product):
+                n = counts[imu_product]
+                # 超过 max_imu 时只推进到最后一个取到的样本，剩下的留给下一次
+                last = imu["timestamp"][n - 1] if n == max_imu else timestamps[imu_product]
+                b["imu_after"] = last
+                if got & (1 << imu_product):
+                    result.imu = imu[:n].copy()
+            pending = retry
+            if not pending:
+                break
+        return result
 
     # ==========================================================
     # Detector
@@ -377,25 +861,22 @@ class ImseeSdk:
     def enable_detector(self):
         return self._lib.imsee_enable_detector()
 
-    def get_detector_boxes(self, max_boxes=100):
-        """返回列表 [{x,y,w,h,class_id,class_name,score}, ...] 或 []"""
-        if self._det_box_buf is None:
-            self._det_box_buf = (ctypes.c_int * (max_boxes * 6))()
-        got = self._lib.imsee_get_detector_boxes(self._det_box_buf, max_boxes)
-        if got <= 0:
-            return []
-        result = []
-        for i in range(got):
-            off = i * 6
-            result.append({
-                "x": self._det_box_buf[off],
-                "y": self._det_box_buf[off + 1],
-                "w": self._det_box_buf[off + 2],
-                "h": self._det_box_buf[off + 3],
-                "class_id": self._det_box_buf[off + 4],
-                "class_name": CLASS_NAMES.get(self._det_box_buf[off + 4], "UNKNOWN"),
-                "score": self._det_box_buf[off + 5] / 1000.0,
-            })
+    def get_detector_boxes(self, max_boxes=256, as_dicts=False):
+        """返回检测框 DET_DTYPE 结构化数组 (x, y, w, h, score, class_id)，带 seq / timestamp；
+        没有新结果时为空数组且 seq == 0 (有新结果但零个框时 seq 非零)。
+
+        过滤 / 去重见 detector_utils；as_dicts=True 时返回旧的 BoxList
+        [{x, y, w, h, class_id, class_name, score}, ...]。
+        """
+        if self._det_box_buf is None or len(self._det_box_buf) < max_boxes:
+            self._det_box_buf = np.empty(max_boxes, DET_DTYPE)
+        got, seq, ts = self._fetch("detector", self._lib.imsee_get_detector_results_ex,
+                                   self._det_box_buf.ctypes.data, max_boxes)
+        boxes = _tag(self._det_box_buf[:max(got, 0)].copy(), seq, ts)
+        if not as_dicts:
+            return boxes
+        result = BoxList(to_dicts(boxes))
+        result.seq, result.timestamp = seq, ts
         return result
 
     def get_detector_image_info(self):
@@ -412,12 +893,13 @@ class ImseeSdk:
         if self._det_img_buf is None or self._det_img_size != needed:
             self._det_img_buf = (ctypes.c_ubyte * needed)()
             self._det_img_size = needed
-        got = self._lib.imsee_get_detector_image(self._det_img_buf, needed)
+        got, seq, ts = self._fetch("detector", self._lib.imsee_get_detector_image_ex,
+                                   self._det_img_buf, needed)
         if got <= 0:
             return None
-        if ch == 1:
-            return np.frombuffer(self._det_img_buf, dtype=np.uint8, count=got).reshape((h, w)).copy()
-        return np.frombuffer(self._det_img_buf, dtype=np.uint8, count=got).reshape((h, w, ch)).copy()
+        shape = (h, w) if ch == 1 else (h, w, ch)
+        arr = np.frombuffer(self._det_img_buf, dtype=np.uint8, count=got).reshape(shape).copy()
+        return _tag(arr, seq, ts)
 
     # ==========================================================
     # Calibration / Device info
@@ -0,0 +1,245 @@
+"""
+IMU 流式录制 — 样本边到边写进 .npy (IMU_DTYPE)，内存占用恒定；录完再向量化转 CSV。
+
+文件就是标准 .npy (np.load 可直接读)，头部固定 HEADER_SIZE 字节，记录数在每次 sync 时回写；
+之后是连续的 32 字节样本 (同 imu_stream.IMU_DTYPE)。进程中途崩溃时头部的记录数可能偏小，
+load_recording() 按文件长度恢复全部完整的样本。
+用法: python imu_recorder.py <录制.npy> [输出.csv]      # 转 CSV
+"""
+import os
+import sys
+import time
+from decimal import ROUND_HALF_EVEN, Decimal
+
+import numpy as np
+
+from imu_stream import IMU_DTYPE, as_columns
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+HEADER_SIZE = 256         # 魔数 + 头长度 + 字典，空格补齐 (64 字节对齐)
+CSV_HEADER = "timestamp,accel_x,accel_y,accel_z,gyro_x,gyro_y,gyro_z\n"
+CSV_DECIMALS = 6
+_PAD = 0                  # 定宽格式化时的占位字节，拼接后整体删掉
+
+
+def _npy_header(count):
+    text = repr({"descr": np.lib.format.dtype_to_descr(IMU_DTYPE),
+                 "fortran_order": False, "shape": (count,)})
+    body_len = HEADER_SIZE - len(NPY_MAGIC) - 2
+    text = text.ljust(body_len - 1) + "\n"
+    if len(text) != body_len:
+        raise ValueError(f"npy header does not fit in {HEADER_SIZE} bytes")
+    return NPY_MAGIC + body_len.to_bytes(2, "little") + text.encode("latin1")
+
+
+class ImuRecorder:
+    """把 IMU 样本流式写入 .npy。
+
+    write() 把样本拷进固定大小的块缓冲 (chunk_samples 个)，块满才写文件；每 sync_interval 秒
+    写出缓冲、回写头部记录数并 fsync (0 = 只在 close 时)。内存只有一个块，与录制时长无关。
+    """
+
+    def __init__(self, path, chunk_samples=8192, sync_interval=1.0):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.count = 0               # 已接收的样本数 (含缓冲中未写出的)
+        self.syncs = 0
+        self._chunk = np.empty(chunk_samples, IMU_DTYPE)
+        self._fill = 0
+        self._file = open(path, "wb")
+        self._file.write(_npy_header(0))
+        self._file.flush()           # 刚开始录制时文件就是合法的空 .npy
+        self._last_sync = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    @property
+    def bytes_written(self):
+        return HEADER_SIZE + self.count * IMU_DTYPE.itemsize
+
+    def write(self, samples):
+        """追加一批样本 (IMU_DTYPE 结构化数组，从旧到新)。"""
+        samples = np.ascontiguousarray(samples, IMU_DTYPE)
+        n = len(samples)
+        size = len(self._chunk)
+        pos = 0
+        while pos < n:
+            if self._fill == 0 and n - pos >= size:   # 整块直接写，不经过缓冲
+                take = (n - pos) // size * size
+                self._file.write(samples[pos:pos + take].data)
+            else:
+                take = min(size - self._fill, n - pos)
+                self._chunk[self._fill:self._fill + take] = samples[pos:pos + take]
+                self._fill += take
+                if self._fill == size:
+                    self._write_chunk()
+            pos += take
+        self.count += n
+        if self.sync_interval and time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync()
+
+    def _write_chunk(self):
+        if self._fill:
+            self._file.write(self._chunk[:self._fill].data)
+            self._fill = 0
+
+    def sync(self):
+        """写出缓冲、回写头部记录数并 fsync: 此后崩溃也不会丢失已写入的样本。"""
+        self._write_chunk()
+        f = self._file
+        f.seek(0)
+        f.write(_npy_header(self.count))
+        f.seek(0, os.SEEK_END)
+        f.flush()
+        os.fsync(f.fileno())
+        self.syncs += 1
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is None:
+            return
+        self.sync()
+        self._file.close()
+        self._file = None
+
+
+def _data_range(path):
+    """(样本区起始偏移, 样本数)；头部记录数偏小 (崩溃) 时按文件长度计。"""
+    with open(path, "rb") as f:
+        if np.lib.format.read_magic(f) == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if dtype != IMU_DTYPE:
+        raise ValueError(f"{path}: not an IMU recording (dtype {dtype})")
+    return offset, max(shape[0], (os.path.getsize(path) - offset) // IMU_DTYPE.itemsize)
+
+
+def load_recording(path, mmap=True):
+    """读取 ImuRecorder 的文件 (IMU_DTYPE 数组)，崩溃后头部未更新的样本也会恢复。
+
+    mmap=True 时返回只读内存映射，不把整个文件读进内存。
+    """
+    offset, count = _data_range(path)
+    if mmap:
+        if count == 0:
+            return np.zeros(0, IMU_DTYPE)
+        return np.memmap(path, IMU_DTYPE, mode="r", offset=offset, shape=(count,))
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return np.fromfile(f, IMU_DTYPE, count)
+
+
+def iter_recording(path, chunk_samples=1 << 16):
+    """按块读取录制文件 (每块一个 IMU_DTYPE 数组)，内存只占一块。"""
+    offset, count = _data_range(path)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while count > 0:
+            chunk = np.fromfile(f, IMU_DTYPE, min(chunk_samples, count))
+            if not len(chunk):
+                return
+            count -= len(chunk)
+            yield chunk
+
+
+def _fixed_columns(values, decimals):
+    """一列数 -> (N, 宽) 的 ASCII 字节矩阵 ("%.{decimals}f"，整数列按 "%d")，多余的位置填 _PAD。"""
+    scale = 10 ** decimals
+    is_int = values.dtype.kind in "iu"
+    if is_int:      # 纳秒时间戳等整数列: 不经过 float64，超过 2**53 也精确
+        whole = np.abs(values.astype(np.int64)).astype(np.uint64)
+        frac = np.zeros(len(values), np.uint64)
+    else:
+        mag = np.abs(values)
+        whole = np.floor(mag)
+        scaled = (mag - whole) * scale    # 先拆整数部分，大时间戳乘 scale 也不丢精度
+        frac = np.rint(scaled)
+        whole, frac = whole.astype(np.uint64), frac.astype(np.uint64)
+        carry = frac >= scale
+        whole[carry] += np.uint64(1)
+        frac[carry] -= np.uint64(scale)
+        # 离舍入边界太近的值按十进制精确舍入，与 Python 格式化逐字一致 (极少)
+        for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+            exact = Decimal(float(mag[i])).scaleb(decimals).to_integral_value(ROUND_HALF_EVEN)
+            whole[i], frac[i] = divmod(int(exact), scale)
+    n_int = len(str(int(whole.max()))) if len(whole) else 1
+    n_frac = 0 if is_int or not decimals else 1 + decimals
+    out = np.full((len(values), 1 + n_int + n_frac), _PAD, np.uint8)
+    out[:, 0] = np.where(np.signbit(values), ord("-"), _PAD)   # 同 Python: -0.0000001 -> "-0.000000"
+    for k in range(n_int):
+        digit = (whole // np.uint64(10 ** (n_int - 1 - k))) % np.uint64(10)
+        leading = whole < np.uint64(10 ** (n_int - 1 - k))   # 前导零不输出 (个位除外)
+        if k < n_int - 1:
+            out[:, 1 + k] = np.where(leading, _PAD, digit + ord("0"))
+        else:
+            out[:, 1 + k] = digit + ord("0")
+    if n_frac:
+        out[:, 1 + n_int] = ord(".")
+        for k in range(decimals):
+            digit = (frac // np.uint64(10 ** (decimals - 1 - k))) % np.uint64(10)
+            out[:, 2 + n_int + k] = digit + ord("0")
+    return out
+
+
+def format_csv(columns, decimals=CSV_DECIMALS, sep=","):
+    """若干等长的列 -> CSV 行 (bytes，无表头)。浮点列 "%.{decimals}f"，整数列 "%d"；
+    decimals 可以是每列一个的序列。
+
+    逐位拼成字节矩阵再去掉占位字节，全程向量化；含 NaN / inf 时退回逐行格式化。
+    """
+    columns = [np.asarray(c) for c in columns]
+    if not columns or not len(columns[0]):
+        return b""
+    if isinstance(decimals, int):
+        decimals = [decimals] * len(columns)
+    if not all(np.isfinite(c).all() for c in columns if c.dtype.kind == "f"):
+        fmts = [f"%.{d}f" if c.dtype.kind == "f" else "%d" for c, d in zip(columns, decimals)]
+        rows = zip(*(c.tolist() for c in columns))
+        return "".join(sep.join(f % v for f, v in zip(fmts, row)) + "\n"
+                       for row in rows).encode("ascii")
+    n = len(columns[0])
+    parts = []
+    for j, (column, d) in enumerate(zip(columns, decimals)):
+        parts.append(_fixed_columns(column, d))
+        parts.append(np.full((n, 1), ord("\n" if j == len(columns) - 1 else sep), np.uint8))
+    table = np.concatenate(parts, axis=1).reshape(-1)
+    return table[table != _PAD].tobytes()
+
+
+def format_csv_rows(samples, decimals=CSV_DECIMALS):
+    """样本 -> CSV 行 (bytes，无表头)，与逐行 f"{v:.6f}" 的输出一致。"""
+    return format_csv(as_columns(samples).T, decimals)
+
+
+def to_csv(npy_path, csv_path, chunk_samples=1 << 16):
+    """把录制文件转成 CSV (同旧 record_imu.py 的列)，按块处理，内存与文件大小无关。返回样本数。"""
+    n = 0
+    with open(csv_path, "wb") as f:
+        f.write(CSV_HEADER.encode("ascii"))
+        for chunk in iter_recording(npy_path, chunk_samples):
+            f.write(format_csv_rows(chunk))
+            n += len(chunk)
+    return n
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 1
+    src = sys.argv[1]
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".csv"
+    t0 = time.perf_counter()
+    n = to_csv(src, dst)
+    print(f"{n} 个采样 -> {dst} ({time.perf_counter() - t0:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+IMU 流式读取 — 结构化样本类型、多读者游标 (ImuReader) 与时间戳断档检测。
+
+C wrapper 的 IMU 环按序号保存样本，读取不会清空环；每个 ImuReader 自带游标，
+记录器 / webapp / 姿态滤波器可以各自无损地读取同一路 IMU。
+"""
+import numpy as np
+
+# 与 imsee_wrapper.cpp 的 struct ImuSample 内存布局一致 (32 字节)，C 侧直接写入
+IMU_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("accel", "<f4", (3,)),   # m/s²
+    ("gyro", "<f4", (3,)),    # rad/s
+])
+
+# 默认 IMU 频率 (imsee_init 中 imuFrequency = 1000)
+IMU_PERIOD = 0.001
+
+
+def as_columns(samples):
+    """结构化样本 -> (N, 7) float64 [timestamp, ax, ay, az, gx, gy, gz] (旧格式 / CSV 用)。"""
+    out = np.empty((len(samples), 7), np.float64)
+    out[:, 0] = samples["timestamp"]
+    out[:, 1:4] = samples["accel"]
+    out[:, 4:7] = samples["gyro"]
+    return out
+
+
+def from_columns(rows):
+    """(N, 7) [timestamp, ax, ay, az, gx, gy, gz] -> 结构化样本。"""
+    rows = np.asarray(rows, np.float64).reshape(-1, 7)
+    out = np.empty(len(rows), IMU_DTYPE)
+    out["timestamp"] = rows[:, 0]
+    out["accel"] = rows[:, 1:4]
+    out["gyro"] = rows[:, 4:7]
+    return out
+
+
+class ImuGapDetector:
+    """按时间戳检测断档: 相邻样本间隔超过 period * factor 记为一次断档。
+
+    跨多次 update() 连续检测 (记住上一批的最后一个时间戳)。
+    gaps: 断档次数；missing: 按 period 估算的缺失样本数；max_gap: 最大间隔 (秒)。
+    """
+
+    def __init__(self, period=IMU_PERIOD, factor=2.5):
+        self.period = period
+        self.threshold = period * factor
+        self.last = None
+        self.gaps = 0
+        self.missing = 0
+        self.max_gap = 0.0
+
+    def update(self, timestamps):
+        """检测一批时间戳 (从旧到新)，返回本批发现的断档数。"""
+        ts = np.asarray(timestamps, np.float64)
+        if len(ts) == 0:
+            return 0
+        if self.last is not None:
+            ts = np.concatenate(([self.last], ts))
+        self.last = float(ts[-1])
+        dt = np.diff(ts)
+        big = dt[dt > self.threshold]
+        if len(big):
+            self.gaps += len(big)
+            self.missing += int(np.sum(np.round(big / self.period) - 1))
+            self.max_gap = max(self.max_gap, float(big.max()))
+        return len(big)
+
+
+class ImuReader:
+    """IMU 游标读者 (见 ImseeSdk.imu_reader)。
+
+    read() 返回游标之后的全部新样本 (IMU_DTYPE 结构化数组，可能为空)。
+    dropped: 读者落后超过 C 侧环大小而被覆盖的样本数 (累计)；
+    gap: 时间戳断档检测 (传感器 / USB 层面的丢样，与 dropped 互补)。
+    """
+
+    def __init__(self, sdk, seq=0, max_samples=2000, period=IMU_PERIOD):
+        self._sdk = sdk
+        self.seq = seq              # 已读到的最后一个样本序号
+        self.max_samples = max_samples
+        self.dropped = 0
+        self.gap = ImuGapDetector(period)
+
+    def read(self):
+        samples, self.seq, dropped = self._sdk.read_imu(self.seq, self.max_samples)
+        self.dropped += dropped
+        self.gap.update(samples["timestamp"])
+        return samples
+
+    def stats(self):
+        return {"seq": self.seq, "dropped": self.dropped, "gaps": self.gap.gaps,
+                "missing": self.gap.missing, "max_gap": self.gap.max_gap}
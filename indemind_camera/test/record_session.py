@@ -0,0 +1,93 @@
+"""
+录制会话 — 把相机 (或 config.BACKEND 指定的数据源) 的多路数据录成会话目录，可用回放后端回放:
+    IMSEE_BACKEND=replay IMSEE_REPLAY=<输出目录> python get_depth.py
+用法: python record_session.py [秒数] [输出目录] [--kinds frame,depth,imu] [--codec auto|raw|rvl|zlib]
+默认: 10 秒, session_<时间>/, frame + depth + imu, auto (深度类 zlib，图像原始字节)
+rvl 只用于 depth (depth_codec 无损深度编码)，其余数据按 auto。
+"""
+import argparse
+import os
+import sys
+import time
+
+from config import RESOLUTION, FPS
+from sdk_backend import open_sdk
+from session import CODEC_KINDS, CODECS
+from session_recorder import DEFAULT_CODECS, RECORD_KINDS, SessionRecorder
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_ENABLE = {"depth": "enable_depth", "disparity": "enable_disparity",
+           "rectified": "enable_rectify", "points": "enable_points",
+           "detector": "enable_detector", "imu": "enable_imu"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indemind 会话录制")
+    parser.add_argument("seconds", nargs="?", type=float, default=10.0, help="录制秒数")
+    parser.add_argument("output", nargs="?",
+                        default=os.path.join(_SCRIPT_DIR, time.strftime("session_%Y%m%d_%H%M%S")),
+                        help="输出目录")
+    parser.add_argument("--kinds", default="frame,depth,imu",
+                        help=f"录制的数据，逗号分隔 ({','.join(RECORD_KINDS)},imu)")
+    parser.add_argument("--codec", default="auto", choices=["auto"] + sorted(CODECS),
+                        help="图像 / 深度类数据的编码 (auto = session_recorder.DEFAULT_CODECS)")
+    parser.add_argument("--workers", type=int, default=4, help="编码线程数")
+    args = parser.parse_args()
+    kinds = [k for k in args.kinds.split(",") if k]
+
+    print("=" * 50)
+    print(f"Indemind 会话录制 ({args.seconds}s): {', '.join(kinds)}")
+    print(f"输出: {args.output}")
+    print("=" * 50)
+
+    sdk = open_sdk()
+    ret = sdk.init(RESOLUTION, FPS)
+    if ret != 0:
+        print(f"初始化失败: {ret}")
+        return 1
+    print(f"相机: {sdk.get_module_info()}")
+    for kind in kinds:
+        if kind in _ENABLE:
+            r = getattr(sdk, _ENABLE[kind])()
+            print(f"  {kind}: {'OK' if r == 0 else f'失败({r})'}")
+
+    codecs = None
+    if args.codec != "auto":
+        supported = CODEC_KINDS.get(args.codec, kinds)
+        codecs = dict(DEFAULT_CODECS, **{k: args.codec for k in kinds if k in supported})
+    recorder = SessionRecorder(sdk, args.output, kinds, codecs=codecs, workers=args.workers,
+                               resolution=RESOLUTION, fps=FPS)
+    print(f"\n开始录制 {args.seconds} 秒...")
+    recorder.start()
+    try:
+        start = time.time()
+        while time.time() - start < args.seconds:
+            time.sleep(0.5)
+            st = recorder.stats()
+            counts = "  ".join(f"{k} {v['recorded']}" for k, v in st["streams"].items())
+            sys.stdout.write(f"\r  {time.time() - start:5.1f}s  {counts}  imu {st['imu_samples']}"
+                             f"  积压 {st['backlog']}  {st['bytes'] / 1e6:.0f} MB")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # stop() 会重新抛出写盘线程的异常；SDK 无论如何都要释放
+        try:
+            stats = recorder.stop()
+        finally:
+            sdk.release()
+
+    print(f"\n\n录制完成: {stats['seconds']:.1f}s, {stats['bytes'] / 1e6:.1f} MB")
+    for kind, st in stats["streams"].items():
+        print(f"  {kind:10s} {st['recorded']:6d} 帧 ({st['fps']:.1f} fps)  "
+              f"积压丢弃 {st['dropped']}  SDK 侧漏取 {st['missed']}")
+    if "imu" in kinds:
+        print(f"  {'imu':10s} {stats['imu_samples']:6d} 样本  "
+              f"积压丢弃 {stats['imu_backlog_dropped']}  环溢出丢失 {stats['imu_dropped']}")
+    print(f"已保存: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
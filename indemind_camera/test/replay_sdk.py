@@ -0,0 +1,213 @@
+"""
+回放后端 — 把录制的会话 (session.py 格式) 当作相机回放，接口与 ImseeSdk 完全相同。
+
+ReplaySdk 就是 ImseeSdk，只是底层的 libimsee_wrapper.so 换成 ReplayLib: 一个纯 Python 的
+wrapper 实现 (FakeImseeLib)，由后台回放线程按会话里的时间戳 push 数据。
+因此 get_* / wait_* / lease / cursor / get_bundle 的语义 (同一帧只返回一次、
+序号、传感器时间戳) 与接真实相机时一致，webapp 和 test/ 脚本不用改代码。
+
+speed: 1.0 = 实时；2.0 = 两倍速 (任意倍率)；0 = 尽快 (上一帧被取走就推下一帧)。
+loop: 播完后从头循环 (时间戳继续递增)；否则停在最后一帧，finished 被置位。
+"""
+import json
+import threading
+import time
+
+import numpy as np
+
+from fake_sdk import FakeImseeLib
+from imsee_sdk import ImseeSdk
+from imu_stream import IMU_PERIOD
+from session import Session
+
+
+class ReplayLib(FakeImseeLib):
+    """按会话时间戳 push 数据的 wrapper 库。imsee_init* 开始回放，imsee_release 停止。
+
+    尽快模式 (speed=0) 下，推下一帧前等调用方取走上一帧: 只看调用方取过的数据种类
+    (比如只读 depth 时不等 frame)；调用方 1 秒内没有取任何数据也继续推。
+    """
+
+    track_push_times = False
+    IDLE_TIMEOUT = 1.0
+
+    def __init__(self, session, speed=1.0, loop=True):
+        super().__init__()
+        self.session = session
+        self.speed = speed
+        self.loop = loop
+        self.finished = threading.Event()
+        self._stop = threading.Event()
+        self._player = None
+        self._imu_read = 0   # 调用方通过 imsee_read_imu 读到的最大样本序号 (尽快模式的回压)
+
+    # ----- 回放线程 -----
+
+    def _ticks(self):
+        """回放节拍: 所有非 IMU 数据的时间戳 (去重排序)；只有 IMU 时每帧周期一拍。"""
+        s = self.session
+        stamps = [s.timestamps(kind) for kind in s.index]
+        if any(len(t) for t in stamps):
+            return np.unique(np.concatenate(stamps))
+        imu_ts = s.imu["timestamp"]
+        if not len(imu_ts):
+            return np.zeros(0)
+        step = max(1, int(round(1.0 / (s.fps * IMU_PERIOD))))
+        return np.unique(np.append(imu_ts[::step], imu_ts[-1]))
+
+    def _consumed(self, pushed):
+        """尽快模式: 上一拍推出的数据中，调用方取过的种类是否都已被取走。"""
+        active = [k for k in pushed if k != "imu" and self.taken[k] > 0]
+        imu_active = "imu" in pushed and self._imu_read > 0
+        if not active and not imu_active:
+            return False
+        if imu_active and self._imu_read < self._seq[6]:
+            return False
+        return not any(k in self._ready for k in active)
+
+    def _wait_turn(self, due, pushed):
+        if self.speed > 0:
+            delay = due - time.monotonic()
+            return delay <= 0 or not self._stop.wait(delay)
+        if pushed:
+            with self._lock:
+                self._lock.wait_for(lambda: self._stop.is_set() or self._consumed(pushed),
+                                    timeout=self.IDLE_TIMEOUT)
+        return not self._stop.is_set()
+
+    def _play(self):
+        s = self.session
+        kinds = list(s.index)
+        ticks = self._ticks()
+        imu = s.imu
+        imu_ts = imu["timestamp"]
+        if not len(ticks):
+            return
+        t_first = float(ticks[0])
+        span = float(ticks[-1]) - t_first + 1.0 / s.fps   # 循环时每圈的时间偏移
+        stamps = {kind: s.timestamps(kind) for kind in kinds}
+        start = time.monotonic()
+        offset = 0.0
+        pushed = []
+        while True:
+            ptr = dict.fromkeys(kinds, 0)
+            imu_ptr = 0
+            for tick in ticks:
+                due = start + (tick + offset - t_first) / self.speed if self.speed > 0 else 0
+                if not self._wait_turn(due, pushed):
+                    return
+                items = []      # 先读出 (解码) 这一拍的全部数据，再一次性发布
+                for kind in kinds:
+                    ts = stamps[kind]
+                    while ptr[kind] < len(ts) and ts[ptr[kind]] <= tick:
+                        items.append((kind, s.read(kind, ptr[kind]), float(ts[ptr[kind]]) + offset))
+                        ptr[kind] += 1
+                end = int(np.searchsorted(imu_ts, tick, side="right"))
+                if end > imu_ptr:
+                    chunk = imu[imu_ptr:end].copy()
+                    chunk["timestamp"] += offset
+                    items.append(("imu", chunk, None))
+                    imu_ptr = end
+                # 同一拍的数据在一次持锁内 push (_lock 可重入)，get_bundle 不会只拿到半拍
+                with self._lock:
+                    for kind, data, timestamp in items:
+                        self.push(kind, data, timestamp)
+                pushed = [kind for kind, _, _ in items]
+            if imu_ptr < len(imu):
+                chunk = imu[imu_ptr:].copy()
+                chunk["timestamp"] += offset
+                self.push("imu", chunk)
+            if not self.loop:
+                return
+            offset += span
+
+    def _run_player(self):
+        try:
+            self._play()
+        finally:   # 会话文件损坏等异常也算回放结束 (异常由线程的 excepthook 打印)
+            if not self._stop.is_set():
+                self.finished.set()
+
+    # ----- wrapper 接口 -----
+
+    def imsee_init_ex(self, resolution, fps, history_depth):
+        ret = super().imsee_init_ex(resolution, fps, history_depth)
+        if ret == 0 and self._player is None:
+            self._stop.clear()
+            self.finished.clear()
+            self._player = threading.Thread(target=self._run_player, name="imsee-replay",
+                                            daemon=True)
+            self._player.start()
+        return ret
+
+    def imsee_release(self):
+        self._stop.set()
+        with self._lock:
+            self._lock.notify_all()
+        if self._player is not None:
+            self._player.join()
+            self._player = None
+        super().imsee_release()
+        self.session.close()
+
+    def imsee_read_imu(self, cursor, buffer, max_samples, dropped):
+        got = super().imsee_read_imu(cursor, buffer, max_samples, dropped)
+        with self._lock:
+            if cursor._obj.value > self._imu_read:
+                self._imu_read = cursor._obj.value
+                self._lock.notify_all()
+        return got
+
+    def _enable(self, stream):
+        return 0 if stream in self.session.streams else -1
+
+    def imsee_enable_depth(self, mode):
+        return self._enable("depth")
+
+    def imsee_enable_disparity(self, mode):
+        return self._enable("disparity")
+
+    def imsee_enable_rectify(self):
+        return self._enable("rectified")
+
+    def imsee_enable_points(self):
+        return self._enable("points")
+
+    def imsee_enable_imu(self):
+        return self._enable("imu")
+
+    def imsee_enable_detector(self):
+        return self._enable("detector")
+
+    def _meta_json(self, key):
+        value = self.session.meta.get(key, {})
+        return (value if isinstance(value, str) else json.dumps(value)).encode("utf-8")
+
+    def imsee_get_calibration(self):
+        return self._meta_json("calibration")
+
+    def imsee_get_device_info_detailed(self):
+        return self._meta_json("device_info")
+
+    def imsee_get_module_info(self):
+        info = self.session.meta.get("module_info", "unknown")
+        return f"{info} (replay: {self.session.path})".encode("utf-8")
+
+
+class ReplaySdk(ImseeSdk):
+    """回放录制会话的 ImseeSdk。init() 开始回放 (resolution / fps 参数以会话为准)。
+
+    path: 会话目录；speed / loop 见模块说明。
+    """
+
+    def __init__(self, path, speed=1.0, loop=True, pool_size=4):
+        self.session = Session(path)
+        super().__init__(lib=ReplayLib(self.session, speed, loop), pool_size=pool_size)
+
+    @property
+    def finished(self):
+        """非循环回放已经推完全部数据。"""
+        return self._lib.finished.is_set()
+
+    def wait_finished(self, timeout=None):
+        return self._lib.finished.wait(timeout)
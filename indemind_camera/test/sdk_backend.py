@@ -0,0 +1,58 @@
+"""
+按 config.BACKEND 创建数据源 — webapp 和 test/ 脚本都通过 open_sdk() 拿 SDK 对象。
+
+    IMSEE_BACKEND=replay IMSEE_REPLAY=/data/session1 python get_depth.py   # 回放录制
+    IMSEE_BACKEND=replay IMSEE_REPLAY_SPEED=0 python get_depth.py          # 合成会话，尽快
+    IMSEE_BACKEND=synthetic IMSEE_SYNTH_RESOLUTION=2 IMSEE_SYNTH_FPS=50 ./run_webapp.sh
+"""
+import os
+import tempfile
+
+from config import (BACKEND, REPLAY_SESSION, REPLAY_SPEED, SHM_NAME, SYNTH_FPS,
+                    SYNTH_IMU_RATE, SYNTH_RESOLUTION)
+
+BACKENDS = ("sdk", "replay", "shm", "synthetic")
+
+# 没有指定会话时，回放后端在这里生成 (并复用) 一段合成会话
+SYNTHETIC_SESSION = os.path.join(tempfile.gettempdir(), "imsee_synthetic_session")
+
+
+def default_session():
+    """REPLAY_SESSION，或合成会话 (不存在时生成)。"""
+    if REPLAY_SESSION:
+        return REPLAY_SESSION
+    from session import META_FILE, generate_synthetic
+    if not os.path.exists(os.path.join(SYNTHETIC_SESSION, META_FILE)):
+        generate_synthetic(SYNTHETIC_SESSION)
+    return SYNTHETIC_SESSION
+
+
+def open_sdk(backend=None, **options):
+    """创建 ImseeSdk 兼容对象 (还没有 init)。
+
+    backend 缺省为 config.BACKEND；options 传给对应的构造函数:
+    replay -> ReplaySdk(path=..., speed=..., loop=...)，shm -> ShmSdk(name=...)，
+    synthetic -> SyntheticSdk(resolution=..., fps=..., imu_rate=...)。
+    """
+    backend = backend or BACKEND
+    if backend == "sdk":
+        from imsee_sdk import ImseeSdk, _ensure_lib_env, _preload_deps
+        _ensure_lib_env()
+        _preload_deps()
+        return ImseeSdk(**options)
+    if backend == "replay":
+        from replay_sdk import ReplaySdk
+        options.setdefault("speed", REPLAY_SPEED)
+        path = options.pop("path", None) or default_session()
+        return ReplaySdk(path, **options)
+    if backend == "shm":
+        from shm_ring import ShmSdk
+        options.setdefault("name", SHM_NAME)
+        return ShmSdk(**options)
+    if backend == "synthetic":
+        from synthetic_sdk import SyntheticSdk
+        options.setdefault("resolution", SYNTH_RESOLUTION or None)
+        options.setdefault("fps", SYNTH_FPS or None)
+        options.setdefault("imu_rate", SYNTH_IMU_RATE)
+        return SyntheticSdk(**options)
+    raise ValueError(f"unknown backend: {backend!r} (expected one of {BACKENDS})")
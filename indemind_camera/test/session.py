@@ -0,0 +1,442 @@
+"""
+录制会话的磁盘格式 — 回放后端 (replay_sdk.ReplaySdk) 读取，SessionWriter 写入。
+
+一个会话是一个目录:
+    session.json        元数据: 分辨率 / 帧率 / 模组信息 / 标定参数 / 各数据流的 dtype、编码与帧数
+    <kind>.bin          该数据流所有数据 (按 codec 编码后) 的字节，按时间顺序只追加
+    <kind>.idx.npy      索引 (INDEX_DTYPE): 每个数据的序号、时间戳、在 .bin 中的偏移 / 长度、形状
+    imu.npy             IMU 样本 (imu_stream.IMU_DTYPE)，按时间戳排序，边录边写 (imu_recorder)
+
+kind 同 ImseeSdk: frame / depth / disparity / rectified / points / detector (DET_DTYPE 检测框)。
+codec: raw = 原始字节；zlib = zlib 压缩 (level 1)；rvl = depth_codec 无损深度编码 (只用于 depth)。
+旧会话没有 codec 字段，按 raw 读。
+录制中途 flush() 会写出当前的索引和 session.json，进程崩溃时最多丢失最后一次 flush 之后的数据。
+Session 以内存映射只读打开会话: 按时间戳 / SDK 序号二分定位，raw 流零拷贝读取，
+aligned() 按时间对齐遍历 frame / depth / IMU。
+generate_synthetic() 生成一段合成会话，没有录制数据时也能跑回放。
+用法: python session.py <输出目录> [秒数] [帧率]
+"""
+import json
+import mmap
+import os
+import sys
+import zlib
+
+import numpy as np
+
+import depth_codec
+from detector_utils import DET_DTYPE
+from imu_recorder import ImuRecorder, load_recording
+from imu_stream import IMU_DTYPE, IMU_PERIOD
+
+SESSION_VERSION = 1
+META_FILE = "session.json"
+IMU_FILE = "imu.npy"
+
+INDEX_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("timestamp", "<f8"),
+    ("offset", "<u8"),
+    ("nbytes", "<u8"),
+    ("ndim", "<u4"),
+    ("shape", "<i4", (3,)),
+])
+
+# 各数据流的元素类型 (imu 单独存为 imu.npy)
+STREAM_DTYPES = {
+    "frame": np.dtype(np.uint8),
+    "depth": np.dtype(np.uint16),
+    "disparity": np.dtype(np.float32),
+    "rectified": np.dtype(np.uint8),
+    "points": np.dtype(np.float32),
+    "detector": DET_DTYPE,
+}
+
+# codec 名 -> (encode(连续 ndarray) -> bytes, decode(bytes, dtype, shape) -> ndarray)
+CODECS = {
+    "raw": (lambda data: data.tobytes(),
+            lambda raw, dtype, shape: np.frombuffer(raw, dtype).reshape(shape)),
+    "zlib": (lambda data: zlib.compress(data, 1),
+             lambda raw, dtype, shape: np.frombuffer(zlib.decompress(raw), dtype).reshape(shape)),
+    "rvl": (depth_codec.encode, lambda raw, dtype, shape: depth_codec.decode(raw)),
+}
+# 只适用于部分数据流的 codec
+CODEC_KINDS = {"rvl": ("depth",)}
+
+
+def encode(kind, arr, codec="raw"):
+    """把一个数据编码为 (字节, 形状)。纯函数，可以在线程池中并行调用 (zlib 释放 GIL)。"""
+    if kind not in STREAM_DTYPES:
+        raise ValueError(f"unknown session stream: {kind}")
+    data = np.ascontiguousarray(arr, STREAM_DTYPES[kind])
+    if data.ndim > 3:
+        raise ValueError(f"{kind}: at most 3 dims, got {data.shape}")
+    return CODECS[codec][0](data), data.shape
+
+
+class SessionWriter:
+    """按时间顺序追加数据，flush() / close() 时写出索引和 session.json。
+
+    codecs: {kind: codec 名}，缺省 raw。meta: 写入 session.json 的附加字段
+    (module_info / calibration / device_info 等)。非线程安全: 由一个线程调用 write*。
+    """
+
+    def __init__(self, path, resolution=1, fps=25, codecs=None, **meta):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.codecs = dict(codecs or {})
+        for kind, codec in self.codecs.items():
+            if codec not in CODECS:
+                raise ValueError(f"unknown codec: {codec}")
+            if kind not in CODEC_KINDS.get(codec, (kind,)):
+                raise ValueError(f"codec {codec} does not support {kind}")
+        self.meta = {"version": SESSION_VERSION, "resolution": resolution, "fps": fps}
+        self.meta.update(meta)
+        self._files = {}     # kind -> 打开的 .bin
+        self._index = {}     # kind -> INDEX_DTYPE 数组 (容量倍增)
+        self._counts = {}
+        self._offsets = {}
+        self._imu = None     # ImuRecorder
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    @property
+    def bytes_written(self):
+        return sum(self._offsets.values()) + (self._imu.bytes_written if self._imu else 0)
+
+    def codec(self, kind):
+        return self.codecs.get(kind, "raw")
+
+    def write(self, kind, arr, timestamp, seq=None):
+        """追加一个数据 (seq 缺省为该流的第几个，从 1 开始)。"""
+        payload, shape = encode(kind, arr, self.codec(kind))
+        self.write_encoded(kind, payload, shape, timestamp, seq)
+
+    def write_encoded(self, kind, payload, shape, timestamp, seq=None):
+        """追加 encode(kind, arr, self.codec(kind)) 的结果。"""
+        f = self._files.get(kind)
+        if f is None:
+            f = self._files[kind] = open(os.path.join(self.path, f"{kind}.bin"), "wb")
+            self._index[kind] = np.zeros(64, INDEX_DTYPE)
+            self._counts[kind] = 0
+            self._offsets[kind] = 0
+        n = self._counts[kind]
+        index = self._index[kind]
+        if n == len(index):
+            index = self._index[kind] = np.concatenate([index, np.zeros_like(index)])
+        index[n] = (n + 1 if seq is None else seq, timestamp, self._offsets[kind], len(payload),
+                    len(shape), tuple(shape) + (0,) * (3 - len(shape)))
+        f.write(payload)
+        self._offsets[kind] += len(payload)
+        self._counts[kind] = n + 1
+
+    def write_imu(self, samples):
+        """追加 IMU 样本 (IMU_DTYPE 结构化数组)。"""
+        if not len(samples):
+            return
+        if self._imu is None:
+            self._imu = ImuRecorder(os.path.join(self.path, IMU_FILE), sync_interval=0)
+        self._imu.write(samples)
+
+    def flush(self):
+        """写出 .bin 缓冲、当前的索引和 session.json (录制中定期调用)。"""
+        streams = {}
+        for kind, f in self._files.items():
+            f.flush()
+            np.save(os.path.join(self.path, f"{kind}.idx.npy"),
+                    self._index[kind][:self._counts[kind]])
+            streams[kind] = {"dtype": np.lib.format.dtype_to_descr(STREAM_DTYPES[kind]),
+                             "codec": self.codec(kind), "count": self._counts[kind]}
+        if self._imu is not None:
+            self._imu.sync()
+            streams["imu"] = {"count": self._imu.count}
+        self.meta["streams"] = streams
+        tmp = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        if self._imu is not None:
+            self._imu.close()
+
+
+class AlignedSample:
+    """Session.aligned() 的一项: 以主数据流的一帧为基准对齐的各路数据。
+
+    timestamp: 主数据流该帧的时间戳；index: {kind: 该流中的序号 (没有对齐到时为 -1)}
+    data: {kind: ndarray 或 None (超出 max_skew)}
+    imu: 上一帧 (不含) 到本帧 (含) 之间的 IMU 样本，会话 imu.npy 的零拷贝视图
+    """
+
+    __slots__ = ("timestamp", "index", "data", "imu")
+
+    def __init__(self, timestamp, index, data, imu):
+        self.timestamp = timestamp
+        self.index = index
+        self.data = data
+        self.imu = imu
+
+    def __getitem__(self, kind):
+        return self.imu if kind == "imu" else self.data[kind]
+
+
+class Session:
+    """只读打开一个会话目录。read(kind, i) 返回该流第 i 个数据 (从 0 开始)。
+
+    打开时只读 session.json 和各索引的文件头: 索引、imu.npy 和 <kind>.bin 都是内存映射，
+    按需从页缓存读入，多 GB 的会话也在毫秒级打开，内存占用与会话大小无关。
+    raw 流的 read() 直接返回映射区上的只读视图 (零拷贝)，压缩流在 read() 时才解码。
+    按时间戳定位 (seek / nearest / imu_between) 是对时间戳列的二分查找，O(log n)。
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != SESSION_VERSION:
+            raise ValueError(f"{path}: unsupported session version {self.meta.get('version')}")
+        self.path = path
+        self.streams = self.meta.get("streams", {})
+        self.index = {kind: np.load(os.path.join(path, f"{kind}.idx.npy"), mmap_mode="r")
+                      for kind in self.streams if kind != "imu"}
+        self.imu = (np.asarray(load_recording(os.path.join(path, IMU_FILE)))
+                    if "imu" in self.streams else np.zeros(0, IMU_DTYPE))
+        self._decoders = {kind: CODECS[info.get("codec", "raw")][1]
+                          for kind, info in self.streams.items() if kind != "imu"}
+        self._maps = {}         # kind -> <kind>.bin 的 uint8 内存映射 (首次 read 时建立)
+        self._columns = {}      # (kind, 列名) -> 连续数组 (首次定位时从索引取出)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    @property
+    def kinds(self):
+        return tuple(self.streams)
+
+    @property
+    def fps(self):
+        return self.meta.get("fps", 25)
+
+    def count(self, kind):
+        return len(self.imu) if kind == "imu" else len(self.index[kind])
+
+    def _column(self, kind, name):
+        column = self._columns.get((kind, name))
+        if column is None:
+            # 结构化数组的列是跨步视图，searchsorted 每次调用都会先把它拷贝成连续数组
+            array = self.imu if kind == "imu" else self.index[kind]
+            column = self._columns[kind, name] = np.ascontiguousarray(array[name])
+        return column
+
+    def timestamps(self, kind):
+        return self._column(kind, "timestamp")
+
+    def time_range(self):
+        """(最早, 最晚) 时间戳；空会话为 (0, 0)。"""
+        ts = [self.timestamps(kind) for kind in self.kinds]
+        ts = [t for t in ts if len(t)]
+        if not ts:
+            return 0.0, 0.0
+        return min(float(t[0]) for t in ts), max(float(t[-1]) for t in ts)
+
+    # ----- 定位 -----
+
+    def seek(self, kind, timestamp):
+        """第一个时间戳 >= timestamp 的序号 (都更早时为 count(kind))。"""
+        return int(np.searchsorted(self.timestamps(kind), timestamp, side="left"))
+
+    def nearest(self, kind, timestamp):
+        """时间戳离 timestamp 最近的序号；空数据流返回 -1。"""
+        ts = self.timestamps(kind)
+        i = int(np.searchsorted(ts, timestamp))
+        if i == len(ts) or (i > 0 and timestamp - ts[i - 1] <= ts[i] - timestamp):
+            i -= 1
+        return i
+
+    def find_seq(self, kind, seq):
+        """SDK 序号为 seq 的数据在该流中的序号，没有录到时返回 -1 (录制时序号递增)。"""
+        seqs = self._column(kind, "seq")
+        i = int(np.searchsorted(seqs, seq))
+        return i if i < len(seqs) and seqs[i] == seq else -1
+
+    def imu_between(self, start, end):
+        """start < timestamp <= end 的 IMU 样本 (零拷贝视图)。"""
+        ts = self.timestamps("imu")
+        lo, hi = np.searchsorted(ts, (start, end), side="right")
+        return self.imu[lo:hi]
+
+    @staticmethod
+    def _nearest(ts, targets):
+        """升序的 ts 中离每个 target 最近的下标；ts 为空时全为 -1。"""
+        if not len(ts):
+            return np.full(np.shape(targets), -1, np.int64)
+        right = np.minimum(np.searchsorted(ts, targets), len(ts) - 1)
+        left = np.maximum(right - 1, 0)
+        return np.where(np.abs(targets - ts[left]) <= np.abs(ts[right] - targets), left, right)
+
+    # ----- 读取 -----
+
+    def _map(self, kind):
+        """(mmap 对象, 其上的 uint8 数组)；空文件不能映射 (比如检测框全是空帧)，为 (None, 空数组)。"""
+        m = self._maps.get(kind)
+        if m is None:
+            with open(os.path.join(self.path, f"{kind}.bin"), "rb") as f:
+                if os.fstat(f.fileno()).st_size:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    m = (mm, np.frombuffer(mm, np.uint8))
+                else:
+                    m = (None, np.zeros(0, np.uint8))
+            self._maps[kind] = m
+        return m
+
+    def read(self, kind, i):
+        """第 i 个数据。raw 流返回内存映射上的只读视图，要修改或长期持有大量帧时先 copy()。"""
+        entry = self.index[kind][i]
+        offset, nbytes = int(entry["offset"]), int(entry["nbytes"])
+        mm, data = self._map(kind)
+        if offset + nbytes > len(data):
+            raise ValueError(f"{self.path}: {kind}.bin truncated at entry {i}")
+        if nbytes:
+            # 缺页时内核只预读一小段: 先让它把整段发起读盘，冷数据读完内容快约 1/3
+            start = offset - offset % mmap.ALLOCATIONGRANULARITY
+            mm.madvise(mmap.MADV_WILLNEED, start, offset + nbytes - start)
+        shape = tuple(entry["shape"][:int(entry["ndim"])].tolist())
+        return self._decoders[kind](data[offset:offset + nbytes], STREAM_DTYPES[kind], shape)
+
+    def read_at(self, kind, timestamp):
+        """时间戳离 timestamp 最近的数据 (空数据流时 IndexError)。"""
+        i = self.nearest(kind, timestamp)
+        if i < 0:
+            raise IndexError(f"{kind}: empty stream")
+        return self.read(kind, i)
+
+    def iter_stream(self, kind, start=None, end=None):
+        """按时间顺序逐个产出 (timestamp, ndarray)，只含 start <= timestamp <= end 的数据。"""
+        ts = self.timestamps(kind)
+        lo = 0 if start is None else self.seek(kind, start)
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="right"))
+        for i in range(lo, hi):
+            yield float(ts[i]), self.read(kind, i)
+
+    def aligned(self, kinds=("frame", "depth"), imu=True, start=None, end=None, max_skew=None):
+        """以 kinds[0] 的每一帧为基准产出 AlignedSample。
+
+        其余数据流取时间戳最近的一帧，相差超过 max_skew 秒时为 None；imu=True 时附上与前一帧
+        之间的 IMU 样本 (第一帧为 start 或会话开头到该帧)。数据在产出时才读取 / 解码。
+        """
+        main, others = kinds[0], kinds[1:]
+        ts = self.timestamps(main)
+        lo = 0 if start is None else self.seek(main, start)
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="right"))
+        ts = ts[lo:hi]
+        matches = {}
+        for kind in others:
+            other = self.timestamps(kind)
+            j = self._nearest(other, ts)
+            if max_skew is not None and len(other):
+                j = np.where(np.abs(other[j] - ts) <= max_skew, j, -1)
+            matches[kind] = j
+        if imu:
+            imu_ts = self.timestamps("imu")
+            first = -np.inf if start is None else np.nextafter(start, -np.inf)
+            bounds = np.searchsorted(imu_ts, np.concatenate([[first], ts]), side="right")
+        for n, t in enumerate(ts):
+            index = {main: lo + n}
+            data = {main: self.read(main, lo + n)}
+            for kind in others:
+                j = int(matches[kind][n])
+                index[kind] = j
+                data[kind] = self.read(kind, j) if j >= 0 else None
+            samples = self.imu[bounds[n]:bounds[n + 1]] if imu else None
+            yield AlignedSample(float(t), index, data, samples)
+
+    def close(self):
+        """丢掉映射的引用。read() 返回的视图仍持有各自的映射，用完后由 GC 释放。"""
+        self._maps = {}
+
+
+def generate_synthetic(path, seconds=5.0, fps=25, resolution=1, size=None,
+                       kinds=("frame", "depth", "imu", "detector")):
+    """生成一段合成会话并返回 path。
+
+    画面是缓慢平移的条纹，深度是 2 m 的背景墙前一个左右往返的 1 m 方块 (检测框跟随它)，
+    IMU 为 1 kHz 的正弦角速度。size=(宽, 高) 覆盖 resolution 对应的尺寸 (测试用小图)。
+    """
+    w, h = size or {1: (640, 400), 2: (1280, 800)}[resolution]
+    frames = max(1, int(round(seconds * fps)))
+    meta = {"module_info": "ID: SYNTHETIC, FW: 0.0", "synthetic": True,
+            "calibration": {"width": w, "height": h, "baseline": 0.12,
+                            "fx": 0.8 * w, "fy": 0.8 * w, "cx": w / 2, "cy": h / 2},
+            "device_info": {"name": "synthetic"}}
+    xs = np.arange(w * 2, dtype=np.float32)
+    box_w, box_h = w // 5, h // 3
+    y0 = (h - box_h) // 2
+    with SessionWriter(path, resolution, fps, **meta) as writer:
+        for i in range(frames):
+            t = i / fps
+            x0 = int((w - box_w) * (0.5 + 0.5 * np.sin(2 * np.pi * t / 4)))
+            if "frame" in kinds or "rectified" in kinds:
+                row = (128 + 100 * np.sin((xs + 40 * t * fps / 25) / 16)).astype(np.uint8)
+                frame = np.broadcast_to(row, (h, w * 2)).copy()
+                frame[y0:y0 + box_h, x0:x0 + box_w] = 230
+                frame[y0:y0 + box_h, w + x0:w + x0 + box_w] = 230
+                for kind in ("frame", "rectified"):
+                    if kind in kinds:
+                        writer.write(kind, frame, t)
+            if "depth" in kinds or "disparity" in kinds or "points" in kinds:
+                depth = np.full((h, w), 2000, np.uint16)
+                depth[y0:y0 + box_h, x0:x0 + box_w] = 1000
+                if "depth" in kinds:
+                    writer.write("depth", depth, t)
+                if "disparity" in kinds:
+                    fx_b = meta["calibration"]["fx"] * meta["calibration"]["baseline"] * 1000
+                    writer.write("disparity", (fx_b / depth).astype(np.float32), t)
+                if "points" in kinds:
+                    v, u = np.mgrid[0:h, 0:w].astype(np.float32)
+                    z = depth.astype(np.float32)
+                    pts = np.stack([(u - w / 2) * z / (0.8 * w), (v - h / 2) * z / (0.8 * w),
+                                    z], axis=-1)
+                    writer.write("points", pts.reshape(-1, 3), t)
+            if "detector" in kinds:
+                box = np.array([(x0, y0, box_w, box_h, 0.9, 1)], DET_DTYPE)
+                writer.write("detector", box, t)
+        if "imu" in kinds:
+            n = int(round(frames / fps / IMU_PERIOD))
+            samples = np.zeros(n, IMU_DTYPE)
+            ts = np.arange(n) * IMU_PERIOD
+            samples["timestamp"] = ts
+            samples["accel"][:, 2] = 9.81
+            samples["gyro"][:, 1] = 0.5 * np.sin(2 * np.pi * ts / 4)
+            writer.write_imu(samples)
+    return path
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 1
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    fps = float(sys.argv[3]) if len(sys.argv) > 3 else 25
+    path = generate_synthetic(sys.argv[1], seconds, fps)
+    session = Session(path)
+    print(f"合成会话: {path}")
+    for kind, info in session.streams.items():
+        print(f"  {kind:10s} {info['count']:7d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
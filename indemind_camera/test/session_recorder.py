@@ -0,0 +1,185 @@
+"""
+会话录制 — 把 ImseeSdk 已启用的全部数据录成会话目录 (session.py 格式)，录完可以用 ReplaySdk 回放。
+
+采集线程只负责取数和拷贝: 每个数据交给线程池编码 (zlib 释放 GIL，可并行)，写盘线程按提交顺序
+把编码结果追加进 SessionWriter 并定期 flush。积压的数据 (含 IMU 批) 超过 max_pending 时新数据
+直接丢弃并计数，采集线程永远不会因为编码或写盘而阻塞。取数或写盘出错时记下第一个异常，
+stop() 时抛出。
+
+丢帧统计 (stats()["streams"][kind]):
+    dropped  积压过多被录制器丢弃
+    missed   SDK 序号不连续 (采集线程没来得及取，被下一帧覆盖)
+IMU: imu_dropped 为读者落后被 SDK 环覆盖的样本数，imu_backlog_dropped 为积压过多被丢弃的样本数。
+"""
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from session import SessionWriter, encode
+
+RECORD_KINDS = ("frame", "depth", "disparity", "rectified", "points", "detector")
+# 深度类数据 zlib 后只剩几个百分点 (1280x800 每帧约 6 ms)；灰度图纹理多，zlib 只压到 1/3
+# 却要 30 ms 以上，默认存原始字节，保证单核也能跟上 25 fps
+DEFAULT_CODECS = {"depth": "zlib", "disparity": "zlib", "points": "zlib"}
+
+
+class SessionRecorder:
+    """录制 sdk (已 init、已 enable 所需数据) 的 kinds 到 path。
+
+    kinds: RECORD_KINDS 的子集，另可含 "imu"；codecs: {kind: codec}，缺省 DEFAULT_CODECS；
+    workers: 编码线程数；max_pending: 允许积压 (已取到、未写盘) 的数据个数；
+    sync_interval: 每隔多少秒写出一次索引和 session.json。
+    """
+
+    def __init__(self, sdk, path, kinds=("frame", "depth", "imu"), codecs=None, workers=4,
+                 max_pending=64, sync_interval=2.0, resolution=1, fps=25):
+        unknown = set(kinds) - set(RECORD_KINDS) - {"imu"}
+        if unknown:
+            raise ValueError(f"unknown record kinds: {sorted(unknown)}")
+        self.sdk = sdk
+        self.path = path
+        self.kinds = tuple(k for k in kinds if k != "imu")
+        self.record_imu = "imu" in kinds
+        self.max_pending = max_pending
+        self.sync_interval = sync_interval
+        self._writer = SessionWriter(
+            path, resolution, fps, codecs=DEFAULT_CODECS if codecs is None else codecs,
+            module_info=sdk.get_module_info(), calibration=sdk.get_calibration(),
+            device_info=sdk.get_device_info_detailed())
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="session-encode")
+        self._queue = queue.Queue()      # 按提交顺序: (kind, seq, timestamp, future) / ("imu", samples)
+        self._pending = 0                # 队列中还没写完的数据个数 (IMU 一批算一个)
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._capture = None
+        self._write_thread = None
+        self._imu_reader = None
+        self._error = None
+        self.recorded = collections.Counter()
+        self.dropped = collections.Counter()
+        self.missed = collections.Counter()
+        self.imu_samples = 0
+        self.max_backlog = 0
+        self._last_seq = {}
+        self._start = self._end = 0.0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+    def start(self):
+        if self.record_imu:
+            self._imu_reader = self.sdk.imu_reader()
+        self._start = time.monotonic()
+        self._capture = threading.Thread(target=self._capture_loop, name="session-capture",
+                                         daemon=True)
+        self._write_thread = threading.Thread(target=self._write_loop, name="session-writer",
+                                              daemon=True)
+        self._write_thread.start()
+        self._capture.start()
+
+    def stop(self):
+        """停止采集，等积压的数据全部写完后关闭会话，返回 stats()。"""
+        if self._capture is None:
+            return self.stats()
+        self._stop.set()
+        self._capture.join()
+        self._capture = None
+        self._end = time.monotonic()
+        self._queue.put(None)
+        self._write_thread.join()
+        self._pool.shutdown()
+        self._writer.close()
+        if self._error is not None:
+            raise self._error
+        return self.stats()
+
+    # ----- 采集线程 -----
+
+    def _reserve(self, kind, count=1):
+        """占一个积压名额；积压已满时把 count 计入 dropped[kind] 并返回 False。"""
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                self.dropped[kind] += count
+                return False
+            self._pending += 1
+            self.max_backlog = max(self.max_backlog, self._pending)
+            return True
+
+    def _submit(self, kind, arr):
+        last = self._last_seq.get(kind)
+        if last is not None and arr.seq > last + 1:
+            self.missed[kind] += arr.seq - last - 1
+        self._last_seq[kind] = arr.seq
+        if not self._reserve(kind):
+            return
+        # get_frame 等返回内部缓冲的视图，编码在别的线程进行，先拷贝
+        data = arr.copy()
+        future = self._pool.submit(encode, kind, data, self._writer.codec(kind))
+        self._queue.put((kind, arr.seq, arr.timestamp, future))
+
+    def _capture_loop(self):
+        try:
+            while not self._stop.is_set():
+                got = self.sdk.wait_any(self.kinds, timeout=0.05) if self.kinds else {}
+                for kind, arr in got.items():
+                    self._submit(kind, arr)
+                if self._imu_reader is not None:
+                    samples = self._imu_reader.read()
+                    if len(samples) and self._reserve("imu", len(samples)):
+                        self._queue.put(("imu", samples))
+                if not self.kinds:
+                    self._stop.wait(0.01)
+        except Exception as e:   # SDK 出错: 记下错误并停止取数，已取到的照常写完，stop() 时抛出
+            self._error = self._error or e
+
+    # ----- 写盘线程 -----
+
+    def _write_loop(self):
+        next_sync = time.monotonic() + self.sync_interval
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                try:
+                    if item[0] == "imu":
+                        self._writer.write_imu(item[1])
+                        self.imu_samples += len(item[1])
+                    else:
+                        kind, seq, timestamp, future = item
+                        payload, shape = future.result()
+                        self._writer.write_encoded(kind, payload, shape, timestamp, seq)
+                        self.recorded[kind] += 1
+                finally:
+                    with self._pending_lock:
+                        self._pending -= 1
+                if self.sync_interval and time.monotonic() >= next_sync:
+                    self._writer.flush()
+                    next_sync = time.monotonic() + self.sync_interval
+            except Exception as e:   # 磁盘满等: 记下错误，继续排空队列，stop() 时抛出
+                self._error = self._error or e
+
+    # ----- 统计 -----
+
+    def stats(self):
+        """{"seconds", "bytes", "backlog", "max_backlog", "imu_samples", "imu_dropped",
+        "imu_backlog_dropped", "streams": {kind: {"recorded", "fps", "dropped", "missed"}}}"""
+        end = self._end or time.monotonic()
+        seconds = max(end - self._start, 1e-9) if self._start else 0.0
+        streams = {kind: {"recorded": self.recorded[kind],
+                          "fps": self.recorded[kind] / seconds if seconds else 0.0,
+                          "dropped": self.dropped[kind], "missed": self.missed[kind]}
+                   for kind in self.kinds}
+        return {"seconds": seconds, "bytes": self._writer.bytes_written,
+                "backlog": self._pending, "max_backlog": self.max_backlog,
+                "imu_samples": self.imu_samples,
+                "imu_dropped": self._imu_reader.dropped if self._imu_reader else 0,
+                "imu_backlog_dropped": self.dropped["imu"],
+                "streams": streams}
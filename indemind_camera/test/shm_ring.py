@@ -0,0 +1,527 @@
+"""
+共享内存帧环 — 一个写者 (采集 worker 进程)、任意多个读者进程，不经过管道复制。
+
+每种数据一个 multiprocessing.shared_memory 段 "<name>_<kind>"，内含 N 个定长槽位；
+每个槽位有自己的 seqlock: 写者写入前把 lock 加 1 (奇数 = 写入中)，写完再加 1。
+读者先读 lock (奇数则重试)，拷贝数据，再读一次 lock；两次相同才说明没读到半帧。
+另有一个控制段 "<name>" 记录 worker 的 pid / 重启代数 / 心跳 / 发布了哪些数据，
+以及 worker 从 SDK 读到的标定参数和设备信息 (JSON)。
+
+读者拿到的是拷贝 (SdkArray，.seq 为环内序号，跨 worker 重启单调递增；
+.timestamp 为传感器时间戳)。注意: seqlock 依赖写入顺序 (x86 的存储顺序)，
+Python 侧没有内存屏障可用。
+"""
+import ast
+import json
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from detector_utils import DET_DTYPE, to_dicts
+from imsee_sdk import PRODUCTS, BoxList, SdkArray
+from imu_stream import IMU_PERIOD, ImuGapDetector
+
+MAGIC = 0x494D5352   # "IMSR"
+VERSION = 2
+
+# 控制段 kinds 位图中每种数据的位: SDK 产品编号，外加检测器图像 (与检测框同属一个产品)
+KIND_BITS = dict(PRODUCTS, detector_image=len(PRODUCTS))
+
+RING_HEADER_DTYPE = np.dtype([
+    ("magic", "<u4"),
+    ("version", "<u4"),
+    ("slots", "<u4"),
+    ("slot_bytes", "<u8"),
+    ("head", "<u8"),         # 最新一个已写完的序号 (0 = 还没有数据)
+    ("oversize", "<u8"),     # 超过槽位容量而被丢弃的数据个数
+    ("descr", "S256"),       # numpy dtype 描述 (np.lib.format.dtype_to_descr)
+], align=True)
+
+SLOT_HEADER_DTYPE = np.dtype([
+    ("lock", "<u8"),         # seqlock: 奇数 = 写入中
+    ("seq", "<u8"),
+    ("timestamp", "<f8"),
+    ("nbytes", "<u8"),
+    ("ndim", "<u4"),
+    ("shape", "<i4", (3,)),
+], align=True)
+
+CONTROL_DTYPE = np.dtype([
+    ("magic", "<u4"),
+    ("version", "<u4"),
+    ("kinds", "<u4"),        # 发布的数据: 1 << PRODUCTS[kind]
+    ("state", "<u4"),        # STATE_*
+    ("pid", "<u8"),          # 当前 worker 进程
+    ("generation", "<u8"),   # worker 启动次数 (重启 +1)
+    ("heartbeat", "<f8"),    # worker 最近一次心跳 time.time()
+    ("slots", "<u4"),
+    ("calibration", "S16384"),   # get_calibration() 的 JSON (worker 初始化数据源后写入)
+    ("device_info", "S4096"),    # get_device_info_detailed() 的 JSON
+], align=True)
+
+STATE_STARTING, STATE_RUNNING, STATE_STOPPED = 0, 1, 2
+
+_HEADER_SIZE = 512
+_ALIGN = 64
+_attach_lock = threading.Lock()
+
+
+def _round_up(n, align=_ALIGN):
+    return (n + align - 1) // align * align
+
+
+def ring_name(name, kind):
+    return f"{name}_{kind}"
+
+
+def attach_segment(name):
+    """按名字打开已有的共享内存段，且不登记到本进程的 resource_tracker。
+
+    Python < 3.13 打开 (而非创建) 共享内存时也会登记，读者进程退出时 tracker 会把
+    段删掉 (见 CPython gh-82300)；段的生命周期只归创建它的 CaptureWorker 管。
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _unlink_stale(name):
+    """删除上次异常退出残留的同名段。"""
+    try:
+        stale = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    stale.close()
+    stale.unlink()
+
+
+def _dtype_from_descr(raw):
+    return np.lib.format.descr_to_dtype(ast.literal_eval(raw.decode("ascii")))
+
+
+class ShmRing:
+    """一种数据的共享内存环。用 create() (写者所在的管理进程) 或 attach() 得到。
+
+    write() 只能由一个进程调用；read / latest / read_after 可在任意进程并发调用。
+    """
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self._owner = owner
+        buf = shm.buf
+        self._hdr = np.ndarray((), RING_HEADER_DTYPE, buffer=buf)
+        if self._hdr["magic"] != MAGIC or self._hdr["version"] != VERSION:
+            raise ValueError(f"{shm.name}: not an shm ring")
+        self.slots = int(self._hdr["slots"])
+        self.slot_bytes = int(self._hdr["slot_bytes"])
+        self.dtype = _dtype_from_descr(self._hdr["descr"][()])
+        stride = _round_up(SLOT_HEADER_DTYPE.itemsize) + self.slot_bytes
+        self._meta = np.ndarray((self.slots,), SLOT_HEADER_DTYPE, buffer=buf,
+                                offset=_HEADER_SIZE, strides=(stride,))
+        self._payload = np.ndarray((self.slots, self.slot_bytes), np.uint8, buffer=buf,
+                                   offset=_HEADER_SIZE + _round_up(SLOT_HEADER_DTYPE.itemsize),
+                                   strides=(stride, 1))
+        self._locks = self._meta["lock"]
+        self._seqs = self._meta["seq"]
+        self.torn = 0   # 本进程读到半帧后重试的次数
+
+    @classmethod
+    def create(cls, name, dtype, slot_bytes, slots=4):
+        """创建环 (已存在同名的残留段时先删除)。slot_bytes: 单个数据的最大字节数。"""
+        dtype = np.dtype(dtype)
+        slot_bytes = _round_up(max(int(slot_bytes), dtype.itemsize))
+        size = _HEADER_SIZE + slots * (_round_up(SLOT_HEADER_DTYPE.itemsize) + slot_bytes)
+        _unlink_stale(name)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        hdr = np.ndarray((), RING_HEADER_DTYPE, buffer=shm.buf)
+        hdr["slots"] = slots
+        hdr["slot_bytes"] = slot_bytes
+        hdr["descr"] = repr(np.lib.format.dtype_to_descr(dtype)).encode("ascii")
+        hdr["version"] = VERSION
+        hdr["magic"] = MAGIC
+        del hdr
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(attach_segment(name))
+
+    @property
+    def head(self):
+        """最新一个已写完的序号 (0 = 还没有数据)。"""
+        return int(self._hdr["head"])
+
+    @property
+    def oversize(self):
+        return int(self._hdr["oversize"])
+
+    def close(self):
+        """释放本进程的映射；创建者同时删除段。读出的数据都是拷贝，不受影响。"""
+        self._hdr = self._meta = self._payload = None
+        self._locks = self._seqs = None
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    # ----- 写者 -----
+
+    def write(self, arr, timestamp=0.0):
+        """追加一个数据 (会覆盖最旧的槽位)，返回它的序号；超过槽位容量时丢弃并返回 0。"""
+        data = np.ascontiguousarray(arr)
+        if data.dtype != self.dtype or data.ndim > 3 or data.nbytes > self.slot_bytes:
+            self._hdr["oversize"] += 1
+            return 0
+        seq = int(self._hdr["head"]) + 1
+        i = (seq - 1) % self.slots
+        meta = self._meta[i]
+        self._locks[i] += 1                      # 奇数: 写入中
+        self._payload[i, :data.nbytes] = data.reshape(-1).view(np.uint8)
+        meta["seq"] = seq
+        meta["timestamp"] = timestamp
+        meta["nbytes"] = data.nbytes
+        meta["ndim"] = data.ndim
+        meta["shape"][:data.ndim] = data.shape
+        self._locks[i] += 1                      # 偶数: 写完
+        self._hdr["head"] = seq
+        return seq
+
+    # ----- 读者 -----
+
+    def read(self, seq, retries=100):
+        """读取序号为 seq 的数据，返回 SdkArray；已被覆盖或还没写入时返回 None。"""
+        i = (seq - 1) % self.slots
+        meta = self._meta[i]
+        for _ in range(retries):
+            lock = int(self._locks[i])
+            if lock & 1:
+                time.sleep(0)   # 写者正在写这个槽位
+                continue
+            if int(self._seqs[i]) != seq:
+                return None
+            nbytes = int(meta["nbytes"])
+            shape = tuple(meta["shape"][:int(meta["ndim"])].tolist())
+            timestamp = float(meta["timestamp"])
+            out = self._payload[i, :nbytes].view(self.dtype).reshape(shape).copy()
+            if int(self._locks[i]) == lock:
+                out = out.view(SdkArray)
+                out.seq, out.timestamp = seq, timestamp
+                return out
+            self.torn += 1
+        return None
+
+    def latest(self, after=0):
+        """最新的数据 (序号必须大于 after)，没有时返回 None。"""
+        for _ in range(self.slots):
+            head = self.head
+            if head <= after:
+                return None
+            out = self.read(head)
+            if out is not None:
+                return out
+        return None
+
+    def read_after(self, seq, max_items=None):
+        """序号 seq 之后、仍在环中的全部数据 (从旧到新)，返回 (列表, 丢失数)。
+
+        丢失数为读者落后超过槽位数、已被覆盖而取不到的数据个数。
+        """
+        items, overruns = [], 0
+        while max_items is None or len(items) < max_items:
+            head = self.head
+            if head <= seq:
+                break
+            first = max(seq + 1, head - self.slots + 1)
+            out = self.read(first)
+            if out is None:        # 刚被覆盖: 重新按 head 计算
+                first = max(first + 1, self.head - self.slots + 1)
+                overruns += first - seq - 1
+                seq = first - 1
+                continue
+            overruns += first - seq - 1
+            items.append(out)
+            seq = first
+        return items, overruns
+
+
+class ShmCursor:
+    """按序号遍历一种共享内存数据的游标 (见 ShmSdk.cursor)，同 HistoryCursor。"""
+
+    def __init__(self, ring, kind, seq=0):
+        self._ring = ring
+        self.kind = kind
+        self.seq = seq          # 已读到的最后一个序号
+        self.overruns = 0       # 累计丢失的数据个数
+
+    def read(self, max_items=None):
+        items, skipped = self._ring.read_after(self.seq, max_items)
+        self.overruns += skipped
+        if items:
+            self.seq = items[-1].seq
+        return items
+
+
+class Control:
+    """控制段 "<name>" 的视图: worker 状态、pid、重启代数、心跳与发布的数据种类。"""
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self._owner = owner
+        self._rec = np.ndarray((), CONTROL_DTYPE, buffer=shm.buf)
+        if self._rec["magic"] != MAGIC or self._rec["version"] != VERSION:
+            raise ValueError(f"{shm.name}: not an shm control segment")
+
+    @classmethod
+    def create(cls, name, kinds, slots):
+        _unlink_stale(name)
+        shm = shared_memory.SharedMemory(name=name, create=True,
+                                         size=_round_up(CONTROL_DTYPE.itemsize))
+        rec = np.ndarray((), CONTROL_DTYPE, buffer=shm.buf)
+        rec["kinds"] = sum(1 << KIND_BITS[k] for k in kinds)
+        rec["slots"] = slots
+        rec["version"] = VERSION
+        rec["magic"] = MAGIC
+        del rec
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(attach_segment(name))
+
+    def __getitem__(self, field):
+        return self._rec[field][()]
+
+    def __setitem__(self, field, value):
+        self._rec[field] = value
+
+    @property
+    def kinds(self):
+        mask = int(self._rec["kinds"])
+        return tuple(k for k, p in KIND_BITS.items() if mask & (1 << p))
+
+    def publish_json(self, field, value):
+        """把 value 以 JSON 写进 field (calibration / device_info)；超过字段长度时抛 ValueError。"""
+        raw = json.dumps(value).encode("utf-8")
+        if len(raw) > CONTROL_DTYPE[field].itemsize:
+            raise ValueError(f"{field} JSON too long: {len(raw)} bytes")
+        self._rec[field] = raw
+
+    def read_json(self, field):
+        """field 中的 JSON；worker 还没写入或内容无效时返回 {}。"""
+        try:
+            return json.loads(bytes(self._rec[field][()]).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return {}
+
+    def close(self):
+        self._rec = None
+        self.shm.close()
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ShmSdk:
+    """从 CaptureWorker 的共享内存读取数据，提供 ImseeSdk 取数部分的接口 (只读)。
+
+    可以直接作为 IndemindHandler 的 sdk_factory 或给脚本使用；每个实例按 kind
+    记住已取到的序号，get_*() 只返回更新的数据。init() 时 worker 不存在则返回 -1。
+    标定参数 / 设备信息取自 worker 写在控制段里的 JSON。
+    poll_interval: wait_any() 检查新数据的间隔 (秒)，共享内存没有跨进程的条件变量。
+    """
+
+    GETTERS = ("frame", "depth", "disparity", "rectified", "points", "detector", "imu")
+
+    def __init__(self, name="imsee", poll_interval=0.001):
+        self.name = name
+        self.poll_interval = poll_interval
+        self._control = None
+        self._rings = {}
+        self._seen = dict.fromkeys(self.GETTERS + ("detector_image",), 0)
+        self._imu_dropped = 0
+        self._imu_gap = ImuGapDetector()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+        return False
+
+    def init(self, resolution=None, fps=None, history=0):
+        """挂到 worker 的共享内存 (分辨率 / 帧率由 worker 决定，参数被忽略)。"""
+        if self._control is not None:
+            return 0
+        try:
+            self._control = Control.attach(self.name)
+            self._rings = {kind: ShmRing.attach(ring_name(self.name, kind))
+                           for kind in self._control.kinds}
+        except (FileNotFoundError, ValueError):
+            self.release()
+            return -1
+        # 从挂上时的最新数据开始，不回放环里的旧数据
+        self._seen.update({kind: ring.head - 1 if ring.head else 0
+                           for kind, ring in self._rings.items()})
+        return 0
+
+    def release(self):
+        for ring in self._rings.values():
+            ring.close()
+        self._rings = {}
+        if self._control is not None:
+            self._control.close()
+            self._control = None
+
+    def is_initialized(self):
+        return self._control is not None
+
+    def get_module_info(self):
+        return f"shm: {self.name} (capture worker pid {int(self._control['pid'])})"
+
+    def get_callback_count(self):
+        """worker 发布的帧数 (跨 worker 重启累计)。"""
+        return self.get_seq("frame")
+
+    def get_calibration(self):
+        """返回标定参数 dict (worker 还没初始化完数据源时为 {})"""
+        return self._control.read_json("calibration")
+
+    def get_device_info_detailed(self):
+        """返回详细设备信息 dict (worker 还没初始化完数据源时为 {})"""
+        return self._control.read_json("device_info")
+
+    def worker_status(self):
+        """{"pid", "generation", "state", "heartbeat_age"} — worker 进程的状态。"""
+        c = self._control
+        return {"pid": int(c["pid"]), "generation": int(c["generation"]),
+                "state": int(c["state"]), "heartbeat_age": time.time() - float(c["heartbeat"])}
+
+    def _enable(self, kind):
+        return 0 if kind in self._rings else -1
+
+    def enable_depth(self, mode=0):
+        return self._enable("depth")
+
+    def enable_disparity(self, mode=0):
+        return self._enable("disparity")
+
+    def enable_rectify(self):
+        return self._enable("rectified")
+
+    def enable_points(self):
+        return self._enable("points")
+
+    def enable_detector(self):
+        return self._enable("detector")
+
+    def enable_imu(self):
+        return self._enable("imu")
+
+    def get_seq(self, kind):
+        ring = self._rings.get(kind)
+        return ring.head if ring is not None else 0
+
+    def _get(self, kind):
+        ring = self._rings.get(kind)
+        if ring is None:
+            return None
+        if kind == "imu":   # IMU 按批发布: 返回上次以来的全部样本，不丢批
+            batches, overruns = ring.read_after(self._seen[kind])
+            if not batches:
+                return None
+            self._seen[kind] = batches[-1].seq
+            out = np.concatenate(batches).view(SdkArray)
+            self._imu_update(out["timestamp"], overruns)
+            out.seq, out.timestamp = batches[-1].seq, batches[-1].timestamp
+            return out
+        out = ring.latest(self._seen[kind])
+        if out is not None:
+            self._seen[kind] = out.seq
+        return out
+
+    def get_frame(self):
+        return self._get("frame")
+
+    def get_depth(self):
+        return self._get("depth")
+
+    def get_disparity(self):
+        return self._get("disparity")
+
+    def get_rectified(self):
+        return self._get("rectified")
+
+    def get_points(self):
+        return self._get("points")
+
+    def get_imu(self):
+        return self._get("imu")
+
+    def _imu_update(self, timestamps, overruns):
+        gap = self._imu_gap
+        if overruns and gap.last is not None:
+            # 被覆盖的批按时间戳折算成样本数计入 dropped，不再算作断档
+            lost = round((timestamps[0] - gap.last) / IMU_PERIOD) - 1
+            self._imu_dropped += max(int(lost), 0)
+            gap.last = None
+        gap.update(timestamps)
+
+    def imu_stats(self):
+        """get_imu() 读者的统计 (同 ImseeSdk.imu_stats)；seq 为环内的批序号。"""
+        gap = self._imu_gap
+        return {"seq": self._seen["imu"], "dropped": self._imu_dropped, "gaps": gap.gaps,
+                "missing": gap.missing, "max_gap": gap.max_gap}
+
+    def get_detector_image(self):
+        """返回检测器图像或 None (worker 没有发布 detector_image 时总是 None)"""
+        return self._get("detector_image")
+
+    def get_detector_boxes(self, max_boxes=256, as_dicts=False):
+        boxes = self._get("detector")
+        if boxes is None:
+            boxes = np.zeros(0, DET_DTYPE).view(SdkArray)
+        boxes = boxes[:max_boxes]
+        if not as_dicts:
+            return boxes
+        result = BoxList(to_dicts(boxes))
+        result.seq, result.timestamp = boxes.seq, boxes.timestamp
+        return result
+
+    def wait_any(self, kinds, timeout=1.0):
+        """阻塞 (轮询共享内存) 到 kinds 中任一数据有更新，返回 {kind: 数据}；超时返回 {}。"""
+        for kind in kinds:
+            if kind not in self.GETTERS:
+                raise ValueError(f"unknown wait kind: {kind}")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            result = {}
+            for kind in kinds:
+                if self.get_seq(kind) > self._seen[kind]:
+                    data = self._get(kind)
+                    if data is not None:
+                        result[kind] = data
+            if result or (deadline is not None and time.monotonic() >= deadline):
+                return result
+            time.sleep(self.poll_interval)
+
+    def wait_frame(self, kind, timeout=1.0):
+        return self.wait_any((kind,), timeout).get(kind)
+
+    def cursor(self, kind, seq=0):
+        """从 seq 之后开始读取 kind 的游标 (ShmCursor)；seq=0 从环中最早的数据开始。"""
+        if kind not in self._rings:
+            raise ValueError(f"kind not published by worker: {kind}")
+        return ShmCursor(self._rings[kind], kind, seq)
@@ -0,0 +1,280 @@
+"""
+合成数据源 — 实时生成相机数据的 ImseeSdk (无需相机、无需录制)，用于高帧率 / 高分辨率压测。
+
+SyntheticSdk 就是 ImseeSdk，底层 wrapper 换成 SyntheticLib (FakeImseeLib)，后台线程按 fps
+节拍现场生成并 push 数据:
+    frame / rectified   平移的斑点纹理 (左右目按视差错开) + 左右往返的方块物体
+    depth               远处 4 m 到近处 0.6 m 的地面斜坡 + 物体 + 随画面移动的空洞 (0)
+    disparity / points  由深度和标定参数推出 (空洞处为 0)
+    detector            每个物体一个检测框 (DET_DTYPE)
+    imu                 imu_rate Hz 的样本，每帧一批 (时间戳连续，不随丢帧跳过)
+只生成调用方 enable_* 过的数据 (frame 始终生成)，与相机一致。生成跟不上 fps 时直接丢帧，
+不补发 (generator_stats() 的 skipped)。
+
+resolution / fps 给定时覆盖 init() 的参数 (webapp 按 config 初始化，压测需要别的分辨率)；
+size=(宽, 高) 覆盖分辨率对应的尺寸 (测试用小图)。
+"""
+import json
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from detector_utils import DET_DTYPE
+from fake_sdk import FakeImseeLib
+from imsee_sdk import ImseeSdk
+from imu_stream import IMU_DTYPE
+
+RESOLUTION_SIZES = {1: (640, 400), 2: (1280, 800)}
+BASELINE = 0.12          # m
+FAR, NEAR = 4000, 600    # 地面斜坡两端的深度 (mm)
+OBJECT_CLASSES = (1, 3, 4, 5)   # PERSON / PET_DOG / SOFA / TABLE
+
+
+class SyntheticScene:
+    """按帧号渲染一个合成场景；输出缓冲复用 (push 时会被复制)。"""
+
+    def __init__(self, width, height, fps, objects=2, holes=0.03, seed=0):
+        self.width, self.height, self.fps = width, height, fps
+        self.fx = 0.8 * width
+        self.fxb = self.fx * BASELINE * 1000   # 视差 = fxb / 深度(mm)
+        rng = np.random.default_rng(seed)
+        w, h = width, height
+        self._disp_bg = int(self.fxb / 2000)    # 背景纹理取 2 m 处的视差
+        self._pan = max(1, w // (4 * int(fps)))  # 每帧平移的像素
+        self._tex_w = 3 * w
+        self._texture = self._blobs(rng, h, self._tex_w + self._disp_bg, 60, 200)
+        holes_mask = self._blobs(rng, h, 2 * w, 0, 255)
+        self._holes = holes_mask < np.quantile(holes_mask, holes) if holes > 0 else None
+        ramp = FAR - (FAR - NEAR) * np.arange(h, dtype=np.float32) / max(h - 1, 1)
+        self._ramp = np.broadcast_to(ramp.astype(np.uint16)[:, None], (h, w))
+        self._objects = []
+        for k in range(objects):
+            ow, oh = w // 6, h // 3
+            depth = 900 + 500 * k
+            patch = self._blobs(rng, oh, ow, 150, 250)
+            self._objects.append((ow, oh, depth, patch, OBJECT_CLASSES[k % len(OBJECT_CLASSES)],
+                                  2 * np.pi * k / max(objects, 1)))
+        v, u = np.mgrid[0:h, 0:w].astype(np.float32)
+        self._ray_x = ((u - w / 2) / self.fx).reshape(-1)
+        self._ray_y = ((v - h / 2) / self.fx).reshape(-1)
+        self._frame = np.empty((h, 2 * w), np.uint8)
+        self._depth = np.empty((h, w), np.uint16)
+        self._disparity = np.empty((h, w), np.float32)
+        self._points = np.empty((h * w, 3), np.float32)
+
+    @staticmethod
+    def _blobs(rng, h, w, lo, hi):
+        """平滑的随机斑点纹理 (低分辨率噪声放大)，比逐像素噪声更接近真实画面的 JPEG 开销。"""
+        small = rng.integers(lo, hi, (max(h // 8, 2), max(w // 8, 2)), dtype=np.uint8)
+        return cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+    def calibration(self):
+        w, h = self.width, self.height
+        return {"width": w, "height": h, "baseline": BASELINE,
+                "fx": self.fx, "fy": self.fx, "cx": w / 2, "cy": h / 2}
+
+    def _placements(self, t):
+        """各物体当前的 (x, y, 宽, 高, 深度, 纹理, 类别)。"""
+        w, h = self.width, self.height
+        out = []
+        for ow, oh, depth, patch, class_id, phase in self._objects:
+            x = int((w - ow) * (0.5 + 0.5 * np.sin(2 * np.pi * t / 4 + phase)))
+            y = (h - oh) // 2 + int(h / 8 * np.cos(phase))
+            out.append((x, max(0, min(y, h - oh)), ow, oh, depth, patch, class_id))
+        return out
+
+    def render(self, i, kinds):
+        """第 i 帧的 {kind: ndarray}，只生成 kinds 中的数据 (frame 总是生成)。"""
+        w, h = self.width, self.height
+        t = i / self.fps
+        objects = self._placements(t)
+        out = {}
+        s = (i * self._pan) % (self._tex_w - w)
+        frame = self._frame
+        frame[:, :w] = self._texture[:, s:s + w]
+        frame[:, w:] = self._texture[:, s + self._disp_bg:s + self._disp_bg + w]
+        for x, y, ow, oh, depth, patch, _ in objects:
+            frame[y:y + oh, x:x + ow] = patch
+            xr = x - int(self.fxb / depth)   # 近处物体在右目中左移更多
+            lo = max(xr, 0)
+            frame[y:y + oh, w + lo:w + xr + ow] = patch[:, lo - xr:]
+        out["frame"] = frame
+        if "rectified" in kinds:
+            out["rectified"] = frame
+        if kinds & {"depth", "disparity", "points"}:
+            d = self._depth
+            np.copyto(d, self._ramp)
+            for x, y, ow, oh, depth, _, _ in objects:
+                d[y:y + oh, x:x + ow] = depth
+            if self._holes is not None:
+                hs = (i * self._pan) % w
+                d[self._holes[:, hs:hs + w]] = 0
+            if "depth" in kinds:
+                out["depth"] = d
+            if "disparity" in kinds:
+                self._disparity.fill(0)
+                np.divide(self.fxb, d, out=self._disparity, where=d > 0)
+                out["disparity"] = self._disparity
+            if "points" in kinds:
+                z = d.reshape(-1).astype(np.float32)
+                np.multiply(self._ray_x, z, out=self._points[:, 0])
+                np.multiply(self._ray_y, z, out=self._points[:, 1])
+                self._points[:, 2] = z
+                out["points"] = self._points
+        if "detector" in kinds:
+            boxes = np.zeros(len(objects), DET_DTYPE)
+            for k, (x, y, ow, oh, _, _, class_id) in enumerate(objects):
+                boxes[k] = (x, y, ow, oh, 0.8 + 0.1 * np.cos(t + k), class_id)
+            out["detector"] = boxes
+        return out
+
+    @staticmethod
+    def imu(start, count, rate):
+        """从第 start 个样本起的 count 个 IMU 样本 (时间戳 = 序号 / rate)。"""
+        samples = np.zeros(count, IMU_DTYPE)
+        ts = (start + np.arange(count)) / rate
+        samples["timestamp"] = ts
+        samples["accel"][:, 0] = 0.2 * np.sin(2 * np.pi * ts / 4)
+        samples["accel"][:, 2] = 9.81
+        samples["gyro"][:, 1] = 0.5 * np.cos(2 * np.pi * ts / 4)
+        return samples
+
+
+class SyntheticLib(FakeImseeLib):
+    """现场生成数据的 wrapper 库。imsee_init* 启动生成线程，imsee_release 停止。"""
+
+    track_push_times = False
+
+    def __init__(self, resolution=None, fps=None, imu_rate=1000, size=None,
+                 objects=2, holes=0.03):
+        super().__init__()
+        self.resolution = resolution
+        self.fps = fps
+        self.imu_rate = imu_rate
+        self.size = size
+        self.objects = objects
+        self.holes = holes
+        self.scene = None
+        self.frames = 0          # 已生成的帧数
+        self.skipped = 0         # 生成跟不上而丢掉的节拍
+        self.render_seconds = 0.0
+        self._enabled = {"frame"}
+        self._stop = threading.Event()
+        self._thread = None
+        self._t0 = 0.0
+
+    def _run(self, fps):
+        period = 1.0 / fps
+        imu_sent = 0
+        due = self._t0
+        i = 0
+        while True:
+            delay = due - time.monotonic()
+            if delay > 0:
+                if self._stop.wait(delay):
+                    return
+            elif -delay > period:   # 落后超过一帧: 和相机一样丢帧，不补发
+                missed = int(-delay / period)
+                self.skipped += missed
+                i += missed
+                due += missed * period
+            if self._stop.is_set():
+                return
+            t0 = time.perf_counter()
+            kinds = self._enabled
+            for kind, arr in self.scene.render(i, kinds).items():
+                self.push(kind, arr, due)
+            if "imu" in kinds and self.imu_rate > 0:
+                total = int((due - self._t0) * self.imu_rate) + 1
+                if total > imu_sent:
+                    samples = self.scene.imu(imu_sent, total - imu_sent, self.imu_rate)
+                    samples["timestamp"] += self._t0
+                    self.push("imu", samples)
+                    imu_sent = total
+            self.render_seconds += time.perf_counter() - t0
+            self.frames += 1
+            i += 1
+            due += period
+
+    # ----- wrapper 接口 -----
+
+    def imsee_init_ex(self, resolution, fps, history_depth):
+        ret = super().imsee_init_ex(resolution, fps, history_depth)
+        if ret != 0 or self._thread is not None:
+            return ret
+        resolution = self.resolution or resolution
+        if resolution not in RESOLUTION_SIZES:
+            self._initialized = False
+            return -2
+        fps = self.fps or fps
+        w, h = self.size or RESOLUTION_SIZES[resolution]
+        self.scene = SyntheticScene(w, h, fps, self.objects, self.holes)
+        self.frames = self.skipped = 0
+        self.render_seconds = 0.0
+        self._stop.clear()
+        self._t0 = time.monotonic()
+        self._thread = threading.Thread(target=self._run, args=(fps,), name="imsee-synthetic",
+                                        daemon=True)
+        self._thread.start()
+        return ret
+
+    def imsee_release(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        super().imsee_release()
+        self._enabled = {"frame"}
+
+    def _enable(self, kind):
+        self._enabled = self._enabled | {kind}   # 整体替换，生成线程不会读到修改中的集合
+        return 0
+
+    def imsee_enable_depth(self, mode):
+        return self._enable("depth")
+
+    def imsee_enable_disparity(self, mode):
+        return self._enable("disparity")
+
+    def imsee_enable_rectify(self):
+        return self._enable("rectified")
+
+    def imsee_enable_points(self):
+        return self._enable("points")
+
+    def imsee_enable_imu(self):
+        return self._enable("imu")
+
+    def imsee_enable_detector(self):
+        return self._enable("detector")
+
+    def imsee_get_calibration(self):
+        calib = self.scene.calibration() if self.scene is not None else {}
+        return json.dumps(calib).encode("utf-8")
+
+    def imsee_get_device_info_detailed(self):
+        return json.dumps({"name": "synthetic", "imu_rate": self.imu_rate}).encode("utf-8")
+
+    def imsee_get_module_info(self):
+        return b"ID: SYNTHETIC, FW: 0.0"
+
+
+class SyntheticSdk(ImseeSdk):
+    """实时合成数据的 ImseeSdk。
+
+    resolution / fps: 覆盖 init() 的参数 (None = 用 init 传入的)；imu_rate: IMU 采样率 (Hz)；
+    objects: 运动物体 (检测框) 个数；holes: 深度空洞占比。
+    """
+
+    def __init__(self, resolution=None, fps=None, imu_rate=1000, size=None, objects=2,
+                 holes=0.03, pool_size=4):
+        super().__init__(lib=SyntheticLib(resolution, fps, imu_rate, size, objects, holes),
+                         pool_size=pool_size)
+
+    def generator_stats(self):
+        """{frames, skipped, render_ms}: 已生成帧数、丢掉的节拍、平均每帧生成耗时。"""
+        lib = self._lib
+        return {"frames": lib.frames, "skipped": lib.skipped,
+                "render_ms": lib.render_seconds / lib.frames * 1000 if lib.frames else 0.0}
@@ -1,32 +1,111 @@
 """
 共用可视化工具 — 深度/视差彩色化函数。
 所有 test 脚本和 webapp 均通过此模块访问。
+
+彩色化走查找表 (LUT) 快速路径：uint16 深度 → BGR 的整张表按
+(max_range, colormap) 缓存，每帧只做一次 gather，结果与逐像素
+float 计算 + applyColorMap 的旧路径逐位一致。
 """
+from functools import lru_cache
+
 import cv2
 import numpy as np
 
 
+_DENOISE_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+
+@lru_cache(maxsize=None)
+def _colormap_table(colormap: int) -> np.ndarray:
+    """(256, 3) uint8: 灰度值 → colormap BGR。"""
+    ramp = np.arange(256, dtype=np.uint8).reshape(256, 1)
+    table = cv2.applyColorMap(ramp, colormap).reshape(256, 3)
+    table.flags.writeable = False
+    return table
+
+
+def _packed(table: np.ndarray) -> np.ndarray:
+    """(N, 3) BGR 表 → (N,) uint32 BGRA 表，gather 时一次取 4 字节。"""
+    bgra = np.zeros((len(table), 4), dtype=np.uint8)
+    bgra[:, :3] = table
+    packed = bgra.view(np.uint32).ravel()
+    packed.flags.writeable = False
+    return packed
+
+
+def _gather_bgr(packed: np.ndarray, index: np.ndarray) -> np.ndarray:
+    bgra = packed.take(index).view(np.uint8).reshape(*index.shape, 4)
+    return cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+
+
+@lru_cache(maxsize=16)
+def depth_lut(max_range: int = 4000, colormap: int = cv2.COLORMAP_JET) -> np.ndarray:
+    """(65536, 3) uint8: 深度(mm) → BGR。0 和超出 max_range 的深度映射为黑色。"""
+    top = min(int(max_range), 65535)
+    values = np.arange(1, top + 1, dtype=np.uint16)
+    # 与旧路径完全相同的 float32 运算顺序，保证逐位一致
+    norm = (255 - (values.astype(np.float32) / max_range * 255)).astype(np.uint8)
+    lut = np.zeros((65536, 3), dtype=np.uint8)
+    lut[1:top + 1] = _colormap_table(colormap)[norm]
+    lut.flags.writeable = False
+    return lut
+
+
+@lru_cache(maxsize=16)
+def _depth_tables(max_range: int, colormap: int) -> tuple[np.ndarray, np.ndarray]:
+    """(截断表 uint16[65536], 打包彩色表 uint32[65536])。"""
+    clamp = np.arange(65536, dtype=np.uint16)
+    clamp[clamp > max_range] = 0
+    clamp.flags.writeable = False
+    return clamp, _packed(depth_lut(max_range, colormap))
+
+
+@lru_cache(maxsize=None)
+def _disparity_table(colormap: int) -> np.ndarray:
+    """(257,) 打包表: 下标 0 = 无效(黑), 1..256 = 归一化值 0..255 的 colormap。"""
+    table = np.zeros((257, 3), dtype=np.uint8)
+    table[1:] = _colormap_table(colormap)
+    return _packed(table)
+
+
 def depth_to_color(depth_mm: np.ndarray, max_range: int = 4000,
-                   denoise: bool = True) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+                   denoise: bool = True,
+                   colormap: int = cv2.COLORMAP_JET) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """深度(mm) → 彩色图 (近=红, 远=蓝) + clamped + valid mask。
 
     Args:
         depth_mm: uint16 深度图 (毫米)
         max_range: 最大显示范围 (mm), 超出置零
         denoise: 是否做中值滤波 + 形态学填洞
+        colormap: OpenCV colormap (默认 JET)
 
     Returns:
         colored: (H, W, 3) uint8 BGR 彩色图
         clamped: (H, W) uint16 截断后的深度图
         valid: (H, W) bool 有效像素 mask
     """
-    if denoise:
-        depth_f = cv2.medianBlur(depth_mm, 3)
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-        filled = cv2.dilate(depth_f, kernel, iterations=1)
-        depth_out = np.where(depth_f > 0, depth_f, filled)
-    else:
-        depth_out = depth_mm
+    depth_out = _denoise(depth_mm) if denoise else depth_mm
+
+    clamp, packed = _depth_tables(max_range, colormap)
+    clamped = clamp.take(depth_out)
+    valid = clamped > 0
+    colored = _gather_bgr(packed, depth_out)
+    return colored, clamped, valid
+
+
+def _denoise(depth_mm: np.ndarray) -> np.ndarray:
+    """中值滤波 + 膨胀填洞 (只填原本为 0 的像素)。"""
+    depth_f = cv2.medianBlur(depth_mm, 3)
+    filled = cv2.dilate(depth_f, _DENOISE_KERNEL, iterations=1)
+    np.copyto(filled, depth_f, where=depth_f > 0)
+    return filled
+
+
+def _depth_to_color_reference(depth_mm: np.ndarray, max_range: int = 4000,
+                              denoise: bool = True,
+                              colormap: int = cv2.COLORMAP_JET):
+    """旧的逐像素实现，仅用于一致性测试和基准对比。"""
+    depth_out = _denoise(depth_mm) if denoise else depth_mm
 
     clamped = depth_out.copy()
     clamped[clamped > max_range] = 0
@@ -35,17 +114,19 @@ def depth_to_color(depth_mm: np.ndarray, max_range: int = 4000,
     norm = np.zeros_like(clamped, dtype=np.uint8)
     norm[valid] = (255 - (clamped[valid].astype(np.float32)
                           / max_range * 255)).astype(np.uint8)
-    colored = cv2.applyColorMap(norm, cv2.COLORMAP_JET)
+    colored = cv2.applyColorMap(norm, colormap)
     colored[~valid] = 0
 
     return colored, clamped, valid
 
 
-def disparity_to_color(disp: np.ndarray) -> np.ndarray:
+def disparity_to_color(disp: np.ndarray,
+                       colormap: int = cv2.COLORMAP_JET) -> np.ndarray:
     """视差(float32) → 彩色图 (JET colormap, 95th percentile 归一化)。
 
     Args:
         disp: float32 视差图
+        colormap: OpenCV colormap (默认 JET)
 
     Returns:
         colored: (H, W, 3) uint8 BGR 彩色图
@@ -58,8 +139,29 @@ def disparity_to_color(disp: np.ndarray) -> np.ndarray:
     if max_val <= 0:
         max_val = 1.0
 
+    # 下标 0 = 无效像素；有效像素 = 截断后的归一化值 + 1
+    scaled = disp / max_val
+    scaled *= 255
+    np.clip(scaled, 0, 255, out=scaled)
+    np.putmask(scaled, ~valid, -1)
+    idx = scaled.astype(np.int16)
+    idx += 1
+    return _gather_bgr(_disparity_table(colormap), idx)
+
+
+def _disparity_to_color_reference(disp: np.ndarray,
+                                  colormap: int = cv2.COLORMAP_JET) -> np.ndarray:
+    """旧的逐像素实现，仅用于一致性测试和基准对比。"""
+    valid = disp > 0
+    if not np.any(valid):
+        return np.zeros((*disp.shape, 3), dtype=np.uint8)
+
+    max_val = np.percentile(disp[valid], 95)
+    if max_val <= 0:
+        max_val = 1.0
+
     norm = np.zeros_like(disp, dtype=np.uint8)
     norm[valid] = np.clip(disp[valid] / max_val * 255, 0, 255).astype(np.uint8)
-    colored = cv2.applyColorMap(norm, cv2.COLORMAP_JET)
+    colored = cv2.applyColorMap(norm, colormap)
     colored[~valid] = 0
     return colored
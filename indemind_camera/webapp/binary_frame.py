@@ -0,0 +1,70 @@
+"""WebSocket 二进制帧格式 — uint16 深度 / uint8 灰度图 + 固定 28 字节头。
+
+布局 (小端):
+    偏移  类型      字段
+    0     char[4]   magic  "IMF1"
+    4     uint64    seq        源帧序号
+    12    float64   timestamp  采集时间 (秒)
+    20    uint16    width
+    22    uint16    height
+    24    uint8     dtype      1 = uint8, 2 = uint16
+    25    uint8     codec      0 = 原始像素，1 = depth_codec (RVL，可能是对上一帧的差分)
+    26    uint8[2]  保留 (0)
+    28    ...       codec 0: width * height 个像素, 行优先；codec 1: depth_codec 编码的字节
+
+浏览器端 (codec 0): new DataView(buf) 读头，new Uint16Array(buf, 28) 取深度 (mm)。
+codec 1 的帧要按顺序交给同一个 depth_codec.DepthDecoder 解码。
+"""
+import struct
+
+import numpy as np
+
+MAGIC = b"IMF1"
+HEADER = struct.Struct("<4sQdHHBB2x")
+CODEC_RAW = 0
+CODEC_RVL = 1
+
+DTYPE_CODES = {np.dtype(np.uint8): 1, np.dtype(np.uint16): 2}
+CODE_DTYPES = {code: dt for dt, code in DTYPE_CODES.items()}
+
+
+def pack_frame(seq: int, timestamp: float, image: np.ndarray, encoder=None) -> bytes:
+    """(H, W) uint8/uint16 图像 → 头 + 像素。
+
+    encoder: depth_codec.DepthEncoder (只用于 uint16 深度)，给出时像素按 RVL 编码。
+    """
+    if image.ndim != 2:
+        raise ValueError(f"expected 2-D image, got shape {image.shape}")
+    code = DTYPE_CODES.get(image.dtype)
+    if code is None:
+        raise ValueError(f"unsupported dtype: {image.dtype}")
+    h, w = image.shape
+    if encoder is not None:
+        return HEADER.pack(MAGIC, seq, timestamp, w, h, code, CODEC_RVL) + encoder.encode(image)
+    header = HEADER.pack(MAGIC, seq, timestamp, w, h, code, CODEC_RAW)
+    return header + np.ascontiguousarray(image, dtype=image.dtype.newbyteorder("<")).tobytes()
+
+
+def unpack_frame(data: bytes, decoder=None) -> tuple[int, float, np.ndarray]:
+    """pack_frame 的逆操作，返回 (seq, timestamp, image)。
+
+    codec 1 的帧需要 decoder (depth_codec.DepthDecoder，同一路流共用一个)。
+    """
+    magic, seq, timestamp, w, h, code, codec = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"bad magic: {magic!r}")
+    dtype = CODE_DTYPES.get(code)
+    if dtype is None:
+        raise ValueError(f"unknown dtype code: {code}")
+    if codec == CODEC_RVL:
+        if decoder is None:
+            raise ValueError("RVL-coded frame needs a decoder")
+        image = decoder.decode(memoryview(data)[HEADER.size:])
+        if image.shape != (h, w):
+            raise ValueError(f"decoded shape {image.shape} != {(h, w)}")
+        return seq, timestamp, image
+    if codec != CODEC_RAW:
+        raise ValueError(f"unknown codec: {codec}")
+    image = np.frombuffer(data, dtype=dtype.newbyteorder("<"), count=w * h,
+                          offset=HEADER.size).reshape(h, w)
+    return seq, timestamp, image
@@ -0,0 +1,152 @@
+"""深度叠加合成器 — 按分辨率预分配输出和中间缓冲，稳态下每帧不分配内存。"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from config import DEPTH_MAX_RANGE
+from vis_utils import _DENOISE_KERNEL, _depth_tables
+from webapp.metrics import COLORIZE_SECONDS, COMPOSITE_SECONDS
+
+
+class _Buffers:
+    """一组 (相机分辨率, 深度分辨率) 对应的预分配缓冲。"""
+
+    def __init__(self, cam_shape, depth_shape):
+        ch, cw = cam_shape
+        dh, dw = depth_shape
+        self.out = np.empty((ch, cw, 3), np.uint8)
+        self.blend = np.empty((ch, cw, 3), np.uint8)
+        self.median = np.empty((dh, dw), np.uint16)
+        self.filled = np.empty((dh, dw), np.uint16)
+        self.clamped = np.empty((dh, dw), np.uint16)
+        self.positive = np.empty((dh, dw), bool)
+        self.valid = np.empty((dh, dw), bool)
+        self.index = np.empty((dh, dw), np.intp)
+        self.gather = np.empty((dh, dw), np.uint32)
+        self.colored = np.empty((dh, dw, 3), np.uint8)
+        self.resize = (dh, dw) != (ch, cw)
+        if self.resize:
+            self.colored_full = np.empty((ch, cw, 3), np.uint8)
+            self.valid_full = np.empty((ch, cw), np.uint8)
+        else:
+            self.colored_full = self.colored
+            self.valid_full = self.valid.view(np.uint8)
+
+
+class OverlayCompositor:
+    """左目灰度图 + 彩色深度半透明叠加 + 中心距离标注。
+
+    compose() 返回的是内部输出缓冲，下次 compose() 会被覆盖；
+    调用方需自行保证 compose 与使用结果 (如 JPEG 编码) 之间不并发。
+    """
+
+    def __init__(self, max_range: int = DEPTH_MAX_RANGE,
+                 colormap: int = cv2.COLORMAP_JET):
+        self.max_range = max_range
+        self.colormap = colormap
+        self._buffers = {}   # (cam_shape, depth_shape) -> _Buffers
+        self.center_mm = 0   # 最近一次合成的中心深度 (mm), 0 = 无效
+
+    def _get_buffers(self, cam_shape, depth_shape) -> _Buffers:
+        key = (cam_shape, depth_shape)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = self._buffers[key] = _Buffers(cam_shape, depth_shape)
+        return buf
+
+    def compose(self, frame: np.ndarray, depth: np.ndarray | None,
+                alpha: float) -> np.ndarray:
+        depth_shape = depth.shape if depth is not None else (0, 0)
+        b = self._get_buffers(frame.shape[:2], depth_shape)
+        cam = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR, dst=b.out)
+        if depth is None:
+            self.center_mm = 0
+            return cam
+
+        t0 = time.perf_counter()
+        # 去噪 (同 vis_utils.depth_to_color): 中值滤波 + 膨胀只填空洞
+        cv2.medianBlur(depth, 3, dst=b.median)
+        cv2.dilate(b.median, _DENOISE_KERNEL, dst=b.filled, iterations=1)
+        np.greater(b.median, 0, out=b.positive)
+        np.copyto(b.filled, b.median, where=b.positive)
+
+        # 截断 + 彩色化: 两次查表。下标预先转成 intp，
+        # 并用 mode="clip" 避免 take() 内部复制下标/缓冲输出
+        clamp, packed = _depth_tables(self.max_range, self.colormap)
+        np.copyto(b.index, b.filled)
+        clamp.take(b.index, out=b.clamped, mode="clip")
+        np.greater(b.clamped, 0, out=b.valid)
+        packed.take(b.index, out=b.gather, mode="clip")
+        bgra = b.gather.view(np.uint8).reshape(*depth_shape, 4)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=b.colored)
+        t1 = time.perf_counter()
+        COLORIZE_SECONDS.observe(t1 - t0)
+
+        ch, cw = cam.shape[:2]
+        if b.resize:
+            cv2.resize(b.colored, (cw, ch), dst=b.colored_full)
+            cv2.resize(b.valid.view(np.uint8), (cw, ch), dst=b.valid_full,
+                       interpolation=cv2.INTER_NEAREST)
+
+        # 整帧混合后按 mask 拷回，避免花式索引产生的临时数组
+        cv2.addWeighted(cam, 1.0 - alpha, b.colored_full, alpha, 0, dst=b.blend)
+        np.copyto(cam, b.blend, where=b.valid_full.view(bool)[..., None])
+
+        # 中心距离: 坐标按比例换算 (等价于最近邻缩放后取中心像素)
+        dh, dw = depth_shape
+        cx, cy = cw // 2, ch // 2
+        sy = min(int(cy * (dh / ch)), dh - 1)
+        sx = min(int(cx * (dw / cw)), dw - 1)
+        val = int(b.clamped[sy, sx])
+        self.center_mm = val
+        label = f"{val / 1000:.2f}m" if val > 0 else "N/A"
+        cv2.drawMarker(cam, (cx, cy), (255, 255, 255),
+                       cv2.MARKER_CROSS, 20, 2)
+        cv2.putText(cam, label, (cx + 15, cy - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        COMPOSITE_SECONDS.observe(time.perf_counter() - t1)
+        return cam
+
+
+def _compose_reference(frame: np.ndarray, depth: np.ndarray | None,
+                       alpha: float, max_range: int = DEPTH_MAX_RANGE) -> np.ndarray:
+    """旧的逐帧分配实现 (花式索引混合)，仅用于一致性测试和基准对比。"""
+    from vis_utils import depth_to_color
+
+    cam = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+    if depth is None:
+        return cam
+
+    colored, clamped, valid = depth_to_color(depth, max_range=max_range)
+    ch, cw = cam.shape[:2]
+    dh, dw = colored.shape[:2]
+
+    if (dw, dh) != (cw, ch):
+        colored = cv2.resize(colored, (cw, ch))
+        valid = cv2.resize(valid.astype(np.uint8), (cw, ch),
+                           interpolation=cv2.INTER_NEAREST).astype(bool)
+
+    mask = valid
+    cam[mask] = cv2.addWeighted(
+        cam[mask], 1.0 - alpha,
+        colored[mask], alpha, 0
+    )
+
+    cx, cy = cw // 2, ch // 2
+    raw = cv2.resize(clamped, (cw, ch),
+                     interpolation=cv2.INTER_NEAREST)
+    val = raw[cy, cx]
+    label = f"{val / 1000:.2f}m" if val > 0 else "N/A"
+    cv2.drawMarker(cam, (cx, cy), (255, 255, 255),
+                   cv2.MARKER_CROSS, 20, 2)
+    cv2.putText(cam, label, (cx + 15, cy - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    return cam
@@ -1,8 +1,11 @@
 """Indemind OV580 相机管理器 — 提供 JPEG 帧用于 MJPEG 流。"""
+import logging
 import os
 import sys
 import time
 import threading
+from collections import OrderedDict
+from dataclasses import dataclass
 
 import cv2
 import numpy as np
@@ -14,22 +17,84 @@ if _TEST_DIR not in sys.path:
     sys.path.insert(0, _TEST_DIR)
 
 from config import RESOLUTION, FPS
-from vis_utils import depth_to_color
+from webapp import metrics
+from webapp.compositor import OverlayCompositor
+
+
+@dataclass(frozen=True)
+class FrameSnapshot:
+    """采集线程发布的最新一帧 (只读)，所有请求路径共享同一份。"""
+    seq: int                      # 采集序号 (每个新帧 +1)
+    timestamp: float              # frame 的传感器时间戳 (秒)；数据源不带时为取到时的 time.time()
+    frame: np.ndarray             # 左目灰度图 (只读)
+    depth: np.ndarray | None      # uint16 深度图 (mm, 只读)
+    depth_seq: int = 0            # depth 最近一次更新时的 seq (0 = 无深度)
+    depth_timestamp: float = 0.0  # depth 的传感器时间戳 (与 depth_seq 对应，规则同 timestamp)
+
+
+def _default_sdk_factory():
+    # 相机 / 回放 / 采集进程共享内存，由 config.BACKEND (IMSEE_BACKEND) 决定
+    from sdk_backend import open_sdk
+    return open_sdk()
+
+
+_RESIZE_CACHE_SIZE = 8
+_ERROR_LOG_INTERVAL = 10.0     # 采集线程同一环节的异常每隔多少秒最多记一次日志
+
+log = logging.getLogger(__name__)
+
+
+def _sensor_time(arr, fallback):
+    """SdkArray 的传感器时间戳；普通 ndarray (没有该元数据) 时返回 fallback。"""
+    timestamp = getattr(arr, "timestamp", 0.0)
+    return float(timestamp) if timestamp else fallback
+
+
+def _resize(img: np.ndarray, scale: float) -> np.ndarray:
+    h, w = img.shape[:2]
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    arr = np.ascontiguousarray(arr)
+    arr.flags.writeable = False
+    return arr
 
 
 class IndemindHandler:
-    """封装 ImseeSdk，提供 JPEG 帧输出。"""
+    """封装 ImseeSdk，提供 JPEG 帧输出。
+
+    start() 启动唯一的采集线程，每个新帧只从 SDK 拉取一次，
+    发布为不可变的 FrameSnapshot；JPEG 接口只读快照，不再触碰 SDK。
+    """
 
-    def __init__(self):
+    def __init__(self, sdk_factory=None):
+        self._sdk_factory = sdk_factory or _default_sdk_factory
         self._sdk = None
         self._running = False
         self._alpha = 0.5
-        self._last_frame = None       # numpy grayscale
-        self._last_depth = None       # numpy uint16
+        self._snapshot = None         # FrameSnapshot | None
         self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._compositor = OverlayCompositor()
+        self._overlay_lock = threading.Lock()   # 合成缓冲复用: 合成 + 编码需串行
+        self._overlay = None                    # 合成器输出缓冲
+        self._overlay_key = None                # 当前合成结果对应的 (seq, alpha)
+        self._resize_cache = OrderedDict()      # (kind, scale) -> (render key, 缩放图)
+        self._resize_lock = threading.Lock()
+        self._resize_count = 0
+        self._listeners = []          # 新帧回调 fn(snapshot)，在采集线程中调用
+        self._stop_listeners = []     # 停止回调 fn()，在调用 stop() 的线程中调用
+        self._seq = 0                 # 跨 start/stop 单调递增
         self._frame_count = 0
         self._start_time = 0.0
+        self._last_capture = 0.0      # 上一帧的 perf_counter()，用于帧间隔直方图
         self._resolution = (0, 0)
+        self._errors = 0              # 采集线程中的异常数 (SDK 取数 + 新帧回调)
+        self._last_error = None       # 最近一次异常 "stage: 类型: 信息"
+        self._error_log = {}          # stage -> (上次记日志的 monotonic, 之后被抑制的次数)
 
     def is_running(self) -> bool:
         return self._running
@@ -39,11 +104,7 @@ class IndemindHandler:
             return {"success": True, "error": None}
 
         try:
-            from imsee_sdk import ImseeSdk, _preload_deps, _ensure_lib_env
-            _ensure_lib_env()
-            _preload_deps()
-
-            self._sdk = ImseeSdk()
+            self._sdk = self._sdk_factory()
             ret = self._sdk.init(RESOLUTION, FPS)
             if ret != 0:
                 self._sdk = None
@@ -55,7 +116,14 @@ class IndemindHandler:
 
             self._running = True
             self._frame_count = 0
+            self._errors = 0
+            self._last_error = None
             self._start_time = time.time()
+            self._last_capture = 0.0
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._capture_loop,
+                                            name="indemind-capture", daemon=True)
+            self._thread.start()
             return {"success": True, "error": None}
 
         except Exception as e:
@@ -63,6 +131,12 @@ class IndemindHandler:
             return {"success": False, "error": str(e)}
 
     def stop(self) -> dict:
+        self._running = False
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
         if self._sdk is not None:
             try:
                 self._sdk.release()
@@ -70,17 +144,24 @@ class IndemindHandler:
                 pass
             self._sdk = None
 
-        self._running = False
         with self._lock:
-            self._last_frame = None
-            self._last_depth = None
+            self._snapshot = None
         self._frame_count = 0
         self._resolution = (0, 0)
+        for fn in list(self._stop_listeners):
+            try:
+                fn()
+            except Exception:
+                log.exception("stop listener failed")
         return {"success": True, "error": None}
 
     def set_alpha(self, alpha: float):
         self._alpha = max(0.0, min(1.0, alpha))
 
+    @property
+    def alpha(self) -> float:
+        return self._alpha
+
     def get_status(self) -> dict:
         elapsed = time.time() - self._start_time if self._running else 0
         fps = self._frame_count / elapsed if elapsed > 1 else 0
@@ -89,83 +170,193 @@ class IndemindHandler:
             "fps": round(fps, 1),
             "resolution": f"{self._resolution[0]}x{self._resolution[1]}",
             "alpha": self._alpha,
+            "errors": self._errors,
+            "last_error": self._last_error,
         }
 
-    def _poll_frames(self):
-        """从 SDK 拉取最新帧（调用方在请求时触发）。"""
-        if not self._running or self._sdk is None:
-            return
+    def get_snapshot(self) -> FrameSnapshot | None:
+        """返回最新快照 (可能为 None)。快照不可变，调用方可随意持有。"""
+        return self._snapshot
 
-        frame = self._sdk.get_frame()
-        depth = self._sdk.get_depth()
+    def add_frame_listener(self, fn):
+        """注册新帧回调 fn(snapshot)。回调在采集线程中执行，必须快速返回。"""
+        self._listeners.append(fn)
 
-        with self._lock:
-            if frame is not None:
-                h, w = frame.shape[:2]
-                # 取左半（立体图像 side-by-side）
-                if w > h * 1.5:
-                    self._last_frame = frame[:, :w // 2]
-                else:
-                    self._last_frame = frame
-                fh, fw = self._last_frame.shape[:2]
-                self._resolution = (fw, fh)
-                self._frame_count += 1
+    def remove_frame_listener(self, fn):
+        try:
+            self._listeners.remove(fn)
+        except ValueError:
+            pass
 
+    def add_stop_listener(self, fn):
+        """注册停止回调 fn()，stop() 之后调用 (比如让等新帧的流结束)。"""
+        self._stop_listeners.append(fn)
+
+    # ---------- 采集线程 ----------
+
+    def _capture_loop(self):
+        idle = 1.0 / (FPS * 4)
+        while not self._stop_event.is_set():
+            try:
+                got = self._capture_once()
+            except Exception as e:
+                self._record_error("sdk", e)
+                got = False
+            if not got:
+                self._stop_event.wait(idle)
+
+    def _capture_once(self) -> bool:
+        """拉取一次 SDK。有新帧时发布快照并返回 True。"""
+        sdk = self._sdk
+        if sdk is None:
+            return False
+
+        t0 = time.perf_counter()
+        frame = sdk.get_frame()
+        if frame is None:
+            return False
+        depth = sdk.get_depth()
+        t1 = time.perf_counter()
+        metrics.SDK_FETCH_SECONDS.observe(t1 - t0)
+        if self._last_capture:
+            metrics.FRAME_INTERVAL_SECONDS.observe(t1 - self._last_capture)
+        self._last_capture = t1
+        metrics.FRAMES_CAPTURED.inc()
+        now = time.time()
+        timestamp = _sensor_time(frame, now)
+
+        h, w = frame.shape[:2]
+        # 取左半（立体图像 side-by-side）
+        if w > h * 1.5:
+            frame = frame[:, :w // 2]
+        # get_frame 返回的是 SDK 内部缓冲区的视图，必须复制后再发布
+        frame = _readonly(frame.copy())
+
+        with self._lock:
+            prev = self._snapshot
+            self._seq += 1
+            depth_seq, depth_timestamp = self._seq, _sensor_time(depth, now)
             if depth is not None:
-                self._last_depth = depth
+                depth = _readonly(depth)
+            elif prev is not None:
+                depth, depth_seq, depth_timestamp = prev.depth, prev.depth_seq, prev.depth_timestamp
+            else:
+                depth_seq, depth_timestamp = 0, 0.0
+            snap = self._snapshot = FrameSnapshot(
+                seq=self._seq,
+                timestamp=timestamp,
+                frame=frame,
+                depth=depth,
+                depth_seq=depth_seq,
+                depth_timestamp=depth_timestamp,
+            )
+            fh, fw = frame.shape[:2]
+            self._resolution = (fw, fh)
+            self._frame_count += 1
+
+        for fn in list(self._listeners):
+            try:
+                fn(snap)
+            except Exception as e:
+                self._record_error("listener", e)
+        return True
+
+    def _record_error(self, stage, exc):
+        """采集线程的异常: 计数 (指标 + get_status)，按 stage 限频记日志，不中断采集。"""
+        metrics.CAPTURE_ERRORS.labels(stage).inc()
+        self._errors += 1
+        self._last_error = f"{stage}: {type(exc).__name__}: {exc}"
+        now = time.monotonic()
+        last, suppressed = self._error_log.get(stage, (None, 0))
+        if last is not None and now - last < _ERROR_LOG_INTERVAL:
+            self._error_log[stage] = (last, suppressed + 1)
+            return
+        self._error_log[stage] = (now, 0)
+        extra = f" ({suppressed} more since last report)" if suppressed else ""
+        log.error("capture thread %s error%s", stage, extra, exc_info=exc)
+
+    # ---------- 渲染 / JPEG ----------
+
+    def render(self, kind: str, snap: FrameSnapshot) -> np.ndarray:
+        """把快照渲染成待编码图像。kind: "frame" (左目灰度) 或 "overlay" (深度叠加)。
+
+        overlay 返回合成器的内部缓冲 (同一快照只合成一次)，调用方必须持有 _overlay_lock。
+        """
+        if kind == "frame":
+            return snap.frame
+        if kind == "overlay":
+            key = (snap.seq, self._alpha)
+            if self._overlay_key != key:
+                self._overlay = self._compositor.compose(snap.frame, snap.depth, key[1])
+                self._overlay_key = key
+            return self._overlay
+        raise ValueError(f"unknown stream kind: {kind}")
+
+    def render_scaled(self, kind: str, snap: FrameSnapshot, scale: float) -> np.ndarray:
+        """缩放后的渲染图。每个 (kind, scale) 每帧只缩放一次，不同质量的变体共享结果。"""
+        render_key = (snap.seq, self._alpha if kind == "overlay" else None)
+        cache_key = (kind, scale)
+        with self._resize_lock:
+            entry = self._resize_cache.get(cache_key)
+            if entry is not None and entry[0] == render_key:
+                self._resize_cache.move_to_end(cache_key)
+                return entry[1]
+
+            if kind == "overlay":
+                with self._overlay_lock:
+                    scaled = _resize(self.render(kind, snap), scale)
+            else:
+                scaled = _resize(self.render(kind, snap), scale)
+            self._resize_count += 1
+            self._resize_cache[cache_key] = (render_key, scaled)
+            self._resize_cache.move_to_end(cache_key)
+            while len(self._resize_cache) > _RESIZE_CACHE_SIZE:
+                self._resize_cache.popitem(last=False)
+        return scaled
+
+    def encode_jpeg(self, kind: str, snap: FrameSnapshot, quality: int = 80,
+                    scale: float = 1.0) -> bytes:
+        t0 = time.perf_counter()
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        if scale != 1.0:
+            _, buf = cv2.imencode('.jpg', self.render_scaled(kind, snap, scale), params)
+        elif kind == "frame":
+            _, buf = cv2.imencode('.jpg', snap.frame, params)
+        else:
+            with self._overlay_lock:
+                _, buf = cv2.imencode('.jpg', self.render(kind, snap), params)
+        # overlay 的合成耗时单独计入 colorize/composite 直方图，这里含在总耗时内
+        metrics.ENCODE_SECONDS.labels(kind).observe(time.perf_counter() - t0)
+        metrics.ENCODES.labels(kind).inc()
+        return buf.tobytes()
+
+    def encode_depth_png(self, snap: FrameSnapshot, scale: float = 1.0) -> bytes:
+        """原始深度 (mm) 编码为 16-bit PNG。缩放用最近邻，不混合相邻像素的距离值。"""
+        depth = snap.depth
+        if scale != 1.0:
+            h, w = depth.shape[:2]
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            depth = cv2.resize(depth, size, interpolation=cv2.INTER_NEAREST)
+        t0 = time.perf_counter()
+        _, buf = cv2.imencode('.png', depth)
+        metrics.PNG_ENCODE_SECONDS.observe(time.perf_counter() - t0)
+        metrics.ENCODES.labels("depth").inc()
+        return buf.tobytes()
 
     def get_frame_jpeg(self, quality: int = 80) -> bytes | None:
         if not self._running:
             return None
 
-        self._poll_frames()
-
-        with self._lock:
-            if self._last_frame is None:
-                return None
-            _, buf = cv2.imencode('.jpg', self._last_frame,
-                                  [cv2.IMWRITE_JPEG_QUALITY, quality])
-        return buf.tobytes()
+        snap = self._snapshot
+        if snap is None:
+            return None
+        return self.encode_jpeg("frame", snap, quality)
 
     def get_overlay_jpeg(self, quality: int = 80) -> bytes | None:
         if not self._running:
             return None
 
-        self._poll_frames()
-
-        with self._lock:
-            if self._last_frame is None:
-                return None
-
-            cam = cv2.cvtColor(self._last_frame, cv2.COLOR_GRAY2BGR)
-
-            if self._last_depth is not None:
-                colored, clamped, valid = depth_to_color(self._last_depth)
-                ch, cw = cam.shape[:2]
-                dh, dw = colored.shape[:2]
-
-                if (dw, dh) != (cw, ch):
-                    colored = cv2.resize(colored, (cw, ch))
-                    valid = cv2.resize(valid.astype(np.uint8), (cw, ch),
-                                       interpolation=cv2.INTER_NEAREST).astype(bool)
-
-                mask = valid
-                cam[mask] = cv2.addWeighted(
-                    cam[mask], 1.0 - self._alpha,
-                    colored[mask], self._alpha, 0
-                )
-
-                # Center distance label
-                cx, cy = cw // 2, ch // 2
-                raw = cv2.resize(clamped, (cw, ch),
-                                 interpolation=cv2.INTER_NEAREST)
-                val = raw[cy, cx]
-                label = f"{val / 1000:.2f}m" if val > 0 else "N/A"
-                cv2.drawMarker(cam, (cx, cy), (255, 255, 255),
-                               cv2.MARKER_CROSS, 20, 2)
-                cv2.putText(cam, label, (cx + 15, cy - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-
-            _, buf = cv2.imencode('.jpg', cam,
-                                  [cv2.IMWRITE_JPEG_QUALITY, quality])
-        return buf.tobytes()
+        snap = self._snapshot
+        if snap is None:
+            return None
+        return self.encode_jpeg("overlay", snap, quality)
@@ -1,16 +1,22 @@
 """FastAPI 后端 — Indemind OV580 Webapp MVP."""
-import time
-
-from fastapi import FastAPI, Response
+import anyio
+from fastapi import FastAPI, Header, Query, Response, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from pydantic import BaseModel
 
+from webapp import metrics
+from webapp.binary_frame import pack_frame
 from webapp.indemind_handler import IndemindHandler
+from webapp.snapshot_cache import MEDIA_TYPES, SnapshotCache, etag_matches
+from webapp.stream_hub import StreamHub
+from depth_codec import DepthEncoder   # test/ 下的模块，webapp.indemind_handler 已把 test/ 加入 sys.path
 
 app = FastAPI(title="Indemind OV580 Viewer")
 
 handler = IndemindHandler()
+hub = StreamHub(handler)
+snapshots = SnapshotCache(handler)
 
 # ---------- Static files ----------
 
@@ -51,41 +57,234 @@ def api_config(body: ConfigBody):
     return {"success": True}
 
 
+@app.get("/api/streams")
+def api_streams():
+    """当前 MJPEG 客户端的交付统计 (已发送 / 丢弃帧数)。"""
+    return {"clients": hub.client_stats()}
+
+
+@app.get("/metrics")
+def api_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # ---------- Snapshot ----------
 
-@app.get("/snapshot")
-def snapshot():
-    data = handler.get_frame_jpeg(quality=90)
-    if data is None:
+def _snapshot_response(kind: str, quality: int, scale: float,
+                       if_none_match: str | None) -> Response:
+    """从缓存返回快照；客户端 ETag 仍是最新时直接 304，不编码。"""
+    snap = handler.get_snapshot() if handler.is_running() else None
+    if snap is None:
         return JSONResponse({"error": "no frame"}, status_code=503)
-    return Response(content=data, media_type="image/jpeg")
+    if kind == "depth" and snap.depth is None:
+        return JSONResponse({"error": "no depth"}, status_code=503)
+
+    scale = round(scale, 2)
+    key = snapshots.key(snap, kind, quality, scale)
+    etag = snapshots.etag(key)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshots.get(snap, key), media_type=MEDIA_TYPES[kind],
+                    headers=headers)
+
+
+_SNAPSHOT_QUALITY = Query(90, ge=1, le=100, description="JPEG 质量")
+_SNAPSHOT_SCALE = Query(1.0, gt=0, le=1, description="缩放比例 (0, 1]")
+
+
+@app.get("/snapshot")
+def snapshot(quality: int = _SNAPSHOT_QUALITY, scale: float = _SNAPSHOT_SCALE,
+             if_none_match: str | None = Header(None)):
+    return _snapshot_response("frame", quality, scale, if_none_match)
+
+
+@app.get("/snapshot/overlay")
+def snapshot_overlay(quality: int = _SNAPSHOT_QUALITY, scale: float = _SNAPSHOT_SCALE,
+                     if_none_match: str | None = Header(None)):
+    return _snapshot_response("overlay", quality, scale, if_none_match)
+
+
+@app.get("/snapshot/depth.png")
+def snapshot_depth(scale: float = _SNAPSHOT_SCALE,
+                   if_none_match: str | None = Header(None)):
+    """16-bit PNG，像素值为深度 (mm)。"""
+    return _snapshot_response("depth", 0, scale, if_none_match)
 
 
 # ---------- MJPEG streams ----------
 
-def _mjpeg_generator(frame_func, quality: int = 80, target_fps: int = 25):
-    interval = 1.0 / target_fps
-    while True:
-        data = frame_func(quality=quality)
-        if data is not None:
-            yield (
+# 单次写入超过该时长仍未完成 (TCP 发送窗口一直是满的) 即视为客户端卡死并断开
+STALL_TIMEOUT = 10.0
+
+
+class MJPEGResponse(StreamingResponse):
+    """MJPEG 流响应：无论 ASGI 版本，都并发监听客户端断开，断开立即取消生成器。
+
+    背压: 生成器每次 yield 后都要等这一帧写完才会取下一帧 (届时最新的帧)，
+    因此每个客户端最多只有一帧在途，慢链路只会丢帧，不会在服务端堆积。
+    单次写入卡住超过 stall_timeout 秒则主动断开。
+    """
+
+    media_type = "multipart/x-mixed-replace; boundary=frame"
+
+    def __init__(self, content, stream: str = "", stall_timeout: float | None = None):
+        super().__init__(content)
+        self.stream = stream
+        self.stall_timeout = STALL_TIMEOUT if stall_timeout is None else stall_timeout
+        self.stalled = False
+
+    async def __call__(self, scope, receive, send):
+        async def bounded_send(message):
+            with anyio.fail_after(self.stall_timeout):
+                await send(message)
+
+        try:
+            async with anyio.create_task_group() as tg:
+
+                async def run_stream():
+                    try:
+                        await self.stream_response(bounded_send)
+                    except TimeoutError:
+                        self.stalled = True
+                        metrics.STALLED_DISCONNECTS.labels(self.stream).inc()
+                    tg.cancel_scope.cancel()
+
+                tg.start_soon(run_stream)
+                await self.listen_for_disconnect(receive)
+                tg.cancel_scope.cancel()
+        finally:
+            # 写入被取消时生成器停在 yield 处，显式关闭以立即释放订阅
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                with anyio.CancelScope(shield=True):
+                    await aclose()
+
+
+async def _mjpeg_generator(kind: str, quality: int = 80, scale: float = 1.0,
+                           max_fps: float | None = None):
+    """按新帧通知推送 MJPEG；订阅在生成器结束 (含断开取消) 时立即释放。"""
+    sub = hub.subscribe(kind, quality, scale, max_fps)
+    subscribers = metrics.SUBSCRIBERS.labels(kind)
+    sent = metrics.BYTES_SENT.labels(kind)
+    subscribers.inc()
+    try:
+        while True:
+            data = await hub.next_jpeg(sub)
+            if data is None:
+                return
+            chunk = (
                 b"--frame\r\n"
                 b"Content-Type: image/jpeg\r\n\r\n" + data + b"\r\n"
             )
-        time.sleep(interval)
+            sent.inc(len(chunk))
+            yield chunk
+    finally:
+        subscribers.dec()
+        hub.unsubscribe(sub)
+
+
+# 每个客户端可按链路情况请求更低的质量 / 分辨率 / 帧率；参数相同的客户端共享编码
+_QUALITY = Query(80, ge=1, le=100, description="JPEG 质量")
+_SCALE = Query(1.0, gt=0, le=1, description="缩放比例 (0, 1]")
+_MAX_FPS = Query(None, gt=0, le=120, description="帧率上限")
 
 
 @app.get("/stream")
-def stream():
-    return StreamingResponse(
-        _mjpeg_generator(handler.get_frame_jpeg),
-        media_type="multipart/x-mixed-replace; boundary=frame",
-    )
+async def stream(quality: int = _QUALITY, scale: float = _SCALE,
+                 max_fps: float | None = _MAX_FPS):
+    return MJPEGResponse(_mjpeg_generator("frame", quality, scale, max_fps), "frame")
 
 
 @app.get("/stream/overlay")
-def stream_overlay():
-    return StreamingResponse(
-        _mjpeg_generator(handler.get_overlay_jpeg),
-        media_type="multipart/x-mixed-replace; boundary=frame",
-    )
+async def stream_overlay(quality: int = _QUALITY, scale: float = _SCALE,
+                         max_fps: float | None = _MAX_FPS):
+    return MJPEGResponse(_mjpeg_generator("overlay", quality, scale, max_fps), "overlay")
+
+
+# ---------- WebSocket 原始数据 ----------
+
+async def _ws_sender(ws, kind: str, stats: dict | None = None, codec: str = "raw"):
+    """推送原始帧 (webapp/binary_frame.py 格式)。
+
+    codec="rvl" (只对 depth): 每个连接一个 DepthEncoder，深度按 RVL 无损编码 (必要时对
+    上一帧差分)，在线程池里编码，不占事件循环。
+
+    每次发送完成后才取下一帧，且总是取当时最新的快照：慢客户端只会丢帧，
+    服务端任何时刻最多只有一条消息在途，不会无限排队。
+    单次发送超过 STALL_TIMEOUT 秒抛出 TimeoutError。
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("sent", 0)
+    stats.setdefault("dropped", 0)
+    stream = f"ws_{kind}"
+    dropped = metrics.FRAMES_DROPPED.labels(stream)
+    sent = metrics.BYTES_SENT.labels(stream)
+    last_seq = 0      # 最近处理到的快照 seq
+    sent_seq = 0      # 最近发送的数据 seq (depth 用 depth_seq，深度未更新时不重发)
+    encoder = DepthEncoder() if codec == "rvl" and kind == "depth" else None
+    while True:
+        snap = await hub.wait_snapshot(last_seq)
+        if snap is None:            # handler 已停止
+            return
+        if last_seq and snap.seq - last_seq > 1:
+            stats["dropped"] += snap.seq - last_seq - 1
+            dropped.inc(snap.seq - last_seq - 1)
+        last_seq = snap.seq
+        if kind == "depth":
+            if snap.depth is None or snap.depth_seq == sent_seq:
+                continue
+            # 深度可能沿用自更早的快照: seq 与时间戳都取深度自己的
+            seq, timestamp, image = snap.depth_seq, snap.depth_timestamp, snap.depth
+        else:
+            seq, timestamp, image = snap.seq, snap.timestamp, snap.frame
+        if encoder is None:
+            data = pack_frame(seq, timestamp, image)
+        else:
+            data = await anyio.to_thread.run_sync(pack_frame, seq, timestamp, image, encoder)
+        with anyio.fail_after(STALL_TIMEOUT):
+            await ws.send_bytes(data)
+        sent.inc(len(data))
+        sent_seq = seq
+        stats["sent"] += 1
+
+
+async def _ws_stream(ws: WebSocket, kind: str, codec: str = "raw"):
+    subscribers = metrics.SUBSCRIBERS.labels(f"ws_{kind}")
+    subscribers.inc()
+    try:
+        await ws.accept()
+        async with anyio.create_task_group() as tg:
+
+            async def run_sender():
+                try:
+                    await _ws_sender(ws, kind, codec=codec)
+                    await ws.close(1001)        # handler 已停止: 流结束
+                except TimeoutError:
+                    metrics.STALLED_DISCONNECTS.labels(f"ws_{kind}").inc()
+                except (WebSocketDisconnect, RuntimeError, OSError):
+                    pass
+                tg.cancel_scope.cancel()
+
+            tg.start_soon(run_sender)
+            # 客户端关闭连接时立即取消发送任务
+            while True:
+                msg = await ws.receive()
+                if msg["type"] == "websocket.disconnect":
+                    break
+            tg.cancel_scope.cancel()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscribers.dec()
+
+
+@app.websocket("/ws/depth")
+async def ws_depth(ws: WebSocket, codec: str = Query("raw", pattern="^(raw|rvl)$")):
+    await _ws_stream(ws, "depth", codec)
+
+
+@app.websocket("/ws/frame")
+async def ws_frame(ws: WebSocket):
+    await _ws_stream(ws, "frame")
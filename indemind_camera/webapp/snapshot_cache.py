@@ -0,0 +1,80 @@
+"""单帧快照缓存 — 按 (源帧序号, 类型, 质量, 缩放) 缓存编码结果，并生成对应的 ETag。"""
+import secrets
+import threading
+from collections import OrderedDict
+
+SNAPSHOT_KINDS = ("frame", "overlay", "depth")
+
+MEDIA_TYPES = {"frame": "image/jpeg", "overlay": "image/jpeg", "depth": "image/png"}
+
+
+class SnapshotCache:
+    """小型 LRU。同一源帧、同一参数的快照只编码一次。
+
+    ETag 由缓存键直接推出，不需要编码就能判断客户端的副本是否仍是最新
+    (If-None-Match 命中时 304，零编码)。键中带进程级随机前缀，
+    服务重启后 seq 从头计数也不会与旧 ETag 撞车。
+    """
+
+    def __init__(self, handler, size: int = 16):
+        self._handler = handler
+        self._size = size
+        self._entries = OrderedDict()   # key -> bytes
+        self._lock = threading.Lock()
+        self._epoch = secrets.token_hex(4)
+        self.encodes = 0
+
+    def key(self, snap, kind: str, quality: int = 90, scale: float = 1.0) -> tuple:
+        """缓存键。overlay 的结果还取决于透明度，一并计入。"""
+        if kind == "depth":
+            return (snap.depth_seq, kind, 0, scale, None)
+        alpha = self._handler.alpha if kind == "overlay" else None
+        return (snap.seq, kind, quality, scale, alpha)
+
+    def etag(self, key: tuple) -> str:
+        seq, kind, quality, scale, alpha = key
+        tag = f"{self._epoch}-{seq}-{kind}-q{quality}-s{scale}"
+        if alpha is not None:
+            tag += f"-a{alpha}"
+        return f'"{tag}"'
+
+    def get(self, snap, key: tuple) -> bytes:
+        """返回 key 对应的编码结果，未命中时编码并放入缓存。"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        # 编码放在锁外: 不同参数的快照互不阻塞 (同一键并发未命中时最多重复编码一次)
+        _, kind, quality, scale, _ = key
+        if kind == "depth":
+            data = self._handler.encode_depth_png(snap, scale)
+        else:
+            data = self._handler.encode_jpeg(kind, snap, quality, scale)
+
+        with self._lock:
+            self.encodes += 1
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+        return data
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match 是否包含 etag (支持逗号分隔列表、弱校验前缀 W/ 和 *)。"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -0,0 +1,246 @@
+"""MJPEG 广播中心 — 每个 (流类型, 质量, 缩放) 组合每帧只编码一次，所有订阅者共享同一份字节。"""
+import asyncio
+import threading
+import time
+import weakref
+
+from webapp import metrics
+
+STREAM_KINDS = ("frame", "overlay")
+
+
+class Subscriber:
+    """一个流连接的订阅句柄。"""
+
+    __slots__ = ("kind", "quality", "scale", "min_interval", "key",
+                 "last_seq", "last_sent", "frames_sent", "frames_dropped")
+
+    def __init__(self, kind: str, quality: int, scale: float = 1.0,
+                 max_fps: float | None = None):
+        self.kind = kind
+        self.quality = quality
+        self.scale = scale
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.key = (kind, quality, scale)
+        self.last_seq = 0       # 最近一次拿到的源帧序号
+        self.last_sent = 0.0    # 最近一次拿到帧的 time.monotonic()
+        self.frames_sent = 0
+        self.frames_dropped = 0  # 因客户端慢 / max_fps 跳过的源帧数
+
+
+class _Variant:
+    """一个编码变体 (kind, quality, scale) 的缓存：只保存最新源帧的 JPEG。"""
+
+    __slots__ = ("key", "subscribers", "latest", "lock", "encodes",
+                 "pending", "pending_seq")
+
+    def __init__(self, key):
+        self.key = key
+        self.subscribers = 0
+        self.latest = (0, None)     # (seq, jpeg bytes)，整体替换保证读取一致
+        self.lock = threading.Lock()
+        self.encodes = 0
+        self.pending = None         # 正在编码的 asyncio.Future (异步路径去重)
+        self.pending_seq = 0
+
+
+class StreamHub:
+    """在 IndemindHandler 之上做编码扇出。
+
+    订阅者通过 subscribe() 登记，变体在第一个订阅者到来时创建、
+    最后一个订阅者离开时销毁，没人看的变体不会被编码。
+
+    异步路径 next_jpeg() 由 handler 的新帧回调唤醒 (不轮询、不 sleep)，
+    编码放到默认线程池执行，同一变体同一帧的并发请求共享一个编码任务。
+    可以同时被多个事件循环使用，每个循环各有自己的唤醒事件。
+    """
+
+    def __init__(self, handler):
+        self._handler = handler
+        self._lock = threading.Lock()
+        self._variants = {}   # (kind, quality, scale) -> _Variant
+        self._subscribers = set()
+        self._encode_count = 0
+        self._events = weakref.WeakKeyDictionary()   # 事件循环 -> 当前的新帧 asyncio.Event
+        self._events_lock = threading.Lock()
+        handler.add_frame_listener(self._on_frame)
+        handler.add_stop_listener(self._on_stop)
+
+    def subscribe(self, kind: str, quality: int = 80, scale: float = 1.0,
+                  max_fps: float | None = None) -> Subscriber:
+        """登记订阅。scale 取两位小数，参数相同的客户端共享同一变体。"""
+        if kind not in STREAM_KINDS:
+            raise ValueError(f"unknown stream kind: {kind}")
+        if not 1 <= quality <= 100:
+            raise ValueError(f"quality out of range: {quality}")
+        scale = round(float(scale), 2)
+        if not 0 < scale <= 1:
+            raise ValueError(f"scale out of range: {scale}")
+        if max_fps is not None and max_fps <= 0:
+            raise ValueError(f"max_fps must be positive: {max_fps}")
+        sub = Subscriber(kind, int(quality), scale, max_fps)
+        with self._lock:
+            variant = self._variants.get(sub.key)
+            if variant is None:
+                variant = self._variants[sub.key] = _Variant(sub.key)
+            variant.subscribers += 1
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subscribers.discard(sub)
+            variant = self._variants.get(sub.key)
+            if variant is None:
+                return
+            variant.subscribers -= 1
+            if variant.subscribers <= 0:
+                del self._variants[sub.key]
+
+    # ---------- 同步路径 ----------
+
+    def get_jpeg(self, sub: Subscriber) -> bytes | None:
+        """返回订阅者所在变体对最新源帧的 JPEG；同一源帧只编码一次。"""
+        snap = self._latest()
+        if snap is None:
+            return None
+        variant = self._variants.get(sub.key)
+        if variant is None:
+            return None
+
+        data = self._encode_variant(variant, snap)
+        self._delivered(sub, snap.seq)
+        return data
+
+    def _latest(self):
+        if not self._handler.is_running():
+            return None
+        return self._handler.get_snapshot()
+
+    def _encode_variant(self, variant: _Variant, snap) -> bytes:
+        with variant.lock:
+            seq, data = variant.latest
+            if seq != snap.seq:
+                kind, quality, scale = variant.key
+                data = self._handler.encode_jpeg(kind, snap, quality, scale)
+                variant.latest = (snap.seq, data)
+                variant.encodes += 1
+                with self._lock:
+                    self._encode_count += 1
+        return data
+
+    # ---------- 异步路径 ----------
+
+    async def next_jpeg(self, sub: Subscriber) -> bytes | None:
+        """等待比 sub.last_seq 更新的源帧，返回其 JPEG。
+
+        订阅者已拿到过的帧不会重复返回，也不会重复编码；设置了 max_fps 时
+        先等满最小间隔，再取届时最新的帧 (中间帧直接跳过)。
+        handler 未运行 (或等待期间被 stop) 或变体已被注销时返回 None，流据此结束。
+        """
+        if sub.min_interval:
+            wait = sub.last_sent + sub.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        snap = await self.wait_snapshot(sub.last_seq)
+        if snap is None:
+            return None
+
+        variant = self._variants.get(sub.key)
+        if variant is None:
+            return None
+
+        seq, data = variant.latest
+        if seq != snap.seq:
+            fut = variant.pending
+            loop = asyncio.get_running_loop()
+            if fut is None or variant.pending_seq != snap.seq or fut.get_loop() is not loop:
+                fut = loop.run_in_executor(None, self._encode_variant, variant, snap)
+                variant.pending, variant.pending_seq = fut, snap.seq
+            # shield: 单个客户端断开被取消时，不影响其他等待同一编码的订阅者
+            data = await asyncio.shield(fut)
+            if variant.pending is fut:
+                variant.pending = None
+
+        self._delivered(sub, snap.seq)
+        return data
+
+    @staticmethod
+    def _delivered(sub: Subscriber, seq: int):
+        """记录一次交付；与上次交付之间的源帧计为该客户端丢弃。"""
+        if sub.last_seq and seq > sub.last_seq + 1:
+            gap = seq - sub.last_seq - 1
+            sub.frames_dropped += gap
+            metrics.FRAMES_DROPPED.labels(sub.kind).inc(gap)
+        sub.last_seq = seq
+        sub.last_sent = time.monotonic()
+        sub.frames_sent += 1
+
+    async def wait_snapshot(self, after_seq: int):
+        """等待并返回 seq > after_seq 的最新快照 (由新帧回调唤醒)。
+
+        handler 未运行或等待期间被 stop (由停止回调唤醒) 时返回 None。
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            # 先拿事件再检查快照: 两步之间没有 await，唤醒不会漏掉
+            event = self._event(loop)
+            if not self._handler.is_running():
+                return None
+            snap = self._latest()
+            if snap is not None and snap.seq > after_seq:
+                return snap
+            await event.wait()
+
+    def _event(self, loop):
+        with self._events_lock:
+            event = self._events.get(loop)
+            if event is None:
+                event = self._events[loop] = asyncio.Event()
+            return event
+
+    def _on_frame(self, snap):
+        """handler 新帧回调 (采集线程)：每帧向每个用过本 hub 的事件循环各投递一次唤醒。"""
+        with self._events_lock:
+            loops = list(self._events)
+        for loop in loops:
+            if loop.is_closed():
+                continue
+            try:
+                loop.call_soon_threadsafe(self._wake, loop)
+            except RuntimeError:
+                pass
+
+    def _on_stop(self):
+        """handler 停止回调：唤醒所有等待者，让它们发现 handler 已停止。"""
+        self._on_frame(None)
+
+    def _wake(self, loop):
+        with self._events_lock:
+            event = self._events.get(loop)
+            self._events[loop] = asyncio.Event()
+        if event is not None:
+            event.set()
+
+    # ---------- 统计 ----------
+
+    def subscriber_count(self, kind: str | None = None) -> int:
+        with self._lock:
+            return sum(v.subscribers for v in self._variants.values()
+                       if kind is None or v.key[0] == kind)
+
+    def client_stats(self) -> list[dict]:
+        """每个订阅者的交付统计 (用于 /api/streams)。"""
+        with self._lock:
+            subs = list(self._subscribers)
+        return [{"kind": s.kind, "quality": s.quality, "scale": s.scale,
+                 "last_seq": s.last_seq, "frames_sent": s.frames_sent,
+                 "frames_dropped": s.frames_dropped} for s in subs]
+
+    def variant_keys(self) -> list:
+        with self._lock:
+            return sorted(self._variants)
+
+    @property
+    def encode_count(self) -> int:
+        return self._encode_count
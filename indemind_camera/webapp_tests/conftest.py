@@ -0,0 +1,21 @@
+"""webapp_tests 共用的 fixture。"""
+import time
+
+import pytest
+
+
+def _wait_seq(h, seq, timeout=2.0):
+    """等待采集线程发布到指定序号的快照。"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        snap = h.get_snapshot()
+        if snap is not None and snap.seq >= seq:
+            return snap
+        time.sleep(0.002)
+    raise AssertionError(f"snapshot seq {seq} not published")
+
+
+@pytest.fixture
+def wait_seq():
+    """wait_seq(handler, seq, timeout=2.0): 等到 handler 发布序号 >= seq 的快照并返回它。"""
+    return _wait_seq
@@ -0,0 +1,167 @@
+"""Tests for test/capture_worker.py — 用合成数据源跑真实的 worker 子进程 (无需相机)。"""
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from capture_worker import CaptureWorker, SyntheticSource
+from sdk_backend import open_sdk
+from shm_ring import ShmSdk, attach_segment, ring_name
+from webapp.indemind_handler import IndemindHandler
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def name():
+    return f"imsee_cw_{os.getpid()}_{next(_names)}"
+
+
+def _reader_proc(name, frames, out):
+    """另一个进程中的读者: 读 frames 帧，检查每帧所有像素一致 (没有半帧)。"""
+    sdk = ShmSdk(name)
+    if sdk.init() != 0:
+        out.put(("attach failed", 0))
+        return
+    seqs, torn = [], 0
+    while len(seqs) < frames:
+        depth = sdk.wait_frame("depth", timeout=2.0)
+        if depth is None:
+            break
+        if not (depth == depth.flat[0]).all():
+            torn += 1
+        seqs.append(depth.seq)
+    sdk.release()
+    out.put((seqs, torn))
+
+
+def test_synthetic_source_fills_with_seq():
+    src = SyntheticSource()
+    assert src.init(1, fps=200) == 0
+    got = src.wait_any(("frame", "depth", "imu", "detector"), timeout=1.0)
+    assert got["frame"].shape == (400, 1280) and (got["frame"] == 1).all()
+    assert got["depth"].seq == 1 and (got["depth"] == 1).all()
+    assert len(got["imu"]) == 5 and got["imu"]["timestamp"][-1] == got["imu"].timestamp
+    assert got["detector"]["x"][0] == 1
+    assert src.wait_any(("depth",), timeout=1.0)["depth"].seq == 2
+
+
+def test_worker_publishes_to_other_processes(name):
+    with CaptureWorker(name, "synthetic", kinds=("frame", "depth"), fps=100) as worker:
+        assert worker.wait_running()
+        ctx = multiprocessing.get_context("spawn")
+        out = ctx.Queue()
+        readers = [ctx.Process(target=_reader_proc, args=(name, 10, out)) for _ in range(2)]
+        for p in readers:
+            p.start()
+        results = [out.get(timeout=20) for _ in readers]
+        for p in readers:
+            p.join(5)
+        for seqs, torn in results:
+            assert len(seqs) == 10
+            assert seqs == sorted(set(seqs))
+            assert torn == 0
+        assert worker.stats()["oversize"] == {"frame": 0, "depth": 0}
+    with pytest.raises(FileNotFoundError):
+        attach_segment(name)
+    with pytest.raises(FileNotFoundError):
+        attach_segment(ring_name(name, "depth"))
+
+
+def test_worker_restarts_after_crash(name):
+    worker = CaptureWorker(name, "synthetic", kinds=("depth",), fps=100,
+                           source_options={"crash_after": 5})
+    worker.start()
+    sdk = ShmSdk(name)
+    try:
+        assert sdk.init() == 0
+        first_pid = worker.pid
+        deadline = time.monotonic() + 20
+        while worker.restarts < 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert worker.restarts >= 1
+        assert worker.pid != first_pid
+        # 读者不用重新挂载，序号跨重启继续递增
+        seqs = []
+        while len(seqs) < 8 and time.monotonic() < deadline:
+            depth = sdk.wait_frame("depth", timeout=1.0)
+            if depth is not None:
+                seqs.append(depth.seq)
+        assert seqs == sorted(set(seqs)) and seqs[-1] > 5
+        assert sdk.worker_status()["generation"] >= 2
+    finally:
+        sdk.release()
+        worker.stop()
+
+
+def test_worker_restarts_when_hung(name):
+    worker = CaptureWorker(name, "synthetic", kinds=("depth",), fps=100, hang_timeout=0.5)
+    worker.start()
+    try:
+        assert worker.wait_running()
+        os.kill(worker.pid, 19)          # SIGSTOP: 进程还在但心跳停了
+        deadline = time.monotonic() + 20
+        while worker.restarts < 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert worker.restarts == 1
+        assert worker.wait_running()
+    finally:
+        worker.stop()
+
+
+def test_worker_publishes_info_and_detector_image(name):
+    with CaptureWorker(name, "synthetic", kinds=("frame", "detector_image"), fps=100) as worker:
+        assert worker.wait_running()
+        sdk = ShmSdk(name)
+        assert sdk.init() == 0
+        try:
+            assert sdk.get_calibration()["width"] == 640
+            assert sdk.get_device_info_detailed()["name"] == "synthetic"
+            deadline = time.monotonic() + 5
+            image = None
+            while image is None and time.monotonic() < deadline:
+                sdk.wait_frame("frame", timeout=1.0)
+                image = sdk.get_detector_image()
+            assert image.shape == (400, 640, 3)
+            assert sdk.get_callback_count() >= image.seq
+            assert "detector" not in worker.stats()["heads"]
+        finally:
+            sdk.release()
+
+
+def test_unknown_kind_rejected():
+    with pytest.raises(ValueError):
+        CaptureWorker("x", kinds=("frame", "bogus"))
+
+
+def test_handler_reads_from_worker(name):
+    with CaptureWorker(name, "synthetic", kinds=("frame", "depth"), fps=50) as worker:
+        assert worker.wait_running()
+        h = IndemindHandler(sdk_factory=lambda: open_sdk("shm", name=name))
+        assert h.start()["success"] is True
+        try:
+            deadline = time.monotonic() + 5
+            # worker 先写 frame 环再写 depth 环: 第一张快照可能只有 frame，等到带深度的
+            snap = None
+            while (snap is None or snap.depth is None) and time.monotonic() < deadline:
+                time.sleep(0.01)
+                snap = h.get_snapshot()
+            assert snap is not None
+            assert snap.frame.shape == (400, 640)
+            assert snap.depth is not None and snap.depth.shape == (400, 640)
+            assert h.get_frame_jpeg() is not None
+        finally:
+            h.stop()
+
+
+def test_handler_start_fails_without_worker(name):
+    result = IndemindHandler(sdk_factory=lambda: open_sdk("shm", name=name)).start()
+    assert result["success"] is False
@@ -0,0 +1,72 @@
+"""Tests for OverlayCompositor — 与旧实现逐位一致，稳态无分配。"""
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from webapp.compositor import OverlayCompositor, _compose_reference
+
+
+def _inputs(cam_shape, depth_shape, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, cam_shape, dtype=np.uint8)
+    depth = rng.integers(0, 6000, depth_shape, dtype=np.uint16)
+    depth[rng.random(depth_shape) < 0.2] = 0
+    return frame, depth
+
+
+@pytest.mark.parametrize("cam_shape,depth_shape", [
+    ((400, 640), (400, 640)),
+    ((400, 640), (200, 320)),
+    ((800, 1280), (400, 640)),
+    ((101, 203), (77, 59)),
+])
+@pytest.mark.parametrize("alpha", [0.0, 0.5, 0.83])
+def test_compose_matches_reference(cam_shape, depth_shape, alpha):
+    frame, depth = _inputs(cam_shape, depth_shape)
+    out = OverlayCompositor().compose(frame, depth, alpha)
+    assert np.array_equal(out, _compose_reference(frame, depth, alpha))
+
+
+def test_compose_without_depth():
+    frame, _ = _inputs((40, 60), (40, 60))
+    comp = OverlayCompositor()
+    out = comp.compose(frame, None, 0.5)
+    assert out.shape == (40, 60, 3)
+    assert np.all(out[..., 0] == frame)
+    assert comp.center_mm == 0
+
+
+def test_center_distance_by_coordinate_scaling():
+    frame = np.zeros((400, 640), np.uint8)
+    depth = np.zeros((200, 320), np.uint16)
+    depth[100, 160] = 1234
+    depth[99:102, 159:162] = 1234   # 中值滤波后仍保留
+    comp = OverlayCompositor()
+    comp.compose(frame, depth, 0.5)
+    assert comp.center_mm == 1234
+
+
+def test_output_buffer_reused_per_resolution():
+    comp = OverlayCompositor()
+    f1, d1 = _inputs((40, 60), (20, 30), seed=1)
+    f2, d2 = _inputs((40, 60), (20, 30), seed=2)
+    a = comp.compose(f1, d1, 0.5)
+    b = comp.compose(f2, d2, 0.5)
+    assert a is b or np.shares_memory(a, b)
+    c = comp.compose(*_inputs((80, 120), (20, 30)), 0.5)
+    assert not np.shares_memory(b, c)
+
+
+def test_steady_state_allocates_no_frame_buffers():
+    frame, depth = _inputs((400, 640), (400, 640))
+    comp = OverlayCompositor()
+    comp.compose(frame, depth, 0.5)     # 预热: 分配缓冲 + 构建 LUT
+    tracemalloc.start()
+    try:
+        comp.compose(frame, depth, 0.5)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # 一帧 640x400 BGR = 768 KB；稳态峰值只允许少量 Python 小对象
+    assert peak < 64 * 1024, f"peak {peak} bytes"
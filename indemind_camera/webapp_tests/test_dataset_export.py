@@ -0,0 +1,123 @@
+"""Tests for test/dataset_export.py — EuRoC / TUM 导出 (会话与实时采集) 和标定参数换算 (无需相机)。"""
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from dataset_export import (EurocWriter, TumWriter, camera_models, export_live, export_session,
+                            to_ns)
+from session import Session, generate_synthetic
+from synthetic_sdk import SyntheticSdk
+
+SDK_CALIB = {
+    "baseline": 0.12,
+    "left": {"w": 640, "h": 400, "fx": 400.0, "fy": 401.0, "cx": 320.5, "cy": 199.5,
+             "k1": -0.1, "k2": 0.02, "t1": 0.001, "t2": -0.002,
+             "P": [390.0, 0, 318.0, 0, 0, 390.0, 201.0, 0, 0, 0, 1, 0]},
+    "right": {"w": 640, "h": 400, "fx": 402.0, "fy": 403.0, "cx": 321.0, "cy": 200.0,
+              "k1": -0.11, "k2": 0.021, "t1": 0.0, "t2": 0.0,
+              "P": [390.0, 0, 318.0, -46.8, 0, 390.0, 201.0, 0, 0, 0, 1, 0]},
+}
+
+
+@pytest.fixture(scope="module")
+def session_dir(tmp_path_factory):
+    return generate_synthetic(str(tmp_path_factory.mktemp("s")), seconds=0.4, size=(48, 30),
+                              kinds=("frame", "depth", "imu"))
+
+
+def _rows(path):
+    with open(path) as f:
+        return [line.rstrip("\n") for line in f if not line.startswith("#")]
+
+
+def test_euroc_layout(session_dir, tmp_path):
+    stats = export_session(session_dir, str(tmp_path), workers=1)
+    s = Session(session_dir)
+    root = tmp_path / "mav0"
+    assert stats["frames"] == {"frame": 10} and stats["imu_samples"] == len(s.imu) == 400
+    for cam, half in (("cam0", slice(0, 48)), ("cam1", slice(48, 96))):
+        rows = _rows(root / cam / "data.csv")
+        assert [r.split(",")[0] for r in rows] == [str(v) for v in to_ns(s.timestamps("frame"))]
+        for i, row in enumerate(rows):
+            png = cv2.imread(str(root / cam / "data" / row.split(",")[1]), cv2.IMREAD_UNCHANGED)
+            np.testing.assert_array_equal(png, s.read("frame", i)[:, half])
+    imu = _rows(root / "imu0" / "data.csv")
+    ns, *values = imu[1].split(",")
+    assert int(ns) == 1_000_000
+    np.testing.assert_allclose([float(v) for v in values],
+                               np.concatenate([s.imu["gyro"][1], s.imu["accel"][1]]), atol=1e-6)
+    yaml = (root / "cam1" / "sensor.yaml").read_text()
+    assert "resolution: [48, 30]" in yaml and "data: [1.0, 0.0, 0.0, 0.12," in yaml
+    intrinsics = yaml.split("intrinsics: [")[1].split("]")[0]
+    assert [float(v) for v in intrinsics.split(",")] == pytest.approx([38.4, 38.4, 24.0, 15.0])
+    assert "rate_hz: 1000" in (root / "imu0" / "sensor.yaml").read_text()
+
+
+def test_tum_layout(session_dir, tmp_path):
+    stats = export_session(session_dir, str(tmp_path), fmt="tum", start=0.1, end=0.2, workers=1)
+    assert stats["frames"] == {"frame": 3, "depth": 3} and stats["imu_samples"] == 101
+    s = Session(session_dir)
+    rows = _rows(tmp_path / "depth.txt")
+    assert rows[0] == "0.120000 depth/0.120000.png"
+    depth = cv2.imread(str(tmp_path / "depth" / "0.120000.png"), cv2.IMREAD_UNCHANGED)
+    assert depth.dtype == np.uint16
+    np.testing.assert_array_equal(depth, s.read("depth", 3) * 5)
+    rgb = cv2.imread(str(tmp_path / _rows(tmp_path / "rgb.txt")[0].split()[1]),
+                     cv2.IMREAD_UNCHANGED)
+    assert rgb.shape == (30, 48)
+    assert _rows(tmp_path / "accelerometer.txt")[0] == "0.100000 0.000000 0.000000 9.810000"
+    calib = [float(v) for v in _rows(tmp_path / "calibration.txt")[0].split()]
+    assert calib == pytest.approx([38.4, 38.4, 24.0, 15.0, 0.0, 0.0, 0.0, 0.0, 0.12])
+
+
+def test_tum_depth_out_of_range_is_invalid(tmp_path):
+    with EurocWriter(str(tmp_path / "e"), workers=1) as w:
+        assert not w.write_depth(0.0, np.zeros((2, 2), np.uint16))    # EuRoC 没有深度
+    with TumWriter(str(tmp_path), workers=1) as w:
+        w.write_depth(1.0, np.array([[1000, 13107, 13108, 0]], np.uint16))
+    depth = cv2.imread(str(tmp_path / "depth" / "1.000000.png"), cv2.IMREAD_UNCHANGED)
+    assert depth.tolist() == [[5000, 65535, 0, 0]]
+
+
+def test_camera_models():
+    (left, right), baseline = camera_models(SDK_CALIB, 1280, 800)
+    assert baseline == 0.12
+    assert left["intrinsics"] == [800.0, 802.0, 641.0, 399.0]
+    assert left["distortion"] == [-0.1, 0.02, 0.001, -0.002]
+    assert right["intrinsics"][0] == 804.0
+    (left, right), _ = camera_models(SDK_CALIB, 640, 400, rectified=True)
+    assert left["intrinsics"] == right["intrinsics"] == [390.0, 390.0, 318.0, 201.0]
+    assert left["distortion"] == [0.0] * 4
+    assert camera_models({}, 640, 400) == ([None, None], 0.0)
+
+
+def test_non_blocking_writer_drops_and_keeps_index_consistent(tmp_path):
+    frame = np.zeros((30, 96), np.uint8)
+    with EurocWriter(str(tmp_path), workers=1, max_pending=0, block=False) as w:
+        for i in range(5):
+            assert not w.write_frame(i * 0.04, frame)
+    stats = w.stats()
+    assert stats["dropped"] == {"frame": 5} and stats["frames"] == {}
+    assert _rows(tmp_path / "mav0" / "cam0" / "data.csv") == []
+    assert os.listdir(tmp_path / "mav0" / "cam0" / "data") == []
+
+
+def test_export_live_synthetic(tmp_path):
+    sdk = SyntheticSdk(fps=40, size=(32, 20), imu_rate=500)
+    sdk.init()
+    sdk.enable_imu()
+    stats = export_live(sdk, str(tmp_path), 0.5, fps=40, workers=1, max_pending=64)
+    sdk.release()
+    rows = _rows(tmp_path / "mav0" / "cam0" / "data.csv")
+    assert len(rows) == stats["frames"]["frame"] > 0 and not stats["dropped"]
+    assert len(os.listdir(tmp_path / "mav0" / "cam1" / "data")) == len(rows)
+    assert len(_rows(tmp_path / "mav0" / "imu0" / "data.csv")) == stats["imu_samples"] > 0
+    assert "resolution: [32, 20]" in (tmp_path / "mav0" / "cam0" / "sensor.yaml").read_text()
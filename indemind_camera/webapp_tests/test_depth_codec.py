@@ -0,0 +1,126 @@
+"""Tests for test/depth_codec.py — RVL 无损深度编码 / 时间差分 / 会话与 WebSocket 帧格式接入。"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from depth_codec import (DELTA_RUNS, HEADER, TEMPORAL, DepthDecoder, DepthEncoder, _vle_decode,
+                         _vle_encode, decode, encode)
+from session import Session, SessionWriter
+from synthetic_sdk import SyntheticScene
+from webapp.binary_frame import pack_frame, unpack_frame
+
+
+def _scene_depths(n=5, size=(160, 100)):
+    scene = SyntheticScene(*size, fps=25)
+    return [scene.render(i, {"depth"})["depth"].copy() for i in range(n)]
+
+
+def _flags(data):
+    return HEADER.unpack_from(data)[1]
+
+
+def test_vle_roundtrip():
+    values = np.array([0, 1, 7, 8, 63, 64, 511, 512, 2 ** 20, 2 ** 32 - 1, 3], np.int64)
+    assert _vle_decode(_vle_encode(values), len(values)).tolist() == values.tolist()
+    assert _vle_encode(np.array([5, 6])) == bytes([5 | 6 << 4])     # 一个数一个 nibble
+    assert _vle_decode(b"", 0).size == 0
+    with pytest.raises(ValueError):
+        _vle_decode(_vle_encode(values)[:3], len(values))
+
+
+@pytest.mark.parametrize("depth", [
+    np.zeros((4, 5), np.uint16),
+    np.full((4, 5), 65535, np.uint16),
+    np.arange(20, dtype=np.uint16).reshape(4, 5),
+    np.array([[0, 65535, 0, 1, 65535]], np.uint16),
+    np.zeros((0, 7), np.uint16),
+])
+def test_roundtrip_edge_cases(depth):
+    np.testing.assert_array_equal(decode(encode(depth)), depth)
+
+
+def test_roundtrip_noise_and_scene():
+    rng = np.random.default_rng(1)
+    noisy = rng.integers(0, 65536, (37, 53), dtype=np.uint16)
+    noisy[rng.random(noisy.shape) < 0.2] = 0
+    data = encode(noisy)
+    assert not _flags(data) & DELTA_RUNS          # 没有相同的相邻值: 不用差值游程
+    np.testing.assert_array_equal(decode(data), noisy)
+    for depth in _scene_depths():
+        data = encode(depth)
+        assert _flags(data) & DELTA_RUNS
+        assert len(data) < depth.nbytes / 20
+        np.testing.assert_array_equal(decode(data), depth)
+    np.testing.assert_array_equal(decode(encode(depth[:, ::3])), depth[:, ::3])   # 非连续输入
+
+
+def test_rejects_bad_input():
+    with pytest.raises(ValueError):
+        encode(np.zeros((4, 4), np.uint8))
+    with pytest.raises(ValueError):
+        decode(b"XXXX" + bytes(HEADER.size))
+    depth = _scene_depths(1)[0]
+    data = encode(depth, depth)
+    with pytest.raises(ValueError):
+        decode(data)                              # 时间差分帧缺上一帧
+    with pytest.raises(ValueError):
+        encode(depth, depth[:10])
+
+
+def test_temporal_delta():
+    a = _scene_depths(1)[0]
+    b = a.copy()
+    b[10:20, 10:20] += 7
+    b[0, :5] = 0
+    data = encode(b, a)
+    assert _flags(data) & TEMPORAL and len(data) < len(encode(b))
+    np.testing.assert_array_equal(decode(data, a), b)
+
+
+def test_stream_encoder_keyframes_and_fallback():
+    static = _scene_depths(1)[0]
+    enc, dec = DepthEncoder(keyframe_interval=4), DepthDecoder()
+    out = [enc.encode(static) for _ in range(6)]
+    assert [bool(_flags(d) & TEMPORAL) for d in out] == [False, True, True, True, False, True]
+    assert len(out[1]) < len(out[0]) / 10
+    for data in out:
+        np.testing.assert_array_equal(dec.decode(data), static)
+
+    moving = _scene_depths(8)             # 物体在动: 差分不划算时退回独立帧，且本周期内不再尝试
+    enc, dec = DepthEncoder(keyframe_interval=100), DepthDecoder()
+    for depth in moving:
+        np.testing.assert_array_equal(dec.decode(enc.encode(depth)), depth)
+    enc.reset()
+    assert not _flags(enc.encode(moving[0])) & TEMPORAL
+
+
+def test_session_rvl_codec(tmp_path):
+    depths = _scene_depths(3)
+    with SessionWriter(str(tmp_path), codecs={"depth": "rvl"}) as w:
+        for i, depth in enumerate(depths):
+            w.write("depth", depth, i * 0.04)
+    s = Session(str(tmp_path))
+    assert s.streams["depth"]["codec"] == "rvl"
+    assert s.index["depth"]["nbytes"].sum() < sum(d.nbytes for d in depths) / 20
+    for i, depth in enumerate(depths):
+        np.testing.assert_array_equal(s.read("depth", i), depth)
+    with pytest.raises(ValueError):
+        SessionWriter(str(tmp_path / "x"), codecs={"frame": "rvl"})
+
+
+def test_binary_frame_rvl():
+    enc, dec = DepthEncoder(), DepthDecoder()
+    for i, depth in enumerate(_scene_depths(3)):
+        data = pack_frame(i + 1, 0.5, depth, enc)
+        seq, ts, out = unpack_frame(data, dec)
+        assert (seq, ts) == (i + 1, 0.5)
+        np.testing.assert_array_equal(out, depth)
+    with pytest.raises(ValueError):
+        unpack_frame(data)                        # RVL 帧需要 decoder
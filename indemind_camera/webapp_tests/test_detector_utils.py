@@ -0,0 +1,71 @@
+"""Tests for test/detector_utils.py — 检测框结构化数组的向量化过滤 / 去重。"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from detector_utils import (DET_DTYPE, class_names, dedup, filter_classes, filter_score,
+                            iou_matrix, make_boxes, to_dicts)
+
+
+@pytest.fixture
+def boxes():
+    return make_boxes([
+        (0, 0, 10, 10, 1, 0.9),      # PERSON
+        (1, 1, 10, 10, 1, 0.8),      # 与上一个重叠 (IoU ~0.68)
+        (50, 50, 10, 10, 1, 0.7),    # 不重叠
+        (0, 0, 10, 10, 3, 0.6),      # PET_DOG，与第一个完全重合但类别不同
+        (200, 200, 5, 5, 42, 0.1),   # 未知类别
+    ])
+
+
+def test_dtype_matches_c_struct():
+    assert DET_DTYPE.itemsize == 24   # struct DetBox: int x4 + float + int
+    assert [DET_DTYPE.fields[k][1] for k in ("x", "score", "class_id")] == [0, 16, 20]
+
+
+def test_filter_classes_and_score(boxes):
+    assert filter_classes(boxes, {1}).tolist() == boxes[:3].tolist()
+    assert filter_classes(boxes, [3, 42])["class_id"].tolist() == [3, 42]
+    assert filter_score(boxes, 0.65)["score"].tolist() == pytest.approx([0.9, 0.8, 0.7])
+    assert len(filter_score(boxes[:0], 0.5)) == 0
+
+
+def test_iou_matrix(boxes):
+    iou = iou_matrix(boxes[:3], boxes[:3])
+    assert iou.shape == (3, 3)
+    np.testing.assert_allclose(np.diag(iou), 1.0)
+    assert iou[0, 1] == pytest.approx(81 / 119)
+    assert iou[0, 2] == 0
+    zero = make_boxes([(0, 0, 0, 0, 1, 0.5)])
+    assert iou_matrix(zero, zero)[0, 0] == 0   # 零面积不除零
+
+
+def test_dedup_per_class(boxes):
+    kept = dedup(boxes, iou_threshold=0.5)
+    assert kept["score"].tolist() == pytest.approx([0.9, 0.7, 0.6, 0.1])
+
+
+def test_dedup_across_classes(boxes):
+    kept = dedup(boxes, iou_threshold=0.5, per_class=False)
+    assert kept["score"].tolist() == pytest.approx([0.9, 0.7, 0.1])
+
+
+def test_dedup_threshold_and_small_inputs(boxes):
+    assert len(dedup(boxes, iou_threshold=0.99)) == len(boxes)
+    assert len(dedup(boxes[:1])) == 1
+    assert len(dedup(boxes[:0])) == 0
+
+
+def test_class_names_and_dicts(boxes):
+    assert class_names(boxes) == ["PERSON", "PERSON", "PERSON", "PET_DOG", "UNKNOWN"]
+    d = to_dicts(boxes[:1])
+    assert d == [{"x": 0, "y": 0, "w": 10, "h": 10, "class_id": 1,
+                  "class_name": "PERSON", "score": pytest.approx(0.9)}]
+    assert all(type(v) in (int, float, str) for v in d[0].values())
@@ -0,0 +1,149 @@
+"""Tests for test/frame_pool.py and ImseeSdk.lease() — 通过 FakeImseeLib 运行，无需相机。"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from fake_sdk import FakeImseeLib
+from frame_pool import FramePool
+from imsee_sdk import ImseeSdk
+
+
+@pytest.fixture
+def sdk():
+    lib = FakeImseeLib()
+    s = ImseeSdk(lib=lib, pool_size=2)
+    s.init()
+    return lib, s
+
+
+def _frame(value, shape=(20, 64)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+# ============================================================
+# FramePool
+# ============================================================
+
+def test_pool_never_hands_out_held_buffer():
+    pool = FramePool((4, 4), np.uint16, size=2)
+    a, b = pool.acquire(), pool.acquire()
+    c = pool.acquire()   # 全部被持有: 新分配，而不是复用 a/b
+    bufs = {id(x.buffer) for x in (a, b, c)}
+    assert len(bufs) == 3
+    assert pool.allocations == 3
+    assert pool.outstanding == 3
+
+
+def test_pool_reuses_released_buffers_in_order():
+    pool = FramePool((4, 4), np.uint8, size=2)
+    a = pool.acquire()
+    first = a.buffer
+    a.release()
+    a.release()   # 重复释放无副作用
+    assert pool.outstanding == 0
+    b = pool.acquire()
+    c = pool.acquire()
+    assert c.buffer is first   # 最早归还的最后才被复用 (环)
+    assert b.buffer is not first
+    assert pool.allocations == 2
+
+
+def test_lease_context_manager_releases():
+    pool = FramePool((2, 3), np.float32, size=1)
+    lease = pool.acquire()
+    with lease as arr:
+        assert arr.shape == (2, 3)
+        assert pool.outstanding == 1
+    assert lease.released
+    assert lease.array is None
+    assert pool.outstanding == 0
+
+
+def test_pool_rejects_empty():
+    with pytest.raises(ValueError):
+        FramePool((2, 2), np.uint8, size=0)
+
+
+# ============================================================
+# ImseeSdk
+# ============================================================
+
+def test_get_frame_aliases_previous_result(sdk):
+    """复现旧问题: get_frame() 返回内部缓冲的视图，下一帧会悄悄改写调用方手里的数组。"""
+    lib, s = sdk
+    lib.push("frame", _frame(1))
+    held = s.get_frame()
+    assert np.all(held == 1)
+
+    lib.push("frame", _frame(2))
+    s.get_frame()
+    assert np.all(held == 2)   # 持有者看到的帧被覆盖了
+
+
+def test_lease_is_not_overwritten_while_held(sdk):
+    lib, s = sdk
+    leases = []
+    for i in range(5):   # 多于池大小
+        lib.push("frame", _frame(i))
+        leases.append(s.lease("frame"))
+    for i, lease in enumerate(leases):
+        assert np.all(lease.array == i)
+    assert s.pool_stats()["frame"] == (5, 5)
+    for lease in leases:
+        lease.release()
+    assert s.pool_stats()["frame"] == (5, 0)
+
+
+def test_lease_steady_state_does_not_allocate(sdk):
+    lib, s = sdk
+    for i in range(20):
+        lib.push("depth", np.full((10, 16), i, np.uint16))
+        with s.lease("depth") as depth:
+            assert depth.dtype == np.uint16
+            assert depth[0, 0] == i
+    assert s._pools["depth"].allocations == 2
+
+
+def test_lease_returns_none_without_new_data(sdk):
+    lib, s = sdk
+    assert s.lease("depth") is None
+    lib.push("depth", np.ones((4, 4), np.uint16))
+    lease = s.lease("depth")
+    lease.release()
+    assert s.lease("depth") is None   # 同一帧只返回一次
+    assert s.pool_stats()["depth"] == (2, 0)
+
+
+def test_lease_kinds_shapes(sdk):
+    lib, s = sdk
+    lib.push("disparity", np.full((6, 8), 1.5, np.float32))
+    lib.push("rectified", _frame(7, (6, 16)))
+    lib.push("points", np.arange(30, dtype=np.float32).reshape(10, 3))
+    lib.push("detector_image", np.zeros((6, 8, 3), np.uint8))
+    expected = {"disparity": ((6, 8), np.float32), "rectified": ((6, 16), np.uint8),
+                "points": ((10, 3), np.float32), "detector_image": ((6, 8, 3), np.uint8)}
+    for kind, (shape, dtype) in expected.items():
+        with s.lease(kind) as arr:
+            assert arr.shape == shape, kind
+            assert arr.dtype == dtype, kind
+    with pytest.raises(ValueError):
+        s.lease("imu")
+
+
+def test_lease_pool_follows_resolution_change(sdk):
+    lib, s = sdk
+    lib.push("frame", _frame(1, (20, 64)))
+    old = s.lease("frame")
+    lib.push("frame", _frame(2, (40, 128)))
+    with s.lease("frame") as arr:
+        assert arr.shape == (40, 128)
+    assert np.all(old.array == 1)
+    old.release()   # 归还给已被替换的旧池，不影响新池
+    assert s.pool_stats()["frame"] == (2, 0)
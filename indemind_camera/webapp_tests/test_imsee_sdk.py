@@ -0,0 +1,493 @@
+"""Tests for test/imsee_sdk.py — 通过 FakeImseeLib 驱动 ctypes 层，无需相机。"""
+import os
+import statistics
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from fake_sdk import FakeImseeLib
+from imsee_sdk import BoxList, Bundle, ImseeSdk, SdkArray
+from detector_utils import DET_DTYPE, make_boxes
+from imu_stream import IMU_DTYPE, ImuGapDetector, as_columns
+
+
+@pytest.fixture
+def sdk():
+    lib = FakeImseeLib()
+    s = ImseeSdk(lib=lib)
+    s.init()
+    return lib, s
+
+
+# ============================================================
+# Sequence numbers / sensor timestamps
+# ============================================================
+
+def test_products_carry_seq_and_timestamp(sdk):
+    lib, s = sdk
+    lib.push("depth", np.ones((4, 6), np.uint16), timestamp=12.5)
+    depth = s.get_depth()
+    assert isinstance(depth, SdkArray)
+    assert depth.seq == 1
+    assert depth.timestamp == 12.5
+
+    lib.push("depth", np.ones((4, 6), np.uint16), timestamp=12.54)
+    assert s.get_depth().seq == 2
+
+
+@pytest.mark.parametrize("kind,getter,shape,dtype", [
+    ("frame", "get_frame", (4, 12), np.uint8),
+    ("disparity", "get_disparity", (4, 6), np.float32),
+    ("rectified", "get_rectified", (4, 12), np.uint8),
+    ("points", "get_points", (8, 3), np.float32),
+    ("detector_image", "get_detector_image", (4, 6, 3), np.uint8),
+])
+def test_every_product_has_metadata(sdk, kind, getter, shape, dtype):
+    lib, s = sdk
+    for i in range(3):
+        lib.push(kind, np.zeros(shape, dtype), timestamp=100.0 + i)
+    arr = getattr(s, getter)()
+    assert arr.shape == shape
+    assert (arr.seq, arr.timestamp) == (3, 102.0)
+
+
+def test_seq_query_does_not_consume(sdk):
+    lib, s = sdk
+    assert s.get_seq("frame") == 0
+    lib.push("frame", np.zeros((4, 12), np.uint8))
+    lib.push("frame", np.zeros((4, 12), np.uint8))
+    assert s.get_seq("frame") == 2
+    assert s.get_seq("depth") == 0
+    frame = s.get_frame()   # 仍然能取到
+    assert frame.seq == 2
+    # 调用方据此跳过: 序号没变就不取
+    assert s.get_seq("frame") == frame.seq
+    assert s.get_frame() is None
+
+
+def test_metadata_survives_slicing(sdk):
+    lib, s = sdk
+    lib.push("frame", np.zeros((4, 12), np.uint8), timestamp=7.0)
+    left = s.get_frame()[:, :6]
+    assert (left.seq, left.timestamp) == (1, 7.0)
+    assert isinstance(left.copy(), SdkArray)
+
+
+def test_lease_carries_metadata(sdk):
+    lib, s = sdk
+    lib.push("depth", np.ones((4, 6), np.uint16), timestamp=3.25)
+    with s.lease("depth") as _:
+        pass
+    lib.push("depth", np.ones((4, 6), np.uint16), timestamp=3.29)
+    lease = s.lease("depth")
+    assert (lease.seq, lease.timestamp) == (2, 3.29)
+    lease.release()
+
+
+def test_detector_boxes_is_structured_array(sdk):
+    lib, s = sdk
+    boxes = s.get_detector_boxes()
+    assert boxes.dtype == DET_DTYPE
+    assert len(boxes) == 0
+    assert boxes.seq == 0
+
+    lib.push("detector", make_boxes([(1, 2, 3, 4, 1, 0.9), (5, 6, 7, 8, 3, 0.25)]),
+             timestamp=4.5)
+    boxes = s.get_detector_boxes()
+    assert (boxes.seq, boxes.timestamp) == (1, 4.5)
+    assert boxes["x"].tolist() == [1, 5]
+    assert boxes["class_id"].tolist() == [1, 3]
+    np.testing.assert_allclose(boxes["score"], [0.9, 0.25])
+    assert len(s.get_detector_boxes()) == 0   # 同一结果只返回一次
+
+
+def test_detector_empty_result_still_has_seq(sdk):
+    lib, s = sdk
+    lib.push("detector", make_boxes([]))
+    boxes = s.get_detector_boxes()
+    assert len(boxes) == 0 and boxes.seq == 1
+
+
+def test_detector_boxes_as_dicts(sdk):
+    lib, s = sdk
+    lib.push("detector", make_boxes([(1, 2, 3, 4, 1, 0.5)]))
+    boxes = s.get_detector_boxes(as_dicts=True)
+    assert isinstance(boxes, BoxList)
+    assert boxes.seq == 1
+    assert boxes == [{"x": 1, "y": 2, "w": 3, "h": 4, "class_id": 1,
+                      "class_name": "PERSON", "score": 0.5}]
+
+
+def test_detector_larger_max_boxes_grows_buffer(sdk):
+    """旧实现按第一次的 max_boxes 分配缓冲，之后更大的 max_boxes 会写越界。"""
+    lib, s = sdk
+    rows = [(i, i, 10, 10, 1, 0.5) for i in range(200)]
+    lib.push("detector", make_boxes(rows))
+    assert len(s.get_detector_boxes(max_boxes=4)) == 4
+    lib.push("detector", make_boxes(rows))
+    boxes = s.get_detector_boxes(max_boxes=256)
+    assert len(boxes) == 200
+    assert boxes["x"].tolist() == list(range(200))
+
+
+# ============================================================
+# Blocking wait (wait_frame / wait_any)
+# ============================================================
+
+def _push_later(lib, kind, array, delay=0.05):
+    t = threading.Timer(delay, lib.push, (kind, array))
+    t.start()
+    return t
+
+
+def test_wait_frame_returns_new_frame(sdk):
+    lib, s = sdk
+    t = _push_later(lib, "depth", np.full((4, 6), 9, np.uint16))
+    depth = s.wait_frame("depth", timeout=2.0)
+    t.join()
+    assert depth is not None
+    assert depth.seq == 1
+    assert depth[0, 0] == 9
+
+
+def test_wait_frame_times_out(sdk):
+    lib, s = sdk
+    t0 = time.monotonic()
+    assert s.wait_frame("frame", timeout=0.05) is None
+    assert 0.04 <= time.monotonic() - t0 < 1.0
+
+
+def test_wait_frame_skips_already_seen(sdk):
+    lib, s = sdk
+    lib.push("frame", np.zeros((4, 12), np.uint8))
+    assert s.wait_frame("frame", timeout=0).seq == 1   # 已有未取的新帧: 立即返回
+    assert s.wait_frame("frame", timeout=0.02) is None  # 不会重复返回同一帧
+    assert s.get_seq("frame") == 1
+
+
+def test_wait_any_returns_every_ready_kind(sdk):
+    lib, s = sdk
+    lib.push("frame", np.zeros((4, 12), np.uint8))
+    lib.push("depth", np.ones((4, 6), np.uint16))
+    got = s.wait_any(("frame", "depth", "disparity"), timeout=0.5)
+    assert set(got) == {"frame", "depth"}
+
+    t = _push_later(lib, "disparity", np.ones((4, 6), np.float32))
+    got = s.wait_any(("frame", "depth", "disparity"), timeout=2.0)
+    t.join()
+    assert set(got) == {"disparity"}
+
+
+def test_wait_any_rejects_unknown_kind(sdk):
+    _, s = sdk
+    with pytest.raises(ValueError):
+        s.wait_any(("frame", "bogus"))
+
+
+def test_wait_imu(sdk):
+    lib, s = sdk
+    t = _push_later(lib, "imu", np.arange(14, dtype=np.float64).reshape(2, 7))
+    imu = s.wait_frame("imu", timeout=2.0)
+    t.join()
+    assert len(imu) == 2
+    assert imu.dtype == IMU_DTYPE
+    assert s.wait_frame("imu", timeout=0.02) is None
+
+
+def test_release_wakes_waiters(sdk):
+    lib, s = sdk
+    result = []
+    t = threading.Thread(target=lambda: result.append(s.wait_frame("depth", timeout=None)))
+    t.start()
+    time.sleep(0.05)
+    s.release()
+    t.join(2.0)
+    assert not t.is_alive()
+    assert result == [None]
+
+
+def test_wait_frame_latency_at_fixed_rate(sdk):
+    """固定 50 fps 推帧，端到端 (push -> wait_frame 返回) 延迟应远小于旧的 30ms 轮询间隔。"""
+    lib, s = sdk
+    stop = lib.start_stream(50, kinds=("depth",))
+    latencies, seqs = [], []
+    try:
+        while len(latencies) < 30:
+            depth = s.wait_frame("depth", timeout=1.0)
+            assert depth is not None
+            latencies.append(time.perf_counter() - lib.push_times[("depth", depth.seq)])
+            seqs.append(depth.seq)
+    finally:
+        stop()
+    assert seqs == sorted(set(seqs))   # 没有重复帧
+    assert statistics.median(latencies) < 0.005
+
+
+# ============================================================
+# Bundle fetch
+# ============================================================
+
+def _imu(*timestamps):
+    samples = np.zeros((len(timestamps), 7))
+    samples[:, 0] = timestamps
+    return samples
+
+
+def test_bundle_returns_frame_depth_and_imu_window(sdk):
+    lib, s = sdk
+    lib.push("imu", _imu(0.99, 1.0))
+    lib.push("frame", np.full((4, 12), 1, np.uint8), timestamp=1.0)
+    lib.push("imu", _imu(1.01, 1.02, 1.03, 1.04))
+    lib.push("frame", np.full((4, 12), 2, np.uint8), timestamp=1.04)
+    lib.push("depth", np.full((4, 6), 700, np.uint16), timestamp=1.04)
+    lib.push("imu", _imu(1.05))   # 晚于当前帧，留给下一次
+
+    b = s.get_bundle()
+    assert isinstance(b, Bundle)
+    assert b.frame.shape == (4, 12) and b.frame[0, 0] == 2
+    assert (b.frame.seq, b.frame.timestamp) == (2, 1.04)
+    assert b.depth.shape == (4, 6) and b.depth[0, 0] == 700
+    # 首次调用: 相邻两帧 (1.0, 1.04] 之间的样本
+    np.testing.assert_allclose(b.imu["timestamp"], [1.01, 1.02, 1.03, 1.04])
+
+    lib.push("frame", np.zeros((4, 12), np.uint8), timestamp=1.08)
+    b = s.get_bundle()
+    assert b.depth is None          # 没有新深度
+    np.testing.assert_allclose(b.imu["timestamp"], [1.05])   # 接着上一次的窗口，不丢不重
+
+
+def test_bundle_is_one_call_and_caches_dims(sdk):
+    lib, s = sdk
+    for i in range(5):
+        lib.push("frame", np.zeros((4, 12), np.uint8), timestamp=float(i))
+        lib.push("depth", np.zeros((4, 6), np.uint16), timestamp=float(i))
+        s.get_bundle(("frame", "depth"))
+    # 首次调用尺寸未知，按返回的尺寸重试一次；之后每帧一次调用
+    assert lib.calls["bundle"] == 6
+    assert lib.calls["frame"] == lib.calls["depth"] == 0   # 没有走单路取数函数
+
+
+def test_bundle_follows_resolution_change(sdk):
+    lib, s = sdk
+    lib.push("depth", np.ones((4, 6), np.uint16))
+    assert s.get_bundle(("depth",)).depth.shape == (4, 6)
+    lib.push("depth", np.ones((8, 12), np.uint16))
+    assert s.get_bundle(("depth",)).depth.shape == (8, 12)
+    lib.push("depth", np.full((2, 3), 5, np.uint16))   # 变小: 旧缓冲够用，也要按新形状解读
+    depth = s.get_bundle(("depth",)).depth
+    assert depth.shape == (2, 3) and np.all(depth == 5)
+
+
+def test_bundle_imu_overflow_carries_over(sdk):
+    lib, s = sdk
+    lib.push("frame", np.zeros((4, 12), np.uint8), timestamp=0.0)
+    lib.push("imu", _imu(*np.arange(1, 11) / 100))
+    lib.push("frame", np.zeros((4, 12), np.uint8), timestamp=0.1)
+    first = s.get_bundle(("imu",), max_imu=4)
+    assert len(first.imu) == 4
+    second = s.get_bundle(("imu",), max_imu=100)
+    np.testing.assert_allclose(second.imu["timestamp"], np.arange(5, 11) / 100)
+
+
+def test_bundle_rejects_unknown_kind(sdk):
+    _, s = sdk
+    with pytest.raises(ValueError):
+        s.get_bundle(("frame", "points"))
+    with pytest.raises(ValueError):
+        s.get_bundle(("frame", "imu"), max_imu=0)
+    assert s.get_bundle(("frame",), max_imu=0).imu is None
+
+
+# ============================================================
+# History ring (init(history=N))
+# ============================================================
+
+@pytest.fixture
+def hist_sdk():
+    lib = FakeImseeLib()
+    s = ImseeSdk(lib=lib)
+    s.init(history=4)
+    return lib, s
+
+
+def test_history_disabled_by_default(sdk):
+    lib, s = sdk
+    lib.push("depth", np.ones((4, 6), np.uint16))
+    assert s.read_after("depth", 0) == ([], 0)
+    assert s.history_stats()["depth"]["depth"] == 0
+
+
+def test_read_after_returns_everything_in_order(hist_sdk):
+    lib, s = hist_sdk
+    for i in range(3):
+        lib.push("depth", np.full((4, 6), i, np.uint16), timestamp=10.0 + i)
+    items, overruns = s.read_after("depth", 0)
+    assert overruns == 0
+    assert [d.seq for d in items] == [1, 2, 3]
+    assert [d.timestamp for d in items] == [10.0, 11.0, 12.0]
+    assert [int(d[0, 0]) for d in items] == [0, 1, 2]
+    assert items[0].shape == (4, 6)
+
+    items, _ = s.read_after("depth", 2)
+    assert [d.seq for d in items] == [3]
+    assert s.read_after("depth", 3) == ([], 0)
+    # 历史读取不消耗 "最新一帧" (get_depth 仍能取到)
+    assert s.get_depth().seq == 3
+
+
+def test_cursor_reports_overruns(hist_sdk):
+    lib, s = hist_sdk
+    cur = s.cursor("frame")
+    lib.push("frame", np.zeros((4, 12), np.uint8))
+    assert [f.seq for f in cur.read()] == [1]
+    for i in range(7):   # 环深度 4: seq 2..4 被覆盖
+        lib.push("frame", np.full((4, 12), i, np.uint8))
+    frames = cur.read()
+    assert [f.seq for f in frames] == [5, 6, 7, 8]
+    assert cur.overruns == 3
+    assert cur.read() == []
+    assert cur.seq == 8
+
+
+def test_cursor_max_items(hist_sdk):
+    lib, s = hist_sdk
+    for _ in range(3):
+        lib.push("points", np.zeros((5, 3), np.float32))
+    cur = s.cursor("points")
+    assert [p.seq for p in cur.read(max_items=2)] == [1, 2]
+    assert [p.shape for p in cur.read()] == [(5, 3)]
+
+
+def test_history_follows_resolution_change(hist_sdk):
+    lib, s = hist_sdk
+    lib.push("detector_image", np.zeros((4, 6, 3), np.uint8))
+    lib.push("detector_image", np.ones((8, 12, 3), np.uint8))
+    lib.push("detector_image", np.full((2, 3, 3), 7, np.uint8))
+    items, _ = s.read_after("detector", 0)
+    assert [d.shape for d in items] == [(4, 6, 3), (8, 12, 3), (2, 3, 3)]
+    assert np.all(items[2] == 7)
+
+
+def test_history_skips_detector_results_without_image(hist_sdk):
+    lib, s = hist_sdk
+    lib.push("detector_image", np.zeros((4, 6, 3), np.uint8))
+    lib.push("detector", [])           # 只有检测框: seq 2 不进历史环
+    lib.push("detector_image", np.ones((4, 6, 3), np.uint8))
+    items, overruns = s.read_after("detector", 0)
+    assert [d.seq for d in items] == [1, 3] and overruns == 0
+    assert [d.seq for d in s.read_after("detector", 1)[0]] == [3]
+    lib.push("detector", [])
+    assert s.read_after("detector", 3) == ([], 0)
+
+
+def test_history_stats_reports_memory(hist_sdk):
+    lib, s = hist_sdk
+    for _ in range(6):
+        lib.push("disparity", np.zeros((4, 6), np.float32))
+    stats = s.history_stats()["disparity"]
+    assert stats == {"depth": 4, "oldest": 3, "newest": 6, "bytes": 4 * 4 * 6 * 4}
+    with pytest.raises(ValueError):
+        s.read_after("imu", 0)
+
+
+# ============================================================
+# IMU cursors (multi-reader, overflow, gaps)
+# ============================================================
+
+def _imu_at(start, count, period=0.001):
+    samples = np.zeros(count, IMU_DTYPE)
+    samples["timestamp"] = start + np.arange(count) * period
+    samples["accel"][:, 2] = 9.8
+    return samples
+
+
+def test_imu_dtype_matches_c_layout():
+    assert IMU_DTYPE.itemsize == 32   # struct ImuSample: double + float[3] + float[3]
+    assert IMU_DTYPE.fields["accel"][1] == 8
+    assert IMU_DTYPE.fields["gyro"][1] == 20
+
+
+def test_imu_readers_are_independent_and_lossless(sdk):
+    lib, s = sdk
+    recorder = s.imu_reader(from_oldest=True)
+    viewer = s.imu_reader(from_oldest=True)
+    lib.push("imu", _imu_at(0.0, 5))
+    assert len(recorder.read()) == 5
+    lib.push("imu", _imu_at(0.005, 3))
+    got = viewer.read()   # 不受 recorder 读取影响
+    assert len(got) == 8
+    np.testing.assert_allclose(np.diff(got["timestamp"]), 0.001)
+    assert len(recorder.read()) == 3
+    assert len(s.get_imu()) == 8   # get_imu 用的是第三个独立游标
+    assert recorder.dropped == viewer.dropped == 0
+
+
+def test_imu_reader_starts_at_now_by_default(sdk):
+    lib, s = sdk
+    lib.push("imu", _imu_at(0.0, 5))
+    reader = s.imu_reader()
+    assert len(reader.read()) == 0
+    lib.push("imu", _imu_at(0.005, 2))
+    assert list(reader.read()["timestamp"]) == pytest.approx([0.005, 0.006])
+
+
+def test_imu_reader_max_samples_keeps_remainder(sdk):
+    lib, s = sdk
+    reader = s.imu_reader(from_oldest=True, max_samples=4)
+    lib.push("imu", _imu_at(0.0, 10))
+    assert [len(reader.read()) for _ in range(4)] == [4, 4, 2, 0]
+    assert reader.dropped == 0
+
+
+def test_imu_overflow_is_counted_per_reader(sdk):
+    lib, s = sdk
+    assert s.set_imu_ring_size(16) == 0
+    assert s.get_imu_ring_size() == 16
+    fast = s.imu_reader(from_oldest=True)
+    slow = s.imu_reader(from_oldest=True)
+    for i in range(5):
+        lib.push("imu", _imu_at(i * 0.01, 10))
+        fast.read()
+    got = slow.read()
+    assert len(got) == 16                  # 只剩环里的最后 16 个
+    assert slow.dropped == 50 - 16
+    assert fast.dropped == 0
+    assert got["timestamp"][0] == pytest.approx(0.034)
+
+
+def test_imu_gap_detector():
+    gap = ImuGapDetector(period=0.001)
+    assert gap.update([0.0, 0.001, 0.002]) == 0
+    assert gap.update([0.006, 0.007]) == 1          # 跨批次的断档: 缺 3 个样本
+    assert gap.update(np.array([])) == 0
+    assert (gap.gaps, gap.missing) == (1, 3)
+    assert gap.max_gap == pytest.approx(0.004)
+
+
+def test_imu_reader_reports_timestamp_gaps(sdk):
+    lib, s = sdk
+    reader = s.imu_reader(from_oldest=True)
+    lib.push("imu", _imu_at(0.0, 10))
+    lib.push("imu", _imu_at(0.020, 10))   # 传感器侧丢了 10 个样本 (序号连续，只能靠时间戳发现)
+    reader.read()
+    stats = reader.stats()
+    assert stats["dropped"] == 0
+    assert (stats["gaps"], stats["missing"]) == (1, 10)
+
+
+def test_imu_as_columns_round_trip():
+    samples = _imu_at(1.0, 3)
+    samples["gyro"][:, 0] = [0.1, 0.2, 0.3]
+    cols = as_columns(samples)
+    assert cols.shape == (3, 7)
+    np.testing.assert_allclose(cols[:, 0], [1.0, 1.001, 1.002])
+    np.testing.assert_allclose(cols[:, 4], [0.1, 0.2, 0.3], rtol=1e-6)
+    np.testing.assert_allclose(cols[:, 3], 9.8, rtol=1e-6)
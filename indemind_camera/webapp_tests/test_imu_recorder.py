@@ -0,0 +1,141 @@
+"""Tests for test/imu_recorder.py — IMU 流式录制与向量化 CSV 导出。"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from imu_recorder import (CSV_HEADER, HEADER_SIZE, ImuRecorder, format_csv, format_csv_rows,
+                          iter_recording, load_recording, to_csv)
+from imu_stream import IMU_DTYPE, as_columns
+
+
+def _samples(n, start=0.0):
+    s = np.zeros(n, IMU_DTYPE)
+    s["timestamp"] = start + np.arange(n) * 0.001
+    s["accel"] = np.arange(n * 3, dtype=np.float32).reshape(n, 3) / 7
+    s["gyro"][:, 1] = -np.arange(n) / 1000
+    return s
+
+
+def _reference_csv(samples):
+    """旧 record_imu.py 的逐行格式。"""
+    return "".join(",".join(f"{v:.6f}" for v in row) + "\n" for row in as_columns(samples))
+
+
+def test_recorder_roundtrip_across_chunks(tmp_path):
+    path = str(tmp_path / "imu.npy")
+    s = _samples(1000)
+    with ImuRecorder(path, chunk_samples=64, sync_interval=0) as rec:
+        for i, n in enumerate((1, 63, 64, 200, 7, 665)):   # 跨块、整块直写、零头
+            start = sum((1, 63, 64, 200, 7, 665)[:i])
+            rec.write(s[start:start + n])
+        assert rec.count == 1000
+    np.testing.assert_array_equal(np.load(path), s)
+    np.testing.assert_array_equal(load_recording(path), s)
+    np.testing.assert_array_equal(load_recording(path, mmap=False), s)
+    assert os.path.getsize(path) == rec.bytes_written == HEADER_SIZE + 1000 * 32
+
+
+def test_recorder_memory_is_one_chunk(tmp_path):
+    rec = ImuRecorder(str(tmp_path / "imu.npy"), chunk_samples=128)
+    for i in range(50):
+        rec.write(_samples(100, i * 0.1))
+    assert rec._chunk.nbytes == 128 * 32
+    rec.close()
+    assert len(load_recording(rec.path)) == 5000
+
+
+def test_sync_updates_header(tmp_path):
+    path = str(tmp_path / "imu.npy")
+    rec = ImuRecorder(path, sync_interval=0)
+    rec.write(_samples(10))
+    assert len(np.load(path)) == 0          # 还在缓冲里
+    rec.sync()
+    assert len(np.load(path)) == 10
+    rec.write(_samples(5, 1.0))
+    rec.close()
+    assert len(np.load(path)) == 15
+    assert rec.syncs == 2
+
+
+def test_periodic_sync(tmp_path):
+    rec = ImuRecorder(str(tmp_path / "imu.npy"), sync_interval=0.5)
+    rec.write(_samples(3))
+    assert rec.syncs == 0
+    rec._last_sync -= 1.0
+    rec.write(_samples(3))
+    assert rec.syncs == 1
+    rec.close()
+
+
+def test_recover_after_crash(tmp_path):
+    """头部记录数没来得及回写 (进程崩溃) 时，按文件长度恢复完整样本，丢弃半个样本。"""
+    path = str(tmp_path / "imu.npy")
+    rec = ImuRecorder(path, chunk_samples=16, sync_interval=0)
+    rec.write(_samples(40))
+    rec._file.flush()     # 模拟崩溃: 两个整块已落盘，头部仍是 0
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 10)
+    got = load_recording(path)
+    assert len(got) == 32
+    np.testing.assert_array_equal(got, _samples(40)[:32])
+    assert sum(len(c) for c in iter_recording(path, 5)) == 32
+    rec._file.close()
+
+
+def test_rejects_other_npy(tmp_path):
+    path = str(tmp_path / "x.npy")
+    np.save(path, np.zeros(4))
+    with pytest.raises(ValueError):
+        load_recording(path)
+
+
+def test_csv_matches_fstring_format():
+    s = _samples(500, start=1.7e9)
+    edge = np.array([0.0, -0.0, 5e-7, -5e-7, 1.5e-6, 2.5e-6, -1e-9, 0.9999996, -9.9999999,
+                     123456.5, 0.125, 1e-300])
+    s["gyro"][:len(edge), 0] = edge
+    s["timestamp"][:len(edge)] = edge * 1000
+    assert format_csv_rows(s).decode() == _reference_csv(s)
+
+
+def test_csv_random_values_match():
+    rng = np.random.default_rng(3)
+    s = np.zeros(20000, IMU_DTYPE)
+    s["timestamp"] = 1e5 + np.cumsum(rng.random(len(s)) * 0.002)
+    s["accel"] = rng.normal(0, 30, (len(s), 3))
+    s["gyro"] = rng.normal(0, 1e-3, (len(s), 3))
+    assert format_csv_rows(s).decode() == _reference_csv(s)
+
+
+def test_csv_non_finite_falls_back():
+    s = _samples(3)
+    s["accel"][1, 0] = np.nan
+    s["gyro"][2, 2] = -np.inf
+    lines = format_csv_rows(s).decode().splitlines()
+    assert len(lines) == 3 and "nan" in lines[1] and "-inf" in lines[2]
+    assert format_csv_rows(np.zeros(0, IMU_DTYPE)) == b""
+
+
+def test_format_csv_integer_columns_and_separator():
+    ns = np.array([0, 1_700_000_000_123_456_789, -5, 2 ** 62], np.int64)   # 超过 2**53 也逐位精确
+    values = np.array([0.5, -1.25, 3.0, 1e-7])
+    out = format_csv([ns, values], [0, 2], sep=" ").decode()
+    assert out == "0 0.50\n1700000000123456789 -1.25\n-5 3.00\n4611686018427387904 0.00\n"
+    assert format_csv([values], 0).decode().splitlines() == ["0", "-1", "3", "0"]
+
+
+def test_to_csv_chunked(tmp_path):
+    path, csv_path = str(tmp_path / "imu.npy"), str(tmp_path / "imu.csv")
+    s = _samples(1234, start=42.0)
+    with ImuRecorder(path) as rec:
+        rec.write(s)
+    assert to_csv(path, csv_path, chunk_samples=100) == 1234
+    with open(csv_path) as f:
+        assert f.read() == CSV_HEADER + _reference_csv(s)
@@ -12,6 +12,8 @@ if _TEST_DIR not in sys.path:
 
 from webapp.indemind_handler import IndemindHandler
 from vis_utils import depth_to_color
+from fake_sdk import FakeImseeLib, FakeImseeSdk
+from imsee_sdk import ImseeSdk
 
 
 # ============================================================
@@ -122,6 +124,186 @@ def test_depth_to_color_far_blue():
     assert avg_b > avg_r, f"Far should be blue: B={avg_b} R={avg_r}"
 
 
+# ============================================================
+# Capture thread — scripted FakeImseeSdk, no camera needed
+# ============================================================
+
+def test_capture_thread_lifecycle():
+    sdk = FakeImseeSdk()
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    assert h.start()["success"] is True
+    assert h._thread is not None and h._thread.is_alive()
+    thread = h._thread
+    h.stop()
+    assert not thread.is_alive()
+    assert sdk.calls["release"] == 1
+    assert h.get_snapshot() is None
+
+
+def test_capture_publishes_left_half_snapshot(wait_seq):
+    sdk = FakeImseeSdk(width=64, height=40)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    h.start()
+    try:
+        frame = np.zeros((40, 128), dtype=np.uint8)
+        frame[:, 64:] = 255
+        sdk.push(frame)
+        snap = wait_seq(h, 1)
+        assert snap.frame.shape == (40, 64)
+        assert np.all(snap.frame == 0)
+        assert snap.depth.shape == (40, 64)
+        assert h.get_status()["resolution"] == "64x40"
+    finally:
+        h.stop()
+
+
+def test_snapshot_is_immutable_copy(wait_seq):
+    sdk = FakeImseeSdk(width=32, height=20)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    h.start()
+    try:
+        frame = np.full((20, 64), 10, dtype=np.uint8)
+        sdk.push(frame)
+        snap = wait_seq(h, 1)
+        frame[:] = 99  # SDK 复用自己的缓冲区
+        assert np.all(snap.frame == 10)
+        assert not snap.frame.flags.writeable
+        assert not snap.depth.flags.writeable
+        with pytest.raises(AttributeError):
+            snap.seq = 5
+    finally:
+        h.stop()
+
+
+def test_depth_kept_when_only_frame_arrives(wait_seq):
+    sdk = FakeImseeSdk(width=32, height=20)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    h.start()
+    try:
+        sdk.push()
+        first = wait_seq(h, 1)
+        with sdk._lock:
+            sdk._frame = np.zeros((20, 64), dtype=np.uint8)
+        second = wait_seq(h, 2)
+        assert second.depth is first.depth
+        assert (second.depth_seq, second.depth_timestamp) == (1, first.timestamp)
+        assert second.timestamp >= first.timestamp
+    finally:
+        h.stop()
+
+
+def test_snapshot_carries_sensor_timestamps(wait_seq):
+    lib = FakeImseeLib()
+    h = IndemindHandler(sdk_factory=lambda: ImseeSdk(lib=lib))
+    h.start()
+    try:
+        lib.push("depth", np.ones((20, 32), np.uint16), timestamp=12.25)
+        lib.push("frame", np.zeros((20, 64), np.uint8), timestamp=12.5)
+        first = wait_seq(h, 1)
+        assert (first.timestamp, first.depth_timestamp) == (12.5, 12.25)
+        lib.push("frame", np.zeros((20, 64), np.uint8), timestamp=12.54)
+        second = wait_seq(h, 2)
+        assert (second.timestamp, second.depth_timestamp) == (12.54, 12.25)
+    finally:
+        h.stop()
+
+
+def test_encode_depth_png_is_lossless_16bit(wait_seq):
+    import cv2
+    sdk = FakeImseeSdk(width=32, height=20)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    h.start()
+    try:
+        depth = np.arange(20 * 32, dtype=np.uint16).reshape(20, 32) * 97
+        sdk.push(depth=depth)
+        snap = wait_seq(h, 1)
+        png = h.encode_depth_png(snap)
+        out = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_UNCHANGED)
+        assert out.dtype == np.uint16
+        assert np.array_equal(out, depth)
+        half = cv2.imdecode(np.frombuffer(h.encode_depth_png(snap, 0.5), np.uint8),
+                            cv2.IMREAD_UNCHANGED)
+        assert half.shape == (10, 16)
+        assert np.isin(half, depth).all()   # 最近邻: 不产生新的距离值
+    finally:
+        h.stop()
+
+
+def test_capture_errors_are_counted_logged_and_reported(caplog, wait_seq):
+    import time
+    from webapp import metrics
+    sdk = FakeImseeSdk(width=32, height=20)
+    failing = {"on": True}
+    real_get_depth = sdk.get_depth
+
+    def get_depth():
+        if failing["on"]:
+            raise RuntimeError("usb gone")
+        return real_get_depth()
+
+    sdk.get_depth = get_depth
+    sdk_errors = metrics.CAPTURE_ERRORS.labels("sdk")
+    listener_errors = metrics.CAPTURE_ERRORS.labels("listener")
+    before = sdk_errors.value, listener_errors.value
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    h.add_frame_listener(lambda snap: 1 / 0)
+    with caplog.at_level("ERROR", logger="webapp.indemind_handler"):
+        h.start()
+        try:
+            for i in range(3):
+                sdk.push()
+                deadline = time.time() + 2
+                while h.get_status()["errors"] <= i:
+                    assert time.time() < deadline
+                    time.sleep(0.002)
+            status = h.get_status()
+            assert status["errors"] == 3 and status["last_error"] == "sdk: RuntimeError: usb gone"
+            assert h.get_snapshot() is None
+            failing["on"] = False
+            sdk.push()
+            wait_seq(h, 1)                        # 恢复后继续采集，回调异常不影响发布
+            assert h.get_status()["last_error"].startswith("listener: ZeroDivisionError")
+        finally:
+            h.stop()
+    assert sdk_errors.value - before[0] == 3 and listener_errors.value - before[1] == 1
+    records = [r for r in caplog.records if r.name == "webapp.indemind_handler"]
+    assert len(records) == 2                      # 每个 stage 限频: 各只记一次
+    assert records[0].exc_info is not None
+
+
+@pytest.mark.parametrize("clients", [1, 8])
+def test_sdk_calls_flat_with_client_count(clients, wait_seq):
+    """N 个客户端并发取 JPEG，SDK 取帧次数只取决于帧数，与 N 无关。"""
+    import threading
+    frames = 5
+    sdk = FakeImseeSdk(width=64, height=40)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    h.start()
+    try:
+        for i in range(1, frames + 1):
+            sdk.push()
+            wait_seq(h, i)
+            results = []
+
+            def client():
+                results.append(h.get_frame_jpeg())
+                results.append(h.get_overlay_jpeg())
+
+            threads = [threading.Thread(target=client) for _ in range(clients)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert all(r is not None and r[:2] == b'\xff\xd8' for r in results)
+
+        assert sdk.frames_served == frames
+        assert sdk.depths_served == frames
+        assert sdk.calls["get_depth"] == frames
+        assert h._frame_count == frames
+    finally:
+        h.stop()
+
+
 # ============================================================
 # Camera-required tests (skip without hardware)
 # ============================================================
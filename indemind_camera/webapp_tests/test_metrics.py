@@ -0,0 +1,146 @@
+"""Tests for webapp/metrics.py and /metrics — 文本格式 + 真实路径埋点，无需相机。"""
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from fake_sdk import FakeImseeSdk
+from webapp import metrics
+from webapp.indemind_handler import IndemindHandler
+from webapp.stream_hub import StreamHub
+
+
+def _sample(text, name, **labels):
+    """从导出文本中取一个样本值 (不存在返回 None)。"""
+    want = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    pattern = "^" + re.escape(name + (f"{{{want}}}" if want else "")) + r" (\S+)$"
+    m = re.search(pattern, text, re.M)
+    return float(m.group(1)) if m else None
+
+
+# ============================================================
+# Text format
+# ============================================================
+
+def test_histogram_buckets_are_cumulative():
+    reg = metrics.Registry()
+    h = reg.register(metrics.Histogram("t_seconds", "test", buckets=(0.01, 0.1)))
+    for v in (0.005, 0.01, 0.05, 2.0):
+        h.observe(v)
+    text = reg.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert _sample(text, "t_seconds_bucket", le="0.01") == 2   # le 为闭区间
+    assert _sample(text, "t_seconds_bucket", le="0.1") == 3
+    assert _sample(text, "t_seconds_bucket", le="+Inf") == 4
+    assert _sample(text, "t_seconds_count") == 4
+    assert _sample(text, "t_seconds_sum") == pytest.approx(2.065)
+
+
+def test_counter_and_gauge_labels():
+    reg = metrics.Registry()
+    c = reg.register(metrics.Counter("t_bytes", "test", ("stream",)))
+    g = reg.register(metrics.Gauge("t_clients", "test", ("stream",)))
+    c.labels("frame").inc(10)
+    c.labels("frame").inc(5)
+    c.labels('a"b').inc()
+    g.labels("frame").inc()
+    g.labels("frame").inc()
+    g.labels("frame").dec()
+    text = reg.render()
+    assert "# TYPE t_bytes_total counter" in text
+    assert _sample(text, "t_bytes_total", stream="frame") == 15
+    assert 't_bytes_total{stream="a\\"b"} 1' in text
+    assert _sample(text, "t_clients", stream="frame") == 1
+
+
+def test_labels_arity_checked():
+    c = metrics.Counter("t_x", "test", ("stream",))
+    with pytest.raises(ValueError):
+        c.inc()
+    with pytest.raises(ValueError):
+        c.labels("a", "b")
+
+
+def test_duplicate_registration_rejected():
+    reg = metrics.Registry()
+    reg.register(metrics.Counter("t_dup", "test"))
+    with pytest.raises(ValueError):
+        reg.register(metrics.Gauge("t_dup", "test"))
+
+
+# ============================================================
+# Instrumented pipeline
+# ============================================================
+
+@pytest.fixture
+def live():
+    sdk = FakeImseeSdk(width=64, height=40)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    hub = StreamHub(h)
+    h.start()
+    with patch("webapp.server.handler", h), patch("webapp.server.hub", hub):
+        yield sdk, h, hub
+    h.stop()
+
+
+def test_metrics_endpoint_reports_pipeline(live, wait_seq):
+    sdk, h, hub = live
+    from webapp.server import app
+    client = TestClient(app)
+    before = client.get("/metrics").text
+
+    depth = np.full((40, 64), 1200, np.uint16)
+    sdk.push(depth=depth)
+    snap = wait_seq(h, 1)
+    h.encode_jpeg("overlay", snap)
+    h.encode_jpeg("frame", snap)
+    h.encode_depth_png(snap)
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = resp.text
+
+    def delta(name, **labels):
+        return (_sample(text, name, **labels) or 0) - (_sample(before, name, **labels) or 0)
+
+    assert delta("indemind_frames_captured_total") == 1
+    assert delta("indemind_sdk_fetch_seconds_count") == 1
+    assert delta("indemind_colorize_seconds_count") == 1
+    assert delta("indemind_composite_seconds_count") == 1
+    assert delta("indemind_jpeg_encode_seconds_count", stream="overlay") == 1
+    assert delta("indemind_encodes_total", stream="frame") == 1
+    assert delta("indemind_png_encode_seconds_count") == 1
+    assert not delta("indemind_jpeg_encode_seconds_count", stream="depth")
+    for name in ("indemind_frame_interval_seconds", "indemind_frames_dropped_total",
+                 "indemind_bytes_sent_total", "indemind_active_subscribers"):
+        assert f"# TYPE {name} " in text
+
+
+def test_ws_stream_counts_bytes_and_subscribers(live):
+    sdk, h, hub = live
+    from webapp.server import app
+    client = TestClient(app)
+    gauge = metrics.SUBSCRIBERS.labels("ws_depth")
+    sent = metrics.BYTES_SENT.labels("ws_depth")
+    bytes_before, subs_before = sent.value, gauge.value
+
+    with client.websocket_connect("/ws/depth") as ws:
+        assert gauge.value == subs_before + 1
+        sdk.push()
+        data = ws.receive_bytes()
+    deadline = time.time() + 2
+    while gauge.value != subs_before and time.time() < deadline:
+        time.sleep(0.005)
+    assert gauge.value == subs_before
+    assert sent.value - bytes_before == len(data)
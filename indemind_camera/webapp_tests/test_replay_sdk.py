@@ -0,0 +1,164 @@
+"""Tests for test/session.py + test/replay_sdk.py — 会话格式与回放后端 (无需相机)。"""
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from detector_utils import DET_DTYPE, make_boxes
+from imsee_sdk import ImseeSdk, SdkArray
+from imu_stream import IMU_DTYPE
+from replay_sdk import ReplaySdk
+from sdk_backend import open_sdk
+from session import Session, SessionWriter, generate_synthetic
+from shm_ring import ShmSdk
+from webapp.indemind_handler import IndemindHandler
+
+
+@pytest.fixture(scope="module")
+def synthetic(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("session"))
+    return generate_synthetic(path, seconds=1.0, fps=10, size=(32, 20),
+                              kinds=("frame", "depth", "imu", "detector", "points"))
+
+
+def test_writer_reader_roundtrip(tmp_path):
+    with SessionWriter(str(tmp_path), resolution=2, fps=30, module_info="ID: X",
+                       calibration={"fx": 1.0}) as w:
+        w.write("depth", np.arange(6, dtype=np.uint16).reshape(2, 3), 0.5)
+        w.write("depth", np.ones((4, 5), np.uint16), 0.6)
+        w.write("detector", make_boxes([(1, 2, 3, 4, 1, 0.5)]), 0.5)
+        w.write("detector", make_boxes([]), 0.6)
+        imu = np.zeros(3, IMU_DTYPE)
+        imu["timestamp"] = [0.1, 0.2, 0.3]
+        w.write_imu(imu)
+        with pytest.raises(ValueError):
+            w.write("bogus", np.zeros(1), 0.0)
+    s = Session(str(tmp_path))
+    assert s.meta["resolution"] == 2 and s.fps == 30
+    assert s.meta["calibration"] == {"fx": 1.0}
+    assert set(s.kinds) == {"depth", "detector", "imu"}
+    assert s.streams["depth"]["count"] == 2
+    assert s.read("depth", 0).tolist() == [[0, 1, 2], [3, 4, 5]]
+    assert s.read("depth", 1).shape == (4, 5)
+    assert s.timestamps("depth").tolist() == [0.5, 0.6]
+    assert s.index["depth"]["seq"].tolist() == [1, 2]
+    assert s.read("detector", 0).dtype == DET_DTYPE
+    assert len(s.read("detector", 1)) == 0
+    assert s.imu["timestamp"].tolist() == [0.1, 0.2, 0.3]
+    assert s.time_range() == (0.1, 0.6)
+    s.close()
+
+
+def test_synthetic_session(synthetic):
+    s = Session(synthetic)
+    assert s.streams["frame"]["count"] == 10
+    assert s.streams["imu"]["count"] == 1000
+    frame, depth = s.read("frame", 3), s.read("depth", 3)
+    assert frame.shape == (20, 64) and depth.shape == (20, 32)
+    assert set(np.unique(depth)) == {1000, 2000}
+    box = s.read("detector", 3)[0]
+    assert (depth[box["y"]:box["y"] + box["h"], box["x"]:box["x"] + box["w"]] == 1000).all()
+    assert s.read("points", 0).shape == (20 * 32, 3)
+
+
+def test_replay_is_an_imsee_sdk(synthetic):
+    sdk = ReplaySdk(synthetic, speed=0, loop=False)
+    assert isinstance(sdk, ImseeSdk)
+    assert sdk.init() == 0
+    assert sdk.enable_depth() == 0 and sdk.enable_points() == 0
+    assert sdk.enable_disparity() == -1        # 会话里没有录
+    assert sdk.get_calibration()["baseline"] == 0.12
+    assert sdk.get_device_info_detailed() == {"name": "synthetic"}
+    assert "SYNTHETIC" in sdk.get_module_info()
+    sdk.release()
+
+
+def test_fast_replay_delivers_every_frame_in_order(synthetic):
+    s = Session(synthetic)
+    sdk = ReplaySdk(synthetic, speed=0, loop=False)
+    sdk.init()
+    depths, imu = [], 0
+    while True:
+        got = sdk.wait_any(("depth", "imu"), timeout=0.5)
+        if not got:
+            break
+        if "depth" in got:
+            depths.append(got["depth"])
+        if "imu" in got:
+            imu += len(got["imu"])
+    assert sdk.finished
+    assert [d.seq for d in depths] == list(range(1, 11))
+    assert [d.timestamp for d in depths] == pytest.approx(s.timestamps("depth").tolist())
+    for i, d in enumerate(depths):
+        assert isinstance(d, SdkArray)
+        np.testing.assert_array_equal(d, s.read("depth", i))
+    assert imu == 1000
+    sdk.release()
+
+
+def test_speed_multiplier_paces_playback(synthetic):
+    sdk = ReplaySdk(synthetic, speed=4.0, loop=False)   # 1 秒的会话 -> ~0.25 秒
+    start = time.monotonic()
+    sdk.init()
+    assert sdk.wait_finished(5.0)
+    elapsed = time.monotonic() - start
+    assert 0.2 <= elapsed < 1.0
+    sdk.release()
+
+
+def test_loop_keeps_timestamps_increasing(synthetic):
+    sdk = ReplaySdk(synthetic, speed=20.0, loop=True)
+    sdk.init()
+    stamps = []
+    deadline = time.monotonic() + 5
+    while len(stamps) < 25 and time.monotonic() < deadline:
+        f = sdk.wait_frame("frame", timeout=0.5)
+        if f is not None:
+            stamps.append(f.timestamp)
+    sdk.release()
+    assert len(stamps) == 25
+    assert all(b > a for a, b in zip(stamps, stamps[1:]))
+    assert not sdk.finished
+
+
+def test_bundle_and_boxes_through_replay(synthetic):
+    sdk = ReplaySdk(synthetic, speed=0, loop=False)
+    sdk.init()
+    b = sdk.get_bundle()
+    deadline = time.monotonic() + 2
+    while b.frame is None and time.monotonic() < deadline:
+        b = sdk.get_bundle()
+    assert b.frame.shape == (20, 64) and b.depth.shape == (20, 32)
+    boxes = sdk.wait_frame("detector", timeout=1.0)
+    assert boxes.dtype == DET_DTYPE and len(boxes) == 1
+    sdk.release()
+
+
+def test_open_sdk_backends(synthetic):
+    sdk = open_sdk("replay", path=synthetic, speed=0)
+    assert isinstance(sdk, ReplaySdk) and sdk._lib.speed == 0
+    assert isinstance(open_sdk("shm", name="nope"), ShmSdk)
+    with pytest.raises(ValueError):
+        open_sdk("bogus")
+
+
+def test_handler_on_replay_backend(synthetic):
+    h = IndemindHandler(sdk_factory=lambda: open_sdk("replay", path=synthetic, speed=5.0))
+    assert h.start()["success"] is True
+    try:
+        deadline = time.monotonic() + 5
+        while h.get_snapshot() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        snap = h.get_snapshot()
+        assert snap is not None
+        assert snap.frame.shape == (20, 32)
+        assert h.get_overlay_jpeg() is not None
+    finally:
+        h.stop()
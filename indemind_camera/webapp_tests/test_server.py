@@ -1,9 +1,25 @@
 """API tests for webapp/server.py — mock handler, no camera needed."""
+import asyncio
+import os
+import sys
+import threading
+import time
+
 import pytest
 from unittest.mock import MagicMock, patch
 
 from fastapi.testclient import TestClient
 
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from webapp import metrics
+from webapp.indemind_handler import IndemindHandler
+from webapp.stream_hub import StreamHub
+from fake_sdk import FakeImseeSdk
+
 
 @pytest.fixture
 def mock_handler():
@@ -21,7 +37,9 @@ def mock_handler():
 
 @pytest.fixture
 def client(mock_handler):
-    with patch("webapp.server.handler", mock_handler):
+    from webapp.snapshot_cache import SnapshotCache
+    with patch("webapp.server.handler", mock_handler), \
+            patch("webapp.server.snapshots", SnapshotCache(mock_handler)):
         from webapp.server import app
         yield TestClient(app)
 
@@ -73,12 +91,88 @@ def test_snapshot_not_running(client):
     assert resp.status_code == 503
 
 
+def _running_with_snapshot(mock_handler, seq=3, depth_seq=3):
+    mock_handler.is_running.return_value = True
+    mock_handler.alpha = 0.5
+    mock_handler.get_snapshot.return_value = MagicMock(seq=seq, depth_seq=depth_seq)
+    mock_handler.encode_jpeg.return_value = b'\xff\xd8fake'
+    mock_handler.encode_depth_png.return_value = b'\x89PNGfake'
+
+
 def test_snapshot_with_frame(client, mock_handler):
-    mock_handler.get_frame_jpeg.return_value = b'\xff\xd8fake'
+    _running_with_snapshot(mock_handler)
     resp = client.get("/snapshot")
     assert resp.status_code == 200
     assert resp.headers["content-type"] == "image/jpeg"
     assert resp.content == b'\xff\xd8fake'
+    assert resp.headers["etag"]
+    mock_handler.encode_jpeg.assert_called_once_with(
+        "frame", mock_handler.get_snapshot.return_value, 90, 1.0)
+
+
+def test_snapshot_cached_per_frame(client, mock_handler):
+    _running_with_snapshot(mock_handler)
+    for _ in range(3):
+        assert client.get("/snapshot").status_code == 200
+    assert mock_handler.encode_jpeg.call_count == 1
+    # 不同质量是不同的缓存项
+    client.get("/snapshot?quality=50")
+    assert mock_handler.encode_jpeg.call_count == 2
+    # 新帧 -> 新编码、新 ETag
+    etag = client.get("/snapshot").headers["etag"]
+    mock_handler.get_snapshot.return_value = MagicMock(seq=4, depth_seq=4)
+    resp = client.get("/snapshot")
+    assert mock_handler.encode_jpeg.call_count == 3
+    assert resp.headers["etag"] != etag
+
+
+def test_snapshot_if_none_match_returns_304_without_encode(client, mock_handler):
+    _running_with_snapshot(mock_handler)
+    etag = client.get("/snapshot/overlay").headers["etag"]
+    mock_handler.encode_jpeg.reset_mock()
+
+    resp = client.get("/snapshot/overlay", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+    resp = client.get("/snapshot/overlay", headers={"If-None-Match": f'"x", W/{etag}'})
+    assert resp.status_code == 304
+    mock_handler.encode_jpeg.assert_not_called()
+
+    # 透明度变化 -> 画面变了，ETag 失效
+    mock_handler.alpha = 0.8
+    resp = client.get("/snapshot/overlay", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    mock_handler.encode_jpeg.assert_called_once()
+
+
+def test_snapshot_depth_png(client, mock_handler):
+    _running_with_snapshot(mock_handler, seq=9, depth_seq=7)
+    resp = client.get("/snapshot/depth.png?scale=0.5")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "image/png"
+    mock_handler.encode_depth_png.assert_called_once_with(
+        mock_handler.get_snapshot.return_value, 0.5)
+    # 只有相机帧更新、深度没变: ETag 不变
+    etag = resp.headers["etag"]
+    mock_handler.get_snapshot.return_value = MagicMock(seq=10, depth_seq=7)
+    resp = client.get("/snapshot/depth.png?scale=0.5", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+def test_snapshot_depth_missing(client, mock_handler):
+    _running_with_snapshot(mock_handler)
+    mock_handler.get_snapshot.return_value = MagicMock(seq=1, depth=None)
+    assert client.get("/snapshot/depth.png").status_code == 503
+
+
+@pytest.mark.parametrize("query", ["quality=0", "quality=101", "scale=0",
+                                   "scale=2", "max_fps=-1", "quality=abc"])
+def test_stream_rejects_bad_params(client, query):
+    resp = client.get(f"/stream?{query}")
+    assert resp.status_code == 422
+    resp = client.get(f"/stream/overlay?{query}")
+    assert resp.status_code == 422
 
 
 def test_stream_route_exists(client, mock_handler):
@@ -86,3 +180,274 @@ def test_stream_route_exists(client, mock_handler):
     routes = [r.path for r in client.app.routes if hasattr(r, "path")]
     assert "/stream" in routes
     assert "/stream/overlay" in routes
+
+
+def test_mjpeg_generator_unsubscribes_on_close():
+    from webapp import server
+    h = MagicMock()
+    h.is_running.return_value = True
+    h.get_snapshot.return_value = MagicMock(seq=1)
+    h.encode_jpeg.return_value = b'\xff\xd8fake'
+    hub = StreamHub(h)
+
+    async def run():
+        gen = server._mjpeg_generator("frame", quality=70)
+        chunk = await gen.__anext__()
+        assert b'\xff\xd8fake' in chunk
+        assert hub.variant_keys() == [("frame", 70, 1.0)]
+        await gen.aclose()
+
+    with patch("webapp.server.hub", hub):
+        asyncio.run(run())
+    assert hub.subscriber_count() == 0
+
+
+# ============================================================
+# Async streaming — driven directly through the ASGI app
+# ============================================================
+
+def _http_scope(path):
+    return {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [], "client": ("test", 1),
+        "server": ("test", 80),
+    }
+
+
+async def _drive_stream(app, path, frames):
+    """模拟一个浏览器: 收到 frames 个 MJPEG 分片后断开。"""
+    return await _drive_stream_scope(app, _http_scope(path), frames)
+
+
+async def _drive_stream_scope(app, scope, frames):
+    disconnected = asyncio.Event()
+    parts = []
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(msg):
+        if msg["type"] == "http.response.body" and msg.get("body"):
+            parts.append(msg["body"])
+            if len(parts) >= frames:
+                disconnected.set()
+
+    await app(scope, receive, send)
+    return parts
+
+
+def test_stream_hundreds_of_clients_constant_threads():
+    """300 个并发流: 线程数不随客户端数增长，断开后订阅全部释放。"""
+    from webapp.server import app
+
+    sdk = FakeImseeSdk(width=64, height=40)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    hub = StreamHub(h)
+    h.start()
+    clients, frames = 300, 3
+    done = threading.Event()
+
+    def feeder():
+        while not done.is_set():
+            sdk.push()
+            time.sleep(0.01)
+
+    async def run():
+        baseline = threading.active_count()
+        peak = baseline
+        tasks = [asyncio.ensure_future(_drive_stream(app, "/stream/overlay", frames))
+                 for _ in range(clients)]
+        while not all(t.done() for t in tasks):
+            peak = max(peak, threading.active_count())
+            await asyncio.sleep(0.005)
+        return baseline, peak, [t.result() for t in tasks]
+
+    feed = threading.Thread(target=feeder, daemon=True)
+    try:
+        with patch("webapp.server.handler", h), patch("webapp.server.hub", hub):
+            feed.start()
+            baseline, peak, results = asyncio.run(asyncio.wait_for(run(), 30))
+    finally:
+        done.set()
+        feed.join()
+        h.stop()
+
+    assert all(len(parts) >= frames for parts in results)
+    assert all(p.startswith(b"--frame") for parts in results for p in parts)
+    assert peak - baseline <= 8, f"threads grew {baseline} -> {peak}"
+    assert hub.subscriber_count() == 0
+    # 每个源帧最多编码一次，与客户端数无关
+    assert hub.encode_count <= h._seq
+
+
+def test_stream_query_params_select_variant():
+    h = MagicMock()
+    h.is_running.return_value = True
+    h.get_snapshot.return_value = MagicMock(seq=1)
+    h.encode_jpeg.return_value = b'\xff\xd8small'
+    hub = StreamHub(h)
+
+    async def run():
+        from webapp.server import app
+        scope = _http_scope("/stream/overlay")
+        scope["query_string"] = b"quality=40&scale=0.5&max_fps=5"
+        return await _drive_stream_scope(app, scope, 1)
+
+    with patch("webapp.server.hub", hub):
+        parts = asyncio.run(run())
+    assert b'\xff\xd8small' in parts[0]
+    h.encode_jpeg.assert_called_once_with("overlay", h.get_snapshot.return_value, 40, 0.5)
+
+
+# ============================================================
+# Backpressure — deliberately slow readers
+# ============================================================
+
+def _live_handler():
+    sdk = FakeImseeSdk(width=64, height=40)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    hub = StreamHub(h)
+    h.start()
+    return sdk, h, hub
+
+
+def _feed(sdk, interval=0.005):
+    done = threading.Event()
+
+    def feeder():
+        while not done.is_set():
+            sdk.push()
+            time.sleep(interval)
+
+    t = threading.Thread(target=feeder, daemon=True)
+    t.start()
+    return done, t
+
+
+def test_slow_reader_gets_newest_frame_and_drops_are_counted():
+    """每个分片写入耗时 80 ms (源帧 5 ms 一帧): 只丢帧不排队，且每次拿到的都是最新帧。"""
+    from webapp.server import app
+
+    sdk, h, hub = _live_handler()
+    lag = []          # 每次写入时: 最新源帧 seq - 本次交付的 seq
+    parts = []
+
+    async def run():
+        disconnected = asyncio.Event()
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(msg):
+            if msg["type"] == "http.response.body" and msg.get("body"):
+                (client,) = hub.client_stats()
+                lag.append(h.get_snapshot().seq - client["last_seq"])
+                parts.append(msg["body"])
+                await asyncio.sleep(0.08)
+                if len(parts) >= 5:
+                    disconnected.set()
+
+        await app(_http_scope("/stream"), receive, send)
+
+    done, feed = _feed(sdk)
+    try:
+        with patch("webapp.server.handler", h), patch("webapp.server.hub", hub):
+            asyncio.run(asyncio.wait_for(run(), 10))
+    finally:
+        done.set()
+        feed.join()
+        h.stop()
+
+    assert len(parts) >= 5
+    # 编码在线程池里完成，期间可能又来了一两帧；但绝不会落后一整串
+    assert max(lag[1:]) <= 3, lag
+    assert hub.subscriber_count() == 0
+
+
+def test_slow_reader_drop_counts_per_client():
+    from webapp.server import _mjpeg_generator
+
+    sdk, h, hub = _live_handler()
+    done, feed = _feed(sdk)
+
+    async def run():
+        fast = _mjpeg_generator("frame", quality=80)
+        slow = _mjpeg_generator("frame", quality=80)
+        await slow.__anext__()
+        for _ in range(10):
+            await fast.__anext__()
+        await slow.__anext__()
+        stats = sorted(hub.client_stats(), key=lambda c: c["frames_sent"])
+        await fast.aclose()
+        await slow.aclose()
+        return stats
+
+    try:
+        with patch("webapp.server.handler", h), patch("webapp.server.hub", hub):
+            slow_stats, fast_stats = asyncio.run(asyncio.wait_for(run(), 10))
+    finally:
+        done.set()
+        feed.join()
+        h.stop()
+
+    assert slow_stats["frames_sent"] == 2
+    assert fast_stats["frames_sent"] == 10
+    # 慢客户端两次读取之间跳过的源帧都记在它自己名下
+    # (快客户端的第一帧可能与慢客户端相同，之后 9 帧全是新帧)
+    assert slow_stats["frames_dropped"] >= 8
+    assert slow_stats["frames_dropped"] > fast_stats["frames_dropped"]
+
+
+def test_stalled_reader_is_disconnected():
+    """写入一直不返回 (TCP 窗口满) 超过 stall_timeout 后断开并释放订阅。"""
+    from webapp.server import app
+
+    sdk, h, hub = _live_handler()
+    stalled = metrics.STALLED_DISCONNECTS.labels("overlay")
+    before = stalled.value
+
+    async def run():
+        never = asyncio.Event()
+
+        async def receive():
+            await never.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(msg):
+            if msg["type"] == "http.response.body" and msg.get("body"):
+                await never.wait()
+
+        t0 = time.monotonic()
+        await app(_http_scope("/stream/overlay"), receive, send)
+        return time.monotonic() - t0
+
+    done, feed = _feed(sdk)
+    try:
+        with patch("webapp.server.handler", h), patch("webapp.server.hub", hub), \
+                patch("webapp.server.STALL_TIMEOUT", 0.2):
+            elapsed = asyncio.run(asyncio.wait_for(run(), 5))
+    finally:
+        done.set()
+        feed.join()
+        h.stop()
+
+    assert 0.2 <= elapsed < 2
+    assert stalled.value == before + 1
+    assert hub.subscriber_count() == 0
+
+
+def test_streams_endpoint_lists_clients(client):
+    hub = StreamHub(MagicMock())
+    sub = hub.subscribe("overlay", 50, 0.5)
+    with patch("webapp.server.hub", hub):
+        resp = client.get("/api/streams")
+    assert resp.status_code == 200
+    (entry,) = resp.json()["clients"]
+    assert entry["kind"] == "overlay"
+    assert entry["quality"] == 50
+    assert entry["frames_dropped"] == 0
+    hub.unsubscribe(sub)
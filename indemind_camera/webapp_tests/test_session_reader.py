@@ -0,0 +1,105 @@
+"""Tests for test/session.py Session — 内存映射读取 / 按时间定位 / 对齐遍历 (无需相机)。"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from detector_utils import DET_DTYPE
+from imu_stream import IMU_DTYPE
+from session import Session, SessionWriter
+
+
+@pytest.fixture
+def session_dir(tmp_path):
+    """frame 25 fps (t = 0, 0.04, ...)；depth 错开 10 ms、zlib；IMU 1 kHz；检测框有空帧。"""
+    path = str(tmp_path / "s")
+    with SessionWriter(path, codecs={"depth": "zlib"}) as w:
+        for i in range(50):
+            w.write("frame", np.full((4, 6), i, np.uint8), i * 0.04, seq=i * 2 + 1)
+            w.write("depth", np.full((2, 3), i, np.uint16), i * 0.04 + 0.01)
+            w.write("detector", np.zeros(i % 2, DET_DTYPE), i * 0.04)
+        imu = np.zeros(2000, IMU_DTYPE)
+        imu["timestamp"] = np.arange(2000) * 0.001
+        w.write_imu(imu)
+    return path
+
+
+def test_raw_reads_are_zero_copy_views(session_dir):
+    s = Session(session_dir)
+    frame = s.read("frame", 7)
+    assert frame.tolist() == np.full((4, 6), 7).tolist()
+    assert not frame.flags.writeable and not frame.flags.owndata
+    assert np.shares_memory(frame, s._maps["frame"][1])
+    depth = s.read("depth", 7)          # 压缩流: 读取时解码
+    assert depth[0, 0] == 7
+    assert "depth" in s._maps and not np.shares_memory(depth, s._maps["depth"][1])
+    assert s.read("detector", 0).shape == (0,)
+    assert isinstance(s.imu, np.ndarray) and not s.imu.flags.writeable
+    s.close()
+    assert frame[0, 0] == 7             # 关闭后已返回的视图仍然有效
+    assert s.read("frame", 8)[0, 0] == 8
+
+
+def test_open_is_lazy(session_dir):
+    s = Session(session_dir)
+    assert s._maps == {} and s._columns == {}
+    assert isinstance(s.index["frame"], np.memmap)
+    assert s.count("frame") == 50 and s.count("imu") == 2000
+
+
+def test_seek_by_timestamp_and_seq(session_dir):
+    s = Session(session_dir)
+    assert s.seek("frame", 0.0) == 0
+    assert s.seek("frame", 0.041) == 2
+    assert s.seek("frame", 99.0) == 50
+    assert s.nearest("frame", 0.061) == 2 and s.nearest("frame", 0.059) == 1
+    assert s.nearest("depth", -5.0) == 0 and s.nearest("depth", 99.0) == 49
+    assert s.read_at("depth", 0.205)[0, 0] == 5
+    assert s.find_seq("frame", 21) == 10 and s.find_seq("frame", 22) == -1
+    imu = s.imu_between(0.1, 0.2)
+    assert len(imu) == 100 and imu["timestamp"][0] == pytest.approx(0.101)
+    assert np.shares_memory(imu, s.imu)
+
+
+def test_iter_stream_range(session_dir):
+    s = Session(session_dir)
+    got = list(s.iter_stream("frame", start=0.08, end=0.2))
+    assert [round(t, 2) for t, _ in got] == [0.08, 0.12, 0.16, 0.2]
+    assert [int(a[0, 0]) for _, a in got] == [2, 3, 4, 5]
+
+
+def test_aligned_pairs_nearest_and_splits_imu(session_dir):
+    s = Session(session_dir)
+    samples = list(s.aligned(("frame", "depth"), start=0.04, end=0.2))
+    assert len(samples) == 5
+    for n, sample in enumerate(samples):
+        i = n + 1
+        assert sample.index == {"frame": i, "depth": i}
+        assert sample["frame"][0, 0] == i and sample["depth"][0, 0] == i
+    assert len(samples[0].imu) == 1          # 只含 t = 0.04 本身
+    assert all(len(x.imu) == 40 for x in samples[1:])
+    assert samples[1].imu["timestamp"][-1] == pytest.approx(0.08)
+    assert sum(len(x.imu) for x in s.aligned()) == 1961   # 从会话开头到最后一帧 (1.96 s)
+
+
+def test_aligned_max_skew(session_dir):
+    s = Session(session_dir)
+    sample = next(s.aligned(("frame", "depth"), imu=False, max_skew=0.005))
+    assert sample.data["depth"] is None and sample.index["depth"] == -1 and sample.imu is None
+    sample = next(s.aligned(("frame", "depth"), imu=False, max_skew=0.02))
+    assert sample["depth"][0, 0] == 0
+
+
+def test_truncated_bin_raises(session_dir):
+    with open(os.path.join(session_dir, "frame.bin"), "r+b") as f:
+        f.truncate(24 * 10)
+    s = Session(session_dir)
+    assert s.read("frame", 9)[0, 0] == 9
+    with pytest.raises(ValueError):
+        s.read("frame", 10)
@@ -0,0 +1,172 @@
+"""Tests for test/session_recorder.py + SessionWriter 编码 / flush — 会话录制 (无需相机)。"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from fake_sdk import FakeImseeLib
+from imsee_sdk import ImseeSdk, _tag
+from imu_stream import IMU_DTYPE
+from replay_sdk import ReplaySdk
+from session import META_FILE, Session, SessionWriter
+from session_recorder import SessionRecorder
+from synthetic_sdk import SyntheticSdk
+
+
+def test_writer_codecs_roundtrip(tmp_path):
+    depth = (np.arange(600, dtype=np.uint16) % 7).reshape(20, 30)
+    with SessionWriter(str(tmp_path), codecs={"depth": "zlib"}) as w:
+        w.write("depth", depth, 0.1)
+        w.write("frame", np.ones((4, 8), np.uint8), 0.1)
+    s = Session(str(tmp_path))
+    assert s.streams["depth"]["codec"] == "zlib" and s.streams["frame"]["codec"] == "raw"
+    assert s.index["depth"]["nbytes"][0] < depth.nbytes
+    np.testing.assert_array_equal(s.read("depth", 0), depth)
+    np.testing.assert_array_equal(s.read("frame", 0), np.ones((4, 8), np.uint8))
+    with pytest.raises(ValueError):
+        SessionWriter(str(tmp_path / "x"), codecs={"depth": "bogus"})
+
+
+def test_session_without_codec_field_reads_raw(tmp_path):
+    with SessionWriter(str(tmp_path)) as w:
+        w.write("depth", np.full((2, 2), 5, np.uint16), 0.0)
+    meta_path = os.path.join(tmp_path, META_FILE)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    del meta["streams"]["depth"]["codec"]
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    assert Session(str(tmp_path)).read("depth", 0).tolist() == [[5, 5], [5, 5]]
+
+
+def test_writer_flush_is_readable_midway(tmp_path):
+    w = SessionWriter(str(tmp_path), codecs={"depth": "zlib"})
+    for i in range(100):   # 超过索引初始容量
+        w.write("depth", np.full((3, 3), i, np.uint16), i * 0.04)
+    imu = np.zeros(5, IMU_DTYPE)
+    imu["timestamp"] = np.arange(5) * 0.001
+    w.write_imu(imu)
+    w.flush()
+    s = Session(str(tmp_path))
+    assert s.streams["depth"]["count"] == 100 and len(s.imu) == 5
+    assert s.read("depth", 99)[0, 0] == 99
+    w.write("depth", np.zeros((3, 3), np.uint16), 5.0)
+    w.close()
+    assert Session(str(tmp_path)).streams["depth"]["count"] == 101
+
+
+def _wait(cond, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not cond() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return cond()
+
+
+def test_recorder_records_enabled_streams(tmp_path):
+    sdk = SyntheticSdk(fps=40, size=(32, 20), imu_rate=500)
+    sdk.init()
+    for enable in (sdk.enable_depth, sdk.enable_imu, sdk.enable_detector):
+        enable()
+    path = str(tmp_path / "s")
+    rec = SessionRecorder(sdk, path, ("frame", "depth", "detector", "imu"), workers=2,
+                          sync_interval=0.1, fps=40)
+    rec.start()
+    assert _wait(lambda: rec.recorded["depth"] >= 10)
+    assert _wait(lambda: os.path.exists(os.path.join(path, META_FILE)))   # 录制中已 flush
+    stats = rec.stop()
+    sdk.release()
+
+    s = Session(path)
+    for kind in ("frame", "depth", "detector"):
+        assert s.streams[kind]["count"] == stats["streams"][kind]["recorded"] > 0
+        assert stats["streams"][kind]["dropped"] == 0
+    assert s.streams["depth"]["codec"] == "zlib" and s.streams["frame"]["codec"] == "raw"
+    assert len(s.imu) == stats["imu_samples"] > 0
+    assert s.meta["calibration"]["width"] == 32
+    assert "SYNTHETIC" in s.meta["module_info"]
+    assert (np.diff(s.index["depth"]["seq"].astype(np.int64)) >= 1).all()
+    assert s.read("frame", 0).shape == (20, 64)
+    assert s.read("detector", 0).dtype.names[0] == "x"
+    assert stats["backlog"] == 0
+
+    replay = ReplaySdk(path, speed=0, loop=False)
+    replay.init()
+    # 第一拍可能只有 frame: 尽快模式下回放线程要等调用方取数或空闲超时 (1 s) 才推下一拍
+    assert replay.wait_frame("depth", timeout=3.0).shape == (20, 32)
+    replay.release()
+
+
+def test_recorder_drops_when_backlog_full(tmp_path):
+    sdk = SyntheticSdk(fps=50, size=(16, 10))
+    sdk.init()
+    sdk.enable_depth()
+    rec = SessionRecorder(sdk, str(tmp_path), ("frame", "depth"), max_pending=0)
+    rec.start()
+    assert _wait(lambda: rec.dropped["depth"] >= 3)
+    stats = rec.stop()
+    sdk.release()
+    assert stats["streams"]["depth"]["recorded"] == 0
+    assert stats["streams"]["frame"]["dropped"] >= 3
+
+
+def test_recorder_imu_counts_against_backlog(tmp_path):
+    sdk = SyntheticSdk(fps=50, size=(16, 10), imu_rate=500)
+    sdk.init()
+    sdk.enable_imu()
+    rec = SessionRecorder(sdk, str(tmp_path), ("imu",), max_pending=0)
+    rec.start()
+    assert _wait(lambda: rec.dropped["imu"] >= 20)
+    stats = rec.stop()
+    sdk.release()
+    assert stats["imu_samples"] == 0 and stats["imu_backlog_dropped"] >= 20
+
+
+class _FailingSdk(SyntheticSdk):
+    """前几次 wait_any 正常，之后抛异常 (模拟相机掉线)。"""
+
+    waits_before_error = 3
+
+    def wait_any(self, kinds, timeout=1.0):
+        if self.waits_before_error <= 0:
+            raise RuntimeError("usb disconnected")
+        self.waits_before_error -= 1
+        return super().wait_any(kinds, timeout)
+
+
+def test_recorder_capture_error_raised_on_stop(tmp_path):
+    sdk = _FailingSdk(fps=50, size=(16, 10))
+    sdk.init()
+    rec = SessionRecorder(sdk, str(tmp_path), ("frame",))
+    rec.start()
+    assert _wait(lambda: rec._error is not None)
+    with pytest.raises(RuntimeError, match="usb disconnected"):
+        rec.stop()
+    sdk.release()
+    assert Session(str(tmp_path)).streams["frame"]["count"] == rec.recorded["frame"]
+
+
+def test_recorder_counts_sdk_seq_gaps(tmp_path):
+    sdk = ImseeSdk(lib=FakeImseeLib())
+    rec = SessionRecorder(sdk, str(tmp_path), ("depth",))
+    depth = np.zeros((2, 2), np.uint16)
+    for seq in (1, 2, 5, 6, 10):
+        rec._submit("depth", _tag(depth, seq, seq * 0.04))
+    rec._queue.put(None)
+    rec._write_loop()
+    rec._writer.close()
+    rec._pool.shutdown()
+    assert rec.missed["depth"] == 5
+    assert Session(str(tmp_path)).index["depth"]["seq"].tolist() == [1, 2, 5, 6, 10]
+
+
+def test_recorder_rejects_unknown_kind(tmp_path):
+    with pytest.raises(ValueError):
+        SessionRecorder(ImseeSdk(lib=FakeImseeLib()), str(tmp_path), ("frame", "bogus"))
@@ -0,0 +1,291 @@
+"""Tests for test/shm_ring.py — 共享内存环的 seqlock 读写、游标与 ShmSdk (同进程内驱动)。"""
+import itertools
+import os
+import sys
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from detector_utils import DET_DTYPE, make_boxes
+from imsee_sdk import BoxList, SdkArray
+from imu_stream import IMU_DTYPE
+from shm_ring import Control, ShmRing, ShmSdk, attach_segment, ring_name
+
+_names = itertools.count()
+
+
+@pytest.fixture
+def name():
+    return f"imsee_test_{os.getpid()}_{next(_names)}"
+
+
+@pytest.fixture
+def ring(name):
+    r = ShmRing.create(name, np.uint16, 4 * 6 * 2, slots=3)
+    yield r
+    r.close()
+
+
+def _depth(value):
+    return np.full((4, 6), value, np.uint16)
+
+
+def test_write_then_read_from_another_mapping(ring, name):
+    reader = ShmRing.attach(name)
+    assert reader.head == 0 and reader.latest() is None
+    assert ring.write(_depth(7), timestamp=1.5) == 1
+    out = reader.latest()
+    assert isinstance(out, SdkArray)
+    assert (out.seq, out.timestamp, out.shape, out.dtype) == (1, 1.5, (4, 6), np.uint16)
+    assert (out == 7).all()
+    ring.write(_depth(8))
+    assert (reader.read(1) == 7).all()   # 3 个槽位: seq 1 还没被覆盖
+    assert reader.read(3) is None        # 还没写入
+    reader.close()
+
+
+def test_read_returns_copy(ring, name):
+    ring.write(_depth(1))
+    out = ring.latest()
+    ring.write(_depth(2))
+    ring.write(_depth(3))
+    ring.write(_depth(4))                # 覆盖了 seq 1 的槽位
+    assert (out == 1).all()
+
+
+def test_latest_after(ring):
+    ring.write(_depth(1))
+    assert ring.latest(after=1) is None
+    ring.write(_depth(2))
+    assert ring.latest(after=1).seq == 2
+
+
+def test_read_after_reports_overruns(ring):
+    for v in range(1, 6):
+        ring.write(_depth(v))
+    items, overruns = ring.read_after(0)
+    assert [x.seq for x in items] == [3, 4, 5]
+    assert overruns == 2
+    assert ring.read(1) is None
+    items, overruns = ring.read_after(4)
+    assert [x.seq for x in items] == [5] and overruns == 0
+    assert ring.read_after(5) == ([], 0)
+
+
+def test_variable_shape_and_oversize(ring):
+    assert ring.write(np.zeros((2, 3), np.uint16)) == 1
+    assert ring.latest().shape == (2, 3)
+    assert ring.write(np.zeros((10, 10), np.uint16)) == 0        # 超过槽位容量
+    assert ring.write(np.zeros((2, 3), np.float32)) == 0         # dtype 不符
+    assert ring.oversize == 2
+    assert ring.head == 1
+
+
+def test_torn_slot_is_not_returned(ring):
+    ring.write(_depth(1))
+    ring._locks[0] += 1                  # 模拟写者停在写入中途
+    assert ring.read(1, retries=3) is None
+    ring._locks[0] += 1
+    assert ring.read(1) is not None
+
+
+def test_torn_copy_is_retried(ring, monkeypatch):
+    ring.write(_depth(1))
+    locks = iter([0, 2, 2, 2])           # 第一次拷贝前后 lock 不同 -> 重读
+    monkeypatch.setattr(ring, "_locks", type("L", (), {
+        "__getitem__": lambda self, i: next(locks)})())
+    assert ring.read(1) is not None
+    assert ring.torn == 1
+
+
+def test_structured_dtypes(name):
+    ring = ShmRing.create(name, IMU_DTYPE, IMU_DTYPE.itemsize * 10)
+    try:
+        samples = np.zeros(3, IMU_DTYPE)
+        samples["timestamp"] = [1, 2, 3]
+        samples["gyro"][:, 2] = 0.5
+        ring.write(samples)
+        out = ShmRing.attach(name).latest()
+        assert out.dtype == IMU_DTYPE
+        assert out["timestamp"].tolist() == [1, 2, 3]
+        assert out["gyro"][:, 2].tolist() == [0.5] * 3
+    finally:
+        ring.close()
+
+
+def test_create_replaces_stale_segment_and_close_unlinks(name):
+    ShmRing.create(name, np.uint8, 16).shm.close()   # 模拟上次异常退出留下的段
+    ring = ShmRing.create(name, np.uint16, 32)
+    assert ring.dtype == np.uint16
+    ring.close()
+    with pytest.raises(FileNotFoundError):
+        attach_segment(name)
+
+
+def test_reader_close_keeps_segment(ring, name):
+    ShmRing.attach(name).close()
+    ring.write(_depth(3))
+    assert ShmRing.attach(name).latest().seq == 1
+
+
+# ============================================================
+# ShmSdk
+# ============================================================
+
+@pytest.fixture
+def published(name):
+    kinds = ("frame", "depth", "detector", "imu")
+    control = Control.create(name, kinds, slots=4)
+    rings = {
+        "frame": ShmRing.create(ring_name(name, "frame"), np.uint8, 4 * 12),
+        "depth": ShmRing.create(ring_name(name, "depth"), np.uint16, 4 * 6 * 2),
+        "detector": ShmRing.create(ring_name(name, "detector"), DET_DTYPE, 24 * 8),
+        "imu": ShmRing.create(ring_name(name, "imu"), IMU_DTYPE, 32 * 10, slots=8),
+    }
+    yield control, rings
+    for r in rings.values():
+        r.close()
+    control.close()
+
+
+def test_shm_sdk_init_without_worker(name):
+    assert ShmSdk(name).init() == -1
+
+
+def test_shm_sdk_get_returns_new_data_once(published, name):
+    control, rings = published
+    rings["depth"].write(_depth(1))                 # 挂上之前的旧数据
+    sdk = ShmSdk(name)
+    assert sdk.init() == 0
+    assert sdk.enable_depth() == 0 and sdk.enable_points() == -1
+    assert sdk.get_depth().seq == 1                 # 挂上时的最新一帧仍可取到
+    assert sdk.get_depth() is None
+    rings["depth"].write(_depth(2))
+    rings["depth"].write(_depth(3))
+    depth = sdk.get_depth()
+    assert depth.seq == 3 and (depth == 3).all()
+    assert sdk.get_frame() is None
+    assert sdk.get_points() is None
+    sdk.release()
+
+
+def test_shm_sdk_imu_concatenates_batches(published, name):
+    control, rings = published
+    sdk = ShmSdk(name)
+    sdk.init()
+    for t in (1.0, 2.0, 3.0):
+        batch = np.zeros(2, IMU_DTYPE)
+        batch["timestamp"] = [t, t + 0.5]
+        rings["imu"].write(batch, timestamp=t + 0.5)
+    imu = sdk.get_imu()
+    assert imu["timestamp"].tolist() == [1.0, 1.5, 2.0, 2.5, 3.0, 3.5]
+    assert imu.seq == 3
+    assert sdk.get_imu() is None
+    sdk.release()
+
+
+def test_shm_sdk_detector_boxes(published, name):
+    control, rings = published
+    sdk = ShmSdk(name)
+    sdk.init()
+    empty = sdk.get_detector_boxes()
+    assert empty.dtype == DET_DTYPE and len(empty) == 0 and empty.seq == 0
+    rings["detector"].write(make_boxes([(1, 2, 3, 4, 1, 0.5)]), timestamp=9.0)
+    boxes = sdk.get_detector_boxes(as_dicts=True)
+    assert isinstance(boxes, BoxList)
+    assert (boxes.seq, boxes.timestamp) == (1, 9.0)
+    assert boxes[0]["class_name"] == "PERSON"
+    sdk.release()
+
+
+def test_shm_sdk_wait_and_cursor(published, name):
+    control, rings = published
+    sdk = ShmSdk(name)
+    sdk.init()
+    assert sdk.wait_any(("frame", "depth"), timeout=0.01) == {}
+    rings["frame"].write(np.zeros((4, 12), np.uint8))
+    got = sdk.wait_any(("frame", "depth"), timeout=0.5)
+    assert list(got) == ["frame"]
+    with pytest.raises(ValueError):
+        sdk.wait_any(("bogus",))
+
+    cur = sdk.cursor("depth")
+    for v in range(1, 7):
+        rings["depth"].write(_depth(v))
+    assert [x.seq for x in cur.read()] == [3, 4, 5, 6]
+    assert cur.overruns == 2
+    with pytest.raises(ValueError):
+        sdk.cursor("points")
+
+    control["pid"], control["generation"] = 123, 2
+    status = sdk.worker_status()
+    assert (status["pid"], status["generation"]) == (123, 2)
+    sdk.release()
+
+
+def test_shm_sdk_info_and_callback_count(published, name):
+    control, rings = published
+    sdk = ShmSdk(name)
+    sdk.init()
+    assert sdk.get_calibration() == {} and sdk.get_device_info_detailed() == {}
+    control.publish_json("calibration", {"baseline": 0.12, "left": {"fx": 400.0}})
+    control.publish_json("device_info", {"name": "synthetic"})
+    assert sdk.get_calibration() == {"baseline": 0.12, "left": {"fx": 400.0}}
+    assert sdk.get_device_info_detailed() == {"name": "synthetic"}
+    with pytest.raises(ValueError):
+        control.publish_json("device_info", "x" * 5000)
+    assert sdk.get_callback_count() == 0
+    rings["frame"].write(np.zeros((4, 12), np.uint8))
+    rings["frame"].write(np.zeros((4, 12), np.uint8))
+    assert sdk.get_callback_count() == 2
+    assert sdk.get_detector_image() is None      # 没有发布 detector_image
+    sdk.release()
+
+
+def test_shm_sdk_imu_stats(published, name):
+    control, rings = published
+    sdk = ShmSdk(name)
+    sdk.init()
+
+    def write(start):
+        batch = np.zeros(10, IMU_DTYPE)
+        batch["timestamp"] = start + np.arange(10) * 0.001
+        rings["imu"].write(batch, timestamp=batch["timestamp"][-1])
+
+    write(1.0)
+    sdk.get_imu()
+    write(1.013)                        # 断档: 少了 3 个样本
+    sdk.get_imu()
+    for i in range(10):                 # 8 个槽位: 前 2 批被覆盖
+        write(1.023 + i * 0.01)
+    assert len(sdk.get_imu()) == 80
+    stats = sdk.imu_stats()
+    assert stats["seq"] == 12 and stats["dropped"] == 20
+    assert (stats["gaps"], stats["missing"]) == (1, 3)
+    assert stats["max_gap"] == pytest.approx(0.004)
+    sdk.release()
+
+
+def test_shm_sdk_detector_image(name):
+    control = Control.create(name, ("detector", "detector_image"), slots=2)
+    image_ring = ShmRing.create(ring_name(name, "detector_image"), np.uint8, 4 * 6 * 3, 2)
+    boxes_ring = ShmRing.create(ring_name(name, "detector"), DET_DTYPE, 24 * 8, 2)
+    try:
+        assert control.kinds == ("detector", "detector_image")
+        sdk = ShmSdk(name)
+        assert sdk.init() == 0
+        assert sdk.get_detector_image() is None
+        image_ring.write(np.full((4, 6, 3), 5, np.uint8), timestamp=2.0)
+        image = sdk.get_detector_image()
+        assert image.shape == (4, 6, 3) and (image == 5).all() and image.timestamp == 2.0
+        assert sdk.get_detector_image() is None
+        sdk.release()
+    finally:
+        image_ring.close()
+        boxes_ring.close()
+        control.close()
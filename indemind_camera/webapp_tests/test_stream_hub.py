@@ -0,0 +1,305 @@
+"""Tests for StreamHub — 编码扇出，使用 FakeImseeSdk，无需相机。"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from webapp.indemind_handler import IndemindHandler
+from webapp.stream_hub import StreamHub
+from fake_sdk import FakeImseeSdk
+
+
+@pytest.fixture
+def running():
+    sdk = FakeImseeSdk(width=64, height=40)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    h.start()
+    yield sdk, h
+    h.stop()
+
+
+# ============================================================
+# Subscription bookkeeping
+# ============================================================
+
+def test_subscribe_unsubscribe_counts():
+    hub = StreamHub(IndemindHandler())
+    a = hub.subscribe("frame", 80)
+    b = hub.subscribe("frame", 80)
+    c = hub.subscribe("overlay", 60)
+    assert hub.subscriber_count() == 3
+    assert hub.subscriber_count("frame") == 2
+    assert hub.variant_keys() == [("frame", 80, 1.0), ("overlay", 60, 1.0)]
+    hub.unsubscribe(a)
+    hub.unsubscribe(c)
+    assert hub.variant_keys() == [("frame", 80, 1.0)]
+    hub.unsubscribe(b)
+    assert hub.variant_keys() == []
+    assert hub.subscriber_count() == 0
+
+
+def test_subscribe_unknown_kind():
+    hub = StreamHub(IndemindHandler())
+    with pytest.raises(ValueError):
+        hub.subscribe("disparity")
+
+
+def test_get_jpeg_not_running():
+    hub = StreamHub(IndemindHandler())
+    sub = hub.subscribe("frame")
+    assert hub.get_jpeg(sub) is None
+
+
+# ============================================================
+# Encode-once fan-out
+# ============================================================
+
+def test_same_variant_encoded_once_per_frame(running, wait_seq):
+    sdk, h = running
+    hub = StreamHub(h)
+    subs = [hub.subscribe("frame", 80) for _ in range(10)]
+    for i in range(1, 4):
+        sdk.push()
+        wait_seq(h, i)
+        datas = [hub.get_jpeg(s) for s in subs]
+        assert all(d is datas[0] for d in datas)
+        assert datas[0][:2] == b'\xff\xd8'
+    assert hub.encode_count == 3
+    assert all(s.last_seq == 3 and s.frames_sent == 3 for s in subs)
+
+
+def test_variants_encoded_independently(running, wait_seq):
+    sdk, h = running
+    hub = StreamHub(h)
+    subs = [hub.subscribe("frame", 80), hub.subscribe("frame", 50),
+            hub.subscribe("overlay", 80), hub.subscribe("overlay", 80)]
+    sdk.push()
+    wait_seq(h, 1)
+    for s in subs:
+        assert hub.get_jpeg(s) is not None
+    assert hub.encode_count == 3
+
+
+def test_unwatched_variant_not_encoded(running, wait_seq):
+    sdk, h = running
+    hub = StreamHub(h)
+    sub = hub.subscribe("overlay", 80)
+    hub.unsubscribe(sub)
+    sdk.push()
+    wait_seq(h, 1)
+    assert hub.get_jpeg(sub) is None
+    assert hub.encode_count == 0
+
+
+def test_concurrent_subscribers_share_encode(running, wait_seq):
+    sdk, h = running
+    hub = StreamHub(h)
+    subs = [hub.subscribe("overlay", 70) for _ in range(20)]
+    sdk.push()
+    wait_seq(h, 1)
+    results = []
+    threads = [threading.Thread(target=lambda s=s: results.append(hub.get_jpeg(s)))
+               for s in subs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 20
+    assert len({id(r) for r in results}) == 1
+    assert hub.encode_count == 1
+
+
+# ============================================================
+# Async path — frame-driven, no re-send
+# ============================================================
+
+def test_next_jpeg_waits_for_new_frame(running):
+    import asyncio
+    sdk, h = running
+    hub = StreamHub(h)
+    sub = hub.subscribe("frame", 80)
+
+    async def run():
+        sdk.push()
+        first = await asyncio.wait_for(hub.next_jpeg(sub), 2)
+        assert first[:2] == b'\xff\xd8'
+        assert sub.last_seq == 1
+        # 没有新帧时不重复发送
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(hub.next_jpeg(sub), 0.1)
+        sdk.push()
+        await asyncio.wait_for(hub.next_jpeg(sub), 2)
+        assert sub.last_seq == 2
+
+    asyncio.run(run())
+    assert hub.encode_count == 2
+
+
+def test_next_jpeg_concurrent_waiters_share_encode(running):
+    import asyncio
+    sdk, h = running
+    hub = StreamHub(h)
+    subs = [hub.subscribe("overlay", 80) for _ in range(50)]
+
+    async def run():
+        waiters = [asyncio.ensure_future(hub.next_jpeg(s)) for s in subs]
+        await asyncio.sleep(0.01)
+        sdk.push()
+        return await asyncio.wait_for(asyncio.gather(*waiters), 2)
+
+    results = asyncio.run(run())
+    assert len({id(r) for r in results}) == 1
+    assert hub.encode_count == 1
+
+
+def test_next_jpeg_cancel_does_not_break_others(running):
+    import asyncio
+    sdk, h = running
+    hub = StreamHub(h)
+    a = hub.subscribe("frame", 80)
+    b = hub.subscribe("frame", 80)
+
+    async def run():
+        ta = asyncio.ensure_future(hub.next_jpeg(a))
+        tb = asyncio.ensure_future(hub.next_jpeg(b))
+        await asyncio.sleep(0.01)
+        ta.cancel()
+        sdk.push()
+        return await asyncio.wait_for(tb, 2)
+
+    assert asyncio.run(run())[:2] == b'\xff\xd8'
+
+
+def test_waiters_on_different_loops_all_woken(running):
+    import asyncio
+    sdk, h = running
+    hub = StreamHub(h)
+    parked = threading.Barrier(3)
+    results = []
+
+    def waiter():
+        async def run():
+            task = asyncio.ensure_future(hub.wait_snapshot(0))
+            await asyncio.sleep(0.05)      # 两个循环都已在各自的事件上等待
+            parked.wait()
+            return await asyncio.wait_for(task, 2)
+        results.append(asyncio.run(run()))
+
+    threads = [threading.Thread(target=waiter) for _ in range(2)]
+    for t in threads:
+        t.start()
+    parked.wait()
+    sdk.push()
+    for t in threads:
+        t.join(5)
+    assert [snap.seq for snap in results] == [1, 1]
+
+
+def test_next_jpeg_ends_when_handler_stops(running):
+    import asyncio
+    sdk, h = running
+    hub = StreamHub(h)
+    sub = hub.subscribe("frame", 80)
+
+    async def run():
+        sdk.push()
+        await asyncio.wait_for(hub.next_jpeg(sub), 2)
+        waiter = asyncio.ensure_future(hub.next_jpeg(sub))
+        await asyncio.sleep(0.01)
+        await asyncio.get_running_loop().run_in_executor(None, h.stop)
+        assert await asyncio.wait_for(waiter, 2) is None
+        assert await asyncio.wait_for(hub.next_jpeg(sub), 0.5) is None
+
+    asyncio.run(run())
+
+
+# ============================================================
+# Per-client parameters — quality / scale / max_fps
+# ============================================================
+
+@pytest.mark.parametrize("kwargs", [
+    {"quality": 0}, {"quality": 101}, {"scale": 0}, {"scale": 1.5}, {"max_fps": 0},
+])
+def test_subscribe_rejects_bad_params(kwargs):
+    hub = StreamHub(IndemindHandler())
+    with pytest.raises(ValueError):
+        hub.subscribe("frame", **kwargs)
+
+
+def test_same_params_share_variant():
+    hub = StreamHub(IndemindHandler())
+    hub.subscribe("frame", 60, 0.5, max_fps=5)
+    hub.subscribe("frame", 60, 0.501, max_fps=12)   # max_fps 不影响编码，scale 取两位小数
+    hub.subscribe("frame", 60, 0.25)
+    assert hub.variant_keys() == [("frame", 60, 0.25), ("frame", 60, 0.5)]
+
+
+@pytest.mark.parametrize("kind", ["frame", "overlay"])
+@pytest.mark.parametrize("scale,size", [(1.0, (64, 40)), (0.5, (32, 20)), (0.25, (16, 10))])
+def test_scaled_dimensions(running, kind, scale, size, wait_seq):
+    import cv2
+    import numpy as np
+    sdk, h = running
+    hub = StreamHub(h)
+    sub = hub.subscribe(kind, 80, scale)
+    sdk.push()
+    wait_seq(h, 1)
+    img = cv2.imdecode(np.frombuffer(hub.get_jpeg(sub), np.uint8), cv2.IMREAD_UNCHANGED)
+    assert (img.shape[1], img.shape[0]) == size
+
+
+def test_resize_shared_across_qualities(running, wait_seq):
+    sdk, h = running
+    hub = StreamHub(h)
+    subs = [hub.subscribe("overlay", q, 0.5) for q in (30, 60, 90)]
+    subs += [hub.subscribe("frame", q, 0.5) for q in (30, 60)]
+    for i in (1, 2):
+        sdk.push()
+        wait_seq(h, i)
+        for s in subs:
+            hub.get_jpeg(s)
+    assert hub.encode_count == 10
+    # 每帧每个 (kind, scale) 只缩放一次
+    assert h._resize_count == 4
+
+
+def test_max_fps_paces_delivery(running):
+    import asyncio
+    sdk, h = running
+    hub = StreamHub(h)
+    sub = hub.subscribe("frame", 80, max_fps=10)
+    fast = hub.subscribe("frame", 80)
+    stop = threading.Event()
+
+    def feeder():
+        while not stop.is_set():
+            sdk.push()
+            time.sleep(0.005)
+
+    async def run():
+        stamps = []
+        for _ in range(4):
+            await asyncio.wait_for(hub.next_jpeg(sub), 2)
+            stamps.append(time.monotonic())
+        return stamps
+
+    t = threading.Thread(target=feeder, daemon=True)
+    t.start()
+    try:
+        stamps = asyncio.run(run())
+    finally:
+        stop.set()
+        t.join()
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert all(g >= 0.095 for g in gaps), gaps
+    # 中间帧被跳过: 序号跳跃，而不是逐帧补发
+    assert sub.frames_sent == 4
+    assert sub.last_seq > 4
+    assert fast.frames_sent == 0
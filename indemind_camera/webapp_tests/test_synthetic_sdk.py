@@ -0,0 +1,150 @@
+"""Tests for test/synthetic_sdk.py — 实时合成数据源 (无需相机)。"""
+import os
+import sys
+import time
+
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from detector_utils import DET_DTYPE
+from imu_stream import IMU_DTYPE
+from sdk_backend import open_sdk
+from synthetic_sdk import FAR, NEAR, SyntheticScene, SyntheticSdk
+from webapp.indemind_handler import IndemindHandler
+
+ALL_KINDS = {"frame", "rectified", "depth", "disparity", "points", "detector"}
+
+
+@pytest.fixture
+def scene():
+    return SyntheticScene(64, 40, fps=20, objects=2, holes=0.05)
+
+
+def test_scene_renders_only_requested(scene):
+    assert set(scene.render(0, {"frame"})) == {"frame"}
+    assert set(scene.render(0, {"frame", "depth"})) == {"frame", "depth"}
+    assert set(scene.render(0, ALL_KINDS)) == ALL_KINDS
+
+
+def test_scene_frame_moves(scene):
+    a = scene.render(0, {"frame"})["frame"].copy()
+    b = scene.render(5, {"frame"})["frame"]
+    assert a.shape == (40, 128) and a.dtype == np.uint8
+    assert not np.array_equal(a, b)
+
+
+def test_scene_depth_ramp_objects_and_holes(scene):
+    out = scene.render(3, {"depth", "detector"})
+    depth = out["depth"]
+    assert depth.shape == (40, 64) and depth.dtype == np.uint16
+    holes = depth == 0
+    assert 0 < holes.mean() < 0.2
+    valid = depth[~holes]
+    assert valid.min() >= NEAR and valid.max() <= FAR
+    # 斜坡: 上远下近
+    assert depth[0][depth[0] > 0].max() > depth[-1][depth[-1] > 0].max()
+    boxes = out["detector"]
+    assert boxes.dtype == DET_DTYPE and len(boxes) == 2
+    for b in boxes:
+        region = depth[b["y"]:b["y"] + b["h"], b["x"]:b["x"] + b["w"]]
+        region = region[region > 0]
+        assert len(np.unique(region)) == 1   # 物体内是同一深度
+
+
+def test_scene_disparity_and_points_follow_depth(scene):
+    out = scene.render(1, {"depth", "disparity", "points"})
+    depth = out["depth"].astype(np.float32)
+    disp, pts = out["disparity"], out["points"]
+    valid = depth > 0
+    assert (disp[~valid] == 0).all()
+    np.testing.assert_allclose(disp[valid], scene.fxb / depth[valid], rtol=1e-5)
+    assert pts.shape == (40 * 64, 3)
+    np.testing.assert_array_equal(pts[:, 2], depth.reshape(-1))
+    assert (pts[~valid.reshape(-1)] == 0).all()
+
+
+def test_scene_imu_is_continuous():
+    a = SyntheticScene.imu(0, 10, 1000.0)
+    b = SyntheticScene.imu(10, 5, 1000.0)
+    ts = np.concatenate([a, b])["timestamp"]
+    assert a.dtype == IMU_DTYPE
+    np.testing.assert_allclose(np.diff(ts), 0.001)
+
+
+def test_sdk_streams_enabled_kinds():
+    sdk = SyntheticSdk(fps=50, size=(32, 20), imu_rate=500)
+    assert sdk.init(1, 25) == 0
+    try:
+        assert sdk.wait_frame("frame", timeout=1.0).shape == (20, 64)
+        assert sdk.get_depth() is None   # 没 enable 的数据不生成
+        assert sdk.enable_depth() == 0 and sdk.enable_imu() == 0
+        assert sdk.enable_detector() == 0
+        reader = sdk.imu_reader()
+        depth = sdk.wait_frame("depth", timeout=1.0)
+        assert depth.shape == (20, 32) and depth.seq > 0
+        time.sleep(0.2)
+        samples = reader.read()
+        assert 50 <= len(samples) <= 150
+        np.testing.assert_allclose(np.diff(samples["timestamp"]), 0.002, atol=1e-6)
+        assert len(sdk.get_detector_boxes()) == 2
+        assert sdk.get_calibration()["width"] == 32
+        assert "SYNTHETIC" in sdk.get_module_info()
+        stats = sdk.generator_stats()
+        assert stats["frames"] > 0 and stats["render_ms"] > 0
+    finally:
+        sdk.release()
+    assert not sdk.is_initialized()
+
+
+def test_sdk_paces_fps():
+    sdk = SyntheticSdk(fps=40, size=(16, 10))
+    sdk.init()
+    try:
+        time.sleep(0.1)
+        seq0 = sdk.get_seq("frame")
+        time.sleep(0.5)
+        frames = sdk.get_seq("frame") - seq0
+    finally:
+        sdk.release()
+    assert 14 <= frames <= 24
+
+
+def test_resolution_override_and_invalid():
+    sdk = SyntheticSdk(resolution=2, fps=10)
+    sdk.init(1, 25)
+    try:
+        assert sdk.wait_frame("frame", timeout=1.0).shape == (800, 2560)
+    finally:
+        sdk.release()
+    assert SyntheticSdk().init(3, 25) != 0
+
+
+def test_open_sdk_synthetic():
+    sdk = open_sdk("synthetic", size=(16, 10), fps=30)
+    assert isinstance(sdk, SyntheticSdk)
+    sdk.init()
+    try:
+        assert sdk.wait_frame("frame", timeout=1.0) is not None
+    finally:
+        sdk.release()
+
+
+def test_handler_on_synthetic():
+    h = IndemindHandler(sdk_factory=lambda: SyntheticSdk(fps=50, size=(32, 20)))
+    assert h.start()["success"]
+    try:
+        deadline = time.monotonic() + 2.0
+        while (h.get_snapshot() is None or h.get_snapshot().depth is None) \
+                and time.monotonic() < deadline:
+            time.sleep(0.01)
+        snap = h.get_snapshot()
+        assert snap.frame.shape == (20, 32)
+        assert snap.depth.shape == (20, 32)
+        assert h.get_overlay_jpeg()[:2] == b"\xff\xd8"
+    finally:
+        h.stop()
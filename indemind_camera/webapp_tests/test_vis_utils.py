@@ -0,0 +1,80 @@
+"""Tests for vis_utils LUT 快速路径 — 必须与旧的逐像素实现逐位一致。"""
+import os
+import sys
+import warnings
+
+import cv2
+import numpy as np
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from vis_utils import (depth_to_color, disparity_to_color, depth_lut,
+                       _depth_to_color_reference, _disparity_to_color_reference)
+
+
+def _random_depth(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    depth = rng.integers(0, 7000, shape, dtype=np.uint16)
+    depth[rng.random(shape) < 0.2] = 0
+    depth[0, 0] = 65535
+    return depth
+
+
+@pytest.mark.parametrize("shape", [(400, 640), (13, 7)])
+@pytest.mark.parametrize("max_range", [4000, 1000, 3333, 70000])
+@pytest.mark.parametrize("denoise", [True, False])
+def test_depth_to_color_matches_reference(shape, max_range, denoise):
+    depth = _random_depth(shape)
+    fast = depth_to_color(depth, max_range=max_range, denoise=denoise)
+    ref = _depth_to_color_reference(depth, max_range=max_range, denoise=denoise)
+    for a, b in zip(fast, ref):
+        assert a.dtype == b.dtype
+        assert a.shape == b.shape
+        assert np.array_equal(a, b)
+
+
+def test_depth_to_color_other_colormap_matches_reference():
+    depth = _random_depth((40, 60), seed=3)
+    fast = depth_to_color(depth, colormap=cv2.COLORMAP_TURBO)
+    ref = _depth_to_color_reference(depth, colormap=cv2.COLORMAP_TURBO)
+    assert np.array_equal(fast[0], ref[0])
+
+
+def test_depth_to_color_does_not_modify_input():
+    depth = _random_depth((20, 30))
+    before = depth.copy()
+    depth_to_color(depth, denoise=False)
+    depth_to_color(depth)
+    assert np.array_equal(depth, before)
+
+
+def test_depth_lut_cached_and_readonly():
+    lut = depth_lut(4000)
+    assert lut is depth_lut(4000)
+    assert lut.shape == (65536, 3)
+    assert not lut.flags.writeable
+    assert np.all(lut[0] == 0)
+    assert np.all(lut[4001:] == 0)
+
+
+@pytest.mark.parametrize("shape", [(400, 640), (9, 11)])
+def test_disparity_to_color_matches_reference(shape):
+    rng = np.random.default_rng(1)
+    disp = (rng.random(shape, dtype=np.float32) * 80 - 8).astype(np.float32)
+    disp[0, 0] = np.nan
+    disp[-1, -1] = np.inf
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        assert np.array_equal(disparity_to_color(disp),
+                              _disparity_to_color_reference(disp))
+
+
+def test_disparity_to_color_all_invalid():
+    disp = np.zeros((5, 6), dtype=np.float32)
+    out = disparity_to_color(disp)
+    assert out.shape == (5, 6, 3)
+    assert not out.any()
@@ -0,0 +1,197 @@
+"""Tests for /ws/depth, /ws/frame — TestClient websocket + 合成深度，无需相机。"""
+import asyncio
+import os
+import sys
+import time
+import threading
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TEST_DIR = os.path.join(_PROJECT_DIR, "test")
+if _TEST_DIR not in sys.path:
+    sys.path.insert(0, _TEST_DIR)
+
+from depth_codec import DepthDecoder
+from fake_sdk import FakeImseeSdk
+from webapp import server
+from webapp.binary_frame import HEADER, pack_frame, unpack_frame
+from webapp.indemind_handler import IndemindHandler
+from webapp.stream_hub import StreamHub
+
+
+def _synthetic_depth(seq, shape=(40, 64)):
+    h, w = shape
+    ramp = np.linspace(300, 4000, w, dtype=np.float32)[None, :].repeat(h, 0)
+    depth = (ramp + seq).astype(np.uint16)
+    depth[::7, ::5] = 0   # 空洞
+    return depth
+
+
+@pytest.fixture
+def live():
+    sdk = FakeImseeSdk(width=64, height=40)
+    h = IndemindHandler(sdk_factory=lambda: sdk)
+    hub = StreamHub(h)
+    h.start()
+    with patch("webapp.server.handler", h), patch("webapp.server.hub", hub):
+        yield sdk, h, hub
+    h.stop()
+
+
+def _push_until_received(sdk, ws, frames, decoder=None):
+    """后台持续推帧，直到客户端收到 frames 条消息。"""
+    stop = threading.Event()
+
+    def feeder():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            sdk.push(depth=_synthetic_depth(i))
+            time.sleep(0.01)
+
+    t = threading.Thread(target=feeder, daemon=True)
+    t.start()
+    try:
+        return [unpack_frame(ws.receive_bytes(), decoder) for _ in range(frames)]
+    finally:
+        stop.set()
+        t.join()
+
+
+# ============================================================
+# Wire format
+# ============================================================
+
+def test_pack_unpack_roundtrip_uint16():
+    depth = _synthetic_depth(3)
+    data = pack_frame(42, 1.5, depth)
+    assert len(data) == HEADER.size + depth.nbytes
+    seq, ts, out = unpack_frame(data)
+    assert (seq, ts) == (42, 1.5)
+    assert out.dtype == np.uint16
+    assert np.array_equal(out, depth)
+
+
+def test_pack_unpack_roundtrip_uint8_noncontiguous():
+    frame = np.arange(40 * 128, dtype=np.uint8).reshape(40, 128)[:, :64]
+    seq, _, out = unpack_frame(pack_frame(1, 0.0, frame))
+    assert np.array_equal(out, frame)
+
+
+def test_pack_rejects_unsupported():
+    with pytest.raises(ValueError):
+        pack_frame(1, 0.0, np.zeros((2, 2), np.float32))
+    with pytest.raises(ValueError):
+        pack_frame(1, 0.0, np.zeros((2, 2, 3), np.uint8))
+    with pytest.raises(ValueError):
+        unpack_frame(b"XXXX" + bytes(HEADER.size))
+
+
+# ============================================================
+# Endpoints
+# ============================================================
+
+def test_ws_depth_streams_raw_depth(live):
+    sdk, h, hub = live
+    client = TestClient(server.app)
+    with client.websocket_connect("/ws/depth") as ws:
+        msgs = _push_until_received(sdk, ws, 3)
+    seqs = [m[0] for m in msgs]
+    assert seqs == sorted(set(seqs))
+    for seq, ts, depth in msgs:
+        assert depth.shape == (40, 64)
+        assert depth.dtype == np.uint16
+        assert ts > 0
+        assert depth[0, 0] == 0 and depth[1, 1] > 0
+
+
+def test_ws_depth_rvl_codec(live):
+    sdk, h, hub = live
+    client = TestClient(server.app)
+    with client.websocket_connect("/ws/depth?codec=rvl") as ws:
+        msgs = _push_until_received(sdk, ws, 4, DepthDecoder())
+    for _, _, depth in msgs:
+        assert depth.shape == (40, 64) and depth.dtype == np.uint16
+        # 无损: 与推送的 _synthetic_depth(i) 逐像素相同 (i 由斜坡的平移量反推)
+        i = int(depth[1, 1]) - int(_synthetic_depth(0)[1, 1])
+        np.testing.assert_array_equal(depth, _synthetic_depth(i))
+
+
+def test_ws_frame_streams_grayscale(live):
+    sdk, h, hub = live
+    client = TestClient(server.app)
+    with client.websocket_connect("/ws/frame") as ws:
+        msgs = _push_until_received(sdk, ws, 2)
+    for _, _, frame in msgs:
+        assert frame.shape == (40, 64)
+        assert frame.dtype == np.uint8
+
+
+def test_ws_depth_header_describes_carried_over_depth(live, wait_seq):
+    sdk, h, hub = live
+    sdk.push(depth=_synthetic_depth(1))
+    first = wait_seq(h, 1)
+    with sdk._lock:
+        sdk._frame = np.zeros((40, 128), np.uint8)    # 只有新 frame，深度沿用第 1 帧的
+    assert wait_seq(h, 2).depth_seq == 1
+    ws = _SlowSocket(delay=0)
+
+    async def run():
+        task = asyncio.ensure_future(server._ws_sender(ws, "depth"))
+        while not ws.sent:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(run(), 2))
+    assert ws.headers[0] == (1, first.timestamp)
+
+
+# ============================================================
+# Slow client — stale frames dropped, never queued
+# ============================================================
+
+class _SlowSocket:
+    def __init__(self, delay):
+        self.delay = delay
+        self.sent = []
+        self.headers = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_bytes(self, data):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        seq, timestamp, _ = unpack_frame(data)
+        self.sent.append(seq)
+        self.headers.append((seq, timestamp))
+        self.in_flight -= 1
+
+
+def test_slow_client_gets_latest_and_drops_stale(live):
+    sdk, h, hub = live
+    ws = _SlowSocket(delay=0.05)
+    stats = {}
+    pushed = 30
+
+    async def run():
+        task = asyncio.ensure_future(server._ws_sender(ws, "depth", stats))
+        await asyncio.sleep(0.01)
+        for i in range(1, pushed + 1):
+            sdk.push(depth=_synthetic_depth(i))
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.2)
+        task.cancel()
+        return h.get_snapshot().depth_seq
+
+    newest = asyncio.run(run())
+    assert ws.max_in_flight == 1
+    assert len(ws.sent) < pushed
+    assert ws.sent == sorted(set(ws.sent))
+    assert ws.sent[-1] == newest           # 最后总能拿到最新帧
+    assert stats["dropped"] > 0
+    assert stats["sent"] == len(ws.sent)